@@ -92,6 +92,12 @@ config.Agent.agentNumber = agentNumber
 config.Agent.useMsgService = False
 config.Agent.useTrigger = False
 config.Agent.useHeartbeat = True
+# Write the heartbeat of the workers at most every 5 minutes
+config.Agent.heartbeatInterval = 300
+# Write the summary of the last poll cycle of the workers in their heartbeat
+config.Agent.heartbeatCycleSummary = False
+# Let the components wake each other up when there is work for them
+config.Agent.useWakeupChannel = True
 
 config.section_("General")
 config.General.workDir = workDirectory
@@ -151,6 +157,9 @@ config.DBS3Upload.pollInterval = 100
 #"https://cmsweb.cern.ch/dbs/prod/global/DBSWriter" - production one
 config.DBS3Upload.dbsUrl = "OVERWRITE_BY_SECRETS"
 config.DBS3Upload.primaryDatasetType = "mc"
+config.DBS3Upload.nProcesses = 4
+config.DBS3Upload.loadWorkers = 4
+config.DBS3Upload.dbsRetryDelay = 300
 
 config.section_("DBSInterface")
 #config.DBSInterface.DBSUrl = localDBSUrl
@@ -174,6 +183,8 @@ config.PhEDExInjector.phedexurl = "OVER_WRITE_BY_SECETES"
 config.PhEDExInjector.pollInterval = 100
 config.PhEDExInjector.subscribeInterval = 43200
 config.PhEDExInjector.diskSites = diskSites
+config.PhEDExInjector.injectionWorkers = 4
+config.PhEDExInjector.maxFilesPerInjection = 5000
 
 config.component_("JobAccountant")
 config.JobAccountant.namespace = "WMComponent.JobAccountant.JobAccountant"
@@ -243,6 +254,7 @@ config.ErrorHandler.readFWJR = True
 config.ErrorHandler.failureExitCodes = [50660, 50661, 50664, 71102]
 config.ErrorHandler.maxFailTime = 120000
 config.ErrorHandler.maxProcessSize = 30
+config.ErrorHandler.triageProcesses = 1
 
 config.component_("RetryManager")
 config.RetryManager.namespace = "WMComponent.RetryManager.RetryManager"
@@ -264,6 +276,13 @@ config.JobArchiver.numberOfJobsToCluster = 1000
 # HOWEVER: Is is HIGHLY recommended that you do NOT run this on the same
 # disk as the JobCreator
 #config.JobArchiver.logDir = config.General.workDir + "/JobArchives"
+# "job" makes a Job_<id> tarball per job, "cluster" appends all the jobs of
+# a JobCluster_<N> to a single archive with an index of the job offsets
+config.JobArchiver.archiveMode = "job"
+# bz2, gz or none, gz with a low compressLevel is much faster than bz2
+config.JobArchiver.compression = "bz2"
+config.JobArchiver.compressLevel = 9
+config.JobArchiver.archiveWorkers = 1
 
 config.component_("TaskArchiver")
 config.TaskArchiver.namespace = "WMComponent.TaskArchiver.TaskArchiver"
@@ -360,6 +379,11 @@ config.section_("Alert")
 config.Alert.address = "tcp://127.0.0.1:6557"
 # control channel (internal alert system commands)
 config.Alert.controlAddr = "tcp://127.0.0.1:6559"
+# alerts are sent in batches of up to batchSize alerts, at least every flushInterval seconds
+config.Alert.batchSize = 100
+config.Alert.flushInterval = 1
+# identical alerts are only sent once within dedupWindow seconds
+config.Alert.dedupWindow = 60
 
 # AlertProcessor component
 # AlertProcessor values - values for Level soft, resp. critical
@@ -376,6 +400,8 @@ config.AlertProcessor.soft.level = 1
 config.AlertProcessor.address = config.Alert.address
 config.AlertProcessor.controlAddr = config.Alert.controlAddr
 config.AlertProcessor.soft.bufferSize = 3
+# alerts queued per sink while it is busy, 0 to call the sinks synchronously
+config.AlertProcessor.sinkQueueSize = 1000
 # configure sinks associated with AlertProcessor
 # there is one configured sink per soft, resp. critical alerts
 # alerts don't get duplicated - i.e. either soft or critical alert is sent, not both
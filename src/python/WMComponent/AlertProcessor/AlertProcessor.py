@@ -62,6 +62,8 @@ class AlertProcessor(Harness):
         """
         logging.info("stopAlertProcessor - stopping Receiver ...")
         self._receiver.shutdown()
+        logging.info("stopAlertProcessor - flushing sinks ...")
+        self._processor.close()
         logging.info("stopAlertProcessor finished.")
 
 
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+_DBSBufferFileStager_
+
+Gather files to be added to DBSBuffer and insert them in bulk.
+"""
+
+import collections
+
+from WMCore.WMConnectionBase import WMConnectionBase
+
+
+class DBSBufferFileStager(WMConnectionBase):
+    """
+    _DBSBufferFileStager_
+
+    Files are staged by LFN, so a file staged twice is only inserted once.
+    Committing them costs one query per table whatever the number of
+    files: a bulk insert of the files, of their locations, checksums and
+    run/lumis. Locations are only inserted the first time they are seen
+    by this object.
+    """
+
+    def __init__(self):
+        WMConnectionBase.__init__(self, "WMComponent.DBS3Buffer")
+
+        self.existsAction = self.daofactory(classname = "DBSBufferFiles.ExistsBulk")
+        self.insertLocation = self.daofactory(classname = "DBSBufferFiles.AddLocation")
+        self.createFiles = self.daofactory(classname = "DBSBufferFiles.Add")
+        self.setLocation = self.daofactory(classname = "DBSBufferFiles.SetLocationByLFN")
+        self.setChecksum = self.daofactory(classname = "DBSBufferFiles.AddChecksumByLFN")
+        self.setRunLumi = self.daofactory(classname = "DBSBufferFiles.AddRunLumi")
+
+        self.knownLocations = set()
+        self.files = collections.OrderedDict()
+        return
+
+    def __len__(self):
+        return len(self.files)
+
+    def reset(self):
+        """
+        _reset_
+
+        Forget about the staged files, but not about the known locations.
+        """
+        self.files = collections.OrderedDict()
+        return
+
+    def stageFile(self, lfn, size, events, datasetAlgo, workflowID,
+                  locations, checksums = None, runs = None, status = "NOTUPLOADED"):
+        """
+        _stageFile_
+
+        Stage a file for insertion, return False if it was already staged.
+        """
+        if lfn in self.files:
+            return False
+        self.files[lfn] = {'lfn': lfn, 'size': size, 'events': events,
+                           'datasetAlgo': datasetAlgo, 'workflowID': workflowID,
+                           'status': status, 'locations': locations,
+                           'checksums': checksums or {}, 'runs': runs}
+        return True
+
+    def stagedFiles(self):
+        """
+        _stagedFiles_
+
+        List of the staged files, in the order they were staged
+        """
+        return self.files.values()
+
+    def dropExisting(self):
+        """
+        _dropExisting_
+
+        Drop from the staged files the ones already in DBSBuffer, checking
+        all of them at once. Return the LFNs dropped.
+        """
+        if not self.files:
+            return set()
+        existing = self.existsAction.execute(lfns = self.files.keys(),
+                                             conn = self.getDBConn(),
+                                             transaction = self.existingTransaction())
+        for lfn in existing:
+            del self.files[lfn]
+        return existing
+
+    def commit(self):
+        """
+        _commit_
+
+        Insert all the staged files in DBSBuffer and empty the stage.
+        """
+        if not self.files:
+            return
+
+        dbsFileTuples = []
+        dbsFileLoc = []
+        dbsCksumBinds = []
+        runLumiBinds = []
+        locations = set()
+
+        for dbsFile in self.files.itervalues():
+            lfn = dbsFile['lfn']
+            # Tuple in the format specified by DBSBufferFiles.Add
+            dbsFileTuples.append((lfn, dbsFile['size'], dbsFile['events'],
+                                  dbsFile['datasetAlgo'], dbsFile['status'],
+                                  dbsFile['workflowID']))
+
+            for location in dbsFile['locations']:
+                locations.add(location)
+                dbsFileLoc.append({'lfn': lfn, 'sename': location})
+
+            for cktype, cksum in dbsFile['checksums'].iteritems():
+                dbsCksumBinds.append({'lfn': lfn, 'cksum': cksum, 'cktype': cktype})
+
+            if dbsFile['runs']:
+                runLumiBinds.append({'lfn': lfn, 'runs': dbsFile['runs']})
+
+        newLocations = locations - self.knownLocations
+        if newLocations:
+            self.insertLocation.execute(siteName = newLocations,
+                                        conn = self.getDBConn(),
+                                        transaction = self.existingTransaction())
+            self.knownLocations.update(newLocations)
+
+        self.createFiles.execute(files = dbsFileTuples,
+                                 conn = self.getDBConn(),
+                                 transaction = self.existingTransaction())
+
+        if dbsFileLoc:
+            self.setLocation.execute(binds = dbsFileLoc,
+                                     conn = self.getDBConn(),
+                                     transaction = self.existingTransaction())
+
+        if dbsCksumBinds:
+            self.setChecksum.execute(bulkList = dbsCksumBinds,
+                                     conn = self.getDBConn(),
+                                     transaction = self.existingTransaction())
+
+        if runLumiBinds:
+            self.setRunLumi.execute(file = runLumiBinds,
+                                    conn = self.getDBConn(),
+                                    transaction = self.existingTransaction())
+
+        self.reset()
+        return
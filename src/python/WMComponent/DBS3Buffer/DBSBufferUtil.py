@@ -71,7 +71,7 @@ class DBSBufferUtil(WMConnectionBase):
         """
         _findUploadableDAS_
 
-        Find all dataset_algo with uploadable files.
+        Find all dataset_algo with uploadable files not in a block yet.
         """
         findDAS = self.daoFactory(classname = "FindDASToUpload")
         result = findDAS.execute(transaction = False)
@@ -127,7 +127,8 @@ class DBSBufferUtil(WMConnectionBase):
         """
         _findUploadableDAS_
 
-        Find all the uploadable files for a given DatasetPath.
+        Find all the uploadable files for a given DatasetPath which are not
+        in a block yet, the files of the open blocks are loaded with them.
         """
         dbsFiles = []
 
@@ -16,6 +16,18 @@ Each part is carried out in its own database transaction.
 3) The code cleans up at the end, check for any open blocks
    that have exceeded their timeout.
 
+The cycle is a pipeline: the files of the new open blocks and the
+uploadable files of the datasets are loaded concurrently by a pool of
+threads, and only the files which are not in a block yet are loaded,
+the open blocks staying in the cache between cycles.  The blocks closed
+so far are handed to the upload processes before the new files are
+loaded, so that their upload overlaps with the loading.
+
+The DBSBuffer status of the blocks is what makes the upload resumable:
+Pending blocks are loaded back and uploaded again after a restart, DBS
+reporting the ones it already has as duplicates.  Blocks whose upload
+failed are retried with an increasing delay.
+
 
 NOTE: This is complicated as hell, because you can have a
 dataset-algo pair where BOTH the dataset and the algo are in
@@ -31,10 +43,13 @@ import logging
 import Queue
 import traceback
 import multiprocessing
+from itertools import izip
+from multiprocessing.pool import ThreadPool
 
 from WMCore.DAOFactory import DAOFactory
 
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
+from WMCore.WorkerThreads.Instrumentation  import timed
 from WMCore.Services.UUID                  import makeUUID
 from WMCore.WMException                    import WMException
 from WMCore.Algorithms.MiscAlgos           import sortListByKey
@@ -141,6 +156,19 @@ def uploadWorker(workInput, results, dbsUrl):
 
     return
 
+def initLoadThread(logger, dbi, dbFactory):
+    """
+    _initLoadThread_
+
+    Give the threads loading from DBSBuffer the database connection of the
+    poller, the DBSBuffer objects look for it in the current thread
+    """
+    myThread = threading.currentThread()
+    myThread.logger = logger
+    myThread.dbi = dbi
+    myThread.dbFactory = dbFactory
+    return
+
 class DBSUploadException(WMException):
     """
     Holds the exception info for
@@ -181,14 +209,17 @@ class DBSUploadPoller(BaseWorkerThread):
         self.nProc  = getattr(self.config.DBS3Upload, 'nProcesses', 4)
         self.wait   = getattr(self.config.DBS3Upload, 'dbsWaitTime', 2)
         self.nTries = getattr(self.config.DBS3Upload, 'dbsNTries', 300)
+        self.loadWorkers   = getattr(self.config.DBS3Upload, 'loadWorkers', 4)
+        self.retryDelay    = getattr(self.config.DBS3Upload, 'dbsRetryDelay', 300)
+        self.maxRetryDelay = getattr(self.config.DBS3Upload, 'dbsMaxRetryDelay', 3600)
         self.physicsGroup   = getattr(self.config.DBS3Upload, "physicsGroup", "NoGroup")
         self.datasetType    = getattr(self.config.DBS3Upload, "datasetType", "PRODUCTION")
         self.primaryDatasetType = getattr(self.config.DBS3Upload, "primaryDatasetType", "mc")
         self.blockCount     = 0
         self.dbsApi = DbsApi(url = self.dbsUrl)
 
-        # List of blocks currently in processing
-        self.queuedBlocks = []
+        # Blocks currently in processing
+        self.queuedBlocks = set()
 
         # Set up the pool of worker processes
         self.setupPool()
@@ -196,6 +227,12 @@ class DBSUploadPoller(BaseWorkerThread):
         # Setting up any cache objects
         self.blockCache = {}
 
+        # Open block of each (datasetpath, location)
+        self.openBlocks = {}
+
+        # Failed upload attempts of the blocks, by block name
+        self.uploadState = {}
+
         self.filesToUpdate = []
 
         self.produceCopy = getattr(self.config.DBS3Upload, 'copyBlock', False)
@@ -210,21 +247,26 @@ class DBSUploadPoller(BaseWorkerThread):
         """
         _setupPool_
 
-        Set up the processing pool for work
+        Set up the processing pool for work, or replace the workers which
+        died.  The pool is kept between cycles.
         """
-        if len(self.pool) > 0:
+        self.pool = [p for p in self.pool if p.is_alive()]
+        if len(self.pool) >= self.nProc:
             # Then something already exists.  Continue
             return
 
-        self.workInput  = multiprocessing.Queue()
-        self.workResult = multiprocessing.Queue()
+        if self.workInput is None:
+            self.workInput  = multiprocessing.Queue()
+            self.workResult = multiprocessing.Queue()
 
         # Starting up the pool:
-        for _ in range(self.nProc):
+        for _ in range(self.nProc - len(self.pool)):
             p = multiprocessing.Process(target = uploadWorker,
                                         args = (self.workInput,
                                                 self.workResult,
                                                 self.dbsUrl))
+            # don't keep the agent waiting for them on exit
+            p.daemon = True
             p.start()
             self.pool.append(p)
 
@@ -282,6 +324,7 @@ class DBSUploadPoller(BaseWorkerThread):
         """
         logging.debug("terminating. doing one more pass before we die")
         self.algorithm(params)
+        self.close()
 
 
     def algorithm(self, parameters = None):
@@ -290,6 +333,7 @@ class DBSUploadPoller(BaseWorkerThread):
 
         First, check blocks that may be already uploaded
         Then, load blocks
+        Then, start adding the blocks already closed to DBS
         Then, load files
         Then, move files into blocks
         Then add new blocks in DBSBuffer
@@ -300,6 +344,7 @@ class DBSUploadPoller(BaseWorkerThread):
             logging.info("Starting the DBSUpload Polling Cycle")
             self.checkBlocks()
             self.loadBlocks()
+            self.inputBlocks()
             self.loadFiles()
             self.checkBlockCompletion()
             self.inputBlocks()
@@ -313,6 +358,7 @@ class DBSUploadPoller(BaseWorkerThread):
             logging.error(msg)
             raise DBSUploadException(msg)
 
+    @timed("loadBlocks")
     def loadBlocks(self):
         """
         _loadBlocks_
@@ -326,7 +372,7 @@ class DBSUploadPoller(BaseWorkerThread):
         # Load them if we don't have them
         blocksToLoad = []
         for block in openBlocks:
-            if not block['blockname'] in self.blockCache.keys():
+            if not block['blockname'] in self.blockCache:
                 blocksToLoad.append(block['blockname'])
 
         # Now load the blocks
@@ -342,17 +388,10 @@ class DBSUploadPoller(BaseWorkerThread):
             logging.debug("Blocks to load: %s\n", blocksToLoad)
             raise DBSUploadException(msg)
 
-        for blockInfo in loadedBlocks:
-            block = DBSBufferBlock(name = blockInfo['block_name'],
-                                   location = blockInfo['origin_site_name'],
-                                   datasetpath = blockInfo['datasetpath'])
-            block.FillFromDBSBuffer(blockInfo)
-            blockname = block.getName()
-
-            # Now we have to load files...
+        def loadBlockFiles(blockInfo):
+            blockname = blockInfo['block_name']
             try:
-                files = self.dbsUtil.loadFilesByBlock(blockname = blockname)
-                logging.info("Have %i files for block %s", (len(files), blockname))
+                return self.dbsUtil.loadFilesByBlock(blockname = blockname)
             except WMException:
                 raise
             except Exception as ex:
@@ -362,15 +401,53 @@ class DBSUploadPoller(BaseWorkerThread):
                 logging.debug("Blocks being loaded: %s\n", blockname)
                 raise DBSUploadException(msg)
 
+        def addBlock(blockInfo, files):
+            block = DBSBufferBlock(name = blockInfo['block_name'],
+                                   location = blockInfo['origin_site_name'],
+                                   datasetpath = blockInfo['datasetpath'])
+            block.FillFromDBSBuffer(blockInfo)
+            logging.info("Have %i files for block %s", len(files), block.getName())
+
             # Add the loaded files to the block
             for f in files:
                 block.addFile(f, self.datasetType, self.primaryDatasetType)
 
             # Add to the cache
-            self.blockCache[blockInfo['block_name']] = block
+            self.blockCache[block.getName()] = block
+            if block.status == 'Open':
+                self.openBlocks[(block.getDatasetPath(), block.getLocation())] = block
 
+        # Now we have to load files...
+        self.loadConcurrently(loadBlockFiles, loadedBlocks, addBlock)
         return
 
+    def loadConcurrently(self, function, items, consume):
+        """
+        _loadConcurrently_
+
+        Call function on each of the items in a pool of loadWorkers threads
+        and hand the items and their results to consume, in order, as soon
+        as they are available.  consume runs in the poller thread.
+        """
+        if self.loadWorkers < 2 or len(items) < 2:
+            for item in items:
+                consume(item, function(item))
+            return
+
+        myThread = threading.currentThread()
+        pool = ThreadPool(processes = min(self.loadWorkers, len(items)),
+                          initializer = initLoadThread,
+                          initargs = (myThread.logger, myThread.dbi,
+                                      getattr(myThread, "dbFactory", None)))
+        try:
+            for item, result in izip(items, pool.imap(function, items)):
+                consume(item, result)
+        finally:
+            pool.close()
+            pool.join()
+        return
+
+    @timed("loadFiles")
     def loadFiles(self):
         """
         _loadFiles_
@@ -380,14 +457,12 @@ class DBSUploadPoller(BaseWorkerThread):
         """
         dspList = self.dbsUtil.findUploadableDAS()
 
-        readyBlocks = []
-        for dspInfo in dspList:
-
+        def loadDatasetFiles(dspInfo):
             datasetpath = dspInfo['DatasetPath']
 
             # Get the files
             try:
-                loadedFiles = self.dbsUtil.findUploadableFilesByDAS(datasetpath = datasetpath)
+                return self.dbsUtil.findUploadableFilesByDAS(datasetpath = datasetpath)
             except WMException:
                 raise
             except Exception as ex:
@@ -397,6 +472,8 @@ class DBSUploadPoller(BaseWorkerThread):
                 logging.debug("DatasetPath being loaded: %s\n", datasetpath)
                 raise DBSUploadException(msg)
 
+        readyBlocks = []
+        def addDatasetFiles(dspInfo, loadedFiles):
             # Sort the files and blocks by location
             fileDict = sortListByKey(loadedFiles, 'locations')
 
@@ -437,11 +514,16 @@ class DBSUploadPoller(BaseWorkerThread):
                     # Done with the location
                     readyBlocks.append(currentBlock)
 
+        # The files of the next datasets are loaded while the ones of the
+        # previous datasets are put into blocks
+        self.loadConcurrently(loadDatasetFiles, dspList, addDatasetFiles)
+
         for block in readyBlocks:
             self.blockCache[block.getName()] = block
 
         return
 
+    @timed("checkBlockCompletion")
     def checkBlockCompletion(self):
         """
         _checkBlockCompletion_
@@ -495,13 +577,13 @@ class DBSUploadPoller(BaseWorkerThread):
         """
         datasetpath = newFile["datasetPath"]
 
-        for block in self.blockCache.values():
-            if datasetpath == block.getDatasetPath() and location == block.getLocation():
-                if not self.isBlockOpen(newFile = newFile, block = block) and not skipOpenCheck:
-                    # Block isn't open anymore.  Mark it as pending so that it gets uploaded.
-                    block.setPendingAndCloseBlock()
-                else:
-                    return block
+        block = self.openBlocks.get((datasetpath, location))
+        if block is not None and block.status == 'Open':
+            if not self.isBlockOpen(newFile = newFile, block = block) and not skipOpenCheck:
+                # Block isn't open anymore.  Mark it as pending so that it gets uploaded.
+                block.setPendingAndCloseBlock()
+            else:
+                return block
 
         # A suitable open block does not exist.  Create a new one.
         blockname = "%s#%s" % (datasetpath, makeUUID())
@@ -509,8 +591,24 @@ class DBSUploadPoller(BaseWorkerThread):
                                   location = location,
                                   datasetpath = datasetpath)
         self.blockCache[blockname] = newBlock
+        self.openBlocks[(datasetpath, location)] = newBlock
         return newBlock
 
+    def removeBlock(self, block):
+        """
+        _removeBlock_
+
+        Forget a block which is in DBS
+        """
+        name = block.getName()
+        del self.blockCache[name]
+        self.uploadState.pop(name, None)
+        key = (block.getDatasetPath(), block.getLocation())
+        if self.openBlocks.get(key) is block:
+            del self.openBlocks[key]
+        return
+
+    @timed("inputBlocks")
     def inputBlocks(self):
         """
         _inputBlocks_
@@ -528,6 +626,8 @@ class DBSUploadPoller(BaseWorkerThread):
            not DBSBuffer.
          Open, in DBSBuffer - Newly created block that has already been
            written to DBSBuffer.  We don't have to do anything with it.
+        Pending blocks whose upload failed are left alone until their retry
+        time.
         """
         myThread = threading.currentThread()
 
@@ -538,12 +638,18 @@ class DBSUploadPoller(BaseWorkerThread):
         createInDBS = []
         createInDBSBuffer = []
         updateInDBSBuffer = []
+        now = time.time()
         for block in self.blockCache.values():
             if block.getName() in self.queuedBlocks:
                 # Block is already being dealt with by another process.  We'll
                 # ignore it here.
                 continue
             if block.status == 'Pending':
+                state = self.uploadState.get(block.getName())
+                if state is not None and state['retryTime'] > now:
+                    # The last upload failed, wait before trying again
+                    continue
+
                 # All pending blocks need to be injected into DBS.
                 createInDBS.append(block)
 
@@ -558,8 +664,7 @@ class DBSUploadPoller(BaseWorkerThread):
                 createInDBSBuffer.append(block)
 
         # Build the pool if it was closed
-        if len(self.pool) == 0:
-            self.setupPool()
+        self.setupPool()
 
         # First handle new and updated blocks
         if len(createInDBSBuffer) > 0 or len(updateInDBSBuffer) > 0:
@@ -639,11 +744,12 @@ class DBSUploadPoller(BaseWorkerThread):
                 f = open(self.copyPath, 'w')
                 f.write(json.dumps(encodedBlock))
                 f.close()
-            self.queuedBlocks.append(block.getName())
+            self.queuedBlocks.add(block.getName())
 
         # And all work is in and we're done for now
         return
 
+    @timed("retrieveBlocks")
     def retrieveBlocks(self):
         """
         _retrieveBlocks_
@@ -695,7 +801,7 @@ class DBSUploadPoller(BaseWorkerThread):
         loadedBlocks = []
         for result in blocksToClose:
             # Remove from list of work being processed
-            self.queuedBlocks.remove(result.get('name'))
+            self.queuedBlocks.discard(result.get('name'))
             if result["success"] == "uploaded":
                 block = self.blockCache.get(result.get('name'))
                 block.status = 'InDBS'
@@ -707,7 +813,15 @@ class DBSUploadPoller(BaseWorkerThread):
                 logging.error("Error found in multiprocess during process of block %s", result.get('name'))
                 logging.error(result['error'])
                 # Continue to the next block
-                # Block will remain in pending status until it is transferred
+                # Block will remain in pending status until it is transferred,
+                # retry it later, waiting longer after each failure
+                state = self.uploadState.setdefault(result['name'], {'attempts': 0})
+                state['attempts'] += 1
+                state['error'] = result['error']
+                delay = min(self.retryDelay * 2 ** (state['attempts'] - 1), self.maxRetryDelay)
+                state['retryTime'] = time.time() + delay
+                logging.info("Upload of block %s failed %d times, retrying in %d secs",
+                             result['name'], state['attempts'], delay)
 
         if len(loadedBlocks) > 0:
             try:
@@ -746,16 +860,12 @@ class DBSUploadPoller(BaseWorkerThread):
 
         for block in loadedBlocks:
             # Clean things up
-            name = block.getName()
-            del self.blockCache[name]
-
-        # Clean up the pool so we don't have stuff waiting around
-        if len(self.pool) > 0:
-            self.close()
+            self.removeBlock(block)
 
         # And we're done
         return
 
+    @timed("checkBlocks")
     def checkBlocks(self):
         """
         _checkBlocks_
@@ -814,8 +924,7 @@ class DBSUploadPoller(BaseWorkerThread):
 
         for block in blocksUploaded:
             # Clean things up
-            name = block.getName()
-            del self.blockCache[name]
+            self.removeBlock(block)
 
         # Clean the check list
         self.blocksToCheck = []
@@ -12,8 +12,12 @@ class AddLocation(DBFormatter):
                VALUES (:location)"""
 
     def execute(self, siteName, conn = None, transaction = False):
+        """
+        siteName can be a single location or a list of them
+        """
         binds = []
-        binds.append({"location": siteName})
+        for location in self.dbi.makelist(siteName):
+            binds.append({"location": location})
 
         self.dbi.processData(self.sql, binds, conn = conn,
                              transaction = True)
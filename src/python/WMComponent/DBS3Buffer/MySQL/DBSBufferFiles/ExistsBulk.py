@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+"""
+_ExistsBulk_
+
+MySQL implementation of DBSBufferFiles.ExistsBulk
+
+Return which of a list of LFNs are already in DBSBuffer, looking up
+several hundred LFNs per query.
+"""
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+class ExistsBulk(DBFormatter):
+    sql = "SELECT lfn FROM dbsbuffer_file WHERE lfn IN (%s)"
+
+    # Oracle does not allow more than 1000 expressions in a list
+    chunkSize = 500
+
+    def execute(self, lfns, conn = None, transaction = False):
+        existing = set()
+        lfns = list(lfns)
+        for start in range(0, len(lfns), self.chunkSize):
+            chunk = lfns[start:start + self.chunkSize]
+            binds = {}
+            for i, lfn in enumerate(chunk):
+                binds["lfn%d" % i] = lfn
+            sql = self.sql % ", ".join([":lfn%d" % i for i in range(len(chunk))])
+            result = self.dbi.processData(sql, binds, conn = conn,
+                                          transaction = transaction)
+            for row in self.format(result):
+                existing.add(row[0])
+        return existing
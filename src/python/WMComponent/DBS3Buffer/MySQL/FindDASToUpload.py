@@ -30,7 +30,8 @@ class FindDASToUpload(DBFormatter):
              LEFT OUTER JOIN dbsbuffer_file parent_file ON
                parent_file.id = dbsbuffer_file_parent.parent AND
                parent_file.status = 'NOTUPLOADED'
-             WHERE dbsbuffer_file.status = 'NOTUPLOADED'
+             WHERE dbsbuffer_file.status = 'NOTUPLOADED' AND
+                   dbsbuffer_file.block_id IS NULL
              GROUP BY dbsbuffer_dataset.path,
                       dbsbuffer_dataset.acquisition_era,
                       dbsbuffer_dataset.processing_ver
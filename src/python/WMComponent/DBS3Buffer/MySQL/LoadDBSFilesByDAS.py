@@ -38,6 +38,7 @@ class LoadDBSFilesByDAS(DBFormatter):
                      INNER JOIN dbsbuffer_workflow ON
                        dbsbuffer_workflow.id = dbsbuffer_file.workflow
                      WHERE dbsbuffer_file.status = 'NOTUPLOADED'
+                     AND dbsbuffer_file.block_id IS NULL
                      AND NOT EXISTS ( SELECT *
                                       FROM dbsbuffer_file_parent
                                       INNER JOIN dbsbuffer_file parent_file ON
@@ -291,12 +292,17 @@ class LoadDBSFilesByDAS(DBFormatter):
         Merge together two file lists based on the ID field
         """
 
+        # Index listB so that merging is linear in the number of files,
+        # the first entry of listB with a given ID wins
+        entriesB = {}
+        for entryB in listB:
+            entriesB.setdefault(entryB[field], entryB)
+
         for entryA in listA:
-            for entryB in listB:
-                if entryA[field] == entryB[field]:
-                    # Then we've found a match
-                    entryA.update(entryB)
-                    break
+            entryB = entriesB.get(entryA[field])
+            if entryB is not None:
+                # Then we've found a match
+                entryA.update(entryB)
 
 
         return listA
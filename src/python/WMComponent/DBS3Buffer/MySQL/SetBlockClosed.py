@@ -10,14 +10,26 @@ from WMCore.Database.DBFormatter import DBFormatter
 
 class SetBlockClosed(DBFormatter):
 
-    def execute(self, block, conn = None, transaction = False):
-
-        sql = """UPDATE dbsbuffer_block
-                 SET status = 'Closed'
-                 WHERE blockname = :block
-                 """
-
-        self.dbi.processData(sql, { 'block' : block },
+    sql = """UPDATE dbsbuffer_block
+             SET status = 'Closed'
+             WHERE blockname = :block
+             """
+
+    def execute(self, blocks, conn = None, transaction = False):
+        """
+        Close a block, or a list of blocks in one bulk update
+        """
+        if not isinstance(blocks, list):
+            blocks = [blocks]
+
+        if len(blocks) < 1:
+            return
+
+        bindVars = []
+        for block in blocks:
+            bindVars.append({'block': block})
+
+        self.dbi.processData(self.sql, bindVars,
                              conn = conn, transaction = transaction)
 
         return
@@ -0,0 +1,11 @@
+#!/usr/bin/env python
+"""
+_ExistsBulk_
+
+Oracle implementation of DBSBufferFiles.ExistsBulk
+"""
+
+from WMComponent.DBS3Buffer.MySQL.DBSBufferFiles.ExistsBulk import ExistsBulk as MySQLExistsBulk
+
+class ExistsBulk(MySQLExistsBulk):
+    pass
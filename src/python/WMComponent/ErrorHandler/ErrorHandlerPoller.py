@@ -24,11 +24,18 @@ config.ErrorHandler.passExitCodes:  This should be a list of exitCodes that you
 immediately to the 'created' state, skipping cooloff.  It defaults to [].
 
 Note that failureExitCodes has precedence over passExitCodes.
+
+The FWJRs are triaged in a pool of config.ErrorHandler.triageProcesses
+processes (default 1, in the poller itself) and the triaged summaries are
+cached by FWJR path.
 """
+import os
 import os.path
 import threading
 import logging
+import multiprocessing
 import traceback
+from collections import OrderedDict
 from httplib import HTTPException
 
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
@@ -51,6 +58,24 @@ class ErrorHandlerException(WMException):
     pass
 
 
+def triageReport(reportPath):
+    """
+    _triageReport_
+
+    Load a FWJR and only return what the ErrorHandler looks at, as a
+    (startTime, stopTime, exitCodes) tuple, or the error message if the
+    report can't be read as a (None, None, None, message) tuple.
+    """
+    try:
+        report = Report()
+        report.load(reportPath)
+        times = report.getFirstStartLastStop() or {}
+        return (times.get('startTime'), times.get('stopTime'),
+                sorted(report.getExitCodes()), None)
+    except Exception as ex:
+        return (None, None, None, str(ex))
+
+
 class ErrorHandlerPoller(BaseWorkerThread):
     """
     Polls for Error Conditions, handles them
@@ -76,10 +101,15 @@ class ErrorHandlerPoller(BaseWorkerThread):
             raise ErrorHandlerException('Max retries for the default job type must be specified')
 
         self.maxProcessSize = getattr(self.config.ErrorHandler, 'maxProcessSize', 250)
-        self.exitCodes      = getattr(self.config.ErrorHandler, 'failureExitCodes', [])
+        self.exitCodes      = set(getattr(self.config.ErrorHandler, 'failureExitCodes', []))
         self.maxFailTime    = getattr(self.config.ErrorHandler, 'maxFailTime', 32 * 3600)
         self.readFWJR       = getattr(self.config.ErrorHandler, 'readFWJR', False)
-        self.passCodes      = getattr(self.config.ErrorHandler, 'passExitCodes', [])
+        self.passCodes      = set(getattr(self.config.ErrorHandler, 'passExitCodes', []))
+
+        # FWJR triage, the summaries are kept by path and file modification time
+        self.triageProcesses = getattr(self.config.ErrorHandler, 'triageProcesses', 1)
+        self.triageCacheSize = getattr(self.config.ErrorHandler, 'triageCacheSize', 10000)
+        self.triageCache     = OrderedDict()
 
         self.getJobs    = self.daoFactory(classname = "Jobs.GetAllJobs")
         self.idLoad     = self.daoFactory(classname = "Jobs.LoadFromIDWithType")
@@ -185,6 +215,54 @@ class ErrorHandlerPoller(BaseWorkerThread):
         self.dataCollection.failedJobs(loadList)
         return
 
+    def triageReports(self, reportPaths):
+        """
+        _triageReports_
+
+        Triage the FWJRs provided, return their summaries keyed by path.
+        Reports already triaged and not modified since are not read again,
+        the others are read in a pool of triageProcesses processes.
+        """
+        summaries = {}
+        toRead = []
+        for reportPath in set(reportPaths):
+            try:
+                stat = os.stat(reportPath)
+            except OSError as ex:
+                summaries[reportPath] = (None, None, None, str(ex))
+                continue
+            key = (stat.st_mtime, stat.st_size)
+            cached = self.triageCache.pop(reportPath, None)
+            if cached is not None and cached[0] == key:
+                self.triageCache[reportPath] = cached
+                summaries[reportPath] = cached[1]
+            else:
+                toRead.append((reportPath, key))
+
+        if not toRead:
+            return summaries
+
+        paths = [x[0] for x in toRead]
+        if self.triageProcesses > 1 and len(toRead) > 1:
+            pool = multiprocessing.Pool(processes = min(self.triageProcesses, len(toRead)))
+            try:
+                results = pool.map(triageReport, paths)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [triageReport(x) for x in paths]
+
+        for (reportPath, key), summary in zip(toRead, results):
+            summaries[reportPath] = summary
+            if summary[3] is None:
+                self.triageCache[reportPath] = (key, summary)
+        while len(self.triageCache) > self.triageCacheSize:
+            self.triageCache.popitem(last = False)
+
+        logging.info("Triaged %d FWJRs, %d of them read" % (len(summaries), len(toRead)))
+        return summaries
+
     def readFWJRForErrors(self, jobList):
         """
         _readFWJRForErrors_
@@ -197,8 +275,8 @@ class ErrorHandlerPoller(BaseWorkerThread):
         cooloffJobs = []
         passJobs = []
         exhaustJobs = []
+        triageJobs = []
         for job in jobList:
-            report     = Report()
             reportPath = job['fwjr_path']
             if reportPath is None:
                 logging.error("No FWJR in job %i, ErrorHandler can't process it.\n Passing it to cooloff." % job['id'])
@@ -208,43 +286,41 @@ class ErrorHandlerPoller(BaseWorkerThread):
                 logging.error("Failed to find FWJR for job %i in location %s.\n Passing it to cooloff." % (job['id'], reportPath))
                 cooloffJobs.append(job)
                 continue
-            try:
-                report.load(reportPath)
-                # First let's check the time conditions
-                times = report.getFirstStartLastStop()
-                startTime = None
-                stopTime = None
-                if times is not None:
-                    startTime = times['startTime']
-                    stopTime = times['stopTime']
-
-                if startTime is None or stopTime is None:
-                    # We have no information to make a decision, keep going.
-                    logging.debug("No start, stop times for steps for job %i" % job['id'])
-                elif stopTime - startTime > self.maxFailTime:
-                    msg = "Job %i exhausted after running on node for %i seconds" % (job['id'], stopTime - startTime)
-                    logging.debug(msg)
-                    exhaustJobs.append(job)
-                    continue
-
-                if len([x for x in report.getExitCodes() if x in self.exitCodes]):
-                    msg = "Job %i exhausted due to a bad exit code (%s)" % (job['id'], str(report.getExitCodes()))
-                    logging.error(msg)
-                    exhaustJobs.append(job)
-                    continue
-
-                if len([x for x in report.getExitCodes() if x in self.passCodes]):
-                    msg = "Job %i restarted immediately due to an exit code (%s)" % (job['id'], str(report.getExitCodes()))
-                    passJobs.append(job)
-                    continue
+            triageJobs.append(job)
 
-                cooloffJobs.append(job)
+        summaries = self.triageReports([job['fwjr_path'] for job in triageJobs])
 
-            except Exception as ex:
+        for job in triageJobs:
+            startTime, stopTime, exitCodes, error = summaries[job['fwjr_path']]
+            if error is not None:
                 logging.warning("Exception while trying to check jobs for failures!")
-                logging.warning(str(ex))
+                logging.warning(error)
                 logging.warning("Ignoring and sending job to cooloff")
                 cooloffJobs.append(job)
+                continue
+
+            # First let's check the time conditions
+            if startTime is None or stopTime is None:
+                # We have no information to make a decision, keep going.
+                logging.debug("No start, stop times for steps for job %i" % job['id'])
+            elif stopTime - startTime > self.maxFailTime:
+                msg = "Job %i exhausted after running on node for %i seconds" % (job['id'], stopTime - startTime)
+                logging.debug(msg)
+                exhaustJobs.append(job)
+                continue
+
+            if self.exitCodes.intersection(exitCodes):
+                msg = "Job %i exhausted due to a bad exit code (%s)" % (job['id'], str(set(exitCodes)))
+                logging.error(msg)
+                exhaustJobs.append(job)
+                continue
+
+            if self.passCodes.intersection(exitCodes):
+                msg = "Job %i restarted immediately due to an exit code (%s)" % (job['id'], str(set(exitCodes)))
+                passJobs.append(job)
+                continue
+
+            cooloffJobs.append(job)
 
         return cooloffJobs, passJobs, exhaustJobs
 
@@ -23,6 +23,7 @@ from WMCore.FwkJobReport.Report  import Report
 from WMCore.DAOFactory           import DAOFactory
 from WMCore.WMConnectionBase     import WMConnectionBase
 from WMCore.WMException          import WMException
+from WMCore.WorkerThreads.Instrumentation import currentInstrumentation, timed
 
 from WMCore.DataStructs.Run import Run
 from WMCore.WMBS.File       import File
@@ -30,6 +31,7 @@ from WMCore.WMBS.Job        import Job
 
 from WMCore.JobStateMachine.ChangeState import ChangeState
 from WMComponent.DBS3Buffer.DBSBufferFile import DBSBufferFile
+from WMComponent.DBS3Buffer.DBSBufferFileStager import DBSBufferFileStager
 from WMCore.Services.PhEDEx.PhEDEx import PhEDEx
 from WMCore.Services.WMStats.WMStatsWriter import WMStatsWriter
 from WMCore.Database.CMSCouch import CouchServer
@@ -84,12 +86,8 @@ class AccountantWorker(WMConnectionBase):
         self.dbsStatusAction       = self.dbsDaoFactory(classname = "DBSBufferFiles.SetStatus")
         self.dbsParentStatusAction = self.dbsDaoFactory(classname = "DBSBufferFiles.GetParentStatus")
         self.dbsChildrenAction     = self.dbsDaoFactory(classname = "DBSBufferFiles.GetChildren")
-        self.dbsCreateFiles        = self.dbsDaoFactory(classname = "DBSBufferFiles.Add")
-        self.dbsSetLocation        = self.dbsDaoFactory(classname = "DBSBufferFiles.SetLocationByLFN")
-        self.dbsInsertLocation     = self.dbsDaoFactory(classname = "DBSBufferFiles.AddLocation")
-        self.dbsSetChecksum        = self.dbsDaoFactory(classname = "DBSBufferFiles.AddChecksumByLFN")
-        self.dbsSetRunLumi         = self.dbsDaoFactory(classname = "DBSBufferFiles.AddRunLumi")
         self.dbsGetWorkflow        = self.dbsDaoFactory(classname = "ListWorkflow")
+        self.dbsStager             = DBSBufferFileStager()
         
         self.dbsLFNHeritage      = self.dbsDaoFactory(classname = "DBSBufferFiles.BulkHeritageParent")
 
@@ -126,10 +124,10 @@ class AccountantWorker(WMConnectionBase):
         self.parentageBinds    = []
         self.parentageBindsForMerge    = []
         self.jobsWithSkippedFiles = {}
+        self.dbsParentsMemo    = {}
         self.count = 0
         self.datasetAlgoID     = collections.deque(maxlen = 1000)
         self.datasetAlgoPaths  = collections.deque(maxlen = 1000)
-        self.dbsLocations      = set()
         self.workflowIDs       = collections.deque(maxlen = 1000)
         self.workflowPaths     = collections.deque(maxlen = 1000)
 
@@ -156,6 +154,7 @@ class AccountantWorker(WMConnectionBase):
         self.parentageBinds    = []
         self.parentageBindsForMerge = []
         self.jobsWithSkippedFiles = {}
+        self.dbsParentsMemo    = {}
         gc.collect()
         return
 
@@ -224,21 +223,39 @@ class AccountantWorker(WMConnectionBase):
 
         return
 
-    def __call__(self, parameters):
+    def __call__(self, parameters, jobReports = None):
         """
         __call__
 
         Handle a completed job.  The parameters dictionary will contain the job
         ID and the path to the framework job report.
         """
+        returnList = self.handleJobs(parameters, jobReports)
+        self.commitJobs()
+        return returnList
+
+    @timed("handleJobs")
+    def handleJobs(self, parameters, jobReports = None):
+        """
+        _handleJobs_
+
+        Handle a batch of completed jobs and keep what has to be written to
+        the database for commitJobs(). jobReports, if given, holds the
+        framework job reports already loaded with loadJobReport(), in the
+        same order as the jobs.
+        """
         returnList = []
         self.reset()
+        currentInstrumentation().count("jobs", len(parameters))
 
-        for job in parameters:
+        for index, job in enumerate(parameters):
             logging.info("Handling %s" % job["fwjr_path"])
 
             # Load the job and set the ID
-            fwkJobReport = self.loadJobReport(job)
+            if jobReports is None:
+                fwkJobReport = self.loadJobReport(job)
+            else:
+                fwkJobReport = jobReports[index]
             fwkJobReport.setJobID(job['id'])
             
             jobSuccess = self.handleJob(jobID = job["id"],
@@ -252,6 +269,16 @@ class AccountantWorker(WMConnectionBase):
 
             self.count += 1
 
+        return returnList
+
+    @timed("commitJobs")
+    def commitJobs(self):
+        """
+        _commitJobs_
+
+        Write everything gathered by handleJobs() to the database in a
+        single transaction.
+        """
         self.beginTransaction()
 
         # Now things done at the end of the job
@@ -312,7 +339,7 @@ class AccountantWorker(WMConnectionBase):
 
         self.commitTransaction(existingTransaction = False)
 
-        return returnList
+        return
 
     def outputFilesetsForJob(self, outputMap, merged, moduleLabel):
         """
@@ -387,37 +414,77 @@ class AccountantWorker(WMConnectionBase):
         _findDBSParents_
 
         Find the parent of the file in DBS
-        This is meant to be called recursively
-        """
-        parentsInfo = self.getParentInfoAction.execute([lfn],
-                                                       conn = self.getDBConn(),
-                                                       transaction = self.existingTransaction())
-        newParents = set()
-        for parentInfo in parentsInfo:
-            # This will catch straight to merge files that do not have redneck
-            # parents.  We will mark the straight to merge file from the job
-            # as a child of the merged parent.
-            if int(parentInfo["merged"]) == 1:
-                newParents.add(parentInfo["lfn"])
-
-            elif parentInfo['gpmerged'] == None:
-                continue
+        """
+        return set(self.findDBSParentsBulk([lfn])[lfn])
+
+    def findDBSParentsBulk(self, lfns):
+        """
+        _findDBSParentsBulk_
+
+        Find the merged parents of several files at once. The lineage is
+        walked breadth first, all the unmerged grandparents found at one
+        level are queried together in the next one. Results are kept in
+        a memo table until the next reset so that sibling outputs sharing
+        their parents are only resolved once per cycle.
+
+        Returns a dictionary of lfn to set of merged parent lfns.
+        """
+        direct = {}
+        deferred = {}
+        level = set(lfn for lfn in lfns if lfn not in self.dbsParentsMemo)
+        while level:
+            for lfn in level:
+                direct[lfn] = set()
+                deferred[lfn] = set()
+            parentsInfo = self.getParentInfoAction.execute(list(level),
+                                                           conn = self.getDBConn(),
+                                                           transaction = self.existingTransaction())
+            nextLevel = set()
+            for parentInfo in parentsInfo:
+                childLFN = parentInfo["child_lfn"]
+                # This will catch straight to merge files that do not have redneck
+                # parents.  We will mark the straight to merge file from the job
+                # as a child of the merged parent.
+                if int(parentInfo["merged"]) == 1:
+                    direct[childLFN].add(parentInfo["lfn"])
+
+                elif parentInfo['gpmerged'] == None:
+                    continue
+
+                # Handle the files that result from merge jobs that aren't redneck
+                # children.  We have to setup parentage and then check on whether or
+                # not this file has any redneck children and update their parentage
+                # information.
+                elif int(parentInfo["gpmerged"]) == 1:
+                    direct[childLFN].add(parentInfo["gplfn"])
+
+                # If that didn't work, we've reached the great-grandparents
+                # And we have to look at them in the next level
+                else:
+                    gpLFN = parentInfo["gplfn"]
+                    deferred[childLFN].add(gpLFN)
+                    if gpLFN not in direct and gpLFN not in self.dbsParentsMemo:
+                        nextLevel.add(gpLFN)
+            level = nextLevel
 
-            # Handle the files that result from merge jobs that aren't redneck
-            # children.  We have to setup parentage and then check on whether or
-            # not this file has any redneck children and update their parentage
-            # information.
-            elif int(parentInfo["gpmerged"]) == 1:
-                newParents.add(parentInfo["gplfn"])
+        for lfn in direct:
+            self._resolveDBSParents(lfn, direct, deferred)
 
-            # If that didn't work, we've reached the great-grandparents
-            # And we have to work via recursion
-            else:
-                parentSet = self.findDBSParents(lfn = parentInfo['gplfn'])
-                for parent in parentSet:
-                    newParents.add(parent)
+        return dict((lfn, self.dbsParentsMemo[lfn]) for lfn in lfns)
 
-        return newParents
+    def _resolveDBSParents(self, lfn, direct, deferred):
+        """
+        _resolveDBSParents_
+
+        Merge the parents found for lfn with the ones of its unmerged
+        grandparents and store the result in the memo table
+        """
+        if lfn not in self.dbsParentsMemo:
+            newParents = direct[lfn]
+            for gpLFN in deferred[lfn]:
+                newParents.update(self._resolveDBSParents(gpLFN, direct, deferred))
+            self.dbsParentsMemo[lfn] = newParents
+        return self.dbsParentsMemo[lfn]
 
     def addFileToWMBS(self, jobType, fwjrFile, jobMask, task, jobID = None):
         """
@@ -641,6 +708,7 @@ class AccountantWorker(WMConnectionBase):
         report.data.cmsRun1.status = "Failed"
         return report
 
+    @timed("createFilesInDBSBuffer")
     def createFilesInDBSBuffer(self):
         """
         _createFilesInDBSBuffer_
@@ -651,13 +719,7 @@ class AccountantWorker(WMConnectionBase):
             # Whoops, nothing to do!
             return
 
-        dbsFileTuples = []
-        dbsFileLoc    = []
-        dbsCksumBinds = []
-        runLumiBinds  = []
-        selfChecksums = None
-        jobLocations  = set()
-
+        self.dbsStager.reset()
         for dbsFile in self.dbsFilesToCreate:
             # Append a tuple in the format specified by DBSBufferFiles.Add
             # Also run insertDatasetAlgo
@@ -715,63 +777,21 @@ class AccountantWorker(WMConnectionBase):
             self.workflowPaths.append(workflowPath)
             self.workflowIDs.append({'workflowPath': workflowPath, 'workflowID': workflowID})
 
-            lfn           = dbsFile['lfn']
-            selfChecksums = dbsFile['checksums']
-            jobLocation   = dbsFile.getLocations()[0]
-            jobLocations.add(jobLocation)
-            dbsFileTuples.append((lfn, dbsFile['size'],
-                                  dbsFile['events'], assocID,
-                                  dbsFile['status'], workflowID))
-
-            dbsFileLoc.append({'lfn': lfn, 'sename' : jobLocation})
-            if dbsFile['runs']:
-                runLumiBinds.append({'lfn': lfn, 'runs': dbsFile['runs']})
-
-            if selfChecksums:
-                # If we have checksums we have to create a bind
-                # For each different checksum
-                for entry in selfChecksums.keys():
-                    dbsCksumBinds.append({'lfn': lfn, 'cksum' : selfChecksums[entry],
-                                          'cktype' : entry})
+            self.dbsStager.stageFile(dbsFile['lfn'], dbsFile['size'], dbsFile['events'],
+                                     assocID, workflowID, [dbsFile.getLocations()[0]],
+                                     checksums = dbsFile['checksums'], runs = dbsFile['runs'],
+                                     status = dbsFile['status'])
 
         try:
-            
-            diffLocation = jobLocations.difference(self.dbsLocations)
-
-            for jobLocation in diffLocation:
-                self.dbsInsertLocation.execute(siteName = jobLocation,
-                                               conn = self.getDBConn(),
-                                               transaction = self.existingTransaction())
-                self.dbsLocations.add(jobLocation)
-
-            self.dbsCreateFiles.execute(files = dbsFileTuples,
-                                        conn = self.getDBConn(),
-                                        transaction = self.existingTransaction())
-
-            self.dbsSetLocation.execute(binds = dbsFileLoc,
-                                        conn = self.getDBConn(),
-                                        transaction = self.existingTransaction())
-
-            self.dbsSetChecksum.execute(bulkList = dbsCksumBinds,
-                                        conn = self.getDBConn(),
-                                        transaction = self.existingTransaction())
-
-            if len(runLumiBinds) > 0:
-                self.dbsSetRunLumi.execute(file = runLumiBinds,
-                                           conn = self.getDBConn(),
-                                           transaction = self.existingTransaction())
+            self.dbsStager.commit()
         except WMException:
             raise
         except Exception as ex:
             msg =  "Got exception while inserting files into DBSBuffer!\n"
             msg += str(ex)
             logging.error(msg)
-            logging.debug("Listing binds:")
-            logging.debug("jobLocation: %s\n" % jobLocation)
-            logging.debug("dbsFiles: %s\n" % dbsFileTuples)
-            logging.debug("dbsFileLoc: %s\n" %dbsFileLoc)
-            logging.debug("Checksum binds: %s\n" % dbsCksumBinds)
-            logging.debug("RunLumi binds: %s\n" % runLumiBinds)
+            logging.debug("Listing staged files:")
+            logging.debug("dbsFiles: %s\n" % self.dbsStager.stagedFiles())
             raise AccountantWorkerException(msg)
 
 
@@ -780,6 +800,7 @@ class AccountantWorker(WMConnectionBase):
         return
 
 
+    @timed("handleWMBSFiles")
     def handleWMBSFiles(self, wmbsFilesToBuild, parentageBinds):
         """
         _handleWMBSFiles_
@@ -900,6 +921,7 @@ class AccountantWorker(WMConnectionBase):
         
         return wmbsFile
 
+    @timed("handleDBSBufferParentage")
     def handleDBSBufferParentage(self):
         """
         _handleDBSBufferParentage_
@@ -908,9 +930,9 @@ class AccountantWorker(WMConnectionBase):
         """
         outputLFNs = [f['lfn'] for f in self.mergedOutputFiles]
         bindList         = []
+        parentsByLFN = self.findDBSParentsBulk(outputLFNs)
         for lfn in outputLFNs:
-            newParents = self.findDBSParents(lfn = lfn)
-            for parentLFN in newParents:
+            for parentLFN in parentsByLFN[lfn]:
                 bindList.append({'child': lfn, 'parent': parentLFN})
 
         # Now all the parents should exist
@@ -933,6 +955,7 @@ class AccountantWorker(WMConnectionBase):
                 raise AccountantWorkerException(msg)
         return
 
+    @timed("handleSkippedFiles")
     def handleSkippedFiles(self):
         """
         _handleSkippedFiles_
@@ -8,6 +8,7 @@ Poll WMBS for complete jobs and process their framework job reports.
 import time
 import threading
 import logging
+from multiprocessing.pool import ThreadPool
 
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
 from WMCore.Agent.Harness import Harness
@@ -29,6 +30,16 @@ class JobAccountantPoller(BaseWorkerThread):
         BaseWorkerThread.__init__(self)
         self.config = config
         self.accountantWorkSize = getattr(self.config.JobAccountant, 'accountantWorkSize', 100)
+
+        # Pipelined mode: job reports for the next slice are loaded by a
+        # thread pool while the current one is handled and committed, and
+        # the slice size follows the observed commit time.
+        self.pipeline = getattr(self.config.JobAccountant, 'accountantPipeline', False)
+        self.loadThreads = getattr(self.config.JobAccountant, 'accountantLoadThreads', 4)
+        self.minWorkSize = getattr(self.config.JobAccountant, 'accountantMinWorkSize', 10)
+        self.maxWorkSize = getattr(self.config.JobAccountant, 'accountantMaxWorkSize', 1000)
+        self.targetCommitTime = getattr(self.config.JobAccountant, 'accountantTargetCommitTime', 30)
+        self.loadPool = None
         # initialize the alert framework (if available - config.Alert present)
         #    self.sendAlert will be then be available
         self.initAlerts(compName = "JobAccountant")
@@ -50,6 +61,19 @@ class JobAccountantPoller(BaseWorkerThread):
         daoFactory = DAOFactory(package = "WMCore.WMBS", logger = myThread.logger,
                                 dbinterface = myThread.dbi)
         self.getJobsAction = daoFactory(classname = "Jobs.GetFWJRByState")
+        if self.pipeline:
+            self.loadPool = ThreadPool(self.loadThreads)
+        return
+
+    def terminate(self, params):
+        """
+        _terminate_
+
+        Stop the report loading threads
+        """
+        if self.loadPool is not None:
+            self.loadPool.terminate()
+            self.loadPool = None
         return
 
     def algorithm(self, parameters = None):
@@ -66,25 +90,97 @@ class JobAccountantPoller(BaseWorkerThread):
             logging.debug("No work to do; exiting")
             return
 
-        while len(completeJobs) > 0:
-            try:
-                jobsSlice = completeJobs[:self.accountantWorkSize]
-                completeJobs = completeJobs[self.accountantWorkSize:]
-                self.accountantWorker(jobsSlice)
-                logging.info("Remaining completed jobs to process: %d" % len(completeJobs))
-            except WMException:
-                myThread = threading.currentThread()
-                if getattr(myThread, 'transaction', None) != None:
-                    myThread.transaction.rollback()
-                raise
-            except Exception as ex:
-                myThread = threading.currentThread()
-                if getattr(myThread, 'transaction', None) != None:
-                    myThread.transaction.rollback()
-                msg =  "Hit general exception in JobAccountantPoller while using worker.\n"
-                msg += str(ex)
-                logging.error(msg)
-                self.sendAlert(6, msg = msg)
-                raise JobAccountantPollerException(msg)
+        try:
+            if self.pipeline:
+                self.pipelinedAccounting(completeJobs)
+            else:
+                while len(completeJobs) > 0:
+                    jobsSlice = completeJobs[:self.accountantWorkSize]
+                    completeJobs = completeJobs[self.accountantWorkSize:]
+                    self.accountantWorker(jobsSlice)
+                    logging.info("Remaining completed jobs to process: %d" % len(completeJobs))
+        except WMException:
+            myThread = threading.currentThread()
+            if getattr(myThread, 'transaction', None) != None:
+                myThread.transaction.rollback()
+            raise
+        except Exception as ex:
+            myThread = threading.currentThread()
+            if getattr(myThread, 'transaction', None) != None:
+                myThread.transaction.rollback()
+            msg =  "Hit general exception in JobAccountantPoller while using worker.\n"
+            msg += str(ex)
+            logging.error(msg)
+            self.sendAlert(6, msg = msg)
+            raise JobAccountantPollerException(msg)
+
+        return
+
+    def pipelinedAccounting(self, completeJobs):
+        """
+        _pipelinedAccounting_
+
+        Process the complete jobs in three stages: the job reports of a
+        slice are loaded by the thread pool while the previous slice is
+        handled and committed to the database. The size of the slices is
+        adapted to the time taken by the commits, and the throughput of
+        each stage is logged at the end.
+        """
+        stageJobs = {'load': 0, 'handle': 0, 'commit': 0}
+        stageTime = {'load': 0.0, 'handle': 0.0, 'commit': 0.0}
 
+        def loadSlice(jobsSlice):
+            timing = {'start': time.time()}
+            def loaded(dummyResult):
+                timing['end'] = time.time()
+            result = self.loadPool.map_async(self.accountantWorker.loadJobReport,
+                                             jobsSlice, callback = loaded)
+            return result, timing
+
+        jobsSlice = completeJobs[:self.accountantWorkSize]
+        completeJobs = completeJobs[self.accountantWorkSize:]
+        pending, timing = loadSlice(jobsSlice)
+        while jobsSlice:
+            jobReports = pending.get()
+            stageJobs['load'] += len(jobsSlice)
+            stageTime['load'] += timing['end'] - timing['start']
+
+            # Start loading the next slice before touching the database
+            nextSlice = completeJobs[:self.accountantWorkSize]
+            completeJobs = completeJobs[self.accountantWorkSize:]
+            if nextSlice:
+                pending, timing = loadSlice(nextSlice)
+
+            startTime = time.time()
+            self.accountantWorker.handleJobs(jobsSlice, jobReports)
+            stageJobs['handle'] += len(jobsSlice)
+            stageTime['handle'] += time.time() - startTime
+
+            startTime = time.time()
+            self.accountantWorker.commitJobs()
+            commitTime = time.time() - startTime
+            stageJobs['commit'] += len(jobsSlice)
+            stageTime['commit'] += commitTime
+
+            self.adaptWorkSize(commitTime)
+            logging.info("Remaining completed jobs to process: %d" % len(completeJobs))
+            jobsSlice = nextSlice
+
+        for stage in ['load', 'handle', 'commit']:
+            logging.info("Accountant %s stage: %d jobs in %.2f secs (%.1f jobs/sec)",
+                         stage, stageJobs[stage], stageTime[stage],
+                         stageJobs[stage] / max(stageTime[stage], 0.001))
+        return
+
+    def adaptWorkSize(self, commitTime):
+        """
+        _adaptWorkSize_
+
+        Halve the slice size when committing a slice takes longer than the
+        target commit time, double it when it takes less than half of it.
+        """
+        if commitTime > self.targetCommitTime:
+            self.accountantWorkSize = max(self.minWorkSize, self.accountantWorkSize // 2)
+        elif commitTime < self.targetCommitTime / 2.0:
+            self.accountantWorkSize = min(self.maxWorkSize, self.accountantWorkSize * 2)
         return
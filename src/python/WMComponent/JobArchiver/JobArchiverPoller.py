@@ -10,7 +10,10 @@ import os
 import os.path
 import shutil
 import tarfile
+import time
 import traceback
+from cStringIO import StringIO
+from multiprocessing.pool import ThreadPool
 
 from Utils.IterTools import grouper
 from WMComponent.TaskArchiver.CleanCouchPoller import uploadPublishWorkflow
@@ -34,6 +37,72 @@ class JobArchiverPollerException(WMException):
     """
 
 
+# tarfile compression and file extension for each codec
+ARCHIVE_CODECS = {"bz2": ("bz2", ".tar.bz2"),
+                  "gz": ("gz", ".tar.gz"),
+                  "none": ("", ".tar")}
+
+
+def tarJobCache(jobID, cacheDir, cacheDirList, fileobj, compression="bz2", compressLevel=9):
+    """
+    _tarJobCache_
+
+    Write a tarball of the files of a job cache, under Job_<jobID>/, to
+    fileobj and return the number of bytes written.
+    """
+    codec = ARCHIVE_CODECS[compression][0]
+    kwargs = {}
+    if codec:
+        kwargs["compresslevel"] = compressLevel
+    start = fileobj.tell()
+    tarball = tarfile.open(fileobj=fileobj, mode='w:%s' % codec, **kwargs)
+    for fileName in cacheDirList:
+        fullFile = os.path.join(cacheDir, fileName)
+        try:
+            tarball.add(name=fullFile, arcname='Job_%i/%s' % (jobID, fileName))
+        except IOError:
+            logging.error('Cannot read %s, skipping', fullFile)
+    tarball.close()
+    return fileobj.tell() - start
+
+
+def loadClusterIndex(indexPath):
+    """
+    _loadClusterIndex_
+
+    Read the index of a cluster archive, return a dictionary of
+    (offset, length) keyed by job id.
+    """
+    index = {}
+    with open(indexPath, 'r') as indexFile:
+        for line in indexFile:
+            jobID, offset, length = [int(x) for x in line.split()]
+            index[jobID] = (offset, length)
+    return index
+
+
+def openArchivedJob(archivePath, jobID):
+    """
+    _openArchivedJob_
+
+    Open the tarball of a single job from a cluster archive, using the
+    index stored next to it. Return None if the job is not archived.
+    """
+    clusterPath = archivePath
+    for extension in sorted([x[1] for x in ARCHIVE_CODECS.values()], key=len, reverse=True):
+        if archivePath.endswith(extension):
+            clusterPath = archivePath[:-len(extension)]
+            break
+    index = loadClusterIndex(clusterPath + '.index')
+    if jobID not in index:
+        return None
+    offset, length = index[jobID]
+    with open(archivePath, 'rb') as archive:
+        archive.seek(offset)
+        content = archive.read(length)
+    return tarfile.open(fileobj=StringIO(content), mode='r:*')
+
+
 class JobArchiverPoller(BaseWorkerThread):
     """
     Polls for Error Conditions, handles them
@@ -57,6 +126,15 @@ class JobArchiverPoller(BaseWorkerThread):
         # Variables
         self.numberOfJobsToCluster = getattr(self.config.JobArchiver,
                                              "numberOfJobsToCluster", 1000)
+        # either a tarball per job or a single archive per job cluster
+        self.archiveMode = getattr(self.config.JobArchiver, "archiveMode", "job")
+        self.compression = getattr(self.config.JobArchiver, "compression", "bz2")
+        self.compressLevel = getattr(self.config.JobArchiver, "compressLevel", 9)
+        self.archiveWorkers = getattr(self.config.JobArchiver, "archiveWorkers", 1)
+        if self.archiveMode not in ("job", "cluster"):
+            raise JobArchiverPollerException("Unknown archiveMode %s" % self.archiveMode)
+        if self.compression not in ARCHIVE_CODECS:
+            raise JobArchiverPollerException("Unknown compression %s" % self.compression)
 
         # initialize the alert framework (if available)
         self.initAlerts(compName="JobArchiver")
@@ -225,67 +303,150 @@ class JobArchiverPoller(BaseWorkerThread):
 
         Upon workQueue realizing that a subscriptions is done, everything
         regarding those jobs is cleaned up.
+
+        The jobs are archived one job cluster at a time, spreading the
+        clusters over archiveWorkers threads.
         """
+        startTime = time.time()
 
+        # make the log directories here, the workers share their parents
+        clusters = {}
         for job in doneList:
-            # print "About to clean cache for job %i" % (job['id'])
-            self.cleanJobCache(job)
+            logDir = self.getLogDir(job)
+            clusters.setdefault(logDir, []).append(job)
 
+        if self.archiveMode == "cluster":
+            archiveFunction = self.archiveJobCluster
+        else:
+            archiveFunction = self.cleanJobCaches
+
+        if self.archiveWorkers > 1 and len(clusters) > 1:
+            pool = ThreadPool(processes=min(self.archiveWorkers, len(clusters)))
+            try:
+                results = pool.map(archiveFunction, clusters.items())
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [archiveFunction(x) for x in clusters.items()]
+
+        nJobs = sum([x[0] for x in results])
+        nBytes = sum([x[1] for x in results])
+        elapsed = max(time.time() - startTime, 0.001)
+        logging.info("Archived %d jobs, %.1f MB in %.2f secs (%.1f jobs/sec, %.2f MB/sec)",
+                     nJobs, nBytes / 1048576.0, elapsed, nJobs / elapsed, nBytes / 1048576.0 / elapsed)
         return
 
-    def cleanJobCache(self, job):
+    def getLogDir(self, job):
         """
-        _cleanJobCache_
+        _getLogDir_
 
-        Clears out any files still sticking around in the jobCache,
-        tars up the contents and sends them off
+        Make and return the directory where the job is archived, the path
+        of the archive without its extension in cluster mode
         """
-
-        cacheDir = job['cache_dir']
-
-        if not cacheDir or not os.path.isdir(cacheDir):
-            msg = "Could not find jobCacheDir %s" % (cacheDir)
-            logging.error(msg)
-            return
-
-        cacheDirList = os.listdir(cacheDir)
-
-        if cacheDirList == []:
-            os.rmdir(cacheDir)
-            return
-
-        # Now we need to set up a final destination
         try:
             # Label all directories by workflow
             # Workflow better have a first character
+            logDir = None
             workflow = job['workflow']
             firstCharacter = workflow[0]
             jobFolder = 'JobCluster_%i' \
                         % (int(job['id'] / self.numberOfJobsToCluster))
             logDir = os.path.join(self.logDir, firstCharacter,
                                   workflow, jobFolder)
-            if not os.path.exists(logDir):
-                os.makedirs(logDir)
+            # cluster archives are kept next to where the cluster directory would be
+            if self.archiveMode == "cluster":
+                makeDir = os.path.dirname(logDir)
+            else:
+                makeDir = logDir
+            if not os.path.exists(makeDir):
+                os.makedirs(makeDir)
         except Exception as ex:
             msg = "Exception while trying to make output logDir\n"
             msg += str("logDir: %s\n" % (logDir))
             msg += str(ex)
             logging.error(msg)
             raise JobArchiverPollerException(msg)
+        return logDir
+
+    def listJobCache(self, job):
+        """
+        _listJobCache_
+
+        List the files in the job cache, None if there is nothing to archive.
+        Empty job caches are removed.
+        """
+        cacheDir = job['cache_dir']
+
+        if not cacheDir or not os.path.isdir(cacheDir):
+            msg = "Could not find jobCacheDir %s" % (cacheDir)
+            logging.error(msg)
+            return None
+
+        cacheDirList = os.listdir(cacheDir)
+
+        if cacheDirList == []:
+            os.rmdir(cacheDir)
+            return None
+        return cacheDirList
+
+    def removeJobCaches(self, cacheDirs):
+        """
+        _removeJobCaches_
+
+        Remove the job caches already archived
+        """
+        for cacheDir in cacheDirs:
+            try:
+                shutil.rmtree('%s' % (cacheDir), ignore_errors=True)
+            except Exception as ex:
+                msg = "Error while removing the old cache dir.\n"
+                msg += "CacheDir: %s\n" % cacheDir
+                msg += str(ex)
+                logging.error(msg)
+                raise JobArchiverPollerException(msg)
+        return
+
+    def cleanJobCaches(self, cluster):
+        """
+        _cleanJobCaches_
+
+        Archive each job of a cluster in its own tarball, return the
+        number of jobs and of bytes archived.
+        """
+        logDir, jobs = cluster
+        nJobs = 0
+        nBytes = 0
+        for job in jobs:
+            archived = self.cleanJobCache(job, logDir)
+            if archived is not None:
+                nJobs += 1
+                nBytes += archived
+        return nJobs, nBytes
+
+    def cleanJobCache(self, job, logDir=None):
+        """
+        _cleanJobCache_
+
+        Clears out any files still sticking around in the jobCache,
+        tars up the contents and sends them off. Return the size of the
+        tarball, None if nothing was archived.
+        """
+        cacheDir = job['cache_dir']
+        cacheDirList = self.listJobCache(job)
+        if cacheDirList is None:
+            return None
+
+        # Now we need to set up a final destination
+        if logDir is None:
+            logDir = self.getLogDir(job)
 
         # Otherwise we have something in there
         try:
-            tarName = 'Job_%i.tar.bz2' % (job['id'])
-            tarball = tarfile.open(name=os.path.join(logDir, tarName),
-                                   mode='w:bz2')
-            for fileName in cacheDirList:
-                fullFile = os.path.join(cacheDir, fileName)
-                try:
-                    tarball.add(name=fullFile,
-                                arcname='Job_%i/%s' % (job['id'], fileName))
-                except IOError:
-                    logging.error('Cannot read %s, skipping', fullFile)
-            tarball.close()
+            tarName = 'Job_%i%s' % (job['id'], ARCHIVE_CODECS[self.compression][1])
+            with open(os.path.join(logDir, tarName), 'wb') as tarFile:
+                size = tarJobCache(job['id'], cacheDir, cacheDirList, tarFile,
+                                   self.compression, self.compressLevel)
         except Exception as ex:
             msg = "Exception while opening and adding to a tarfile\n"
             msg += "Tarfile: %s\n" % os.path.join(logDir, tarName)
@@ -294,15 +455,85 @@ class JobArchiverPoller(BaseWorkerThread):
             logging.debug("cacheDirList: %s", cacheDirList)
             raise JobArchiverPollerException(msg)
 
+        self.removeJobCaches([cacheDir])
+        return size
+
+    def archiveJobCluster(self, cluster):
+        """
+        _archiveJobCluster_
+
+        Append the tarball of each job of a cluster to the single archive
+        of the cluster, JobCluster_N.tar.<codec>, and its offset and length
+        to JobCluster_N.index. The archive is a valid concatenated archive
+        (tar --ignore-zeros) and a single job is read back with
+        openArchivedJob.
+
+        Each job is indexed as soon as its tarball is written. Should a
+        job fail, its partial tarball is cut off the archive and the caches
+        of the jobs already indexed are removed, so that no job is archived
+        twice. The caches are otherwise removed once all the jobs are
+        archived.
+
+        Return the number of jobs and of bytes archived.
+        """
+        logDir, jobs = cluster
+        archivePath = logDir + ARCHIVE_CODECS[self.compression][1]
+        indexPath = logDir + '.index'
+
+        archived = []
+        nBytes = 0
         try:
-            shutil.rmtree('%s' % (cacheDir), ignore_errors=True)
+            self.truncateJobCluster(archivePath, indexPath)
+            with open(archivePath, 'ab') as archive:
+                with open(indexPath, 'a') as indexFile:
+                    archive.seek(0, os.SEEK_END)
+                    for job in jobs:
+                        cacheDirList = self.listJobCache(job)
+                        if cacheDirList is None:
+                            continue
+                        offset = archive.tell()
+                        try:
+                            length = tarJobCache(job['id'], job['cache_dir'], cacheDirList, archive,
+                                                 self.compression, self.compressLevel)
+                            archive.flush()
+                            indexFile.write("%i %i %i\n" % (job['id'], offset, length))
+                            indexFile.flush()
+                        except Exception:
+                            # drop what was written of the job
+                            archive.truncate(offset)
+                            raise
+                        archived.append(job['cache_dir'])
+                        nBytes += length
         except Exception as ex:
-            msg = "Error while removing the old cache dir.\n"
-            msg += "CacheDir: %s\n" % cacheDir
+            msg = "Exception while adding to the archive of a job cluster\n"
+            msg += "Archive: %s\n" % archivePath
+            msg += "%i jobs archived before the failure\n" % len(archived)
             msg += str(ex)
             logging.error(msg)
+            self.removeJobCaches(archived)
             raise JobArchiverPollerException(msg)
 
+        self.removeJobCaches(archived)
+        return len(archived), nBytes
+
+    def truncateJobCluster(self, archivePath, indexPath):
+        """
+        _truncateJobCluster_
+
+        Cut off the end of the archive of a cluster which is not indexed,
+        what was written of a job when the component was stopped.
+        """
+        if not os.path.exists(archivePath):
+            return
+        end = 0
+        if os.path.exists(indexPath):
+            for offset, length in loadClusterIndex(indexPath).values():
+                end = max(end, offset + length)
+        if os.path.getsize(archivePath) > end:
+            logging.warning("Removing %i bytes not indexed from %s",
+                            os.path.getsize(archivePath) - end, archivePath)
+            with open(archivePath, 'r+b') as archive:
+                archive.truncate(end)
         return
 
     def markInjected(self):
@@ -9,6 +9,7 @@ import os
 import os.path
 import cPickle
 import logging
+import time
 import traceback
 import threading
 
@@ -96,23 +97,33 @@ def capResourceEstimates(jobGroups, nCores, constraints):
     Checks the current job resource estimates and cap
     them based on the limits defined in the agent
     config file (also take into account nCores).
+
+    The limits are worked out once for all the job groups and each
+    estimate is read and written back only once.
     """
+    minJobTime = constraints['MinWallTimeSecs']
+    maxJobTime = constraints['MaxWallTimeSecs']
+    minDisk = constraints['MinRequestDiskKB']
+    if nCores == 1:
+        maxDisk = constraints['MaxRequestDiskKB']
+    else:
+        maxDisk = constraints['MaxRequestDiskKB'] * nCores
+
+    # we assume job efficiency as nCores * 0.8 for multicore
+    efficiency = 1.0 if nCores == 1 else nCores * 0.8
+
     for jobGroup in jobGroups:
         for j in jobGroup.jobs:
-            if not j['estimatedJobTime'] or j['estimatedJobTime'] < constraints['MinWallTimeSecs']:
-                j['estimatedJobTime'] = constraints['MinWallTimeSecs']
-            if not j['estimatedDiskUsage'] or j['estimatedDiskUsage'] < constraints['MinRequestDiskKB']:
-                j['estimatedDiskUsage'] = constraints['MinRequestDiskKB']
-
-            if nCores == 1:
-                j['estimatedJobTime'] = min(j['estimatedJobTime'], constraints['MaxWallTimeSecs'])
-                j['estimatedDiskUsage'] = min(j['estimatedDiskUsage'], constraints['MaxRequestDiskKB'])
-            else:
-                # we assume job efficiency as nCores * 0.8 for multicore
-                j['estimatedJobTime'] = min(j['estimatedJobTime']/(nCores * 0.8),
-                                            constraints['MaxWallTimeSecs'])
-                j['estimatedDiskUsage'] = min(j['estimatedDiskUsage'],
-                                              constraints['MaxRequestDiskKB'] * nCores)
+            jobTime = j['estimatedJobTime']
+            if not jobTime or jobTime < minJobTime:
+                jobTime = minJobTime
+            disk = j['estimatedDiskUsage']
+            if not disk or disk < minDisk:
+                disk = minDisk
+            if nCores != 1:
+                jobTime = jobTime / efficiency
+            j['estimatedJobTime'] = jobTime if jobTime < maxJobTime else maxJobTime
+            j['estimatedDiskUsage'] = disk if disk < maxDisk else maxDisk
     return
 
 
@@ -378,6 +389,10 @@ class JobCreatorPoller(BaseWorkerThread):
         self.agentNumber    = int(getattr(config.Agent, 'agentNumber', 0))
         self.glideinLimits  = getattr(config.JobCreator, 'GlideInRestriction', None)
 
+        # jobs and time per stage of the current cycle
+        self.stageJobs = {}
+        self.stageTime = {}
+
         # initialize the alert framework (if available - config.Alert present)
         #    self.sendAlert will be then be available
         self.initAlerts(compName = "JobCreator")
@@ -460,6 +475,8 @@ class JobCreatorPoller(BaseWorkerThread):
         """
         logging.info("Beginning JobCreator.pollSubscriptions() cycle.")
         myThread = threading.currentThread()
+        self.stageJobs = {}
+        self.stageTime = {}
 
         #First, get list of Subscriptions
         subscriptions    = self.subscriptionList.execute()
@@ -557,7 +574,10 @@ class JobCreatorPoller(BaseWorkerThread):
                 # First we need the jobs.
                 myThread.transaction.begin()
                 try:
+                    startTime = time.time()
                     wmbsJobGroups = next(jobSplittingFunction)
+                    self.recordStage("split %s" % wmbsJobFactory.__class__.__name__,
+                                     wmbsJobGroups, startTime)
                     logging.info("Retrieved %i jobGroups from jobSplitter" % (len(wmbsJobGroups)))
                 except StopIteration:
                     # If you receive a stopIteration, we're done
@@ -598,7 +618,11 @@ class JobCreatorPoller(BaseWorkerThread):
 
                 # if we have glideinWMS constraints, then adapt all jobs
                 if self.glideinLimits:
-                    capResourceEstimates(wmbsJobGroups, processDict['numberOfCores'], self.glideinLimits) 
+                    startTime = time.time()
+                    capResourceEstimates(wmbsJobGroups, processDict['numberOfCores'], self.glideinLimits)
+                    self.recordStage("cap estimates", wmbsJobGroups, startTime)
+
+                startTime = time.time()
 
                 nameDictList = []
                 for wmbsJobGroup in wmbsJobGroups:
@@ -626,6 +650,7 @@ class JobCreatorPoller(BaseWorkerThread):
                                              'cacheDir':job['cache_dir']})
                         job["user"] = wmWorkload.getOwner()["name"]
                         job["group"] = wmWorkload.getOwner()["group"]
+                self.recordStage("create", wmbsJobGroups, startTime)
                 # Set the caches in the database
                 try:
                     if len(nameDictList) > 0:
@@ -656,6 +681,29 @@ class JobCreatorPoller(BaseWorkerThread):
             # Close the jobFactory
             wmbsJobFactory.close()
 
+        for stage in sorted(self.stageTime):
+            logging.info("JobCreator %s: %d jobs in %.2f secs (%.1f jobs/sec)",
+                         stage, self.stageJobs[stage], self.stageTime[stage],
+                         self.stageJobs[stage] / max(self.stageTime[stage], 0.001))
+        if self.stageJobs.get("create"):
+            # don't leave the new jobs waiting for the next JobSubmitter cycle
+            self.wakeupComponent("JobSubmitter")
+        return
+
+    def recordStage(self, stage, jobGroups, startTime):
+        """
+        _recordStage_
+
+        Account the time since startTime and the jobs of the job groups
+        to a stage of the cycle: splitting with a given algorithm, capping
+        the resource estimates or creating the jobs.
+        """
+        nJobs = sum([len(x.jobs) for x in jobGroups])
+        elapsed = time.time() - startTime
+        self.stageJobs[stage] = self.stageJobs.get(stage, 0) + nJobs
+        self.stageTime[stage] = self.stageTime.get(stage, 0.0) + elapsed
+        self.instrumentation.addTime(stage, elapsed)
+        self.instrumentation.count("%s jobs" % stage, nJobs)
         return
 
 
@@ -19,6 +19,7 @@ from WMCore.WMExceptions      import WM_JOB_ERROR_CODES
 
 from WMCore.JobStateMachine.ChangeState       import ChangeState
 from WMCore.WorkerThreads.BaseWorkerThread    import BaseWorkerThread
+from WMCore.WorkerThreads.Instrumentation     import currentInstrumentation, timed
 from WMCore.ResourceControl.ResourceControl   import ResourceControl
 from WMCore.DataStructs.JobPackage            import JobPackage
 from WMCore.FwkJobReport.Report               import Report
@@ -228,6 +229,7 @@ class JobSubmitterPoller(BaseWorkerThread):
 
         return
 
+    @timed("refreshCache")
     def refreshCache(self):
         """
         _refreshCache_
@@ -461,6 +463,7 @@ class JobSubmitterPoller(BaseWorkerThread):
         self.setFWJRPathAction.execute(binds=fwjrBinds)
         return
 
+    @timed("getThresholds")
     def getThresholds(self):
         """
         _getThresholds_
@@ -518,6 +521,7 @@ class JobSubmitterPoller(BaseWorkerThread):
 
         return
 
+    @timed("assignJobLocations")
     def assignJobLocations(self):
         """
         _assignJobLocations_
@@ -759,6 +763,7 @@ class JobSubmitterPoller(BaseWorkerThread):
         return jobsToSubmit
 
 
+    @timed("submitJobs")
     def submitJobs(self, jobsToSubmit):
         """
         _submitJobs_
@@ -794,6 +799,8 @@ class JobSubmitterPoller(BaseWorkerThread):
         # Run the actual underlying submit code using bossAir
         successList, failList = self.bossAir.submit(jobs=jobList)
         logging.info("Jobs that succeeded/failed submission: %d/%d.", len(successList), len(failList))
+        currentInstrumentation().count("submitted", len(successList))
+        currentInstrumentation().count("submitFailed", len(failList))
 
         # Propagate states in the WMBS database
         logging.debug("Propagating success state to WMBS.")
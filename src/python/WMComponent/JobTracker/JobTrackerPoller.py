@@ -151,6 +151,13 @@ class JobTrackerPoller(BaseWorkerThread):
         self.passJobs(passedJobs)
         self.failJobs(failedJobs)
 
+        # don't leave the jobs waiting for the next cycle of the components
+        # handling them
+        if passedJobs:
+            self.wakeupComponent("JobAccountant")
+        if failedJobs:
+            self.wakeupComponent("ErrorHandler")
+
         return
 
 
@@ -50,33 +50,36 @@ class GetUninjectedFiles(DBFormatter):
         In order to do this, we have to graph the checksum.
         """
         dictResult = DBFormatter.formatDict(self, result)
-        self.specCache = {}
+        # the files already formatted, by location and LFN, as there is a
+        # row for each of their checksums
+        fileCache = {}
         formattedResult = {}
         for row in dictResult:
             location = row['location']
 
-            if location not in formattedResult.keys():
+            if location not in formattedResult:
                 formattedResult[location] = {}
 
             locationDict = formattedResult[location]
-            if row["dataset"] not in locationDict.keys():
+            if row["dataset"] not in locationDict:
                 locationDict[row["dataset"]] = {}
 
             datasetDict = locationDict[row["dataset"]]
-            if row["blockname"] not in datasetDict.keys():
+            if row["blockname"] not in datasetDict:
                 datasetDict[row["blockname"]] = {"is-open": "y",
                                                  "files": []}
 
             blockDict = datasetDict[row["blockname"]]
-            for file in blockDict["files"]:
-                if file["lfn"] == row["lfn"]:
-                    file["checksum"][row["cktype"]] = row["cksum"]
-                    break
+            file = fileCache.get((location, row["lfn"]))
+            if file is not None:
+                file["checksum"][row["cktype"]] = row["cksum"]
             else:
                 cksumDict = {row["cktype"]: row["cksum"]}
-                blockDict["files"].append({"lfn": row["lfn"],
-                                           "size": row["filesize"],
-                                           "checksum": cksumDict})
+                file = {"lfn": row["lfn"],
+                        "size": row["filesize"],
+                        "checksum": cksumDict}
+                fileCache[(location, row["lfn"])] = file
+                blockDict["files"].append(file)
 
         return formattedResult
 
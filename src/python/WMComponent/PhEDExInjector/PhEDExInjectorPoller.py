@@ -12,6 +12,9 @@ Making subscriptions and deleting blocks is optional, triggered by the subscribe
 Even if they are enabled, they'll run at a different (longer) intervall than the main polling loop.
 
 File injection and block closing runs most frequently, the latter is just following DBS block closing.
+The pending files and blocks of all the locations are grouped into injection payloads bounded in number
+of datasets, blocks and files, which are sent to PhEDEx concurrently by a pool of threads, each with its
+own PhEDEx service.  The injection status in DBSBuffer is updated in bulk for each payload injected.
 
 For subscription making, we poll the DBSBuffer database for unsubscribed datasets and make subscriptions
 associated with these datasets.
@@ -46,8 +49,10 @@ import logging
 import traceback
 import time
 from httplib import HTTPException
+from multiprocessing.pool import ThreadPool
 
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
+from WMCore.WorkerThreads.Instrumentation import timed
 
 from WMCore.Services.PhEDEx.PhEDEx import PhEDEx
 from WMCore.Services.PhEDEx import XMLDrop
@@ -82,8 +87,17 @@ class PhEDExInjectorPoller(BaseWorkerThread):
             # subscribe on first cycle
             self.pollCounter = self.subFrequency - 1
 
+        # injections are sent concurrently by up to injectionWorkers threads,
+        # in payloads bounded in number of datasets, blocks and files
+        self.injectionWorkers = getattr(config.PhEDExInjector, "injectionWorkers", 4)
+        self.maxDatasets = getattr(config.PhEDExInjector, "maxDatasetsPerInjection", 20)
+        self.maxBlocks = getattr(config.PhEDExInjector, "maxBlocksPerInjection", 50)
+        self.maxFiles = getattr(config.PhEDExInjector, "maxFilesPerInjection", 5000)
+        self.threadData = threading.local()
+
         # retrieving the node mappings is fickle and can fail quite often
-        self.phedex = PhEDEx({"endpoint": config.PhEDExInjector.phedexurl}, "json")
+        self.phedexUrl = config.PhEDExInjector.phedexurl
+        self.phedex = PhEDEx({"endpoint": self.phedexUrl}, "json")
         try:
             nodeMappings = self.phedex.getNodeMap()
         except:
@@ -236,91 +250,158 @@ class PhEDExInjectorPoller(BaseWorkerThread):
 
         return blocks
     
-    def injectFiles(self):
+    def threadPhEDEx(self):
         """
-        _injectFiles_
+        _threadPhEDEx_
 
-        Inject any uninjected files in PhEDEx.
+        PhEDEx service of the current injection thread, the connection of a
+        service can't be shared between threads
         """
-        logging.info("Starting injectFiles method")
+        phedex = getattr(self.threadData, "phedex", None)
+        if phedex is None:
+            phedex = PhEDEx({"endpoint": self.phedexUrl}, "json")
+            self.threadData.phedex = phedex
+        return phedex
 
-        uninjectedFiles = self.getUninjected.execute()
+    def runConcurrently(self, function, items, callback):
+        """
+        _runConcurrently_
 
-        for siteName in uninjectedFiles.keys():
-            # SE names can be stored in DBSBuffer as that is what is returned in
-            # the framework job report.  We'll try to map the SE name to a
-            # PhEDEx node name here.
-            location = None
+        Call function(phedex, item) for each of the items in up to
+        injectionWorkers threads, and hand each item, the result and the
+        exception raised, if any, to callback in the poller thread as soon
+        as it is done.  The database is only accessed by the callback.
+        """
+        def run(item, phedex):
+            try:
+                return item, function(phedex, item), None
+            except Exception as ex:
+                logging.debug("Traceback: %s", str(traceback.format_exc()))
+                return item, None, ex
 
-            if siteName in self.nodeNames:
-                location = siteName
-            else:
-                if "Buffer" in self.seMap and siteName in self.seMap["Buffer"]:
-                    location = self.seMap["Buffer"][siteName]
-                elif "MSS" in self.seMap and siteName in self.seMap["MSS"]:
-                    location = self.seMap["MSS"][siteName]
-                elif "Disk" in self.seMap and siteName in self.seMap["Disk"]:
-                    location = self.seMap["Disk"][siteName]
+        if self.injectionWorkers < 2 or len(items) < 2:
+            for item in items:
+                callback(*run(item, self.phedex))
+            return
+
+        pool = ThreadPool(processes = min(self.injectionWorkers, len(items)))
+        try:
+            for result in pool.imap_unordered(lambda item: run(item, self.threadPhEDEx()), items):
+                callback(*result)
+        finally:
+            pool.close()
+            pool.join()
+        return
+
+    def mapLocation(self, siteName):
+        """
+        _mapLocation_
+
+        SE names can be stored in DBSBuffer as that is what is returned in
+        the framework job report.  We'll try to map the SE name to a PhEDEx
+        node name here.  Return None if there is no such node.
+        """
+        location = None
+
+        if siteName in self.nodeNames:
+            location = siteName
+        else:
+            if "Buffer" in self.seMap and siteName in self.seMap["Buffer"]:
+                location = self.seMap["Buffer"][siteName]
+            elif "MSS" in self.seMap and siteName in self.seMap["MSS"]:
+                location = self.seMap["MSS"][siteName]
+            elif "Disk" in self.seMap and siteName in self.seMap["Disk"]:
+                location = self.seMap["Disk"][siteName]
+
+        return location
+
+    def createPayloads(self, pendingData, alertLevel):
+        """
+        _createPayloads_
 
+        Split the data pending injection, keyed by location, dataset and
+        block name as returned by the DAOs, into payloads of at most
+        maxDatasets datasets, maxBlocks blocks and maxFiles files, unless a
+        single block has more files.  Return a list of (location, injectData)
+        tuples, injectData being in the createInjectionSpec format.
+        """
+        payloads = []
+        for siteName in pendingData:
+            location = self.mapLocation(siteName)
             if location == None:
                 msg = "Could not map SE %s to PhEDEx node." % siteName
                 logging.error(msg)
-                self.sendAlert(7, msg = msg)
+                self.sendAlert(alertLevel, msg = msg)
                 continue
 
-            maxDataset = 20
-            maxBlocks = 50
-            maxFiles = 5000
-            numberDatasets = 0
+            injectData = {}
             numberBlocks = 0
             numberFiles = 0
-            injectData = {}
-            lfnList = []
-            for dataset in uninjectedFiles[siteName]:
+            for dataset, blocks in pendingData[siteName].iteritems():
+                for blockName, block in blocks.iteritems():
+                    blockFiles = len(block["files"])
+                    if injectData and (numberBlocks >= self.maxBlocks or
+                                       numberFiles + blockFiles > self.maxFiles or
+                                       (dataset not in injectData and len(injectData) >= self.maxDatasets)):
+                        payloads.append((location, injectData))
+                        injectData = {}
+                        numberBlocks = 0
+                        numberFiles = 0
+
+                    injectData.setdefault(dataset, {})[blockName] = block
+                    numberBlocks += 1
+                    numberFiles += blockFiles
 
-                numberDatasets += 1
-                injectData[dataset] = uninjectedFiles[siteName][dataset]
+            if injectData:
+                payloads.append((location, injectData))
 
-                for block in injectData[dataset]:
-                    numberBlocks += 1
-                    numberFiles += len(injectData[dataset][block]['files'])
-                    for fileInfo in injectData[dataset][block]['files']:
-                        lfnList.append(fileInfo['lfn'])
+        return payloads
 
-                if numberDatasets >= maxDataset or numberBlocks >= maxBlocks or numberFiles >= maxFiles:
+    def injectPayload(self, phedex, payload):
+        """
+        _injectPayload_
 
-                    self.injectFilesPhEDExCall(location, injectData, lfnList)
-                    numberDatasets = 0
-                    numberBlocks = 0
-                    numberFiles = 0
-                    injectData = {}
-                    lfnList = []
+        actual PhEDEx call for file injection and block closing
+        """
+        location, injectData = payload
+        xmlData = self.createInjectionSpec(injectData)
+        logging.debug("Injection XMLData: %s", xmlData)
 
-            if injectData:
-                self.injectFilesPhEDExCall(location, injectData, lfnList)
+        return phedex.injectBlocks(location, xmlData)
+
+    @timed("injectFiles")
+    def injectFiles(self):
+        """
+        _injectFiles_
+
+        Inject any uninjected files in PhEDEx.
+        """
+        logging.info("Starting injectFiles method")
+
+        uninjectedFiles = self.getUninjected.execute()
+
+        payloads = self.createPayloads(uninjectedFiles, alertLevel = 7)
+        logging.info("Injecting files in %d payloads", len(payloads))
+        self.runConcurrently(self.injectPayload, payloads, self.injectFilesResult)
 
         return
 
-    def injectFilesPhEDExCall(self, location, injectData, lfnList):
+    def injectFilesResult(self, payload, injectRes, ex):
         """
-        _injectFilesPhEDExCall_
+        _injectFilesResult_
 
-        actual PhEDEx call for file injection
+        Mark the files of a payload injected if PhEDEx accepted it
         """
-        xmlData = self.createInjectionSpec(injectData)
-        logging.debug("injectFiles XMLData: %s", xmlData)
+        location, injectData = payload
 
-        try:
-            injectRes = self.phedex.injectBlocks(location, xmlData)
-        except HTTPException as ex:
+        if isinstance(ex, HTTPException):
             # HTTPException with status 400 assumed to be duplicate injection
             # trigger later block recovery (investgation needed if not the case)
             if ex.status == 400:
                 self.blocksToRecover.extend( self.createRecoveryFileFormat(injectData) )
             logging.error("PhEDEx file injection failed with HTTPException: %s %s", ex.status, ex.result)
-        except Exception as ex:
+        elif ex is not None:
             logging.error("PhEDEx file injection failed with Exception: %s", str(ex))
-            logging.debug("Traceback: %s", str(traceback.format_exc()))
         else:
             logging.info("Injection result: %s", injectRes)
 
@@ -329,6 +410,10 @@ class PhEDExInjectorPoller(BaseWorkerThread):
                 logging.error(msg)
                 self.sendAlert(6, msg = msg)
             else:
+                lfnList = []
+                for blocks in injectData.itervalues():
+                    for block in blocks.itervalues():
+                        lfnList.extend([fileInfo["lfn"] for fileInfo in block["files"]])
                 try:
                     self.setStatus.execute(lfnList, 1)
                 except:
@@ -339,6 +424,7 @@ class PhEDExInjectorPoller(BaseWorkerThread):
 
         return
 
+    @timed("closeBlocks")
     def closeBlocks(self):
         """
         _closeBlocks_
@@ -349,53 +435,42 @@ class PhEDExInjectorPoller(BaseWorkerThread):
 
         migratedBlocks = self.getMigrated.execute()
 
-        for siteName in migratedBlocks.keys():
-            # SE names can be stored in DBSBuffer as that is what is returned in
-            # the framework job report.  We'll try to map the SE name to a
-            # PhEDEx node name here.
-            location = None
+        payloads = self.createPayloads(migratedBlocks, alertLevel = 6)
+        logging.info("Closing blocks in %d payloads", len(payloads))
+        self.runConcurrently(self.injectPayload, payloads, self.closeBlocksResult)
 
-            if siteName in self.nodeNames:
-                location = siteName
-            else:
-                if "Buffer" in self.seMap and siteName in self.seMap["Buffer"]:
-                    location = self.seMap["Buffer"][siteName]
-                elif "MSS" in self.seMap and siteName in self.seMap["MSS"]:
-                    location = self.seMap["MSS"][siteName]
-                elif "Disk" in self.seMap and siteName in self.seMap["Disk"]:
-                    location = self.seMap["Disk"][siteName]
+        return
 
-            if location == None:
-                msg = "Could not map SE %s to PhEDEx node." % siteName
-                logging.error(msg)
-                self.sendAlert(6, msg = msg)
-                continue
+    def closeBlocksResult(self, payload, injectRes, ex):
+        """
+        _closeBlocksResult_
 
-            xmlData = self.createInjectionSpec(migratedBlocks[siteName])
-            logging.debug("closeBlocks XMLData: %s", xmlData)
+        Mark the blocks of a payload closed if PhEDEx accepted it
+        """
+        location, injectData = payload
 
-            try:
-                injectRes = self.phedex.injectBlocks(location, xmlData)
-            except HTTPException as ex:
-                logging.error("PhEDEx block close failed with HTTPException: %s %s", ex.status, ex.result)
-            except Exception as ex:
-                logging.error("PhEDEx block close failed with Exception: %s", str(ex))
-                logging.debug("Traceback: %s", str(traceback.format_exc()))
+        if isinstance(ex, HTTPException):
+            logging.error("PhEDEx block close failed with HTTPException: %s %s", ex.status, ex.result)
+        elif ex is not None:
+            logging.error("PhEDEx block close failed with Exception: %s", str(ex))
+        else:
+            logging.info("Block closing result: %s", injectRes)
+
+            if "error" not in injectRes:
+                blockNames = []
+                for datasetName in injectData:
+                    for blockName in injectData[datasetName]:
+                        logging.debug("Closing block %s", blockName)
+                        blockNames.append(blockName)
+                self.setBlockClosed.execute(blockNames)
             else:
-                logging.info("Block closing result: %s", injectRes)
-
-                if "error" not in injectRes:
-                    for datasetName in migratedBlocks[siteName]:
-                        for blockName in migratedBlocks[siteName][datasetName]:
-                            logging.debug("Closing block %s", blockName)
-                            self.setBlockClosed.execute(blockName)
-                else:
-                    msg = "Error injecting data %s: %s" % (migratedBlocks[siteName], injectRes["error"])
-                    logging.error(msg)
-                    self.sendAlert(6, msg = msg)
+                msg = "Error injecting data %s: %s" % (injectData, injectRes["error"])
+                logging.error(msg)
+                self.sendAlert(6, msg = msg)
 
         return
 
+    @timed("recoverInjectedFiles")
     def recoverInjectedFiles(self):
         """
         When PhEDEx inject call timed out, run this function.
@@ -406,20 +481,34 @@ class PhEDExInjectorPoller(BaseWorkerThread):
         2. if those file exist set the in_phedex status to 1
         3. set self.blocksToRecover = []
 
-        Run this recovery one block at a time, with too many blocks
-        the call to the PhEDEx data service on cmsweb can time out
+        Run this recovery one block per call, with too many blocks
+        the call to the PhEDEx data service on cmsweb can time out,
+        the blocks are queried concurrently though.  Blocks which
+        couldn't be queried are kept for the next cycle.
         """
-        # recover one block at a time
+        blockFiles = {}
         for block in self.blocksToRecover:
+            for blockName, lfns in block.iteritems():
+                blockFiles.setdefault(blockName, set()).update(lfns)
+        self.blocksToRecover = []
+
+        injectedFiles = []
+        def recovered(blockName, result, ex):
+            if ex is not None:
+                logging.error("PhEDEx recovery of block %s failed with Exception: %s", blockName, str(ex))
+                self.blocksToRecover.append({blockName: blockFiles[blockName]})
+            else:
+                injectedFiles.extend(result)
 
-            injectedFiles = self.phedex.getInjectedFiles(block)
+        self.runConcurrently(lambda phedex, blockName: phedex.getInjectedFiles({blockName: blockFiles[blockName]}),
+                             blockFiles.keys(), recovered)
 
-            if injectedFiles:
-                self.setStatus.execute(injectedFiles, 1)
+        if injectedFiles:
+            self.setStatus.execute(injectedFiles, 1)
 
-        self.blocksToRecover = []
         return
         
+    @timed("deleteBlocks")
     def deleteBlocks(self):
         """
         _deleteBlocks_
@@ -549,6 +638,7 @@ class PhEDExInjectorPoller(BaseWorkerThread):
 
         return
 
+    @timed("subscribeDatasets")
     def subscribeDatasets(self):
         """
         _subscribeDatasets_
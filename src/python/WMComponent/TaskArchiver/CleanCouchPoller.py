@@ -17,6 +17,7 @@ import time
 
 from httplib import HTTPException
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
+from WMCore.WorkerThreads.Instrumentation import timed
 from WMCore.Services.WMStats.WMStatsWriter import WMStatsWriter
 from WMCore.Services.RequestDB.RequestDBReader import RequestDBReader
 from WMCore.Database.CMSCouch import CouchServer
@@ -315,6 +316,7 @@ class CleanCouchPoller(BaseWorkerThread):
                     self.centralRequestDBWriter.updateRequestStatus(workflowName, archiveState)
         return updated
     
+    @timed("archiveSummaryAndPublishToDashBoard")
     def archiveSummaryAndPublishToDashBoard(self, finishedwfsWithLogCollectAndCleanUp):
         """
         _completeWithLogCollectAndCleanUp_
@@ -337,6 +339,7 @@ class CleanCouchPoller(BaseWorkerThread):
                         
         return
     
+    @timed("cleanCouchDBAndChangeToArchiveStatus")
     def cleanCouchDBAndChangeToArchiveStatus(self):
         # archiving only workflows that I own (same team)
         logging.info("Getting requests in '%s' state for team '%s'", self.deletableState,
@@ -457,6 +460,7 @@ class CleanCouchPoller(BaseWorkerThread):
         # other wise return True.
         return True
         
+    @timed("cleanAlreadyArchivedWorkflows")
     def cleanAlreadyArchivedWorkflows(self):
         """
         loop through the workflows in couchdb, if archived delete all the data in couchdb
@@ -484,6 +488,7 @@ class CleanCouchPoller(BaseWorkerThread):
             
         return numDeletedRequests
     
+    @timed("deleteWorkflowFromWMBSAndDisk")
     def deleteWorkflowFromWMBSAndDisk(self):
         #Get the finished workflows, in descending order
         deletableWorkflowsDAO = self.daoFactory(classname = "Workflow.GetDeletableWorkflows")
@@ -64,9 +64,13 @@ def setUpAlertsMessaging(compInstance, compName = None):
         # the import shall be put back up later once the issue disappears
         from WMCore.Alerts.ZMQ.Sender import Sender
         logging.info("Creating Alerts Sender instance ...")
-        sender = Sender(compInstance.config.Alert.address,
-                        compInstance.config.Alert.controlAddr,
-                        callerClassName)
+        alertConfig = compInstance.config.Alert
+        sender = Sender(alertConfig.address,
+                        alertConfig.controlAddr,
+                        callerClassName,
+                        batchSize = getattr(alertConfig, "batchSize", 1),
+                        flushInterval = getattr(alertConfig, "flushInterval", 1.0),
+                        dedupWindow = getattr(alertConfig, "dedupWindow", 0))
         sender.register()
         logging.info("Alerts messaging set up for %s" % callerClassName)
         return preAlert, sender
@@ -3,10 +3,15 @@ Alert Processor pipeline.
 Provides a coroutine based handling system for alerts that can be used
 by a Receiver to process Alert streams sent from Agent components.
 
+The sinks are fed by a worker thread each, through a bounded queue, so
+that a slow sink doesn't hold the pipeline nor the other sinks.
+
 """
 
 import sys
+import Queue
 import logging
+import threading
 import traceback
 
 from WMCore.Alerts.Alert import Alert
@@ -40,6 +45,81 @@ def coroutine(func):
 
 
 
+class AsyncSink(object):
+    """
+    Wrapper sending alerts to a sink from a worker thread. The lists of
+    alerts queued while the sink is busy are sent together. Should the
+    queue be full, the alerts are dropped rather than blocking.
+
+    """
+
+    def __init__(self, name, sink, queueSize = 1000):
+        self.name = name
+        self.sink = sink
+        self.queue = Queue.Queue(maxsize = queueSize)
+        self.dropped = 0
+        self.sent = 0
+        self.worker = threading.Thread(target = self.work, name = "AlertSink-%s" % name)
+        self.worker.daemon = True
+        self.worker.start()
+
+
+    def send(self, alerts):
+        """
+        Queue a list of alerts for the sink, never blocks.
+
+        """
+        try:
+            self.queue.put_nowait(alerts)
+        except Queue.Full:
+            self.dropped += len(alerts)
+            logging.warn("Queue of sink '%s' full, %s alerts dropped (%s in total)." %
+                         (self.name, len(alerts), self.dropped))
+
+
+    def work(self):
+        """
+        Send the queued alerts to the sink until closed.
+
+        """
+        while True:
+            alerts = self.queue.get()
+            if alerts is None:
+                break
+            closing = False
+            # send everything queued meanwhile at once
+            while True:
+                try:
+                    more = self.queue.get_nowait()
+                except Queue.Empty:
+                    break
+                if more is None:
+                    closing = True
+                    break
+                alerts = alerts + more
+            try:
+                self.sink.send(alerts)
+                self.sent += len(alerts)
+            except Exception as ex:
+                trace = traceback.format_exception(*sys.exc_info())
+                traceString = '\n '.join(trace)
+                m = ("Sending alerts failed on %s, reason: %s\n%s" %
+                     (self.sink.__class__.__name__, ex, traceString))
+                logging.error(m)
+            if closing:
+                break
+
+
+    def close(self, timeout = 10):
+        """
+        Send the alerts still queued and stop the worker.
+
+        """
+        self.queue.put(None)
+        self.worker.join(timeout)
+
+
+
 @coroutine
 def dispatcher(targets, config):
     """
@@ -129,6 +209,9 @@ class Processor(object):
     def __init__(self, config):
         softFunctions = {}
         criticalFunctions = {}
+        # size of the queues of the sinks, 0 to call them synchronously
+        queueSize = getattr(config, "sinkQueueSize", 1000)
+        self.asyncSinks = []
 
         def getSinkInstance(sinkName, sinkConfig):
             sinkClass = sinksMap[sinkName]
@@ -153,6 +236,9 @@ class Processor(object):
                     sinkInstance = getSinkInstance(sink, sinkConfig)
                     if sinkInstance:
                         logging.info("Sink '%s' initialized." % sink)
+                        if queueSize > 0:
+                            sinkInstance = AsyncSink(sink, sinkInstance, queueSize)
+                            self.asyncSinks.append(sinkInstance)
                         r[sink] = sinkInstance
             return r
 
@@ -187,3 +273,13 @@ class Processor(object):
         alert.update(alertData)
         self.pipeline.send(alert)
         logging.debug("Incoming Alert data processing done.")
+
+
+    def close(self):
+        """
+        Wait for the sinks to send the alerts queued.
+
+        """
+        for sink in self.asyncSinks:
+            sink.close()
+        logging.info("Sinks closed.")
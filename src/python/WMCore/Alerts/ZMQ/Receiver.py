@@ -10,6 +10,7 @@ Had issues with multiprocessing.Process implementation of the Receiver.
 
 
 import time
+import json
 import logging
 from threading import Thread
 
@@ -173,10 +174,12 @@ class ReceiverLogic(object):
                 break
             # check receiver - work channel
             if socks.get(self._workChannel) == zmq.POLLIN:
-                # alert data (JSON) are sent to the handler
-                alert = self._workChannel.recv_json()
-                logging.debug("Received Alert, processing ...")
-                self._workMsgHandler(alert)
+                # alert data (JSON) are sent to the handler, a message
+                # holds a batch of alerts, one per frame
+                frames = self._workChannel.recv_multipart()
+                logging.debug("Received %s Alerts, processing ..." % len(frames))
+                for frame in frames:
+                    self._workMsgHandler(json.loads(frame))
             # check the control channel
             if socks.get(self._contChannel) == zmq.POLLIN:
                 controlData = self._contChannel.recv_json()
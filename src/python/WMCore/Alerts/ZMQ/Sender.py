@@ -1,11 +1,21 @@
 """
 ZMQ Sender, Alerts framework.
 
+Alerts can be sent in batches, one multipart message of JSON frames per
+batch, flushed when the batch is full or its oldest alert is older than
+the flush interval. Identical alerts repeated within the deduplication
+window are only sent once, the next one sent after the window holds the
+number of alerts suppressed.
+
 """
 
 
 import os
+import json
+import time
 import logging
+import threading
+import weakref
 
 import zmq
 
@@ -25,8 +35,26 @@ class Sender(object):
     LINGER_DELAY = 1000 # [ms]
 
 
-    def __init__(self, target, controller, label = None):
+    # the deduplication table is pruned when it grows over this size
+    MAX_DEDUP_KEYS = 10000
+
+
+    def __init__(self, target, controller, label = None, batchSize = 1,
+                 flushInterval = 1.0, dedupWindow = 0):
         self._label = label or "Sender_%s" % os.getpid()
+        self._batchSize = batchSize
+        self._flushInterval = flushInterval
+        self._dedupWindow = dedupWindow
+        # alerts waiting to be sent and when the first one was added
+        self._batch = []
+        self._batchStart = None
+        # key -> [time of the last alert sent, number of alerts suppressed]
+        self._recent = {}
+        self._lock = threading.RLock()
+        self._flusher = None
+        self.sent = 0
+        self.suppressed = 0
+        self.dropped = 0
         self._context = zmq.Context()
         # set up a channel to send work
         self._workChannel = self._context.socket(zmq.PUSH)
@@ -39,13 +67,108 @@ class Sender(object):
         # socket closure will be done on garbage collection of Sender instance
 
 
+    def _isDuplicate(self, alert):
+        """
+        Whether an identical alert was sent within the deduplication window,
+        otherwise add the number of alerts suppressed since to the alert.
+
+        """
+        now = time.time()
+        key = (alert.get("Component"), alert.get("Source"), alert.get("Type"),
+               alert.get("Level"), alert.get("Workload"),
+               json.dumps(alert.get("Details"), sort_keys = True, default = str))
+        recent = self._recent.get(key)
+        if recent is not None and now - recent[0] < self._dedupWindow:
+            recent[1] += 1
+            self.suppressed += 1
+            return True
+
+        if recent is not None and recent[1]:
+            alert["Suppressed"] = recent[1]
+        self._recent[key] = [now, 0]
+        if len(self._recent) > self.MAX_DEDUP_KEYS:
+            for oldKey, (lastSent, _) in self._recent.items():
+                if now - lastSent >= self._dedupWindow:
+                    del self._recent[oldKey]
+        return False
+
+
     def __call__(self, alert):
         """
-        Send the alert instance to the target that this sender represents.
+        Send the alert instance to the target that this sender represents,
+        or add it to the current batch.
+
+        """
+        with self._lock:
+            if self._dedupWindow and self._isDuplicate(alert):
+                logging.debug("Alert %s suppressed." % alert)
+                return
+            if self._batchSize <= 1:
+                self._send([alert])
+                return
+            if not self._batch:
+                self._batchStart = time.time()
+            self._batch.append(alert)
+            if len(self._batch) >= self._batchSize or \
+                   time.time() - self._batchStart >= self._flushInterval:
+                self.flush()
+            elif self._flusher is None:
+                self._startFlusher()
+
+
+    def _send(self, alerts):
+        """
+        Send alerts as one message, with a frame per alert. Never blocks:
+        should the receiver not keep up the alerts are dropped.
 
         """
-        self._workChannel.send_json(alert)
-        logging.debug("Alert %s sent." % alert)
+        try:
+            self._workChannel.send_multipart([json.dumps(x) for x in alerts], zmq.NOBLOCK)
+        except zmq.Again:
+            self.dropped += len(alerts)
+            logging.warn("Alerts receiver not keeping up, %s alerts dropped (%s in total)." %
+                         (len(alerts), self.dropped))
+            return
+        self.sent += len(alerts)
+        logging.debug("%s alerts sent." % len(alerts))
+
+
+    def flush(self):
+        """
+        Send the alerts of the current batch.
+
+        """
+        with self._lock:
+            if self._batch:
+                self._send(self._batch)
+                self._batch = []
+                self._batchStart = None
+
+
+    def _startFlusher(self):
+        """
+        Start the thread flushing the batches that don't fill up within the
+        flush interval. It only keeps a weak reference to the sender so that
+        it ends along with it.
+
+        """
+        senderRef = weakref.ref(self)
+        interval = self._flushInterval
+
+        def flushLoop():
+            while True:
+                time.sleep(interval)
+                sender = senderRef()
+                if sender is None:
+                    break
+                with sender._lock:
+                    if sender._batch and time.time() - sender._batchStart >= interval:
+                        sender.flush()
+                del sender
+
+        self._flusher = threading.Thread(target = flushLoop, name = "AlertsFlusher")
+        self._flusher.daemon = True
+        self._flusher.start()
 
 
     def register(self):
@@ -59,9 +182,10 @@ class Sender(object):
 
     def unregister(self):
         """
-        Send an unregister message to the target.
+        Send the pending alerts and an unregister message to the target.
 
         """
+        self.flush()
         self._contChannel.send_json(UnregisterMsg(self._label))
         logging.debug("Unregister message sent for %s." % self._label)
 
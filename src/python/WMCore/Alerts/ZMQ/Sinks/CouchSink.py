@@ -31,13 +31,12 @@ class CouchSink(object):
 
     def send(self, alerts):
         """
-        Handle list of alerts.
+        Handle list of alerts, stored with a single bulk request.
 
         """
-        retVals = []
         for a in alerts:
             doc = Document(None, a)
-            retVal = self.database.commitOne(doc)
-            retVals.append(retVal)
+            self.database.queue(doc)
+        retVals = self.database.commit()
         logging.debug("Stored %s alerts to CouchDB, retVals: %s" % (len(alerts), retVals))
         return retVals
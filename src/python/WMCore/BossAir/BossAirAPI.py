@@ -20,6 +20,7 @@ import os.path
 import threading
 import logging
 import subprocess
+from collections import defaultdict
 
 from WMCore.JobStateMachine.ChangeState import ChangeState
 from WMCore.DAOFactory          import DAOFactory
@@ -450,7 +451,7 @@ class BossAirAPI(WMConnectionBase):
 
 
 
-    def track(self, runJobIDs=None, wmbsIDs=None):
+    def track(self, runJobIDs=None, wmbsIDs=None, buildWMBSJobs=True):
         """
         _track_
 
@@ -459,29 +460,30 @@ class BossAirAPI(WMConnectionBase):
 
         OPTIONAL: You can submit a list of jobs to check, based either on wmbsIDs or
          on runjobIDs.  This takes a list of integer IDs.
+
+        By default the running jobs are returned as WMBS jobs, with buildWMBSJobs
+        set to False the RunJob objects are returned instead, so that the
+        caller only builds WMBS jobs for the ones it has to act on.
         """
 
         jobsToChange = []
         jobsToComplete = []
         jobsToReturn = []
-        returnList = []
 
-        jobsToTrack = {}
+        jobsToTrack = defaultdict(list)
 
         runningJobs = self._listRunJobs(active=True)
 
         if runJobIDs:
-            for job in runningJobs:
-                if not job['id'] in runJobIDs:
-                    runningJobs.remove(job)
+            runJobIDs = set(runJobIDs)
+            runningJobs = [job for job in runningJobs if job['id'] in runJobIDs]
         if wmbsIDs:
-            for job in runningJobs:
-                if not job['jobid'] in wmbsIDs:
-                    runningJobs.remove(job)
+            wmbsIDs = set(wmbsIDs)
+            runningJobs = [job for job in runningJobs if job['jobid'] in wmbsIDs]
 
         if len(runningJobs) < 1:
             # Then we have no running jobs
-            return returnList
+            return []
 
         logging.info("About to start building running jobs")
 
@@ -490,13 +492,10 @@ class BossAirAPI(WMConnectionBase):
         logging.info("About to look for %i loadedJobs.\n", len(loadedJobs))
 
         for runningJob in loadedJobs:
-            plugin = runningJob['plugin']
-            if not plugin in jobsToTrack.keys():
-                jobsToTrack[plugin] = []
-            jobsToTrack[plugin].append(runningJob)
+            jobsToTrack[runningJob['plugin']].append(runningJob)
 
-        for plugin in jobsToTrack.keys():
-            if not plugin in self.plugins.keys():
+        for plugin in jobsToTrack:
+            if plugin not in self.plugins:
                 msg = "Jobs tracking with non-existant plugin %s\n" % (plugin)
                 msg += "They were submitted but can't be tracked?\n"
                 msg += "That's too strange to continue\n"
@@ -528,10 +527,13 @@ class BossAirAPI(WMConnectionBase):
         self._updateJobs(jobs=jobsToChange)
         self._complete(jobs=jobsToComplete)
 
+        if not buildWMBSJobs:
+            return jobsToReturn
 
         # We should have a globalState variable for changed jobs
         # from the plugin
         # Return that to the calling function
+        returnList = []
         for rj in jobsToReturn:
             job = rj.buildWMBSJob()
             job['globalState'] = rj['globalState']
@@ -552,17 +554,15 @@ class BossAirAPI(WMConnectionBase):
             return
 
         # We should be insulated from bad plugins by track()
-        jobsToComplete = {}
+        jobsToComplete = defaultdict(list)
         idsToComplete = []
 
         for job in jobs:
-            if not job['plugin'] in jobsToComplete.keys():
-                jobsToComplete[job['plugin']] = []
             jobsToComplete[job['plugin']].append(job)
             idsToComplete.append(job['id'])
 
         try:
-            for plugin in jobsToComplete.keys():
+            for plugin in jobsToComplete:
                 self.plugins[plugin].complete(jobsToComplete[plugin])
         except WMException:
             raise
@@ -796,18 +796,15 @@ class BossAirAPI(WMConnectionBase):
         finalJobs = []
 
         loadedJobs = self._loadByID(jobs=runJobs)
+        runJobsByID = dict((rj['id'], rj) for rj in runJobs)
 
         for loadJob in loadedJobs:
-            runJob = None
-            for rj in runJobs:
-                if rj['id'] == loadJob['id']:
-                    runJob = rj
-                    break
+            runJob = runJobsByID[loadJob['id']]
             # We should have two instances of the job
-            for key in runJob.keys():
+            for key, value in runJob.iteritems():
                 # Fill one from the other
                 # runJob, being most recent, should be on top
-                if runJob[key] == None:
+                if value is None:
                     runJob[key] = loadJob.get(key, None)
             finalJobs.append(runJob)
 
@@ -829,23 +826,27 @@ class BossAirAPI(WMConnectionBase):
         if len(wmbsJobs) != len(loadedJobs):
             logging.error("Could not load all jobs in BossAir for WMBS input")
 
+        runJobsByWMBS = {}
+        for runJob in loadedJobs:
+            runJobsByWMBS.setdefault((runJob['jobid'], runJob['retry_count']), runJob)
+
         for wmbsJob in wmbsJobs:
-            for runJob in loadedJobs:
-                if runJob['jobid'] == wmbsJob['id'] and runJob['retry_count'] == wmbsJob['retry_count']:
-                    rj = RunJob()
-                    rj.buildFromJob(wmbsJob)
-                    rj['id'] = runJob['id']
-                    for key in rj.keys():
-                        if rj[key] == None:
-                            rj[key] = runJob.get(key, None)
-                    finalJobs.append(rj)
-                    break
-            # If we get here, we're sort of screwed
-            # It means that although we sent for it, we couldn't find it.
-            # Possibly means that the job just isn't in there yet.
-            # Make a note of it, then do nothing
-            logging.debug("Could not successfully load a runJob for wmbsJob %i:%i\n", wmbsJob['id'], wmbsJob['retry_count'])
-            logging.debug("WMBS Job: %s\n", wmbsJob)
+            runJob = runJobsByWMBS.get((wmbsJob['id'], wmbsJob['retry_count']))
+            if runJob is None:
+                # If we get here, we're sort of screwed
+                # It means that although we sent for it, we couldn't find it.
+                # Possibly means that the job just isn't in there yet.
+                # Make a note of it, then do nothing
+                logging.debug("Could not successfully load a runJob for wmbsJob %i:%i\n", wmbsJob['id'], wmbsJob['retry_count'])
+                logging.debug("WMBS Job: %s\n", wmbsJob)
+                continue
+            rj = RunJob()
+            rj.buildFromJob(wmbsJob)
+            rj['id'] = runJob['id']
+            for key in rj.keys():
+                if rj[key] == None:
+                    rj[key] = runJob.get(key, None)
+            finalJobs.append(rj)
 
 
         return finalJobs
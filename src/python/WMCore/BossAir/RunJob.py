@@ -19,51 +19,56 @@ class RunJob(dict):
     the necessary fields.
     """
 
+    # Fields every RunJob has, if the field has no value
+    # leave it as None so we can overwrite it later.
+    defaultFields = {
+        'id':                    None,
+        'gridid':                None,
+        'bulkid':                None,
+        'retry_count':           0,
+        'status':                None,
+        'location':              None,
+        'site_cms_name':         None,
+        'userdn':                None,
+        'usergroup':             '',
+        'userrole':              '',
+        'plugin':                None,
+        'cache_dir':             None,
+        'status_time':           None,
+        'packageDir':            None,
+        'sandbox':               None,
+        'priority':              None,
+        'taskType':              None,
+        'possibleSites':         None,
+        'swVersion':             None,
+        'scramArch':             None,
+        'siteName':              None,
+        'name':                  None,
+        'proxyPath':             None,
+        'requestName':           None,
+        'estimatedJobTime':      None,
+        'estimatedDiskUsage':    None,
+        'estimatedMemoryUsage':  None,
+        'numberOfCores':         1,
+        'taskPriority':          None,
+        'taskName':              None,
+        'taskID':                None,
+        'potentialSites':        None,
+        'inputDataset':          None,
+        'inputDatasetLocations': None,
+        'allowOpportunistic':    False,
+        'highIOjob':             False,
+    }
+
     def __init__(self, jobid = -1):
         """
         Just make sure you init the dictionary fields.
 
-        If the field has no value, leave it as None so we can
-        overwrite it later.
+        The defaults are copied in one go, RunJobs are built by the
+        hundred thousands every tracking cycle.
         """
-
-        self.setdefault('id', None)
-        self.setdefault('jobid', jobid)
-        self.setdefault('gridid', None)
-        self.setdefault('bulkid', None)
-        self.setdefault('retry_count', 0)
-        self.setdefault('status', None)
-        self.setdefault('location', None)
-        self.setdefault('site_cms_name', None)
-        self.setdefault('userdn', None)
-        self.setdefault('usergroup', '')
-        self.setdefault('userrole', '')
-        self.setdefault('plugin', None)
-        self.setdefault('cache_dir', None)
-        self.setdefault('status_time', None)
-        self.setdefault('packageDir', None)
-        self.setdefault('sandbox', None)
-        self.setdefault('priority', None)
-        self.setdefault('taskType', None)
-        self.setdefault('possibleSites', None)
-        self.setdefault('swVersion', None)
-        self.setdefault('scramArch', None)
-        self.setdefault('siteName', None)
-        self.setdefault('name', None)
-        self.setdefault('proxyPath', None)
-        self.setdefault('requestName', None)
-        self.setdefault('estimatedJobTime', None)
-        self.setdefault('estimatedDiskUsage', None)
-        self.setdefault('estimatedMemoryUsage', None)
-        self.setdefault('numberOfCores', 1)
-        self.setdefault('taskPriority', None)
-        self.setdefault('taskName', None)
-        self.setdefault('taskID', None)
-        self.setdefault('potentialSites', None)
-        self.setdefault('inputDataset', None)
-        self.setdefault('inputDatasetLocations', None)
-        self.setdefault('allowOpportunistic', False)
-        self.setdefault('highIOjob', False)
+        dict.__init__(self, self.defaultFields)
+        self['jobid'] = jobid
 
         return
 
@@ -86,7 +91,7 @@ class RunJob(dict):
 
         # Update the job with all other shared keys
         for key in job.keys():
-            if key in self.keys():
+            if key in self:
                 self[key] = job[key]
 
         return
@@ -89,7 +89,8 @@ class StatusPoller(BaseWorkerThread):
         """
 
 
-        runningJobs = self.bossAir.track()
+        # Only the jobs we have to kill are turned into WMBS jobs
+        runningJobs = self.bossAir.track(buildWMBSJobs=False)
 
         if len(runningJobs) < 1:
             # Then we have no jobs
@@ -104,17 +105,19 @@ class StatusPoller(BaseWorkerThread):
         jobsToKill = []
 
         # Now check for timeouts
-        for job in runningJobs:
-            globalState = job.get('globalState', 'Error')
-            statusTime = job.get('status_time', None)
+        for runJob in runningJobs:
+            globalState = runJob.get('globalState', 'Error')
+            statusTime = runJob.get('status_time', None)
             timeout = self.timeouts.get(globalState, None)
             if statusTime == 0:
-                logging.error("Not killing job %i, the status time was zero", job['id'])
+                logging.error("Not killing job %i, the status time was zero", runJob['jobid'])
                 continue
             if timeout and statusTime:
                 if time.time() - float(statusTime) > float(timeout):
                     # Then the job needs to be killed.
-                    logging.info("Killing job %i because it has exceeded timeout for status '%s'", job['id'], globalState)
+                    logging.info("Killing job %i because it has exceeded timeout for status '%s'", runJob['jobid'], globalState)
+                    job = runJob.buildWMBSJob()
+                    job['globalState'] = globalState
                     job['status'] = globalState
                     jobsToKill.append(job)
 
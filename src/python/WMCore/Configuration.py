@@ -35,6 +35,34 @@ _SupportedTypes = []
 _SupportedTypes.extend(_SimpleTypes)
 _SupportedTypes.extend(_ComplexTypes)
 
+# sets used for the type checks, done for every single setting
+_SimpleTypeSet = frozenset(_SimpleTypes)
+_ComplexTypeSet = frozenset(_ComplexTypes)
+
+
+def _checkType(name, value):
+    """
+    _checkType_
+
+    Check that a value is of a supported type, nested sequences and dicts
+    included, raise a RuntimeError otherwise
+
+    """
+    valueType = type(value)
+    if valueType in _SimpleTypeSet:
+        return
+    elif valueType in _ComplexTypeSet:
+        for val in (value.itervalues() if valueType is dict else value):
+            if type(val) not in _SimpleTypeSet:
+                _checkType(name, val)
+        return
+    msg = "Not supported type in sequence:"
+    msg += "%s\n" % type(value)
+    msg += "for name: %s and value: %s\n" % (name, value)
+    msg += "Added to WMAgent Configuration."
+    msg += "Use ConfigurationEx to skip checks on config params"
+    raise RuntimeError(msg)
+
 
 def format(value):
     """
@@ -73,18 +101,21 @@ class ConfigSection(object):
 
     Chunk of configuration information
     """
+    # default for sections pickled before the flag existed
+    _internal_skipChecks = False
+
     def __init__(self, name = None):
         object.__init__(self)
-        self._internal_documentation = ""
-        self._internal_name = name
-        self._internal_settings = set()
-        self._internal_docstrings = {}
-        self._internal_children = set()
-        self._internal_parent_ref = None
         #The flag skipChecks controls weather each parameter added to the configuration
         #should be a primitive or complex type that can be "jsonized"
         #By default it is false, but ConfigurationEx instances set it to True
-        self._internal_skipChecks = False
+        self.__dict__.update(_internal_documentation = "",
+                             _internal_name = name,
+                             _internal_settings = set(),
+                             _internal_docstrings = {},
+                             _internal_children = set(),
+                             _internal_parent_ref = None,
+                             _internal_skipChecks = False)
 
     def __eq__(self, other):
         if (isinstance(other, type(self))):
@@ -99,22 +130,8 @@ class ConfigSection(object):
             return (id(self) == id(other))
 
     def _complexTypeCheck(self, name, value):
-
-        if type(value) in _SimpleTypes:
-            return
-        elif type(value) in _ComplexTypes:
-            vallist = value
-            if isinstance(value, dict):
-                vallist = value.values()
-            for val in vallist:
-                self._complexTypeCheck(name, val)
-        else:
-            msg = "Not supported type in sequence:"
-            msg += "%s\n" % type(value)
-            msg += "for name: %s and value: %s\n" % (name, value)
-            msg += "Added to WMAgent Configuration."
-            msg += "Use ConfigurationEx to skip checks on config params"
-            raise RuntimeError(msg)
+        _checkType(name, value)
+        return
 
 
     def __setattr__(self, name, value):
@@ -123,26 +140,60 @@ class ConfigSection(object):
             object.__setattr__(self, name, value)
             return
 
-        if isinstance(value, ConfigSection):
+        valueType = type(value)
+        if valueType in _SimpleTypeSet:
+            # most settings, no further check needed
+            if valueType is unicode:
+                value = str(value)
+        elif isinstance(value, ConfigSection):
             # child ConfigSection
             self._internal_children.add(name)
             self._internal_settings.add(name)
             value._internal_parent_ref = self
             object.__setattr__(self, name, value)
             return
-
-        if isinstance(value, unicode):
-            value = str(value)
-
-        #for backward compatibility use getattr and sure to work if the
-        #_internal_skipChecks flag is not set
-        if not getattr(self, '_internal_skipChecks', False):
-            self._complexTypeCheck(name, value)
+        elif not self._internal_skipChecks:
+            _checkType(name, value)
 
         object.__setattr__(self, name, value)
         self._internal_settings.add(name)
         return
 
+    def update_from_dict_(self, values):
+        """
+        _update_from_dict_
+
+        Set all the settings of a dictionary, as setting them one by one
+        would but type checking all the values first, so that nothing is
+        set if any of them is not supported.
+
+        """
+        checkTypes = not self._internal_skipChecks
+        settings = []
+        for name, value in values.iteritems():
+            valueType = type(value)
+            if name.startswith("_internal_") or isinstance(value, ConfigSection):
+                pass
+            elif valueType in _SimpleTypeSet:
+                if valueType is unicode:
+                    value = str(value)
+            elif checkTypes:
+                _checkType(name, value)
+            settings.append((name, value))
+
+        sectionDict = self.__dict__
+        sectionSettings = self._internal_settings
+        for name, value in settings:
+            if name.startswith("_internal_"):
+                sectionDict[name] = value
+                continue
+            if isinstance(value, ConfigSection):
+                self._internal_children.add(name)
+                value._internal_parent_ref = self
+            sectionDict[name] = value
+            sectionSettings.add(name)
+        return
+
     def __delattr__(self, name):
         if name.startswith("_internal_"):
             # skip test for internal setting
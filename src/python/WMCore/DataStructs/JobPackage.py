@@ -9,9 +9,55 @@ Data structure for storing and retreiving multiple job objects.
 
 
 import cPickle
+import struct
 
 from WMCore.DataStructs.WMObject import WMObject
 
+# Indexed packages start with the magic string and the length of the
+# pickled index, followed by the index and the pickle of each job.  The
+# index holds the directory and the (offset, length, task) of each job so
+# a single job can be read, or copied, without unpickling the others.
+INDEXED_MAGIC = "WMJOBPKG\x01\n"
+
+
+def readPackageIndex(fileHandle):
+    """
+    _readPackageIndex_
+
+    Read the index of an indexed package, return None if the package isn't
+    indexed.  Only depends on the standard library, so that it can be used
+    by the Unpacker before WMCore is available.
+    """
+    fileHandle.seek(0)
+    if fileHandle.read(len(INDEXED_MAGIC)) != INDEXED_MAGIC:
+        return None
+    indexLength = struct.unpack(">Q", fileHandle.read(8))[0]
+    index = cPickle.loads(fileHandle.read(indexLength))
+    index["dataOffset"] = len(INDEXED_MAGIC) + 8 + indexLength
+    return index
+
+
+def writeIndexedPackage(fileHandle, directory, jobs):
+    """
+    _writeIndexedPackage_
+
+    Write an indexed package from the job pickles provided as a list of
+    (key, task, pickle) tuples.
+    """
+    index = {"directory": directory, "jobs": {}}
+    offset = 0
+    for key, task, content in jobs:
+        index["jobs"][key] = (offset, len(content), task)
+        offset += len(content)
+    indexContent = cPickle.dumps(index, cPickle.HIGHEST_PROTOCOL)
+    fileHandle.write(INDEXED_MAGIC)
+    fileHandle.write(struct.pack(">Q", len(indexContent)))
+    fileHandle.write(indexContent)
+    for _, _, content in jobs:
+        fileHandle.write(content)
+    return
+
+
 class JobPackage(WMObject, dict):
     """
     _JobPackage_
@@ -32,21 +78,42 @@ class JobPackage(WMObject, dict):
         """
         _save_
 
-        Pickle this object and save it to disk.
+        Pickle this object and save it to disk, each job pickled on its own
+        and indexed.
         """
-        fileHandle = open(fileName, "w")
-        cPickle.dump(self, fileHandle, -1)
+        jobs = []
+        for key, job in self.iteritems():
+            if key == 'directory':
+                continue
+            jobs.append((key, job.get('task'), cPickle.dumps(job, cPickle.HIGHEST_PROTOCOL)))
+        fileHandle = open(fileName, "wb")
+        writeIndexedPackage(fileHandle, self['directory'], jobs)
         fileHandle.close()
         return
 
-    def load(self, fileName):
+    def load(self, fileName, jobID = None):
         """
         _load_
 
-        Load a pickled JobPackage object.
+        Load a pickled JobPackage object, either indexed or not.  If a job
+        ID is provided only load that job from an indexed package.
         """
-        fileHandle = open(fileName, "r")
-        loadedJobPackage = cPickle.load(fileHandle)
-        self.clear()
-        self.update(loadedJobPackage)
+        fileHandle = open(fileName, "rb")
+        try:
+            index = readPackageIndex(fileHandle)
+            self.clear()
+            if index is None:
+                fileHandle.seek(0)
+                loadedJobPackage = cPickle.load(fileHandle)
+                self.update(loadedJobPackage)
+                return
+
+            self['directory'] = index['directory']
+            for key, (offset, length, task) in index['jobs'].iteritems():
+                if jobID is not None and key != jobID:
+                    continue
+                fileHandle.seek(index['dataOffset'] + offset)
+                self[key] = cPickle.loads(fileHandle.read(length))
+        finally:
+            fileHandle.close()
         return
@@ -13,12 +13,146 @@ This code began life in COMP/CRAB/python/LumiList.py
 """
 
 
-import copy
+import bisect
 import itertools
 import json
 import re
 import urllib2
 
+
+def _mergeRanges(ranges):
+    """
+    Sort lumi ranges and merge the ones overlapping or touching, always
+    returning new [first, last] lists
+    """
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            if last > merged[-1][1]:
+                merged[-1][1] = last
+        else:
+            merged.append([first, last])
+    return merged
+
+
+def _intersectRanges(aRanges, bRanges):
+    """
+    Ranges in both sorted, merged lists of ranges, in a single pass
+    """
+    result = []
+    i, j = 0, 0
+    while i < len(aRanges) and j < len(bRanges):
+        first = max(aRanges[i][0], bRanges[j][0])
+        last = min(aRanges[i][1], bRanges[j][1])
+        if first <= last:
+            result.append([first, last])
+        if aRanges[i][1] < bRanges[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def _subtractRanges(aRanges, bRanges):
+    """
+    Ranges of a sorted, merged list of ranges not in another, in a single
+    pass
+    """
+    result = []
+    j = 0
+    for first, last in aRanges:
+        # skip the ranges of b ending before this one
+        while j < len(bRanges) and bRanges[j][1] < first:
+            j += 1
+        k = j
+        while k < len(bRanges) and bRanges[k][0] <= last:
+            if bRanges[k][0] > first:
+                result.append([first, bRanges[k][0] - 1])
+            first = bRanges[k][1] + 1
+            if first > last:
+                break
+            k += 1
+        if first <= last:
+            result.append([first, last])
+    return result
+
+
+def _iterJSONObject(handle, chunkSize = 1024 * 1024):
+    """
+    Iterate over the (key, value) pairs of the JSON object in a file,
+    reading and decoding it a member at a time, so the whole document is
+    never held in memory as text. Raise ValueError on malformed JSON, like
+    json.load does.
+    """
+    decoder = json.JSONDecoder()
+    whitespace = re.compile(r'[ \t\n\r]*')
+    state = {'buf': '', 'pos': 0, 'eof': False}
+
+    def nextChar():
+        """
+        Skip whitespace, reading more of the file if needed, and return the
+        next character, an empty string at the end of the file
+        """
+        while True:
+            state['pos'] = whitespace.match(state['buf'], state['pos']).end()
+            if state['pos'] < len(state['buf']) or state['eof']:
+                return state['buf'][state['pos']:state['pos'] + 1]
+            chunk = handle.read(chunkSize)
+            state['eof'] = not chunk
+            state['buf'] = state['buf'][state['pos']:] + chunk
+            state['pos'] = 0
+
+    def expect(chars):
+        """
+        Consume the next character, which must be one of chars
+        """
+        char = nextChar()
+        if not char or char not in chars:
+            raise ValueError("Expecting %s at offset %d of the JSON object" %
+                             (" or ".join(["'%s'" % x for x in chars]), state['pos']))
+        state['pos'] += 1
+        return char
+
+    def decode():
+        """
+        Decode the next JSON value, reading more of the file until it is
+        complete
+        """
+        while True:
+            nextChar()
+            buf, pos, eof = state['buf'], state['pos'], state['eof']
+            try:
+                if pos < len(buf) or eof:
+                    value, end = decoder.raw_decode(buf, pos)
+                    # a number at the end of the buffer may be truncated
+                    if end < len(buf) or eof:
+                        state['pos'] = end
+                        return value
+            except ValueError:
+                if eof:
+                    raise
+            chunk = handle.read(chunkSize)
+            state['eof'] = not chunk
+            state['buf'] = buf[pos:] + chunk
+            state['pos'] = 0
+
+    expect('{')
+    if nextChar() == '}':
+        state['pos'] += 1
+    else:
+        while True:
+            if nextChar() != '"':
+                raise ValueError("Expecting a property name at offset %d of the JSON object" % state['pos'])
+            key = decode()
+            expect(':')
+            value = decode()
+            yield key, value
+            if expect(',}') == '}':
+                break
+    if nextChar():
+        raise ValueError("Extra data after the JSON object")
+    return
+
 class LumiList(object):
     """
     Deal with lists of lumis in several different forms:
@@ -56,12 +190,13 @@ class LumiList(object):
         self.duplicates = {}
         if filename:
             self.filename = filename
-            jsonFile = open(self.filename,'r')
-            self.compactList = json.load(jsonFile)
+            with open(self.filename,'r') as jsonFile:
+                self.compactList = dict(_iterJSONObject(jsonFile))
         elif url:
             self.url = url
             jsonFile = urllib2.urlopen(url)
-            self.compactList = json.load(jsonFile)
+            self.compactList = dict(_iterJSONObject(jsonFile))
+            jsonFile.close()
         elif lumis:
             runsAndLumis = {}
             for (run, lumi) in lumis:
@@ -136,88 +271,29 @@ class LumiList(object):
         # Compact each run and make it unique
 
         for run in self.compactList.keys():
-            newLumis = []
-            for lumi in sorted(self.compactList[run]):
-                # If the next lumi starts inside or just after the last just change the endpoint of the first
-                if newLumis and newLumis[-1][0] <= lumi[0] <= newLumis[-1][1] + 1:
-                    newLumis[-1][1] = max(newLumis[-1][1], lumi[1])
-                else:
-                    newLumis.append(lumi)
-            self.compactList[run] = newLumis
+            self.compactList[run] = _mergeRanges(self.compactList[run])
+
+    # the ranges of each run are kept sorted and merged by the constructor,
+    # so set operations are single passes over them
 
     def __sub__(self, other): # Things from self not in other
         result = {}
-        for run in sorted(self.compactList.keys()):
-            alumis = sorted(self.compactList[run])
-            blumis = sorted(other.compactList.get(run, []))
-            alist = []                    # verified part
-            for alumi in alumis:
-                tmplist = [alumi[0], alumi[1]] # may be part
-                for blumi in blumis:
-                    if blumi[0] <= tmplist[0] and blumi[1] >= tmplist[1]: # blumi has all of alumi
-                        tmplist = []
-                        break # blumi is has all of alumi
-                    if blumi[0] > tmplist[0] and blumi[1] < tmplist[1]: # blumi is part of alumi
-                        alist.append([tmplist[0], blumi[0]-1])
-                        tmplist = [blumi[1]+1, tmplist[1]]
-                    elif blumi[0] <= tmplist[0] and blumi[1] < tmplist[1] and blumi[1]>=tmplist[0]: # overlaps start
-                        tmplist = [blumi[1]+1, tmplist[1]]
-                    elif blumi[0] > tmplist[0] and blumi[1] >= tmplist[1] and blumi[0]<=tmplist[1]: # overlaps end
-                        alist.append([tmplist[0], blumi[0]-1])
-                        tmplist = []
-                        break
-                if tmplist:
-                    alist.append(tmplist)
-            result[run] = alist
-
+        for run in self.compactList.keys():
+            result[run] = _subtractRanges(self.compactList[run], other.compactList.get(run, []))
         return LumiList(compactList = result)
 
 
     def __and__(self, other): # Things in both
         result = {}
-        aruns = set(self.compactList.keys())
-        bruns = set(other.compactList.keys())
-        for run in aruns & bruns:
-            lumiList = []                    # List for this run
-            unique = []                    # List for this run
-            for alumi in self.compactList[run]:
-                for blumi in other.compactList[run]:
-                    if blumi[0] <= alumi[0] and blumi[1] >= alumi[1]: # blumi has all of alumi
-                        lumiList.append(alumi)
-                    if blumi[0] > alumi[0] and blumi[1] < alumi[1]: # blumi is part of alumi
-                        lumiList.append(blumi)
-                    elif blumi[0] <= alumi[0] and blumi[1] < alumi[1] and blumi[1] >= alumi[0]: # overlaps start
-                        lumiList.append([alumi[0], blumi[1]])
-                    elif blumi[0] > alumi[0] and blumi[1] >= alumi[1] and blumi[0] <= alumi[1]: # overlaps end
-                        lumiList.append([blumi[0], alumi[1]])
-
-
-            if lumiList:
-                unique = [lumiList[0]]
-            for pair in lumiList[1:]:
-                if pair[0] == unique[-1][1]+1:
-                    unique[-1][1] = copy.deepcopy(pair[1])
-                else:
-                    unique.append(copy.deepcopy(pair))
-
-            result[run] = unique
+        for run in set(self.compactList.keys()) & set(other.compactList.keys()):
+            result[run] = _intersectRanges(self.compactList[run], other.compactList[run])
         return LumiList(compactList = result)
 
 
     def __or__(self, other):
         result = {}
-        aruns = self.compactList.keys()
-        bruns = other.compactList.keys()
-        runs = set(aruns + bruns)
-        for run in runs:
-            overlap = sorted(self.compactList.get(run, []) + other.compactList.get(run, []))
-            unique = [overlap[0]]
-            for pair in overlap[1:]:
-                if pair[0] >= unique[-1][0] and pair[0] <= unique[-1][1]+1 and pair[1] > unique[-1][1]:
-                    unique[-1][1] = copy.deepcopy(pair[1])
-                elif pair[0] > unique[-1][1]:
-                    unique.append(copy.deepcopy(pair))
-            result[run] = unique
+        for run in set(self.compactList.keys() + other.compactList.keys()):
+            result[run] = _mergeRanges(self.compactList.get(run, []) + other.compactList.get(run, []))
         return LumiList(compactList = result)
 
 
@@ -235,13 +311,21 @@ class LumiList(object):
         lumilist is of the simple form
         [(run1,lumi1),(run1,lumi2),(run2,lumi1)]
         """
+        # first and last lumis of the ranges of each run, to look the
+        # lumis up by bisection
+        runRanges = {}
         filteredList = []
+        lastRun = None
         for (run, lumi) in lumiList:
-            runsInLumi = self.compactList.get(str(run), [[0, -1]])
-            for (first, last) in runsInLumi:
-                if lumi >= first and lumi <= last:
-                    filteredList.append((run, lumi))
-                    break
+            if run != lastRun:
+                lastRun = run
+                if run not in runRanges:
+                    ranges = self.compactList.get(str(run), [])
+                    runRanges[run] = ([x[0] for x in ranges], [x[1] for x in ranges])
+                firstLumis, lastLumis = runRanges[run]
+            index = bisect.bisect_right(firstLumis, lumi) - 1
+            if index >= 0 and lumi <= lastLumis[index]:
+                filteredList.append((run, lumi))
         return filteredList
 
 
@@ -269,16 +353,20 @@ class LumiList(object):
         """
         Return the list of pairs representation
         """
-        theList = []
+        return list(self.iterLumis())
+
+
+    def iterLumis(self):
+        """
+        Iterate over the (run, lumi) pairs, expanding the ranges as needed
+        """
         runs = self.compactList.keys()
         runs.sort(key=int)
         for run in runs:
-            lumis = self.compactList[run]
-            for lumiPair in sorted(lumis):
-                for lumi in range(lumiPair[0], lumiPair[1]+1):
-                    theList.append((int(run), lumi))
-
-        return theList
+            runNumber = int(run)
+            for lumiPair in sorted(self.compactList[run]):
+                for lumi in xrange(lumiPair[0], lumiPair[1]+1):
+                    yield (runNumber, lumi)
 
 
     def getRuns(self):
@@ -10,7 +10,7 @@ job in two ways:
 
 """
 
-from WMCore.DataStructs.Run import Run
+from WMCore.DataStructs.RunLumis import RunLumis
 
 class Mask(dict):
     """
@@ -197,28 +197,7 @@ class Mask(dict):
             # ALWAYS TRUE
             return runs
 
-        runDict = {}
-        for r in runs:
-            if r.run in runDict:
-                runDict[r.run].lumis.extend(r.lumis)
-            else:
-                runDict[r.run] = r
-
-        maskRuns = set(self["runAndLumis"].keys())
-        passedRuns = set([r.run for r in runs])
-        filteredRuns = maskRuns.intersection(passedRuns)
-
-        newRuns = set()
-        for runNumber in filteredRuns:
-            maskLumis = set()
-            for pair in self["runAndLumis"][runNumber]:
-                if pair[0] == pair[1]:
-                    maskLumis.add(pair[0])
-                else:
-                    maskLumis = maskLumis.union(range(pair[0], pair[1] + 1, 1))
-
-            filteredLumis = set(runDict[runNumber].lumis).intersection(maskLumis)
-            if len(filteredLumis) > 0:
-                newRuns.add(Run(runNumber, *list(filteredLumis)))
+        filtered = RunLumis(runs).intersectionWithRanges(self["runAndLumis"])
+        newRuns = set(filtered.getRuns())
 
         return newRuns
@@ -63,9 +63,13 @@ class Run(WMObject):
             msg += "Run %s does not equal Run %s" % (self.run, rhs.run)
             raise RuntimeError(msg)
 
-        #newRun = Run(self.run, *self)
-        #[ newRun.append(x) for x in rhs if x not in newRun ]
-        [ self.lumis.append(x) for x in rhs.lumis if x not in self.lumis ]
+        # keep the lumis in order, looking them up in a set rather than
+        # in the list, which made merging long runs quadratic
+        knownLumis = set(self.lumis)
+        for lumi in rhs.lumis:
+            if lumi not in knownLumis:
+                knownLumis.add(lumi)
+                self.lumis.append(lumi)
 
         return self
     def __iter__(self):
@@ -94,11 +98,8 @@ class Run(WMObject):
 
     def __hash__(self):
 
-        value = self.run.__hash__()
         self.lumis.sort()
-        for lumi in self.lumis:
-            value += lumi.__hash__()
-        return value
+        return self.run.__hash__() + sum(map(hash, self.lumis))
 
     def json(self):
         """
@@ -0,0 +1,421 @@
+#!/usr/bin/env python
+"""
+_RunLumis_
+
+Compact container for the runs and lumi sections of files and jobs
+
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+from WMCore.DataStructs.Run import Run
+from WMCore.DataStructs.WMObject import WMObject
+
+
+def _lumiArray(lumis):
+    """
+    _lumiArray_
+
+    Sorted array of the unique lumis provided
+
+    """
+    return array('I', sorted(set(lumis)))
+
+
+# when one array is this many times shorter than the other, its lumis are
+# bisected in the other one, which is then copied a slice at a time,
+# rather than walking both arrays lumi by lumi
+BISECT_RATIO = 8
+
+
+def _union(left, right):
+    """
+    _union_
+
+    Merge two sorted arrays of unique lumis into a new one, in linear time.
+    Disjoint arrays, like consecutive lumi ranges, are just concatenated.
+
+    """
+    if not left or not right or left[-1] < right[0]:
+        return left + right
+    if right[-1] < left[0]:
+        return right + left
+    if len(left) < len(right):
+        left, right = right, left
+    result = array('I')
+    append = result.append
+    if len(right) * BISECT_RATIO < len(left):
+        start = 0
+        for lumi in right:
+            index = bisect_left(left, lumi, start)
+            result.extend(left[start:index])
+            if index == len(left) or left[index] != lumi:
+                append(lumi)
+            start = index
+        result.extend(left[start:])
+        return result
+    i = j = 0
+    nLeft = len(left)
+    nRight = len(right)
+    while i < nLeft and j < nRight:
+        lumi = left[i]
+        other = right[j]
+        if lumi < other:
+            append(lumi)
+            i += 1
+        elif other < lumi:
+            append(other)
+            j += 1
+        else:
+            append(lumi)
+            i += 1
+            j += 1
+    result.extend(left[i:])
+    result.extend(right[j:])
+    return result
+
+
+def _intersection(left, right):
+    """
+    _intersection_
+
+    Lumis in both sorted arrays, in linear time. When one array is much
+    shorter its lumis are bisected in the other one instead.
+
+    """
+    if not left or not right or left[-1] < right[0] or right[-1] < left[0]:
+        return array('I')
+    if len(left) > len(right):
+        left, right = right, left
+    result = array('I')
+    append = result.append
+    nRight = len(right)
+    if len(left) * BISECT_RATIO < nRight:
+        start = 0
+        for lumi in left:
+            start = bisect_left(right, lumi, start)
+            if start == nRight:
+                break
+            if right[start] == lumi:
+                append(lumi)
+        return result
+    i = j = 0
+    nLeft = len(left)
+    while i < nLeft and j < nRight:
+        lumi = left[i]
+        other = right[j]
+        if lumi < other:
+            i += 1
+        elif other < lumi:
+            j += 1
+        else:
+            append(lumi)
+            i += 1
+            j += 1
+    return result
+
+
+def _difference(left, right):
+    """
+    _difference_
+
+    Lumis of the sorted array left not in the sorted array right, in
+    linear time. Few lumis to remove are bisected in left, which is then
+    copied a slice at a time.
+
+    """
+    if not left or not right or left[-1] < right[0] or right[-1] < left[0]:
+        return array('I', left)
+    result = array('I')
+    append = result.append
+    nLeft = len(left)
+    nRight = len(right)
+    if nRight * BISECT_RATIO < nLeft:
+        start = 0
+        for lumi in right:
+            index = bisect_left(left, lumi, start)
+            result.extend(left[start:index])
+            if index < nLeft and left[index] == lumi:
+                index += 1
+            start = index
+        result.extend(left[start:])
+        return result
+    if nLeft * BISECT_RATIO < nRight:
+        start = 0
+        for lumi in left:
+            start = bisect_left(right, lumi, start)
+            if start == nRight or right[start] != lumi:
+                append(lumi)
+        return result
+    i = j = 0
+    while i < nLeft and j < nRight:
+        lumi = left[i]
+        other = right[j]
+        if lumi < other:
+            append(lumi)
+            i += 1
+        elif other < lumi:
+            j += 1
+        else:
+            i += 1
+            j += 1
+    result.extend(left[i:])
+    return result
+
+
+class RunLumis(WMObject):
+    """
+    _RunLumis_
+
+    Runs and their lumis, kept as one sorted array of unique unsigned ints
+    per run instead of a list of Python ints per Run object. Union,
+    intersection and difference merge the sorted arrays of a run in linear
+    time and the hash is computed once until the container changes.
+
+    Can be built from and converted to Run objects, and round trips
+    through json()/__to_json__ losslessly.
+    """
+
+    # up to this many lumis are inserted one by one in the sorted array of
+    # their run, more are merged with it
+    insortLimit = 8
+
+    def __init__(self, runs = None):
+        WMObject.__init__(self)
+        self.runLumis = {}
+        self._hash = None
+        if runs:
+            self.update(runs)
+
+    def addLumis(self, run, lumis):
+        """
+        _addLumis_
+
+        Add lumis to a run. A few lumis are inserted in place, more are
+        merged with the ones of the run.
+
+        """
+        current = self.runLumis.get(run)
+        if isinstance(lumis, array) and lumis.typecode == 'I':
+            # arrays come from another RunLumis, they are sorted and unique
+            newLumis = lumis
+        else:
+            newLumis = _lumiArray(lumis)
+        if current is None:
+            self.runLumis[run] = array('I', newLumis)
+        elif len(newLumis) <= self.insortLimit:
+            for lumi in newLumis:
+                index = bisect_left(current, lumi)
+                if index == len(current) or current[index] != lumi:
+                    current.insert(index, lumi)
+        else:
+            self.runLumis[run] = _union(current, newLumis)
+        self._hash = None
+        return
+
+    def addRun(self, run):
+        """
+        _addRun_
+
+        Add the lumis of a WMCore.DataStructs.Run
+
+        """
+        self.addLumis(run.run, run.lumis)
+        return
+
+    def update(self, runs):
+        """
+        _update_
+
+        Add all the lumis of another RunLumis, of a dict of lumis keyed by
+        run or of a list of Run objects
+
+        """
+        if isinstance(runs, RunLumis):
+            items = runs.runLumis.iteritems()
+        elif isinstance(runs, dict):
+            items = runs.iteritems()
+        else:
+            items = ((run.run, run.lumis) for run in runs)
+        for run, lumis in items:
+            self.addLumis(run, lumis)
+        return
+
+    def union(self, other):
+        """
+        _union_
+
+        New RunLumis with the lumis of both
+
+        """
+        result = self.copy()
+        result.update(other)
+        return result
+
+    def intersection(self, other):
+        """
+        _intersection_
+
+        New RunLumis with the lumis in both
+
+        """
+        result = RunLumis()
+        for run in set(self.runLumis).intersection(other.runLumis):
+            lumis = _intersection(self.runLumis[run], other.runLumis[run])
+            if lumis:
+                result.runLumis[run] = lumis
+        return result
+
+    def intersectionWithRanges(self, lumiRanges):
+        """
+        _intersectionWithRanges_
+
+        New RunLumis with the lumis within the ranges provided, as a dict
+        of [[firstLumi, lastLumi], ...] lists keyed by run, like the
+        runAndLumis of a Mask. The ranges are not expanded: overlapping
+        ones are joined and each one is a slice of the sorted lumis.
+
+        """
+        result = RunLumis()
+        for run in set(self.runLumis).intersection(lumiRanges):
+            lumis = self.runLumis[run]
+            selected = array('I')
+            lastLumi = None
+            for first, last in sorted(lumiRanges[run]):
+                if lastLumi is not None and first <= lastLumi:
+                    # overlaps the previous range, only take what follows it
+                    if last <= lastLumi:
+                        continue
+                    first = lastLumi + 1
+                selected.extend(lumis[bisect_left(lumis, first):bisect_right(lumis, last)])
+                lastLumi = last
+            if selected:
+                result.runLumis[run] = selected
+        return result
+
+    def difference(self, other):
+        """
+        _difference_
+
+        New RunLumis with the lumis not in other
+
+        """
+        result = RunLumis()
+        for run, lumis in self.runLumis.iteritems():
+            if run in other.runLumis:
+                lumis = _difference(lumis, other.runLumis[run])
+            else:
+                lumis = array('I', lumis)
+            if lumis:
+                result.runLumis[run] = lumis
+        return result
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+    def copy(self):
+        """
+        _copy_
+
+        Copy of this container
+
+        """
+        result = RunLumis()
+        result.runLumis = dict((run, array('I', lumis)) for run, lumis in self.runLumis.iteritems())
+        return result
+
+    def runs(self):
+        """
+        _runs_
+
+        Sorted list of the run numbers
+
+        """
+        return sorted(self.runLumis)
+
+    def lumis(self, run):
+        """
+        _lumis_
+
+        Sorted list of the lumis of a run
+
+        """
+        return self.runLumis.get(run, array('I')).tolist()
+
+    def getRuns(self):
+        """
+        _getRuns_
+
+        List of Run objects, sorted by run number
+
+        """
+        return [Run(run, *self.runLumis[run]) for run in self.runs()]
+
+    def __len__(self):
+        return sum([len(lumis) for lumis in self.runLumis.itervalues()])
+
+    def __contains__(self, runLumi):
+        run, lumi = runLumi
+        lumis = self.runLumis.get(run)
+        if not lumis:
+            return False
+        index = bisect_left(lumis, lumi)
+        return index < len(lumis) and lumis[index] == lumi
+
+    def __iter__(self):
+        """
+        Iterate over (run, lumi) pairs sorted by run and lumi
+        """
+        for run in self.runs():
+            for lumi in self.runLumis[run]:
+                yield (run, lumi)
+
+    def __eq__(self, other):
+        if not isinstance(other, RunLumis):
+            return False
+        return self.runLumis == other.runLumis
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(tuple([(run, self.runLumis[run].tostring()) for run in self.runs()]))
+        return self._hash
+
+    def __str__(self):
+        return "RunLumis%s" % dict((run, lumis.tolist()) for run, lumis in self.runLumis.iteritems())
+
+    def json(self):
+        """
+        _json_
+
+        Convert to JSON friendly format.  Include some information for the
+        thunker so that we can convert back.
+        """
+        return {"Runs": [{"Run": run, "Lumis": self.runLumis[run].tolist()} for run in self.runs()],
+                "thunker_encoded_json": True, "type": "WMCore.DataStructs.RunLumis.RunLumis"}
+
+    def __to_json__(self, thunker = None):
+        """
+        __to_json__
+
+        This is the standard way we jsonize other objects.
+        Included here so we have a uniform method.
+        """
+        return self.json()
+
+    def __from_json__(self, jsondata, thunker):
+        """
+        __from_json__
+
+        Convert JSON data back into a RunLumis object.
+        """
+        WMObject.__init__(self)
+        self.runLumis = {}
+        self._hash = None
+        for runInfo in jsondata["Runs"]:
+            self.runLumis[runInfo["Run"]] = _lumiArray(runInfo["Lumis"])
+        return self
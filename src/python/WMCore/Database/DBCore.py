@@ -11,7 +11,11 @@ Core Database APIs
 
 from WMCore.DataStructs.WMObject import WMObject
 from WMCore.Database.ResultSet import ResultSet
+from WMCore.WorkerThreads.Instrumentation import daoName
 from copy import copy
+import sys
+import threading
+import time
 import WMCore.WMLogging
 
 from sqlalchemy.dialects.oracle.cx_oracle import OracleDialect_cx_oracle
@@ -141,6 +145,21 @@ class DBInterface(WMObject):
         set transaction = True if you already have an active transaction
 
         """
+        instrumentation = getattr(threading.currentThread(), "instrumentation", None)
+        if instrumentation is not None:
+            # account the query to the DAO running it, unless it's this
+            # method splitting the binds
+            caller = sys._getframe(1).f_locals.get('self')
+            if not isinstance(caller, DBInterface):
+                startTime = time.time()
+                try:
+                    return self.processData(sqlstmt, binds, conn = conn, transaction = transaction,
+                                            returnCursor = returnCursor)
+                finally:
+                    nBinds = len(binds) if isinstance(binds, list) else 1
+                    instrumentation.addQuery(daoName(caller) if caller is not None else "unknown",
+                                             time.time() - startTime, nBinds)
+
         connection = None
         try:
             if not conn:
@@ -92,8 +92,7 @@ def addAttributesToFile(fileSection, **attributes):
 
     Add attributes to a file in the FWJR.
     """
-    for attName in attributes.keys():
-        setattr(fileSection, attName, attributes[attName])
+    fileSection.update_from_dict_(attributes)
     return
 
 class Report:
@@ -517,7 +516,7 @@ class Report:
         newFile = getattr(analysisFiles, label)
         newFile.fileName = filename
 
-        [setattr(newFile, x, y) for x, y in attrs.items()]
+        newFile.update_from_dict_(attrs)
 
         analysisFiles.fileCount += 1
         return
@@ -535,7 +534,7 @@ class Report:
         removedFiles.section_(label)
         newFile = getattr(removedFiles, label)
 
-        [setattr(newFile, x, y) for x, y in attrs.items()]
+        newFile.update_from_dict_(attrs)
 
         self.report.cleanup.removed.fileCount += 1
         return
@@ -1352,6 +1351,21 @@ class Report:
 
         return
 
+    def setStepPSS(self, stepName, min, max, average):
+        """
+        _setStepPSS_
+
+        Set the Performance PSS information
+        """
+
+        reportStep = self.retrieveStep(stepName)
+        reportStep.performance.section_('PSSMemory')
+        reportStep.performance.PSSMemory.min = min
+        reportStep.performance.PSSMemory.max = max
+        reportStep.performance.PSSMemory.average = average
+
+        return
+
     def setStepPMEM(self, stepName, min, max, average):
         """
         _setStepPMEM_
@@ -426,15 +426,50 @@ def validateUrl(candidate):
     return check(regex_url, candidate)
 
 
+# every regular expression used by check(), compiled only once
+_compiledRegexps = {}
+
+
+def _compile(regexp):
+    """
+    _compile_
+
+    Return the compiled version of regexp, compiling it on first use.
+    Unlike the re module cache this one is never flushed.
+    """
+    try:
+        return _compiledRegexps[regexp]
+    except KeyError:
+        compiled = _compiledRegexps[regexp] = re.compile(regexp)
+        return compiled
+
+
 def check(regexp, candidate, maxLength=None):
     if maxLength != None:
         assert len(candidate) <= maxLength, \
             "%s is longer then max length (%s) allowed" % (candidate, maxLength)
-    assert re.compile(regexp).match(candidate) != None, \
+    assert _compile(regexp).match(candidate) != None, \
         "'%s' does not match regular expression %s" % (candidate, regexp)
     return True
 
 
+def checkList(regexp, candidates, maxLength=None):
+    """
+    _checkList_
+
+    Same as check, for all the candidates at once. The first candidate
+    failing the check raises an AssertionError.
+    """
+    match = _compile(regexp).match
+    for candidate in candidates:
+        if maxLength != None:
+            assert len(candidate) <= maxLength, \
+                "%s is longer then max length (%s) allowed" % (candidate, maxLength)
+        assert match(candidate) != None, \
+            "'%s' does not match regular expression %s" % (candidate, regexp)
+    return True
+
+
 def parseLFN(candidate):
     """
     _parseLFN_
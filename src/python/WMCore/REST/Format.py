@@ -416,22 +416,33 @@ def stream_compress(reply, available, compress_level, max_chunk):
     The `compression_level` tells how hard to compress, zero disables the
     compression entirely."""
 
+    method = stream_compression(available, compress_level)
+    if method:
+        # Add 'Vary' header for 'Accept-Encoding'.
+        vary_by('Accept-Encoding')
+
+        # Compress contents at original chunk boundaries.
+        if 'Content-Length' in cherrypy.response.headers:
+            del cherrypy.response.headers['Content-Length']
+        cherrypy.response.headers['Content-Encoding'] = method
+        return _stream_compressor[method](reply, compress_level, max_chunk)
+
+    return reply
+
+def stream_compression(available, compress_level):
+    """Return the compression method `stream_compress()` would use for the
+    current request given the `available` methods and `compress_level`,
+    or None if the response would not be compressed."""
+
     global _stream_compressor
     for enc in cherrypy.request.headers.elements('Accept-Encoding'):
         if enc.value not in available:
             continue
 
         elif enc.value in _stream_compressor and compress_level > 0:
-            # Add 'Vary' header for 'Accept-Encoding'.
-            vary_by('Accept-Encoding')
-
-            # Compress contents at original chunk boundaries.
-            if 'Content-Length' in cherrypy.response.headers:
-                del cherrypy.response.headers['Content-Length']
-            cherrypy.response.headers['Content-Encoding'] = enc.value
-            return _stream_compressor[enc.value](reply, compress_level, max_chunk)
+            return enc.value
 
-    return reply
+    return None
 
 def _etag_match(status, etagval, match, nomatch):
     """Match ETag value against any If-Match / If-None-Match headers."""
@@ -5,14 +5,15 @@ import re
 import signal
 import string
 import time
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 from functools import wraps
-from threading import Thread, Condition
+from threading import Thread, Condition, Lock
 
 from cherrypy import engine, expose, request, response, HTTPError, HTTPRedirect, tools
 
 from WMCore.REST.Error import *
 from WMCore.REST.Format import *
+from WMCore.REST.Format import _etag_match
 from WMCore.REST.Validation import validate_no_more_input
 
 try:
@@ -37,6 +38,19 @@ _COMPRESSIBLE = [ 'text/html',       'text/html; charset=utf-8',
 #: arguments either from the query string or body (but not both).
 RESTArgs = namedtuple("RESTArgs", ["args", "kwargs"])
 
+#: Response kept in :class:`RESTResponseCache`: the API name, the time the
+#: entry expires, the ETag, content type and encoding, and the response body
+#: after formatting and compression.
+RESTCachedResponse = namedtuple("RESTCachedResponse",
+                                ["api", "expires", "etag", "content_type",
+                                 "encoding", "body"])
+
+def _cache_kwargs(kwargs):
+    """Normalise query arguments `kwargs` into a hashable response cache key.
+    Argument order does not matter, but the order of repeated values does."""
+    return tuple(sorted((k, tuple(v) if isinstance(v, list) else v)
+                        for k, v in kwargs.iteritems()))
+
 ######################################################################
 ######################################################################
 class RESTFrontPage:
@@ -353,6 +367,65 @@ class RESTFrontPage:
         URL arguments; they are not used here."""
         return self._serve([self._frontpage])
 
+######################################################################
+######################################################################
+class RESTResponseCache:
+    """Server side cache of formatted and compressed REST responses.
+
+    Entries are :class:`RESTCachedResponse` tuples, looked up by the key
+    built in :meth:`MiniRESTApi._call`. Expired entries are dropped when
+    they are looked up, and the least recently used entries are dropped
+    when the total size of the cached bodies goes over `max_size` bytes.
+    The cache is safe to use from several threads.
+
+    :arg int max_size: Maximum total size of the cached response bodies."""
+
+    def __init__(self, max_size = 64 * 1024 * 1024):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """Return the cached response for `key`, None if there is no valid
+        response for it."""
+        with self._lock:
+            cached = self._entries.pop(key, None)
+            if not cached:
+                return None
+            if cached.expires < time.time():
+                self.size -= len(cached.body)
+                return None
+            self._entries[key] = cached
+            return cached
+
+    def put(self, key, cached):
+        """Store the :class:`RESTCachedResponse` `cached` under `key`. Bodies
+        larger than the whole cache are not stored."""
+        if len(cached.body) > self.max_size:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self.size -= len(old.body)
+            self._entries[key] = cached
+            self.size += len(cached.body)
+            while self.size > self.max_size:
+                _, old = self._entries.popitem(last = False)
+                self.size -= len(old.body)
+
+    def invalidate(self, api = None):
+        """Drop the cached responses of `api`, or everything if `api` is None."""
+        with self._lock:
+            if api is None:
+                self._entries.clear()
+                self.size = 0
+                return
+            for key, cached in self._entries.items():
+                if cached.api == api:
+                    del self._entries[key]
+                    self.size -= len(cached.body)
+
 ######################################################################
 ######################################################################
 class MiniRESTApi:
@@ -499,6 +572,29 @@ class MiniRESTApi:
     These can be tuned per API with ``cherrypy.tools.expires(secs=n)``, or
     ``expires`` and ``expires_opts`` :func:`restcall` keyword arguments.
 
+    .. rubric:: Response cache
+
+    APIs whose GET output is expensive to produce but identical for all the
+    callers, for example summaries polled by monitoring dashboards every
+    minute, can ask for their responses to be cached on the server side by
+    giving a positive ``cache_ttl`` keyword argument to :func:`restcall`, or
+    the whole mount point via :attr:`default_cache_ttl`. The response body is
+    then kept in :attr:`response_cache` after formatting and compression,
+    together with its ETag, keyed on the URL path, the query arguments, the
+    output format and the compression method. Until the entry expires, GET
+    and HEAD requests with the same key are answered from the cache without
+    running validation or the API method at all, and If-Match / If-None-Match
+    conditions are checked against the stored ETag, so a client revalidating
+    its copy gets a 304 reply without anything being regenerated. Responses
+    which fail are never cached.
+
+    Successful PUT, POST and DELETE calls to an API drop the cached GET
+    responses of the same API. Derived classes whose data changes in other
+    ways can call :meth:`RESTResponseCache.invalidate` themselves; otherwise
+    ``cache_ttl`` bounds how stale a cached response can get. Since the
+    validation step is skipped for cached responses, never enable caching
+    for APIs whose output depends on who is calling.
+
     .. rubric:: Notes
 
     .. note:: Only GET and HEAD requests are allowed to have a query string.
@@ -622,6 +718,18 @@ class MiniRESTApi:
        object can override this value with ``expires_opts`` keyword argument
        to :func:`restcall`. The default is an empty list.
 
+    .. attribute:: default_cache_ttl
+
+       Number, default time in seconds GET / HEAD responses are kept in the
+       server side response cache. The API object can override this value
+       with ``cache_ttl`` keyword argument to :func:`restcall`. The default
+       is zero, which disables the cache.
+
+    .. attribute:: response_cache
+
+       The :class:`RESTResponseCache` holding cached responses for this API
+       mount point, by default limited to 64 MB.
+
     .. rubric:: Constructor arguments
 
     :arg app: The main application :class:`~.RESTMain` object.
@@ -640,6 +748,8 @@ class MiniRESTApi:
         self.methods = {}
         self.default_expires = 3600
         self.default_expires_opts = []
+        self.default_cache_ttl = 0
+        self.response_cache = RESTResponseCache()
 
     def _addAPI(self, method, api, callable, args, validation, **kwargs):
         """Add an API method.
@@ -742,6 +852,10 @@ class MiniRESTApi:
             response.headers['Allow'] = 'GET HEAD'
             raise MethodWithoutQueryString()
 
+        # Remember the full path for the response cache before the derived
+        # class and the API lookup below take parts of it away.
+        path = tuple(param.args)
+
         # Give derived class a chance to look at arguments.
         self._precall(param)
 
@@ -773,6 +887,22 @@ class MiniRESTApi:
             format_names = ', '.join(f[0] for f in formats)
             raise NotAcceptable('Available types: %s' % format_names)
 
+        # Reply from the response cache if the API allows it and we have a
+        # valid response for exactly these arguments, format and encoding.
+        compression = apiobj.get('compression', self.compression)
+        compression_level = apiobj.get('compression_level', self.compression_level)
+        compression_chunk = apiobj.get('compression_chunk', self.compression_chunk)
+        cache_ttl = apiobj.get('cache_ttl', self.default_cache_ttl)
+        cache_key = None
+        if cache_ttl > 0 and (request.method == 'GET' or request.method == 'HEAD'):
+            cache_key = (path, _cache_kwargs(param.kwargs), format,
+                         stream_compression(compression, compression_level))
+            cached = self.response_cache.get(cache_key)
+            if cached:
+                vary_by('Accept')
+                self._set_expires(apiobj)
+                return self._reply_cached(cached)
+
         # Validate arguments. May convert arguments too, e.g. str->int.
         safe = RESTArgs([], {})
         for v in apiobj['validation']:
@@ -782,13 +912,35 @@ class MiniRESTApi:
         # Invoke the method.
         obj = apiobj['call'](*safe.args, **safe.kwargs)
 
+        # Modifications make cached responses of this API obsolete.
+        if request.method != 'GET' and request.method != 'HEAD':
+            self.response_cache.invalidate(api)
+
         # Add Vary: Accept header.
         vary_by('Accept')
 
-        # Set expires header if applicable. Note that POST/PUT/DELETE are not
-        # cacheable to begin with according to HTTP/1.1 specification. We must
-        # do this before actually streaming out the response below in case the
-        # ETag matching decides the previous response remains valid.
+        # Set expires header if applicable. We must do this before actually
+        # streaming out the response below in case the ETag matching decides
+        # the previous response remains valid.
+        self._set_expires(apiobj)
+
+        # Format the response.
+        response.headers['X-REST-Status'] = 100
+        response.headers['Content-Type'] = format
+        etagger = apiobj.get('etagger', None) or SHA1ETag()
+        reply = stream_compress(fmthandler(obj, etagger), compression,
+                                compression_level, compression_chunk)
+        if cache_key:
+            return self._reply_and_cache(cache_key, api, cache_ttl, etagger, reply)
+        return stream_maybe_etag(apiobj.get('etag_limit', self.etag_limit), etagger, reply)
+
+    def _set_expires(self, apiobj):
+        """Set the response expire time headers for GET and HEAD requests.
+        Note that POST/PUT/DELETE are not cacheable to begin with according
+        to HTTP/1.1 specification.
+
+        :arg dict apiobj: API object from :meth:`_addAPI`.
+        :returns: Nothing."""
         if request.method == 'GET' or request.method == 'HEAD':
             expires = self.default_expires
             cpcfg = getattr(apiobj['call'], '_cp_config', None)
@@ -807,15 +959,52 @@ class MiniRESTApi:
                 expires_opts = (expires_opts and ', '.join([''] + expires_opts)) or ''
                 response.headers['Cache-Control'] = 'max-age=%d%s' % (expires, expires_opts)
 
-        # Format the response.
+    def _reply_and_cache(self, key, api, ttl, etagger, reply):
+        """Consume the entire formatted and compressed `reply`, store it in
+        the response cache under `key` if it was produced without errors and
+        has an ETag, and respond with it.
+
+        :arg tuple key: The response cache key.
+        :arg str api: Name of the API being called.
+        :arg number ttl: Time in seconds to keep the response in the cache.
+        :arg etagger: The ETag generator fed by the formatter.
+        :arg reply: The compressed formatted response stream.
+        :returns: See :meth:`_reply_cached`."""
+        body = "".join(reply)
+
+        # The formatter converts errors into X-* headers, recover them as in
+        # stream_maybe_etag(). Never cache those responses.
+        err = response.headers.get('X-Error-HTTP', None)
+        if err:
+            message = response.headers.get('X-Error-Detail', 'Original error lost')
+            raise HTTPError(int(err), message)
+
+        cached = RESTCachedResponse(api, time.time() + ttl, etagger.value(),
+                                    response.headers['Content-Type'],
+                                    response.headers.get('Content-Encoding', None),
+                                    body)
+        if cached.etag:
+            self.response_cache.put(key, cached)
+        return self._reply_cached(cached)
+
+    def _reply_cached(self, cached):
+        """Respond with a response from the cache, processing any If-Match /
+        If-None-Match request headers against its ETag.
+
+        :arg RESTCachedResponse cached: The cached response.
+        :returns: The response body as a plain string."""
         response.headers['X-REST-Status'] = 100
-        response.headers['Content-Type'] = format
-        etagger = apiobj.get('etagger', None) or SHA1ETag()
-        reply = stream_compress(fmthandler(obj, etagger),
-                                apiobj.get('compression', self.compression),
-                                apiobj.get('compression_level', self.compression_level),
-                                apiobj.get('compression_chunk', self.compression_chunk))
-        return stream_maybe_etag(apiobj.get('etag_limit', self.etag_limit), etagger, reply)
+        response.headers['Content-Type'] = cached.content_type
+        if cached.encoding:
+            vary_by('Accept-Encoding')
+            response.headers['Content-Encoding'] = cached.encoding
+        if cached.etag:
+            response.headers['ETag'] = cached.etag
+            match = [str(x) for x in (request.headers.elements('If-Match') or [])]
+            nomatch = [str(x) for x in (request.headers.elements('If-None-Match') or [])]
+            _etag_match(response.status or 200, cached.etag, match, nomatch)
+        response.headers['Content-Length'] = len(cached.body)
+        return cached.body
 
     def _precall(self, param):
         """Point for derived classes to hook into prior to peeking at URL.
@@ -2323,6 +2512,7 @@ def restcall(func=None, args=None, generate="result", **kwargs):
     compression         "Accept-Encoding" methods, empty disables compression.
     compression_level   ZLIB compression level for output (0 .. 9).
     compression_chunk   Approximate amount of output to compress at once.
+    cache_ttl           Seconds to keep GET responses in the server side cache.
     =================== ======================================================
 
     :returns: The original function suitably enriched with attributes if
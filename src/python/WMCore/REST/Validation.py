@@ -84,9 +84,33 @@ def _validate_one(argname, param, safe, checker, optional, *args):
         safe.kwargs[argname] = checker(argname, val, *args)
         del param.kwargs[argname]
 
+def _check_strlist(argname, vals, rx, custom_err = None):
+    """Bulk version of `_check_str`. When every value is already a str
+    matching `rx` the list is accepted in one pass, otherwise values are
+    checked one by one to convert them or report the right error."""
+    match = rx.match
+    for v in vals:
+        if type(v) is not str or not match(v):
+            return [_check_str(argname, v, rx, custom_err) for v in vals]
+    return list(vals)
+
+def _check_ustrlist(argname, vals, rx, custom_err = None):
+    """Bulk version of `_check_ustr`, see `_check_strlist`."""
+    match = rx.match
+    for v in vals:
+        if type(v) is not unicode or not match(v):
+            return [_check_ustr(argname, v, rx, custom_err) for v in vals]
+    return list(vals)
+
+# checkers with a bulk version validating whole lists with fast paths
+_bulk_checkers = { _check_str: _check_strlist, _check_ustr: _check_ustrlist }
+
 def _validate_all(argname, param, safe, checker, *args):
-    safe.kwargs[argname] = map(lambda v: checker(argname, v, *args),
-                               _arglist(argname, param.kwargs))
+    vals = _arglist(argname, param.kwargs)
+    if checker in _bulk_checkers:
+        safe.kwargs[argname] = _bulk_checkers[checker](argname, vals, *args)
+    else:
+        safe.kwargs[argname] = [checker(argname, v, *args) for v in vals]
     if argname in param.kwargs:
         del param.kwargs[argname]
 
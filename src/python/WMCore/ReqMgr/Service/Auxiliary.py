@@ -337,10 +337,12 @@ class Software(RESTEntity):
         pass
 
 
-    @restcall
+    @restcall(cache_ttl = 300)
     def get(self):
         """
         Return entire "software" document - all versions and scramarchs.
+        The document only changes when the tag collector is synchronised,
+        so the response is kept in the server side cache for 5 minutes.
             
         """
         sw = self.reqmgr_aux_db.document("software")
@@ -5,16 +5,42 @@ _DBSReader_
 Readonly DBS Interface
 
 """
+import copy
+import threading
+import urlparse
 from collections import defaultdict
+from multiprocessing.pool import ThreadPool
 
 from dbs.apis.dbsClient import DbsApi
 from dbs.exceptions.dbsClientException import *
 
 from Utils.IterTools import grouper
+from WMCore.Services.DBS.DBSBlockCache import getDefaultBlockCache
 from WMCore.Services.DBS.DBSErrors import DBSReaderError, formatEx3
 from WMCore.Services.PhEDEx.PhEDEx import PhEDEx
 from WMCore.Services.SiteDB.SiteDB import SiteDBJSON as SiteDB
 
+# one semaphore per DBS host and cap, shared by every DBS3Reader in the
+# process, so that concurrent bulk calls asking for the same cap never
+# exceed it together
+_hostSemaphores = {}
+_hostSemaphoresLock = threading.Lock()
+
+def _hostSemaphore(url, maxPerHost):
+    """
+    _hostSemaphore_
+
+    Return the semaphore limiting to maxPerHost the number of concurrent
+    requests sent to the host serving url. Callers asking for a different
+    cap get their own semaphore, they are not bound by the cap of the
+    first caller.
+    """
+    key = (urlparse.urlparse(url).netloc or url, maxPerHost)
+    with _hostSemaphoresLock:
+        if key not in _hostSemaphores:
+            _hostSemaphores[key] = threading.BoundedSemaphore(maxPerHost)
+        return _hostSemaphores[key]
+
 def remapDBS3Keys(data, stringify = False, **others):
     """Fields have been renamed between DBS2 and 3, take fields from DBS3
     and map to DBS2 values
@@ -47,7 +73,14 @@ class DBS3Reader:
 
 
     """
-    def __init__(self, url, **contact):
+    def __init__(self, url, blockCache = None, **contact):
+
+        # cache of closed block metadata, the process wide one if not given
+        self.blockCache = blockCache
+        self.dbsURL = url
+        self.contact = contact
+        # per thread readers used by the bulk (concurrent) APIs
+        self._threadData = threading.local()
 
         # instantiate dbs api object
         try:
@@ -87,6 +120,49 @@ class DBS3Reader:
             lumiDict[lumisItem['logical_file_name']].append(item)
         return lumiDict
 
+    def _getBlockCache(self):
+        """
+        _getBlockCache_
+
+        Return the closed block metadata cache in use, None if disabled
+        """
+        if self.blockCache is not None:
+            return self.blockCache
+        return getDefaultBlockCache()
+
+    def _getBlockInfo(self, fileBlockName):
+        """
+        _getBlockInfo_
+
+        Return the DBS details of a block, None if it doesn't exist.
+        Used both to check that the block exists and to know whether
+        what is read from it can be cached, in a single call.
+        """
+        self.checkBlockName(fileBlockName)
+        try:
+            blocks = self.dbs.listBlocks(block_name = fileBlockName, detail = True)
+        except Exception as ex:
+            msg = "Error in "
+            msg += "DBSReader.blockExists(%s)\n" % fileBlockName
+            msg += "%s\n" % formatEx3(ex)
+            raise DBSReaderError(msg)
+
+        if len(blocks) == 0:
+            return None
+        return blocks[0]
+
+    def _cacheBlockInfo(self, blockCache, fileBlockName, blockInfo, kind, data):
+        """
+        _cacheBlockInfo_
+
+        Store block metadata in the cache, only if the block is closed
+        (according to its DBS details blockInfo) since open blocks can
+        still change.
+        """
+        if str(blockInfo.get('open_for_writing', 1)) == "0":
+            blockCache.put(fileBlockName, kind, data)
+        return
+
     def listPrimaryDatasets(self, match = '*'):
         """
         _listPrimaryDatasets_
@@ -462,7 +538,15 @@ class DBS3Reader:
         We need to clean code up when dbs2 is completely deprecated.
         calling lumis for run number is expensive.
         """
-        if not self.blockExists(fileBlockName):
+        blockCache = self._getBlockCache()
+        cacheKind = "files:%d:%s" % (bool(lumis), validFileOnly)
+        if blockCache:
+            result = blockCache.get(fileBlockName, cacheKind)
+            if result is not None:
+                return result
+
+        blockInfo = self._getBlockInfo(fileBlockName)
+        if blockInfo is None:
             msg = "DBSReader.listFilesInBlock(%s): No matching data"
             raise DBSReaderError(msg % fileBlockName)
 
@@ -482,6 +566,9 @@ class DBS3Reader:
             if lumis:
                 fileInfo["LumiList"] = lumiDict[fileInfo['logical_file_name']]
             result.append(remapDBS3Keys(fileInfo, stringify = True))
+
+        if blockCache:
+            self._cacheBlockInfo(blockCache, fileBlockName, blockInfo, cacheKind, result)
         return result
 
     def listFilesInBlockWithParents(self, fileBlockName, lumis = True, validFileOnly = 1):
@@ -495,7 +582,15 @@ class DBS3Reader:
         so for now it will be always true.
 
         """
-        if not self.blockExists(fileBlockName):
+        blockCache = self._getBlockCache()
+        cacheKind = "parents:%d:%s" % (bool(lumis), validFileOnly)
+        if blockCache:
+            result = blockCache.get(fileBlockName, cacheKind)
+            if result is not None:
+                return result
+
+        blockInfo = self._getBlockInfo(fileBlockName)
+        if blockInfo is None:
             msg = "DBSReader.listFilesInBlockWithParents(%s): No matching data"
             raise DBSReaderError(msg % fileBlockName)
 
@@ -541,8 +636,112 @@ class DBS3Reader:
         for fileInfo in fileDetails:
             fileInfo["ParentList"] = parentsByLFN[fileInfo['logical_file_name']]
 
+        if blockCache:
+            self._cacheBlockInfo(blockCache, fileBlockName, blockInfo, cacheKind, fileDetails)
         return fileDetails
 
+    def _threadReader(self):
+        """
+        _threadReader_
+
+        DbsApi objects are not thread safe, return a copy of this reader
+        owning its own DbsApi instance for the calling thread.
+        """
+        reader = getattr(self._threadData, 'reader', None)
+        if reader is None:
+            reader = copy.copy(self)
+            try:
+                reader.dbs = DbsApi(self.dbsURL, **self.contact)
+            except dbsClientException as ex:
+                msg = "Error in DBSReader with DbsApi\n"
+                msg += "%s\n" % formatEx3(ex)
+                raise DBSReaderError(msg)
+            self._threadData.reader = reader
+        return reader
+
+    def _mapBlocks(self, function, fileBlockNames, maxWorkers, maxPerHost):
+        """
+        _mapBlocks_
+
+        Call function(reader, blockName) for every block, concurrently in a
+        pool of at most maxWorkers threads each one using its own reader,
+        never sending more than maxPerHost requests at once to the DBS host.
+
+        Return the results in the same order as fileBlockNames. The first
+        error raised by any block is propagated.
+        """
+        fileBlockNames = list(fileBlockNames)
+        if not fileBlockNames:
+            return []
+
+        semaphore = _hostSemaphore(self.dbsURL, maxPerHost)
+
+        def callForBlock(blockName):
+            reader = self._threadReader()
+            with semaphore:
+                return function(reader, blockName)
+
+        pool = ThreadPool(processes = min(maxWorkers, len(fileBlockNames)))
+        try:
+            return pool.map(callForBlock, fileBlockNames)
+        finally:
+            pool.close()
+            pool.join()
+
+    def getFilesForBlocks(self, fileBlockNames, lumis = True, validFileOnly = 1,
+                          parents = False, maxWorkers = 8, maxPerHost = 4):
+        """
+        _getFilesForBlocks_
+
+        Bulk version of listFilesInBlock (listFilesInBlockWithParents if
+        parents is True). Blocks are fetched concurrently by a pool of at
+        most maxWorkers threads, never sending more than maxPerHost
+        requests at once to the DBS host.
+
+        Return a list with the files of each block, in the same order as
+        fileBlockNames. The first error raised by any block is propagated.
+        """
+        def filesForBlock(reader, blockName):
+            if parents:
+                return reader.listFilesInBlockWithParents(blockName, lumis, validFileOnly)
+            return reader.listFilesInBlock(blockName, lumis, validFileOnly)
+
+        return self._mapBlocks(filesForBlock, fileBlockNames, maxWorkers, maxPerHost)
+
+    def getDBSSummaryInfoForBlocks(self, dataset, fileBlockNames, maxWorkers = 8, maxPerHost = 4):
+        """
+        _getDBSSummaryInfoForBlocks_
+
+        Bulk version of getDBSSummaryInfo for blocks of the same dataset,
+        fetched concurrently like in getFilesForBlocks. DBS only provides
+        per block summaries one block at a time.
+
+        Return a list with the summary of each block, in the same order as
+        fileBlockNames.
+        """
+        if dataset:
+            self.checkDatasetPath(dataset)
+
+        def summaryForBlock(reader, blockName):
+            return reader.getDBSSummaryInfo(dataset, block = blockName)
+
+        return self._mapBlocks(summaryForBlock, fileBlockNames, maxWorkers, maxPerHost)
+
+    def listRunLumisForBlocks(self, fileBlockNames, maxWorkers = 8, maxPerHost = 4):
+        """
+        _listRunLumisForBlocks_
+
+        Bulk version of listRunLumis, blocks fetched concurrently like in
+        getFilesForBlocks.
+
+        Return a list with the run dictionary of each block, in the same
+        order as fileBlockNames.
+        """
+        def runLumisForBlock(reader, blockName):
+            return reader.listRunLumis(block = blockName)
+
+        return self._mapBlocks(runLumisForBlock, fileBlockNames, maxWorkers, maxPerHost)
+
     def lfnsInBlock(self, fileBlockName):
         """
         _lfnsInBlock_
@@ -607,7 +806,10 @@ class DBS3Reader:
                     locations[name] = list(valid_nodes)
         else:
             try:
-                blocksInfo = self.phedex.getReplicaPhEDExNodesForBlocks(block=fileBlockNames, complete='y')
+                # query PhEDEx by chunks of blocks to keep the requests short
+                blocksInfo = {}
+                for blockChunk in grouper(fileBlockNames, 100):
+                    blocksInfo.update(self.phedex.getReplicaPhEDExNodesForBlocks(block=blockChunk, complete='y'))
             except Exception as ex:
                 msg = "Error while getting block location from PhEDEx for block_name=%s)\n" % fileBlockNames
                 msg += "%s\n" % str(ex)
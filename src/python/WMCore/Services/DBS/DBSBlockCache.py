@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+"""
+_DBSBlockCache_
+
+Persistent cache of closed block metadata (files, lumis and parents)
+retrieved from DBS.
+
+Closed blocks are immutable, so whatever DBS returned for them once can
+be served again to WorkQueue splitting, WMBS injection, ACDC and
+resubmissions without another round trip to DBS.
+
+Entries are keyed by block name and kind of query and point to a content
+addressed blob (the sha1 of the serialized data), so identical answers
+are only stored once. The cache lives in a SQLite database and the least
+recently used entries are evicted when its size goes over the limit.
+"""
+
+import cPickle
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+_defaultBlockCache = None
+
+
+def setDefaultBlockCache(blockCache):
+    """
+    _setDefaultBlockCache_
+
+    Set the cache used by every DBS3Reader which was not given one.
+    Pass None to disable it.
+    """
+    global _defaultBlockCache
+    _defaultBlockCache = blockCache
+
+
+def getDefaultBlockCache():
+    """
+    _getDefaultBlockCache_
+
+    Return the process wide block cache, None if not configured.
+    """
+    return _defaultBlockCache
+
+
+class DBSBlockCache(object):
+    """
+    _DBSBlockCache_
+
+    SQLite backed, size limited cache of closed block metadata.
+    A new connection is opened for each operation, so the same object
+    can be used from several threads and the database can be shared by
+    several processes.
+    """
+
+    def __init__(self, cacheDir, maxSize=1024 ** 3, logger=None):
+        """
+        cacheDir is created if needed, maxSize is the maximum size (in
+        bytes) of the compressed data kept in the cache.
+        """
+        if not os.path.isdir(cacheDir):
+            os.makedirs(cacheDir)
+        self.dbFile = os.path.join(cacheDir, 'dbsblockcache.db')
+        self.maxSize = maxSize
+        self.logger = logger or logging.getLogger()
+        self.lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS blobs (
+                              digest TEXT PRIMARY KEY,
+                              size INTEGER NOT NULL,
+                              data BLOB NOT NULL)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                              block_name TEXT NOT NULL,
+                              kind TEXT NOT NULL,
+                              digest TEXT NOT NULL,
+                              last_access REAL NOT NULL,
+                              PRIMARY KEY (block_name, kind))""")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_access ON entries (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        """
+        Connection to the cache database, committed and closed on exit
+        """
+        conn = sqlite3.connect(self.dbFile, timeout=60)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, blockName, kind):
+        """
+        _get_
+
+        Return the data cached for blockName and kind, None if not cached.
+        """
+        with self._connect() as conn:
+            row = conn.execute("""SELECT blobs.digest, blobs.data FROM entries
+                                    JOIN blobs ON entries.digest = blobs.digest
+                                    WHERE entries.block_name = ? AND entries.kind = ?""",
+                               (blockName, kind)).fetchone()
+            if row is None:
+                return None
+            digest, blob = row
+            blob = str(blob)
+            if hashlib.sha1(blob).hexdigest() != digest:
+                # corrupted entry, forget about it and go back to DBS
+                self.logger.warning("Dropping corrupted DBS cache entry for %s (%s)", blockName, kind)
+                conn.execute("DELETE FROM entries WHERE block_name = ? AND kind = ?", (blockName, kind))
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE block_name = ? AND kind = ?",
+                         (time.time(), blockName, kind))
+        return cPickle.loads(zlib.decompress(blob))
+
+    def put(self, blockName, kind, data):
+        """
+        _put_
+
+        Store data for blockName and kind, only call it for closed blocks.
+        """
+        blob = zlib.compress(cPickle.dumps(data, cPickle.HIGHEST_PROTOCOL))
+        digest = hashlib.sha1(blob).hexdigest()
+        with self._connect() as conn:
+            conn.execute("INSERT OR IGNORE INTO blobs (digest, size, data) VALUES (?, ?, ?)",
+                         (digest, len(blob), sqlite3.Binary(blob)))
+            conn.execute("""INSERT OR REPLACE INTO entries (block_name, kind, digest, last_access)
+                              VALUES (?, ?, ?, ?)""", (blockName, kind, digest, time.time()))
+        self.evict()
+        return digest
+
+    def size(self):
+        """
+        _size_
+
+        Size in bytes of the data held in the cache
+        """
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def evict(self, maxSize=None):
+        """
+        _evict_
+
+        Remove the least recently used entries until the cache is smaller
+        than maxSize (the cache limit by default).
+        """
+        maxSize = self.maxSize if maxSize is None else maxSize
+        with self.lock:
+            with self._connect() as conn:
+                totalSize = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+                if totalSize <= maxSize:
+                    return
+                rows = conn.execute("""SELECT entries.block_name, entries.kind, entries.digest, blobs.size
+                                         FROM entries JOIN blobs ON entries.digest = blobs.digest
+                                         ORDER BY entries.last_access""").fetchall()
+                refCount = {}
+                for _, _, digest, _ in rows:
+                    refCount[digest] = refCount.get(digest, 0) + 1
+                for blockName, kind, digest, blobSize in rows:
+                    if totalSize <= maxSize:
+                        break
+                    conn.execute("DELETE FROM entries WHERE block_name = ? AND kind = ?", (blockName, kind))
+                    refCount[digest] -= 1
+                    if not refCount[digest]:
+                        totalSize -= blobSize
+                conn.execute("DELETE FROM blobs WHERE digest NOT IN (SELECT digest FROM entries)")
+        return
+
+    def clear(self):
+        """
+        _clear_
+
+        Remove everything from the cache
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM blobs")
+        return
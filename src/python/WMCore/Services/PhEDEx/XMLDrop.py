@@ -51,11 +51,6 @@ class XMLFileblock(list):
         result = doc.createElement("block")
         result.setAttribute('name', self.fileblockName)
         result.setAttribute('is-open', self.isOpen)
-        for lfn, checksums, size in self:
-            # checksums is a comma separated list of key:value pair
-            checksum = ",".join(["%s:%s" % (x, y) for x, y \
-                                 in checksums.items() \
-                                 if y not in (None, '')])
         for lfn, checksums, size in self:
             # checksums is a comma separated list of key:value pair
             formattedChecksums = ",".join(["%s:%s" % (x.lower(), y) for x, y \
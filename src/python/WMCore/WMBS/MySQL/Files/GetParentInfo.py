@@ -6,6 +6,9 @@ Figure out parentage information for a file in WMBS.  This will return
 information about a file's parent and it's grand parent such as the
 lfn, id and whether or not the file is merged.  This will also determine
 whether or not the file is a redneck parent or redneck child.
+
+Several child LFNs can be passed at once, they are looked up several
+hundred per query and each row carries the LFN of the child it refers to.
 """
 
 
@@ -14,23 +17,29 @@ whether or not the file is a redneck parent or redneck child.
 from WMCore.Database.DBFormatter import DBFormatter
 
 class GetParentInfo(DBFormatter):
-    sql = """SELECT wfp.id, wfp.lfn, wfp.merged,
+    sql = """SELECT wfd.lfn AS child_lfn, wfp.id, wfp.lfn, wfp.merged,
                     wfgp.lfn AS gplfn, wfgp.merged AS gpmerged
              FROM wmbs_file_details wfp
              INNER JOIN wmbs_file_parent wfpa ON wfpa.parent = wfp.id
              INNER JOIN wmbs_file_details wfd ON wfd.id = wfpa.child
              LEFT OUTER JOIN wmbs_file_parent wfpb ON wfpb.child = wfp.id
              LEFT OUTER JOIN wmbs_file_details wfgp ON wfgp.id = wfpb.parent
-             WHERE wfd.lfn = :child_lfn
+             WHERE wfd.lfn IN (%s)
     """
 
-
+    # Oracle does not allow more than 1000 expressions in a list
+    chunkSize = 500
 
     def execute(self, childLFNs, conn = None, transaction = False):
-        bindVars = []
-        for childLFN in childLFNs:
-            bindVars.append({"child_lfn": childLFN})
-
-        result = self.dbi.processData(self.sql, bindVars,
-                         conn = conn, transaction = transaction)
-        return self.formatDict(result)
+        results = []
+        childLFNs = list(childLFNs)
+        for start in range(0, len(childLFNs), self.chunkSize):
+            chunk = childLFNs[start:start + self.chunkSize]
+            binds = {}
+            for i, childLFN in enumerate(chunk):
+                binds["child_lfn%d" % i] = childLFN
+            sql = self.sql % ", ".join([":child_lfn%d" % i for i in range(len(chunk))])
+            result = self.dbi.processData(sql, binds, conn = conn,
+                                          transaction = transaction)
+            results.extend(self.formatDict(result))
+        return results
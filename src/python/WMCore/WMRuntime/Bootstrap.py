@@ -16,6 +16,7 @@ import os.path
 import logging
 import threading
 import sys
+import time
 import socket
 from logging.handlers import RotatingFileHandler
 
@@ -123,17 +124,6 @@ def loadJobDefinition():
     Report names are dependent on the retry_count, but if it fails unpacking the job
     it doesn't know the retry_count and will create the wrong file
     """
-    sandboxLoc = locateWMSandbox()
-    package = JobPackage()
-    packageLoc = os.path.join(sandboxLoc, "JobPackage.pcl")
-    try:
-        package.load(packageLoc)
-    except Exception as ex:
-        msg = "Failed to load JobPackage:%s\n" % packageLoc
-        msg += str(ex)
-        createErrorReport(exitCode = 11001, errorType = "JobPackageError", errorDetails = msg)
-        raise BootstrapException(msg)
-
     try:
         import WMSandbox.JobIndex
     except ImportError as ex:
@@ -144,6 +134,20 @@ def loadJobDefinition():
 
     index = WMSandbox.JobIndex.jobIndex
 
+    sandboxLoc = locateWMSandbox()
+    package = JobPackage()
+    packageLoc = os.path.join(sandboxLoc, "JobPackage.pcl")
+    startTime = time.time()
+    try:
+        # only the indexed job is unpickled
+        package.load(packageLoc, jobID = index)
+    except Exception as ex:
+        msg = "Failed to load JobPackage:%s\n" % packageLoc
+        msg += str(ex)
+        createErrorReport(exitCode = 11001, errorType = "JobPackageError", errorDetails = msg)
+        raise BootstrapException(msg)
+    logging.info("Loaded JobPackage %s in %.3f secs", packageLoc, time.time() - startTime)
+
     try:
         job = package[index]
     except Exception as ex:
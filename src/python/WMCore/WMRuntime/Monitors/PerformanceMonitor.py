@@ -6,12 +6,20 @@ __PerformanceMonitor_
 Monitor object which checks the job to ensure it is working inside
 the agreed limits of virtual memory and wallclock time, and terminate it
 if it exceeds them.
+
+The whole process tree of the step is sampled from /proc when available,
+with ps otherwise, and the min, max and average of the samples are written
+in the performance section of the step report.
+
+The Watchdog thread samples while the executor thread starts and ends the
+steps, the step state and the sampler are only used under sampleLock.
 """
 
 import os
 import signal
 import os.path
 import logging
+import threading
 import traceback
 import time
 
@@ -19,6 +27,7 @@ import WMCore.Algorithms.SubprocessAlgos as subprocessAlgos
 import WMCore.FwkJobReport.Report        as Report
 
 from WMCore.WMRuntime.Monitors.DashboardMonitor import getStepPID
+from WMCore.WMRuntime.Monitors.ProcessTreeSampler import ProcessTreeSampler, procfsAvailable
 from WMCore.WMRuntime.Monitors.WMRuntimeMonitor import WMRuntimeMonitor
 from WMCore.WMSpec.Steps.Executor               import getStepSpace
 from WMCore.WMSpec.WMStep                       import WMStepHelper
@@ -45,8 +54,8 @@ class PerformanceMonitor(WMRuntimeMonitor):
     """
     _PerformanceMonitor_
 
-    Monitors the performance by pinging ps and
-    recording data regarding the current step
+    Monitors the performance by sampling the processes of the current
+    step and recording data regarding it
     """
 
     def __init__(self):
@@ -78,6 +87,12 @@ class PerformanceMonitor(WMRuntimeMonitor):
 
         self.disableStep = False
 
+        self.stepPID        = None
+        self.sampler        = None
+        self.maxSamples     = 1000
+        self.useProcfs      = procfsAvailable()
+        self.sampleLock     = threading.Lock()
+
         WMRuntimeMonitor.__init__(self)
 
         return
@@ -98,6 +113,10 @@ class PerformanceMonitor(WMRuntimeMonitor):
         self.softTimeout = args.get('softTimeout', None)
         self.hardTimeout = args.get('hardTimeout', None)
 
+        # sample more often than the Watchdog interval, e.g. every 0.5 secs
+        self.sampleInterval = args.get('sampleInterval', None)
+        self.maxSamples     = args.get('maxSamples', 1000)
+
         self.logPath = os.path.join(logPath)
 
         return
@@ -119,17 +138,20 @@ class PerformanceMonitor(WMRuntimeMonitor):
         Assure that the monitor is pointing at the right step
         """
 
-        self.stepHelper = WMStepHelper(step)
-        self.currentStepName  = getStepName(step)
-        self.currentStepSpace = None
-
-        if not self.stepHelper.stepType() in self.watchStepTypes:
-            self.disableStep = True
-            logging.debug("PerformanceMonitor ignoring step of type %s" % self.stepHelper.stepType())
-            return
-        else:
-            logging.debug("Beginning PeformanceMonitor step Initialization")
-            self.disableStep = False
+        with self.sampleLock:
+            self.stepHelper = WMStepHelper(step)
+            self.currentStepName  = getStepName(step)
+            self.currentStepSpace = None
+            self.stepPID          = None
+            self.sampler          = None
+
+            if not self.stepHelper.stepType() in self.watchStepTypes:
+                self.disableStep = True
+                logging.debug("PerformanceMonitor ignoring step of type %s" % self.stepHelper.stepType())
+                return
+            else:
+                logging.debug("Beginning PeformanceMonitor step Initialization")
+                self.disableStep = False
 
         return
 
@@ -141,13 +163,94 @@ class PerformanceMonitor(WMRuntimeMonitor):
         Package the information and send it off
         """
 
-        if not self.disableStep:
-            # No information to correlate
+        with self.sampleLock:
+            if not self.disableStep and self.sampler is not None and stepReport is not None:
+                self.reportPerformance(stepReport)
+
+            self.currentStepName  = None
+            self.currentStepSpace = None
+            self.stepPID          = None
+            self.sampler          = None
+
+        return
+
+    def reportPerformance(self, stepReport):
+        """
+        _reportPerformance_
+
+        Write the summary of the samples in the performance section of
+        the step report, called with sampleLock held
+        """
+        if not stepReport.retrieveStep(self.currentStepName):
             return
+        summary = self.sampler.summary()
+        setters = {'rss': stepReport.setStepRSS, 'pss': stepReport.setStepPSS,
+                   'vsize': stepReport.setStepVSize, 'pcpu': stepReport.setStepPCPU}
+        for metric, setter in setters.items():
+            if metric in summary:
+                setter(stepName = self.currentStepName, **summary[metric])
+        return
 
-        self.currentStepName  = None
-        self.currentStepSpace = None
+    def getStepPID(self):
+        """
+        _getStepPID_
+
+        PID of the current step, read once per step
+        """
+        if self.stepPID is None:
+            if self.currentStepSpace == None:
+                # Then build the step space
+                self.currentStepSpace = getStepSpace(self.stepHelper.name())
+            self.stepPID = getStepPID(self.currentStepSpace, self.currentStepName)
+        return self.stepPID
+
+    def takeSample(self, stepPID):
+        """
+        _takeSample_
+
+        Sample the processes of the step, return the sample or None,
+        called with sampleLock held
+        """
+        if not self.useProcfs:
+            return self.psSample(stepPID)
+
+        if self.sampler is None or self.sampler.pid != stepPID:
+            self.sampler = ProcessTreeSampler(stepPID, maxSamples = self.maxSamples)
+        return self.sampler.sample()
+
+    def psSample(self, stepPID):
+        """
+        _psSample_
 
+        Sample the step process only with ps, where /proc is not available
+        """
+        cmd = self.monitorBase % (stepPID, stepPID)
+        stdout, stderr, retcode = subprocessAlgos.runCommand(cmd)
+
+        output = stdout.split()
+        if not len(output) > 7:
+            # Then something went wrong in getting the ps data
+            msg =  "Error when grabbing output from process ps\n"
+            msg += "output = %s\n" % output
+            msg += "command = %s\n" % cmd
+            logging.error(msg)
+            return None
+        return {'rss': float(output[2]), 'vsize': float(output[3]),
+                'pcpu': float(output[4]), 'pss': None, 'nProcesses': 1}
+
+    def periodicSample(self):
+        """
+        _periodicSample_
+
+        Only sample the step, run by the Watchdog every sampleInterval
+        """
+        with self.sampleLock:
+            if self.disableStep or self.currentStepName == None or not self.useProcfs:
+                return
+
+            stepPID = self.getStepPID()
+            if stepPID != None:
+                self.takeSample(stepPID)
         return
 
 
@@ -164,44 +267,39 @@ class PerformanceMonitor(WMRuntimeMonitor):
                            'Wallclock time' : 50664,
                            '' : 99999}
 
-        if self.disableStep:
-            # Then we aren't doing CPU monitoring
-            # on this step
-            return
+        with self.sampleLock:
+            if self.disableStep:
+                # Then we aren't doing CPU monitoring
+                # on this step
+                return
 
-        if self.currentStepName == None:
-            # We're between steps
-            return
+            if self.currentStepName == None:
+                # We're between steps
+                return
 
-        if self.currentStepSpace == None:
-            # Then build the step space
-            self.currentStepSpace = getStepSpace(self.stepHelper.name())
+            stepPID = self.getStepPID()
 
-        stepPID = getStepPID(self.currentStepSpace, self.currentStepName)
+            if stepPID == None:
+                # Then we have no step PID, we can do nothing
+                return
 
-        if stepPID == None:
-            # Then we have no step PID, we can do nothing
-            return
+            # the step may end while its limits are checked
+            stepName  = self.currentStepName
+            stepSpace = self.currentStepSpace
 
-        # Now we run the monitor command and collate the data
-        cmd = self.monitorBase % (stepPID, stepPID)
-        stdout, stderr, retcode = subprocessAlgos.runCommand(cmd)
+            # Now we sample the processes and collate the data
+            sample = self.takeSample(stepPID)
 
-        output = stdout.split()
-        if not len(output) > 7:
-            # Then something went wrong in getting the ps data
-            msg =  "Error when grabbing output from process ps\n"
-            msg += "output = %s\n" % output
-            msg += "command = %s\n" % self.monitorCommand
-            logging.error(msg)
+        if sample is None:
+            logging.error("Could not sample the processes of step %s (PID %s)" % (stepName, stepPID))
             return
-        rss   = float(output[2])
-        vsize = float(output[3])
+        rss   = sample['rss']
+        vsize = sample['vsize']
         logging.info("Retrieved following performance figures:")
-        logging.info("RSS: %s;  VSize: %s; PCPU: %s; PMEM: %s" % (output[2], output[3],
-                                                                  output[4], output[5]))
+        logging.info("RSS: %s;  PSS: %s; VSize: %s; PCPU: %.1f; processes: %i" % (rss, sample['pss'], vsize,
+                                                                                 sample['pcpu'], sample['nProcesses']))
 
-        msg = 'Error in CMSSW step %s\n' % self.currentStepName
+        msg = 'Error in CMSSW step %s\n' % stepName
         if self.maxRSS != None and rss >= self.maxRSS:
             msg += "Job has exceeded maxRSS: %s\n" % self.maxRSS
             msg += "Job has RSS: %s\n" % rss
@@ -230,7 +328,7 @@ class PerformanceMonitor(WMRuntimeMonitor):
             logging.error(msg)
             report  = Report.Report()
             # Find the global report
-            logPath = os.path.join(self.currentStepSpace.location,
+            logPath = os.path.join(stepSpace.location,
                                    '../../../',
                                    os.path.basename(self.logPath))
             try:
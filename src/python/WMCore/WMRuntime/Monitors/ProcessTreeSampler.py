@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+"""
+_ProcessTreeSampler_
+
+Sample the memory and CPU usage of a process and of all its children
+directly from /proc, without forking ps.
+
+"""
+
+import os
+import time
+from collections import deque
+
+PAGE_KB = os.sysconf('SC_PAGE_SIZE') / 1024
+CLOCK_TICKS = float(os.sysconf('SC_CLK_TCK'))
+
+# sampled metrics, memory in kB and CPU in percent of one core
+METRICS = ['rss', 'pss', 'vsize', 'pcpu']
+
+
+def procfsAvailable():
+    """
+    _procfsAvailable_
+
+    Whether processes can be sampled from /proc
+
+    """
+    return os.path.isfile('/proc/self/statm')
+
+
+def readProcStat(pid):
+    """
+    _readProcStat_
+
+    Return the parent PID, the CPU time used (user and system, in clock
+    ticks) and the start time (in clock ticks after boot) of a process
+
+    """
+    with open('/proc/%i/stat' % pid, 'r') as handle:
+        content = handle.read()
+    # the command name may contain spaces, the other fields follow it
+    fields = content[content.rindex(')') + 2:].split()
+    return int(fields[1]), int(fields[11]) + int(fields[12]), int(fields[19])
+
+
+def readProcMemory(pid, withPSS=True):
+    """
+    _readProcMemory_
+
+    Return the VSZ, RSS and PSS of a process in kB, PSS is None if the
+    kernel doesn't provide smaps_rollup
+
+    """
+    with open('/proc/%i/statm' % pid, 'r') as handle:
+        fields = handle.read().split()
+    vsize = int(fields[0]) * PAGE_KB
+    rss = int(fields[1]) * PAGE_KB
+
+    pss = None
+    if withPSS:
+        try:
+            with open('/proc/%i/smaps_rollup' % pid, 'r') as handle:
+                for line in handle:
+                    if line.startswith('Pss:'):
+                        pss = int(line.split()[1])
+                        break
+        except IOError:
+            pass
+    return vsize, rss, pss
+
+
+class ProcessTreeSampler(object):
+    """
+    _ProcessTreeSampler_
+
+    Sample a process and its children, keeping the last maxSamples
+    samples and the min, max and average of each metric over all the
+    samples taken. The CPU usage is the one since the previous sample,
+    since the start of the process for the first one.
+    """
+
+    def __init__(self, pid, maxSamples=1000, withPSS=True):
+        self.pid = pid
+        self.withPSS = withPSS
+        self.samples = deque(maxlen=maxSamples)
+        self.stats = {}
+        self.lastCPU = None
+        # the children of each thread are listed since Linux 3.5
+        self.childrenFiles = os.path.isfile('/proc/self/task/%i/children' % os.getpid())
+
+    def listChildren(self, pid):
+        """
+        _listChildren_
+
+        PIDs of the children of a process
+
+        """
+        children = []
+        for tid in os.listdir('/proc/%i/task' % pid):
+            with open('/proc/%i/task/%s/children' % (pid, tid), 'r') as handle:
+                children.extend([int(x) for x in handle.read().split()])
+        return children
+
+    def processTree(self):
+        """
+        _processTree_
+
+        PIDs of the process and of all its descendants, the process first
+
+        """
+        if self.childrenFiles:
+            children = self.listChildren
+        else:
+            childMap = {}
+            for entry in os.listdir('/proc'):
+                if not entry.isdigit():
+                    continue
+                try:
+                    childMap.setdefault(readProcStat(int(entry))[0], []).append(int(entry))
+                except (IOError, OSError):
+                    # the process is gone
+                    continue
+            children = lambda pid: childMap.get(pid, [])
+
+        tree = [self.pid]
+        index = 0
+        while index < len(tree):
+            try:
+                tree.extend(children(tree[index]))
+            except (IOError, OSError):
+                pass
+            index += 1
+        return tree
+
+    def sample(self):
+        """
+        _sample_
+
+        Take a sample of the process tree, return it as a dictionary of
+        the metrics plus its time and number of processes, None if the
+        process is gone.
+
+        """
+        now = time.time()
+        sample = {'time': now, 'nProcesses': 0, 'rss': 0, 'vsize': 0, 'pss': None}
+        cpuTicks = {}
+        rootStart = None
+        for pid in self.processTree():
+            try:
+                _, ticks, startTime = readProcStat(pid)
+                vsize, rss, pss = readProcMemory(pid, self.withPSS)
+            except (IOError, OSError, IndexError, ValueError):
+                # the process ended while being read
+                continue
+            if pid == self.pid:
+                rootStart = startTime
+            cpuTicks[pid] = ticks
+            sample['nProcesses'] += 1
+            sample['rss'] += rss
+            sample['vsize'] += vsize
+            if pss is not None:
+                sample['pss'] = (sample['pss'] or 0) + pss
+
+        if rootStart is None:
+            return None
+
+        if self.lastCPU is None:
+            with open('/proc/uptime', 'r') as handle:
+                elapsed = float(handle.read().split()[0]) - rootStart / CLOCK_TICKS
+            used = sum(cpuTicks.values())
+        else:
+            lastTime, lastTicks = self.lastCPU
+            elapsed = now - lastTime
+            used = sum([max(ticks - lastTicks.get(pid, 0), 0) for pid, ticks in cpuTicks.iteritems()])
+        self.lastCPU = (now, cpuTicks)
+        if elapsed > 0:
+            sample['pcpu'] = 100.0 * used / CLOCK_TICKS / elapsed
+        else:
+            sample['pcpu'] = 0.0
+
+        self.samples.append(sample)
+        for metric in METRICS:
+            value = sample[metric]
+            if value is None:
+                continue
+            if metric not in self.stats:
+                self.stats[metric] = [0, 0, value, value]
+            stats = self.stats[metric]
+            stats[0] += 1
+            stats[1] += value
+            if value < stats[2]:
+                stats[2] = value
+            if value > stats[3]:
+                stats[3] = value
+        return sample
+
+    def summary(self):
+        """
+        _summary_
+
+        Min, max and average of each metric sampled
+
+        """
+        result = {}
+        for metric, (count, total, minimum, maximum) in self.stats.iteritems():
+            result[metric] = {'min': minimum, 'max': maximum,
+                              'average': float(total) / count}
+        return result
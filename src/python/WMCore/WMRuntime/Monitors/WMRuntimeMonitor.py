@@ -31,6 +31,7 @@ class WMRuntimeMonitor:
 
 
     def __init__(self):
+        self.sampleInterval   = None
         self.currentStep      = None
         self.currentStepName  = None
         self.currentStepSpace = None
@@ -59,6 +60,14 @@ class WMRuntimeMonitor:
         pass
 
 
+    def periodicSample(self):
+        """
+        Sampling between periodic updates, run every sampleInterval
+        seconds if the monitor sets one.
+        """
+        pass
+
+
     def jobStart(self, task):
         """
         Job start notifier.
@@ -3,9 +3,15 @@
     _SandboxCreator_
 
     Given a path, workflow and task, create a sandbox within the path
+
+    If a sandbox store directory is provided, or set in the
+    WMCORE_SANDBOX_STORE environment variable, the sandbox is assembled
+    from layers cached in the store (see WMCore.WMRuntime.SandboxStore)
+    instead of being compressed from scratch.
 """
 
 
+import hashlib
 import os
 import re
 import tarfile
@@ -19,6 +25,7 @@ import shutil
 import PSetTweaks
 import Utils
 from WMCore.WMSpec.Steps.StepFactory import getFetcher
+from WMCore.WMRuntime.SandboxStore import SandboxStore, SANDBOX_EXTENSION, listTree, hashEntries
 
 def tarballExclusion(path):
     """
@@ -35,8 +42,12 @@ def tarballExclusion(path):
 
 class SandboxCreator:
 
-    def __init__(self):
+    def __init__(self, storeDir = None):
         self.packageWMCore = True
+        storeDir = storeDir or os.environ.get('WMCORE_SANDBOX_STORE')
+        self.store = None
+        if storeDir:
+            self.store = SandboxStore(storeDir)
 
     def disableWMCorePackaging(self):
         """
@@ -78,7 +89,10 @@ class SandboxCreator:
         pileupCachePath = "%s/pileupCache" % buildItHere
         path = "%s/%s/WMSandbox" % (buildItHere, workloadName)
         workloadFile = os.path.join(path, "WMWorkload.pkl")
-        archivePath = os.path.join(buildItHere, "%s/%s-Sandbox.tar.bz2" % (workloadName, workloadName))
+        if self.store is not None:
+            archivePath = os.path.join(buildItHere, "%s/%s-Sandbox%s" % (workloadName, workloadName, SANDBOX_EXTENSION))
+        else:
+            archivePath = os.path.join(buildItHere, "%s/%s-Sandbox.tar.bz2" % (workloadName, workloadName))
         # check if already built
         if os.path.exists(archivePath) and os.path.exists(workloadFile):
             workload.setSpecUrl(workloadFile) # point to sandbox spec
@@ -138,6 +152,10 @@ class SandboxCreator:
         workload.setSpecUrl(workloadFile)
         workload.save(workloadFile)
 
+        if self.store is not None:
+            self._buildFromStore(buildItHere, workloadName, archivePath, userSandboxes)
+            return archivePath
+
         # now, tar everything up and put it somewhere special
         #(archiveHandle,archivePath) = tempfile.mkstemp('.tar.bz2','sbox',
         #                                              buildItHere)
@@ -148,33 +166,8 @@ class SandboxCreator:
                     exclude = tarballExclusion)
 
         if (self.packageWMCore):
-            # package up the WMCore distribution in a zip file
-            # fixes #2943
-            
-            wmcorePath = os.path.realpath(os.path.join(os.path.dirname(__file__), '..'))
-
-            (zipHandle, zipPath)  = tempfile.mkstemp()
-            os.close(zipHandle)
-            zipFile               = zipfile.ZipFile( zipPath,
-                                                     mode = 'w',
-                                                     compression = zipfile.ZIP_DEFLATED )
-
-            for ( root, dirnames, filenames ) in os.walk(wmcorePath):
-                for filename in filenames:
-                    if not tarballExclusion( filename ):
-                        zipFile.write( filename = os.path.join( root, filename ),
-                                       # the name in the archive is the path relative to WMCore/
-                                       arcname  = os.path.join( root, filename )[len(wmcorePath) - len('WMCore/') + 1:])
-
-            # Add a dummy module for zipimport testing
-            (handle, dummyModulePath) = tempfile.mkstemp()
-            os.write( handle, "#!/usr/bin/env python\n")
-            os.write( handle, "# This file should only appear in zipimports, used for testing\n")
-            os.close( handle )
-            zipFile.write( filename = dummyModulePath, arcname = 'WMCore/ZipImportTestModule.py')
-
+            zipPath, dummyModulePath = self._makeWMCoreZip()
             # Add the wmcore zipball to the sandbox
-            zipFile.close()
             archive.add(zipPath, '/WMCore.zip')
             os.unlink( zipPath )
             os.unlink( dummyModulePath )
@@ -198,3 +191,93 @@ class SandboxCreator:
 
 
         return archivePath
+
+    def _getWMCorePath(self):
+        return os.path.realpath(os.path.join(os.path.dirname(__file__), '..'))
+
+    def _makeWMCoreZip(self):
+        """
+            __makeWMCoreZip__
+
+            package up the WMCore distribution in a zip file, return the
+            paths of the zip file and of the dummy module it contains
+        """
+        # fixes #2943
+        wmcorePath = self._getWMCorePath()
+
+        (zipHandle, zipPath)  = tempfile.mkstemp()
+        os.close(zipHandle)
+        zipFile               = zipfile.ZipFile( zipPath,
+                                                 mode = 'w',
+                                                 compression = zipfile.ZIP_DEFLATED )
+
+        for ( root, dirnames, filenames ) in os.walk(wmcorePath):
+            for filename in filenames:
+                if not tarballExclusion( filename ):
+                    zipFile.write( filename = os.path.join( root, filename ),
+                                   # the name in the archive is the path relative to WMCore/
+                                   arcname  = os.path.join( root, filename )[len(wmcorePath) - len('WMCore/') + 1:])
+
+        # Add a dummy module for zipimport testing
+        (handle, dummyModulePath) = tempfile.mkstemp()
+        os.write( handle, "#!/usr/bin/env python\n")
+        os.write( handle, "# This file should only appear in zipimports, used for testing\n")
+        os.close( handle )
+        zipFile.write( filename = dummyModulePath, arcname = 'WMCore/ZipImportTestModule.py')
+
+        zipFile.close()
+        return zipPath, dummyModulePath
+
+    def _buildFromStore(self, buildItHere, workloadName, archivePath, userSandboxes):
+        """
+            __buildFromStore__
+
+            assemble the sandbox from layers: one per task directory, one
+            for the rest of the workload directory, the WMCore zipball,
+            PSetTweaks, Utils and one per user sandbox. Only the layers
+            not in the store yet are compressed.
+        """
+        workloadDir = os.path.join(buildItHere, workloadName)
+        sandboxDir = os.path.join(workloadDir, "WMSandbox")
+        taskDirs = [x for x in sorted(os.listdir(sandboxDir))
+                    if os.path.isdir(os.path.join(sandboxDir, x))]
+        skipped = set([archivePath] + [os.path.join(sandboxDir, x) for x in taskDirs])
+
+        exclude = lambda x: tarballExclusion(x) or x in skipped
+        layers = [listTree(workloadDir, '', exclude)[1:]]
+        for taskDir in taskDirs:
+            layers.append(listTree(os.path.join(sandboxDir, taskDir),
+                                   "WMSandbox/%s" % taskDir, tarballExclusion))
+        keys = [None] * len(layers)
+
+        tempPaths = []
+        if self.packageWMCore:
+            # the zipball is only made if its content changed
+            wmcoreEntries = listTree(self._getWMCorePath(), 'WMCore',
+                                     lambda x: tarballExclusion(os.path.basename(x)))
+            wmcoreKey = hashlib.sha1("WMCore.zip %s" % hashEntries(wmcoreEntries)).hexdigest()
+
+            def wmcoreLayer():
+                zipPath, dummyModulePath = self._makeWMCoreZip()
+                tempPaths.extend([zipPath, dummyModulePath])
+                return [("WMCore.zip", zipPath)]
+            layers.append(wmcoreLayer)
+            keys.append(wmcoreKey)
+
+            layers.append(listTree(PSetTweaks.__path__[0], 'PSetTweaks', tarballExclusion))
+            layers.append(listTree(Utils.__path__[0], 'Utils', tarballExclusion))
+            keys.extend([None, None])
+
+        for sb in userSandboxes:
+            splitResult = urlparse.urlsplit(sb)
+            if not splitResult[0]:
+                layers.append(listTree(sb, os.path.basename(sb)) if os.path.isdir(sb) else
+                              [(os.path.basename(sb), sb)])
+                keys.append(None)
+
+        try:
+            self.store.build(layers, archivePath, keys)
+        finally:
+            for tempPath in tempPaths:
+                os.unlink(tempPath)
+        return
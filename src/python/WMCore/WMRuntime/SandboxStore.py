@@ -0,0 +1,384 @@
+#!/usr/bin/env python
+"""
+_SandboxStore_
+
+Content addressed store of sandbox layers.
+
+A layer is a set of files (the WMCore zipball, a task directory, a user
+sandbox...) stored as a gzipped tar fragment, i.e. tar members without
+the end of archive marker, named after the hash of its content. A sandbox
+is the concatenation of its layers and of a gzipped end of archive
+marker, which is a valid multi member .tar.gz, and identical sandboxes
+are stored once and hard linked where they are needed.
+
+Each sandbox has a manifest listing its layers. After each build the
+sandboxes no longer linked anywhere else are removed and, while the store
+is bigger than its limit, the layers none of the remaining sandboxes is
+made of are removed, least recently used first.
+
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+from cStringIO import StringIO
+from multiprocessing.pool import ThreadPool
+
+from WMCore.WMException import WMException
+
+# the layers only depend on the content of their files
+LAYER_MTIME = 1262304000
+
+SANDBOX_EXTENSION = ".tar.gz"
+MANIFEST_EXTENSION = ".layers"
+
+# the gzipped end of archive marker closing every sandbox
+TRAILER_KEY = 'end'
+
+
+class SandboxStoreException(WMException):
+    """
+    _SandboxStoreException_
+
+    A layer could not be stored
+    """
+    pass
+
+
+def listTree(path, arcPrefix, exclude=None):
+    """
+    _listTree_
+
+    (arcname, path) entries of a directory and everything below it, as
+    tarfile.add would add them
+
+    """
+    entries = [(arcPrefix, path)]
+    for root, dirNames, fileNames in os.walk(path):
+        dirNames.sort()
+        if exclude:
+            dirNames[:] = [x for x in dirNames if not exclude(os.path.join(root, x))]
+        relRoot = os.path.relpath(root, path)
+        for name in dirNames + sorted(fileNames):
+            fullPath = os.path.join(root, name)
+            if exclude and exclude(fullPath):
+                continue
+            if relRoot == '.':
+                entries.append((os.path.join(arcPrefix, name), fullPath))
+            else:
+                entries.append((os.path.join(arcPrefix, relRoot, name), fullPath))
+    return entries
+
+
+def hashEntries(entries):
+    """
+    _hashEntries_
+
+    Hash of the names, modes and contents of the files of a layer
+
+    """
+    digest = hashlib.sha1()
+    for arcname, path in entries:
+        stat = os.lstat(path)
+        digest.update("%s\0%o\0" % (arcname, stat.st_mode))
+        if os.path.islink(path):
+            digest.update(os.readlink(path))
+        elif os.path.isfile(path):
+            with open(path, 'rb') as handle:
+                for chunk in iter(lambda: handle.read(1024 * 1024), ''):
+                    digest.update(chunk)
+        digest.update("\0")
+    return digest.hexdigest()
+
+
+def compressLayer(entries, compressLevel=6):
+    """
+    _compressLayer_
+
+    Gzipped tar fragment of the entries provided
+
+    """
+    tarBuffer = StringIO()
+    tarball = tarfile.open(fileobj=tarBuffer, mode='w')
+    for arcname, path in entries:
+        info = tarball.gettarinfo(path, arcname)
+        info.mtime = LAYER_MTIME
+        info.uid = info.gid = 0
+        info.uname = info.gname = ''
+        if info.isreg():
+            with open(path, 'rb') as handle:
+                tarball.addfile(info, handle)
+        else:
+            tarball.addfile(info)
+    # not closing the tarball, so that no end of archive marker is written
+
+    gzBuffer = StringIO()
+    gzFile = gzip.GzipFile(fileobj=gzBuffer, mode='wb', compresslevel=compressLevel, mtime=LAYER_MTIME)
+    gzFile.write(tarBuffer.getvalue())
+    gzFile.close()
+    return gzBuffer.getvalue()
+
+
+class SandboxStore(object):
+    """
+    _SandboxStore_
+
+    Store of the sandbox layers and of the sandboxes assembled from them
+
+    """
+
+    def __init__(self, storeDir, workers=4, compressLevel=6, maxSize=1024 ** 3, minAge=3600):
+        """
+        maxSize is the size (in bytes) above which the unused layers are
+        removed, nothing used in the last minAge seconds is removed so
+        that the sandboxes being built by other processes are left alone.
+        """
+        self.storeDir = storeDir
+        self.workers = workers
+        self.compressLevel = compressLevel
+        self.maxSize = maxSize
+        self.minAge = minAge
+        self.layerDir = os.path.join(storeDir, 'layers')
+        self.sandboxDir = os.path.join(storeDir, 'sandboxes')
+        for directory in (self.layerDir, self.sandboxDir):
+            if not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError:
+                    if not os.path.isdir(directory):
+                        raise
+
+    def layerPath(self, key):
+        return os.path.join(self.layerDir, key + SANDBOX_EXTENSION)
+
+    def sandboxPath(self, key):
+        return os.path.join(self.sandboxDir, key + SANDBOX_EXTENSION)
+
+    def manifestPath(self, key):
+        return os.path.join(self.sandboxDir, key + MANIFEST_EXTENSION)
+
+    def _touch(self, path):
+        """
+        Record that a file of the store was used, return whether it is there
+        """
+        try:
+            os.utime(path, None)
+        except OSError:
+            return False
+        return True
+
+    def _unlink(self, path):
+        """
+        Remove a file of the store, return whether it was there
+        """
+        try:
+            os.unlink(path)
+        except OSError:
+            return False
+        return True
+
+    def _write(self, path, content):
+        """
+        Write a file of the store atomically
+        """
+        handle, tmpName = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(handle, 'wb') as tmpFile:
+                if isinstance(content, list):
+                    for chunkPath in content:
+                        with open(chunkPath, 'rb') as chunk:
+                            shutil.copyfileobj(chunk, tmpFile)
+                else:
+                    tmpFile.write(content)
+        except (IOError, OSError):
+            self._unlink(tmpName)
+            raise
+        os.chmod(tmpName, 0o644)
+        os.rename(tmpName, path)
+        return
+
+    def hasLayer(self, key):
+        """
+        _hasLayer_
+
+        Whether a layer is already stored
+
+        """
+        return os.path.exists(self.layerPath(key))
+
+    def addLayers(self, layers, keys=None):
+        """
+        _addLayers_
+
+        Store the layers provided, as lists of (arcname, path) entries, if
+        they aren't already, compressing them in parallel. The key of a
+        layer is the hash of its entries unless provided. A layer can be
+        a function returning its entries, only called if the layer with
+        the key provided is missing. Return the keys.
+
+        """
+        givenKeys = keys or [None] * len(layers)
+        keys = []
+        for key, entries in zip(givenKeys, layers):
+            if not key and callable(entries):
+                raise SandboxStoreException("The layers built on demand need a key")
+            keys.append(key or hashEntries(entries))
+        missing = {}
+        for key, givenKey, entries in zip(keys, givenKeys, layers):
+            # touched, so that it isn't pruned before the sandbox is assembled
+            if not self._touch(self.layerPath(key)):
+                missing[key] = (givenKey, entries)
+
+        def storeLayer(item):
+            key, (givenKey, entries) = item
+            if callable(entries):
+                entries = entries()
+            if givenKey and not entries:
+                # never store a wrong layer under the key of its content
+                raise SandboxStoreException("Empty layer provided for key %s" % key)
+            self._write(self.layerPath(key), compressLayer(entries, self.compressLevel))
+
+        if self.workers > 1 and len(missing) > 1:
+            pool = ThreadPool(processes=min(self.workers, len(missing)))
+            try:
+                pool.map(storeLayer, missing.items())
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for item in missing.items():
+                storeLayer(item)
+        logging.info("Sandbox layers: %d stored, %d reused", len(missing), len(keys) - len(missing))
+        return keys
+
+    def assemble(self, layerKeys, targetPath):
+        """
+        _assemble_
+
+        Assemble the sandbox made of the layers provided, or reuse the
+        identical one already assembled, and hard link it to targetPath.
+
+        """
+        sandboxKey = hashlib.sha1(" ".join(layerKeys)).hexdigest()
+        sandboxPath = self.sandboxPath(sandboxKey)
+        if not os.path.exists(sandboxPath):
+            trailerPath = self.layerPath(TRAILER_KEY)
+            if not os.path.exists(trailerPath):
+                gzBuffer = StringIO()
+                gzFile = gzip.GzipFile(fileobj=gzBuffer, mode='wb', mtime=LAYER_MTIME)
+                gzFile.write("\0" * (2 * tarfile.BLOCKSIZE))
+                gzFile.close()
+                self._write(trailerPath, gzBuffer.getvalue())
+            self._write(self.manifestPath(sandboxKey), "".join([x + "\n" for x in layerKeys]))
+            self._write(sandboxPath, [self.layerPath(x) for x in layerKeys] + [trailerPath])
+        else:
+            self._touch(sandboxPath)
+
+        if os.path.exists(targetPath):
+            os.unlink(targetPath)
+        try:
+            os.link(sandboxPath, targetPath)
+        except OSError:
+            # e.g. not on the same file system
+            shutil.copyfile(sandboxPath, targetPath)
+        return sandboxKey
+
+    def build(self, layers, targetPath, keys=None):
+        """
+        _build_
+
+        Store the layers and assemble the sandbox at targetPath
+
+        """
+        startTime = time.time()
+        layerKeys = self.addLayers(layers, keys)
+        try:
+            sandboxKey = self.assemble(layerKeys, targetPath)
+        except (IOError, OSError) as ex:
+            # a layer was pruned by another build meanwhile, store it again
+            logging.warning("Assembling sandbox %s failed, retrying: %s", targetPath, ex)
+            sandboxKey = self.assemble(self.addLayers(layers, keys), targetPath)
+        logging.info("Sandbox %s built from %d layers in %.2f secs", targetPath,
+                     len(layers), time.time() - startTime)
+        self.prune()
+        return sandboxKey
+
+    def prune(self, maxSize=None):
+        """
+        _prune_
+
+        Remove the sandboxes only the store links to, then the layers none
+        of the remaining sandboxes is made of, least recently used first,
+        until the store is not bigger than maxSize (the store limit by
+        default). Return the number of sandboxes and layers removed.
+
+        """
+        maxSize = self.maxSize if maxSize is None else maxSize
+        oldest = time.time() - self.minAge
+        removed = 0
+        totalSize = 0
+        usedLayers = set([TRAILER_KEY])
+        for name in os.listdir(self.sandboxDir):
+            if name.endswith(MANIFEST_EXTENSION):
+                # the manifest of a sandbox which was never written
+                key = name[:-len(MANIFEST_EXTENSION)]
+                try:
+                    if not os.path.exists(self.sandboxPath(key)) and \
+                       os.stat(self.manifestPath(key)).st_mtime < oldest:
+                        self._unlink(self.manifestPath(key))
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(SANDBOX_EXTENSION):
+                continue
+            key = name[:-len(SANDBOX_EXTENSION)]
+            try:
+                stat = os.stat(self.sandboxPath(key))
+            except OSError:
+                continue
+            if stat.st_nlink == 1 and stat.st_mtime < oldest:
+                if self._unlink(self.sandboxPath(key)):
+                    removed += 1
+                self._unlink(self.manifestPath(key))
+                continue
+            totalSize += stat.st_size
+            try:
+                with open(self.manifestPath(key), 'r') as handle:
+                    usedLayers.update(handle.read().split())
+            except IOError:
+                pass
+
+        unusedLayers = []
+        for name in os.listdir(self.layerDir):
+            if not name.endswith(SANDBOX_EXTENSION):
+                continue
+            key = name[:-len(SANDBOX_EXTENSION)]
+            try:
+                stat = os.stat(self.layerPath(key))
+            except OSError:
+                continue
+            totalSize += stat.st_size
+            if key not in usedLayers and stat.st_mtime < oldest:
+                unusedLayers.append((stat.st_mtime, key, stat.st_size))
+
+        unusedLayers.sort()
+        for _, key, size in unusedLayers:
+            if totalSize <= maxSize:
+                break
+            try:
+                if os.stat(self.layerPath(key)).st_mtime >= oldest:
+                    # reused since it was listed
+                    continue
+            except OSError:
+                continue
+            if self._unlink(self.layerPath(key)):
+                removed += 1
+                totalSize -= size
+        if removed:
+            logging.info("Sandbox store pruned: %d files removed, %d bytes left", removed, totalSize)
+        return removed
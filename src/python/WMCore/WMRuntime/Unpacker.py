@@ -17,11 +17,20 @@ This will then do the following:
 - drop the package and index into the job area
 - set everything up so that you can just add the job dir to the pythonpath and then call the runtime startup for the WMCore/WMRuntime stuff
 
+In the "task" mode (--mode=task or WMAGENT_UNPACK_MODE=task) only the
+sandbox directory of the task of the job is extracted, and only the job
+is copied out of an indexed job package, all in process.  The time spent
+in each phase is printed in both modes.
+
 """
 from __future__ import print_function
 import sys
 import os
+import cPickle
+import shutil
+import struct
 import tarfile
+import time
 import zipfile
 import getopt
 import traceback
@@ -31,8 +40,13 @@ options = {
     "package=": "WMAGENT_PACKAGE",  # job package pickle file
     "index=": "WMAGENT_INDEX",  # index of job to be run
     "jobname=": "WMAGENT_JOBNAME",  # job name/id
+    "mode=": "WMAGENT_UNPACK_MODE",  # full (default) or task
 }
 
+# header of the indexed job packages, see WMCore.DataStructs.JobPackage,
+# this script only depends on the standard library
+INDEXED_MAGIC = "WMJOBPKG\x01\n"
+
 
 def makeErrorReport(jobName, exitCode, message):
     """
@@ -61,13 +75,56 @@ def makeErrorReport(jobName, exitCode, message):
     handle.close()
 
 
-def createWorkArea(sandbox):
+def readJobSlice(package, jobIndex):
+    """
+    _readJobSlice_
+
+    Read the pickle and the task of a single job from an indexed job
+    package, return None if the package isn't indexed or doesn't
+    have the job.
+
+    """
+    with open(package, 'rb') as handle:
+        if handle.read(len(INDEXED_MAGIC)) != INDEXED_MAGIC:
+            return None
+        indexLength = struct.unpack(">Q", handle.read(8))[0]
+        index = cPickle.loads(handle.read(indexLength))
+        if jobIndex not in index["jobs"]:
+            return None
+        offset, length, task = index["jobs"][jobIndex]
+        handle.seek(len(INDEXED_MAGIC) + 8 + indexLength + offset)
+        return index["directory"], task, handle.read(length)
+
+
+def taskMemberFilter(taskName):
+    """
+    _taskMemberFilter_
+
+    Return a function selecting the sandbox members needed by a task,
+    i.e. all of them but the directories of the other tasks
+
+    """
+    def wanted(member):
+        parts = member.name.split('/')
+        if len(parts) < 2 or parts[0] != 'WMSandbox' or parts[1] == taskName:
+            return True
+        return len(parts) == 2 and not member.isdir()
+    return wanted
+
+
+def createWorkArea(sandbox, taskName = None):
     """
     _createWorkArea_
 
     Create a job working area containing all the bits and pieces
     needed to bootstrap up and kickstart the job
 
+    If a task name is provided the directories of the other tasks are
+    not extracted.  The members are selected while the sandbox is read,
+    so that it is only decompressed once, and it is opened in the regular
+    mode as the ones assembled from a store of layers are made of several
+    gzip members.
+
     """
     currentDir = os.getcwd()
     jobDir = "%s/job" % currentDir
@@ -76,9 +133,27 @@ def createWorkArea(sandbox):
     if not os.path.exists(os.path.join(jobDir, 'StartupScript')):
         os.makedirs(os.path.join(jobDir, 'StartupScript'))
 
-    tfile = tarfile.open(sandbox, "r")
-    tfile.extractall(jobDir)
-    tfile.close()
+    if taskName is None:
+        tfile = tarfile.open(sandbox, "r")
+        tfile.extractall(jobDir)
+        tfile.close()
+    else:
+        wanted = taskMemberFilter(taskName)
+        counts = {True: 0, False: 0}
+
+        def taskMembers(tfile):
+            # a single forward pass over the archive
+            for member in tfile:
+                isWanted = wanted(member)
+                counts[isWanted] += 1
+                if isWanted:
+                    yield member
+
+        tfile = tarfile.open(sandbox, "r")
+        tfile.extractall(jobDir, taskMembers(tfile))
+        tfile.close()
+        print("Unpacker: extracted %i sandbox members for task %s, skipped %i" %
+              (counts[True], taskName, counts[False]))
 
     # need to pull out the startup file from the zipball
     zfile = zipfile.ZipFile(os.path.join(jobDir, 'WMCore.zip'), 'r')
@@ -93,18 +168,30 @@ def createWorkArea(sandbox):
     return jobDir
 
 
-def installPackage(jobArea, jobPackage, jobIndex):
+def installPackage(jobArea, jobPackage, jobIndex, jobSlice = None):
     """
     _installPackage_
 
     Install the job package and index into the job directory so that
     it can be found on bootstrap
 
+    If the slice of the job read from an indexed package is provided, the
+    package installed only contains that job.
+
     """
     target = "%s/WMSandbox" % jobArea
     pkgTarget = "%s/JobPackage.pcl" % target
-    # shutil.copy(jobPackage, pkgTarget)
-    os.system("/bin/cp %s %s" % (jobPackage, pkgTarget))
+    if jobSlice is None:
+        shutil.copyfile(jobPackage, pkgTarget)
+    else:
+        directory, task, content = jobSlice
+        index = cPickle.dumps({"directory": directory, "jobs": {int(jobIndex): (0, len(content), task)}},
+                              cPickle.HIGHEST_PROTOCOL)
+        with open(pkgTarget, 'wb') as handle:
+            handle.write(INDEXED_MAGIC)
+            handle.write(struct.pack(">Q", len(index)))
+            handle.write(index)
+            handle.write(content)
 
     indexPy = "%s/JobIndex.py" % target
     handle = open(indexPy, 'w')
@@ -114,15 +201,27 @@ def installPackage(jobArea, jobPackage, jobIndex):
     return
 
 
-def runUnpacker(sandbox, package, jobIndex, jobname):
+def runUnpacker(sandbox, package, jobIndex, jobname, mode = "full"):
     """
     Run everything in the unpacker
 
     """
 
     try:
-        jobArea = createWorkArea(sandbox)
-        installPackage(jobArea, package, jobIndex)
+        startTime = time.time()
+        jobSlice = None
+        taskName = None
+        if mode == "task":
+            jobSlice = readJobSlice(package, int(jobIndex))
+            if jobSlice is not None and jobSlice[1]:
+                taskName = jobSlice[1].rstrip('/').split('/')[-1]
+        indexTime = time.time()
+        jobArea = createWorkArea(sandbox, taskName)
+        sandboxTime = time.time()
+        installPackage(jobArea, package, jobIndex, jobSlice)
+        packageTime = time.time()
+        print("Unpacker timing: package index %.3f secs, sandbox %.3f secs, job package %.3f secs, total %.3f secs" %
+              (indexTime - startTime, sandboxTime - indexTime, packageTime - sandboxTime, packageTime - startTime))
         # sys.exit(0)
     except Exception as ex:
         msg = "Unable to create job area for bootstrap\n"
@@ -147,6 +246,7 @@ if __name__ == '__main__':
     package = os.environ.get('WMAGENT_PACKAGE', None)
     jobIndex = os.environ.get('WMAGENT_INDEX', None)
     jobname = os.environ.get('WMAGENT_JOBNAME', None)
+    mode = os.environ.get('WMAGENT_UNPACK_MODE', 'full')
     for opt, arg in opts:
         if opt == "--sandbox":
             sandbox = arg
@@ -156,6 +256,8 @@ if __name__ == '__main__':
             jobIndex = arg
         if opt == "--jobname":
             jobname = arg
+        if opt == "--mode":
+            mode = arg
 
     if sandbox == None:
         msg = "No Sandbox provided"
@@ -174,4 +276,4 @@ if __name__ == '__main__':
         sys.exit(1)
 
     runUnpacker(sandbox=sandbox, package=package,
-                jobIndex=jobIndex, jobname=jobname)
+                jobIndex=jobIndex, jobname=jobname, mode=mode)
@@ -10,6 +10,7 @@ import os
 import os.path
 import threading
 import logging
+import time
 import traceback
 
 from WMCore.WMFactory   import WMFactory
@@ -257,6 +258,7 @@ class Watchdog(threading.Thread):
         Override Thread.run() to do the periodic update
         of the MonitorState object and dispatch it to the monitors
         """
+        nextUpdate = 0
         while True:
             #  //
             # // shutdown signal
@@ -265,27 +267,58 @@ class Watchdog(threading.Thread):
                 return
 
             #  //
-            # // Update State information only during a running task
-            #//
+            # // Update State information only during a running task,
+            #//  sample in between for the monitors asking for it
             if self._RunUpdate.isSet():
-                for monitor in self._Monitors:
-                    try:
-                        monitor.periodicUpdate()
-                    except Exception as ex:
-                        msg = "Error in periodicUpdate for monitor class %s in Watchdog:\n" % monitor.__class__
-                        msg += str(ex)
-                        msg += str(traceback.format_exc())
-                        msg += "This is a CRITICAL error because this kills the monitoring.\n"
-                        msg += "Terminate thread and retry.\n"
-                        logging.error(msg)
-                        #raise WatchdogException(msg)
-                        # This one needs to be killed by itself
-                        # since it's run by thread
-                        os.abort()
+                if time.time() >= nextUpdate:
+                    nextUpdate = time.time() + self._Interval
+                    self.runMonitors("periodicUpdate")
+                else:
+                    self.runMonitors("periodicSample")
                 #self._MonMgr.periodicUpdate()
 
             #time.sleep(self._Interval)
-            self._Finished.wait(self._Interval)
+            waitTime = self.getSampleInterval()
+            if nextUpdate > time.time():
+                waitTime = min(waitTime, nextUpdate - time.time())
+            self._Finished.wait(waitTime)
+
+    def getSampleInterval(self):
+        """
+        _getSampleInterval_
+
+        Shortest interval between samples of the monitors, the update
+        interval if none of them samples
+        """
+        intervals = [self._Interval]
+        for monitor in self._Monitors:
+            if getattr(monitor, 'sampleInterval', None):
+                intervals.append(monitor.sampleInterval)
+        return min(intervals)
+
+    def runMonitors(self, method):
+        """
+        _runMonitors_
+
+        Run periodicUpdate or periodicSample for all the monitors
+        """
+        for monitor in self._Monitors:
+            if method == "periodicSample" and not getattr(monitor, 'sampleInterval', None):
+                continue
+            try:
+                getattr(monitor, method)()
+            except Exception as ex:
+                msg = "Error in %s for monitor class %s in Watchdog:\n" % (method, monitor.__class__)
+                msg += str(ex)
+                msg += str(traceback.format_exc())
+                msg += "This is a CRITICAL error because this kills the monitoring.\n"
+                msg += "Terminate thread and retry.\n"
+                logging.error(msg)
+                #raise WatchdogException(msg)
+                # This one needs to be killed by itself
+                # since it's run by thread
+                os.abort()
+        return
 
 
     #  //
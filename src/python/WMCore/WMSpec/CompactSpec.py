@@ -0,0 +1,435 @@
+#!/usr/bin/env python
+"""
+_CompactSpec_
+
+Compact serialization of WMSpec ConfigSection trees and a cache of the
+specs already decoded.
+
+A compact spec is made of one section per task plus one for the rest of
+the workload. Each section is the list of the ConfigSections it contains,
+flattened in a single marshalled and compressed list, so a single task
+can be decoded without the rest of the spec.
+
+"""
+
+import cPickle
+import gc
+import hashlib
+import json
+import marshal
+import os
+import struct
+import sys
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+
+from WMCore.Configuration import ConfigSection
+from WMCore.WMSpec.WMTask import WMTask
+
+COMPACT_MAGIC = "WMSPEC\x01\n"
+COMPACT_EXTENSION = ".wmspec"
+
+# section formats
+_RECORDS = "M"
+_PICKLED_RECORDS = "P"
+_PICKLED_OBJECT = "W"
+
+# attributes rebuilt when decoding
+_REBUILT = set(["_internal_parent_ref", "_internal_settings",
+                "_internal_children", "_internal_treeCache"])
+
+
+class _NotCompactable(Exception):
+    """
+    The tree can't be flattened, e.g. a section is referenced twice
+    """
+    pass
+
+
+def isCompactSpec(content):
+    """
+    _isCompactSpec_
+
+    Whether the content provided is a compact spec
+
+    """
+    return content.startswith(COMPACT_MAGIC)
+
+
+class _pausedGC(object):
+    """
+    Context manager pausing the cyclic garbage collector, which is
+    otherwise run over and over while thousands of sections are created.
+    """
+
+    def __enter__(self):
+        self.enabled = gc.isenabled()
+        gc.disable()
+
+    def __exit__(self, *args):
+        if self.enabled:
+            gc.enable()
+
+
+def _flatten(root, classes):
+    """
+    _flatten_
+
+    Flatten the tree of ConfigSections starting at root into a list of
+    sections. Tasks other than root are not flattened, they are returned
+    with where they belong in the list instead.
+
+    Each record is (class index, parent record index, attribute name in
+    the parent, internal attributes, values, settings, children), with
+    settings and children listed in the order of their sets so that the
+    rebuilt sets iterate in the same order, as when unpickling.
+    """
+    records = []
+    tasks = []
+    stack = [(root, -1, None)]
+    while stack:
+        section, parentIndex, attrName = stack.pop()
+        if section is not root and isinstance(section, WMTask):
+            tasks.append((section, parentIndex, attrName))
+            continue
+
+        sectionDict = section.__dict__
+        internals = {}
+        values = {}
+        children = []
+        for key, value in sectionDict.iteritems():
+            if key in _REBUILT:
+                continue
+            if key.startswith("_internal_"):
+                internals[key] = value
+            elif isinstance(value, ConfigSection):
+                if value._internal_parent_ref is not section:
+                    raise _NotCompactable("Section %s referenced twice" % key)
+                children.append(key)
+            else:
+                values[key] = value
+
+        if section._internal_children != set(children) or \
+           section._internal_settings != set(values).union(children):
+            raise _NotCompactable("Inconsistent section %s" % section._internal_name)
+
+        cls = section.__class__
+        if cls not in classes:
+            classes[cls] = len(classes)
+
+        index = len(records)
+        records.append((classes[cls], parentIndex, attrName, internals, values,
+                        list(section._internal_settings), list(section._internal_children)))
+        for key in sorted(children, reverse=True):
+            stack.append((sectionDict[key], index, key))
+    return records, tasks
+
+
+def _encodeRecords(records):
+    """
+    _encodeRecords_
+
+    Marshal the records if they only contain basic types, pickle them
+    otherwise.
+    """
+    try:
+        return _RECORDS + zlib.compress(marshal.dumps(records))
+    except ValueError:
+        return _PICKLED_RECORDS + zlib.compress(cPickle.dumps(records, cPickle.HIGHEST_PROTOCOL))
+
+
+def encodeSpec(data):
+    """
+    _encodeSpec_
+
+    Encode the WMWorkload (or any ConfigSection tree) provided in the
+    compact format
+
+    """
+    classes = {}
+    sections = []
+    try:
+        pending = [(data, None, None, None)]
+        while pending:
+            section, parentSection, parentRecord, attrName = pending.pop(0)
+            records, tasks = _flatten(section, classes)
+            index = len(sections)
+            sections.append({"path": getattr(section, "pathName", None),
+                             "parent": parentSection, "record": parentRecord,
+                             "attr": attrName, "content": _encodeRecords(records)})
+            for task, taskParentRecord, taskAttrName in tasks:
+                pending.append((task, index, taskParentRecord, taskAttrName))
+    except _NotCompactable:
+        sections = [{"path": None, "parent": None, "record": None, "attr": None,
+                     "content": _PICKLED_OBJECT + zlib.compress(cPickle.dumps(data, cPickle.HIGHEST_PROTOCOL))}]
+        classes = {}
+
+    classNames = [None] * len(classes)
+    for cls, index in classes.iteritems():
+        classNames[index] = (cls.__module__, cls.__name__)
+
+    offset = 0
+    for section in sections:
+        section["offset"] = offset
+        section["length"] = len(section["content"])
+        offset += section["length"]
+    header = json.dumps({"version": 1, "classes": classNames,
+                         "sections": [dict((k, v) for k, v in x.iteritems() if k != "content")
+                                      for x in sections]})
+
+    content = [COMPACT_MAGIC, struct.pack(">I", len(header)), header]
+    content.extend([x["content"] for x in sections])
+    return "".join(content)
+
+
+def _decodeRecords(content, classes):
+    """
+    _decodeRecords_
+
+    Rebuild the sections of a single compact section, return the list
+    of sections in the order they were flattened.
+    """
+    sectionFormat = content[0]
+    if sectionFormat == _PICKLED_OBJECT:
+        return [cPickle.loads(zlib.decompress(content[1:]))]
+    if sectionFormat == _RECORDS:
+        records = marshal.loads(zlib.decompress(content[1:]))
+    else:
+        records = cPickle.loads(zlib.decompress(content[1:]))
+
+    sections = []
+    for classIndex, parentIndex, attrName, internals, values, settings, children in records:
+        cls = classes[classIndex]
+        section = cls.__new__(cls)
+        sectionDict = section.__dict__
+        sectionDict.update(internals)
+        sectionDict.update(values)
+        sectionDict["_internal_settings"] = set(settings)
+        sectionDict["_internal_children"] = set(children)
+        if parentIndex < 0:
+            sectionDict["_internal_parent_ref"] = None
+        else:
+            parent = sections[parentIndex]
+            parent.__dict__[attrName] = section
+            sectionDict["_internal_parent_ref"] = parent
+        sections.append(section)
+    return sections
+
+
+def _findTask(root, taskPath):
+    """
+    _findTask_
+
+    Task with the path provided in the tree of ConfigSections starting at
+    root, None if there is no such task.
+    """
+    seen = set()
+    stack = [root]
+    while stack:
+        section = stack.pop()
+        if id(section) in seen:
+            continue
+        seen.add(id(section))
+        if isinstance(section, WMTask) and getattr(section, "pathName", None) == taskPath:
+            return section
+        for name in section._internal_children:
+            child = getattr(section, name, None)
+            if isinstance(child, ConfigSection):
+                stack.append(child)
+    return None
+
+
+def decodeSpec(content, taskPath=None):
+    """
+    _decodeSpec_
+
+    Decode a compact spec. If a task path is provided only decode the
+    sections of that task and its subtasks, and return the task, None if
+    the spec has no such task. A spec which couldn't be split in sections
+    is decoded as a whole to find the task.
+
+    """
+    if not isCompactSpec(content):
+        raise ValueError("Not a compact spec")
+    start = len(COMPACT_MAGIC)
+    headerLength = struct.unpack(">I", content[start:start + 4])[0]
+    start += 4
+    header = json.loads(content[start:start + headerLength])
+    start += headerLength
+
+    classes = []
+    for moduleName, className in header["classes"]:
+        __import__(moduleName)
+        classes.append(getattr(sys.modules[moduleName], className))
+
+    sections = header["sections"]
+    if taskPath is not None and content[start + sections[0]["offset"]] == _PICKLED_OBJECT:
+        with _pausedGC():
+            data = _decodeRecords(content[start:start + sections[0]["length"]], classes)[0]
+        task = _findTask(data, taskPath)
+        if task is not None:
+            # detached from the rest of the spec, as a task decoded alone
+            task._internal_parent_ref = None
+        return task
+
+    if taskPath is None:
+        wanted = set(range(len(sections)))
+        rootIndex = 0
+    else:
+        rootIndex = None
+        for index, section in enumerate(sections):
+            if section["path"] == taskPath:
+                rootIndex = index
+                break
+        if rootIndex is None:
+            return None
+        # sections are stored parents first
+        wanted = set([rootIndex])
+        for index in range(rootIndex + 1, len(sections)):
+            if sections[index]["parent"] in wanted:
+                wanted.add(index)
+
+    decoded = {}
+    with _pausedGC():
+        for index in sorted(wanted):
+            section = sections[index]
+            offset = start + section["offset"]
+            decoded[index] = _decodeRecords(content[offset:offset + section["length"]], classes)
+            if index != rootIndex:
+                parent = decoded[section["parent"]][section["record"]]
+                parent.__dict__[str(section["attr"])] = decoded[index][0]
+                decoded[index][0]._internal_parent_ref = parent
+    return decoded[rootIndex][0]
+
+
+class SpecCache(object):
+    """
+    _SpecCache_
+
+    Specs already decoded, kept in the compact format and keyed by a hash
+    of the content they were decoded from. Decoding the same spec again,
+    whatever its original format, only costs decoding its compact form
+    and every decode returns new objects.
+
+    If a cache directory is provided the compact specs are also stored
+    there, to be shared by all the processes using the same directory.
+    """
+
+    def __init__(self, maxSize=64 * 1024 * 1024, cacheDir=None):
+        self.maxSize = maxSize
+        self.cacheDir = cacheDir
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if cacheDir and not os.path.isdir(cacheDir):
+            try:
+                os.makedirs(cacheDir)
+            except OSError:
+                if not os.path.isdir(cacheDir):
+                    raise
+
+    def _cacheFile(self, key):
+        return os.path.join(self.cacheDir, key + COMPACT_EXTENSION)
+
+    def get(self, key):
+        """
+        _get_
+
+        Compact spec stored for the key, None if there is none
+
+        """
+        with self.lock:
+            compact = self.entries.pop(key, None)
+            if compact is not None:
+                self.entries[key] = compact
+                return compact
+
+        if self.cacheDir and os.path.exists(self._cacheFile(key)):
+            with open(self._cacheFile(key), "rb") as handle:
+                compact = handle.read()
+            if isCompactSpec(compact):
+                self._store(key, compact)
+                return compact
+        return None
+
+    def put(self, key, compact):
+        """
+        _put_
+
+        Store a compact spec for the key
+
+        """
+        self._store(key, compact)
+        if self.cacheDir:
+            handle, tmpName = tempfile.mkstemp(dir=self.cacheDir)
+            with os.fdopen(handle, "wb") as tmpFile:
+                tmpFile.write(compact)
+            os.rename(tmpName, self._cacheFile(key))
+        return
+
+    def _store(self, key, compact):
+        """
+        Keep a compact spec in memory, evicting the least recently used ones
+        """
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = compact
+            self.size += len(compact)
+            while self.size > self.maxSize and len(self.entries) > 1:
+                self.size -= len(self.entries.popitem(last=False)[1])
+        return
+
+    def decode(self, content, taskPath=None):
+        """
+        _decode_
+
+        Decode a spec either compact or pickled. If a task path is provided
+        only return that task, None if the spec has no such task.
+
+        """
+        if isCompactSpec(content):
+            return decodeSpec(content, taskPath)
+
+        key = hashlib.sha1(content).hexdigest()
+        compact = self.get(key)
+        if compact is not None:
+            self.hits += 1
+            return decodeSpec(compact, taskPath)
+
+        self.misses += 1
+        with _pausedGC():
+            data = cPickle.loads(content)
+        compact = encodeSpec(data)
+        self.put(key, compact)
+        if taskPath is None:
+            return data
+        return decodeSpec(compact, taskPath)
+
+
+_specCache = None
+_specCacheLock = threading.Lock()
+
+
+def getSpecCache():
+    """
+    _getSpecCache_
+
+    Spec cache shared by the whole process. The compact specs are also
+    stored on disk under WMSPEC_CACHE_DIR or WMCORE_CACHE_DIR if set.
+
+    """
+    global _specCache
+    with _specCacheLock:
+        if _specCache is None:
+            cacheDir = None
+            for var in ('WMSPEC_CACHE_DIR', 'WMCORE_CACHE_DIR'):
+                if os.environ.get(var):
+                    cacheDir = os.path.join(os.environ[var], '.wmcore_cache_%s' % os.getuid(), 'wmspec')
+                    break
+            _specCache = SpecCache(cacheDir=cacheDir)
+    return _specCache
@@ -33,6 +33,48 @@ def nodeParent(node):
     """
     return node._internal_parent_ref
 
+def treeCache(node):
+    """
+    _treeCache_
+
+    Dictionary of lookup results memoized on the node provided, they stay
+    valid until the tree containing the node is modified.
+    Not persisted with the node.
+
+    """
+    cache = getattr(node, "_internal_treeCache", None)
+    if cache is None:
+        cache = {}
+        node._internal_treeCache = cache
+    return cache
+
+def invalidateTreeCache(node):
+    """
+    _invalidateTreeCache_
+
+    Drop the memoized lookups of the node provided and of all the sections
+    containing it, to be called whenever the tree is modified
+
+    """
+    while node is not None:
+        if getattr(node, "_internal_treeCache", None) is not None:
+            node._internal_treeCache = None
+        node = node._internal_parent_ref
+    return
+
+def iterNodes(topNode):
+    """
+    _iterNodes_
+
+    Generator delivering the node provided and all its subnodes in
+    execution order
+
+    """
+    yield topNode
+    for child in list(topNode.tree.childNames):
+        for node in iterNodes(getattr(topNode.tree.children, child)):
+            yield node
+
 def listNodes(topNode):
     """
     _listNodes_
@@ -66,6 +108,18 @@ def listFirstGenChildNodes(topNode):
     """
     return topNode.tree.childNames
 
+def nodeIndex(topNode):
+    """
+    _nodeIndex_
+
+    Memoized nodeMap of the top node of a tree
+
+    """
+    cache = treeCache(topNode)
+    if "nodeMap" not in cache:
+        cache["nodeMap"] = nodeMap(topNode)
+    return cache["nodeMap"]
+
 def nodeMap(node):
     """
     _nodeMap_
@@ -109,7 +163,10 @@ def allNodeNames(node):
 
     """
     topNode = findTopNode(node)
-    return listNodes(topNode)
+    cache = treeCache(topNode)
+    if "nodeNames" not in cache:
+        cache["nodeNames"] = listNodes(topNode)
+    return list(cache["nodeNames"])
 
 
 
@@ -131,6 +188,7 @@ def addNode(currentNode, newNode):
     setattr(currentNode.tree.children, newName, newNode)
     currentNode.tree.childNames.append(newName)
     newNode.tree.parent = nodeName(currentNode)
+    invalidateTreeCache(newNode)
     return
 
 def addTopNode(currentNode, newNode):
@@ -151,6 +209,7 @@ def addTopNode(currentNode, newNode):
     setattr(currentNode.tree.children, newName, newNode)
     currentNode.tree.childNames.insert(0, newName)
     newNode.tree.parent = nodeName(currentNode)
+    invalidateTreeCache(newNode)
     return
 
 def deleteNode(topNode, childName):
@@ -161,8 +220,11 @@ def deleteNode(topNode, childName):
     with the given name if it exists
     """
     if hasattr(topNode.tree.children, childName):
+        childNode = getattr(topNode.tree.children, childName)
         delattr(topNode.tree.children, childName)
         topNode.tree.childNames.remove(childName)
+        invalidateTreeCache(childNode)
+        invalidateTreeCache(topNode)
 
 def getNode(node, nodeNameToGet):
     """
@@ -174,7 +236,7 @@ def getNode(node, nodeNameToGet):
 
     """
     topNode = findTopNode(node)
-    mapping = nodeMap(topNode)
+    mapping = nodeIndex(topNode)
     return mapping.get(nodeNameToGet, None)
 
 def findTop(node):
@@ -199,8 +261,7 @@ def nodeIterator(node):
     Generator function that delivers all nodes in order
 
     """
-    for i in listNodes(node):
-        yield getNode(node, i)
+    return iterNodes(node)
 
 def nodeChildIterator(node):
     """
@@ -208,8 +269,9 @@ def nodeChildIterator(node):
 
     iterate over all nodes in order, except for the top node passed to this method
     """
-    for i in listChildNodes(node):
-        yield getNode(node, i)
+    for child in list(node.tree.childNames):
+        for childNode in iterNodes(getattr(node.tree.children, child)):
+            yield childNode
 
 def firstGenNodeChildIterator(node):
     """
@@ -217,8 +279,8 @@ def firstGenNodeChildIterator(node):
 
     Iterator over all the first generation child nodes.
     """
-    for i in listFirstGenChildNodes(node):
-        yield getNode(node, i)
+    for child in listFirstGenChildNodes(node):
+        yield getattr(node.tree.children, child)
 
 def format(value):
     """
@@ -270,6 +332,7 @@ class TreeHelper:
         flag this node as the top of the tree
         """
         self.data._internal_treetop = True
+        invalidateTreeCache(self.data)
 
     def isTopOfTree(self):
         """
@@ -343,15 +406,13 @@ class TreeHelper:
         """
         generator for processing all subnodes in execution order
         """
-        for i in listNodes(self.data):
-            yield getNode(self.data, i)
+        return nodeIterator(self.data)
 
     def nodeChildIterator(self):
         """
         generator for processing all subnodes in execution order
         """
-        for i in listChildNodes(self.data):
-            yield getNode(self.data, i)
+        return nodeChildIterator(self.data)
 
     def firstGenNodeChildIterator(self):
         """
@@ -359,8 +420,7 @@ class TreeHelper:
 
         Iterate over all the first generation child nodes.
         """
-        for i in listFirstGenChildNodes(self.data):
-            yield getNode(self.data, i)
+        return firstGenNodeChildIterator(self.data)
 
     def pythoniseDict(self, **options):
         """
@@ -439,3 +499,14 @@ class ConfigSectionTree(ConfigSection):
         self.tree.section_("children")
         self.tree.childNames = []
         self.tree.parent = None
+
+    def __getstate__(self):
+        """
+        _getstate_
+
+        Memoized lookups are not persisted
+
+        """
+        state = self.__dict__.copy()
+        state.pop("_internal_treeCache", None)
+        return state
@@ -19,12 +19,19 @@ from urllib2 import urlopen, Request
 from urlparse import urlparse
 import json
 
+from WMCore.WMSpec.CompactSpec import COMPACT_EXTENSION, encodeSpec, getSpecCache
+
 class PersistencyHelper:
     """
     _PersistencyHelper_
 
     Save a WMSpec object to a file using cPickle
 
+    Files with the .wmspec extension are saved in the compact format of
+    CompactSpec, other files are pickled. Both formats are loaded, going
+    through the spec cache of the process, so loading a spec already seen
+    only costs decoding its compact form.
+
     Future ideas:
     - cPickle mode: read/write using cPickle
     - python mode: write using pythonise, read using import
@@ -41,9 +48,11 @@ class PersistencyHelper:
         Save data to a file
         Saved format is defined depending on the extension
         """
+        if filename.endswith(COMPACT_EXTENSION):
+            with open(filename, 'wb') as handle:
+                handle.write(encodeSpec(self.data))
+            return
         handle = open(filename, 'w')
-        #TODO: use different encoding scheme for different extension
-        #extension = filename.split(".")[-1].lower()
         cPickle.dump(self.data, handle)
         handle.close()
         return
@@ -52,34 +61,48 @@ class PersistencyHelper:
         """
         _load_
 
-        UncPickle data from file
+        Load data from a file or url, either pickled or compact
+
+        """
+        self.data = getSpecCache().decode(self._readSpec(filename))
+        return
+
+    def loadTask(self, filename, taskPath):
+        """
+        _loadTask_
+
+        Load a single task, with its subtasks, from a file or url without
+        decoding the rest of the spec when it is in the compact format.
+        Return the task data, None if there is no such task.
 
         """
+        return getSpecCache().decode(self._readSpec(filename), taskPath)
 
+    def _readSpec(self, filename):
+        """
+        _readSpec_
+
+        Read the content of a spec from a file or url
+
+        """
         #TODO: currently support both loading from file path or url
         #if there are more things to filter may be separate the load function
 
         # urllib2 needs a scheme - assume local file if none given
         if not urlparse(filename)[0]:
             filename = 'file:' + filename
+        if filename.startswith('file:'):
             handle = urlopen(Request(filename, headers = {"Accept" : "*/*"}))
-            self.data = cPickle.load(handle)
-            handle.close()
-        elif filename.startswith('file:'):
-            handle = urlopen(Request(filename, headers = {"Accept" : "*/*"}))
-            self.data = cPickle.load(handle)
+            content = handle.read()
             handle.close()
         else:
-            # use own request class so we get authentication if needed
+            # use own request class so we get authentication if needed,
+            # its http cache only fetches the spec again when it changed
             from WMCore.Services.Requests import Requests
             request = Requests(filename)
             data = request.makeRequest('', incoming_headers = {"Accept" : "*/*"})
-            self.data = cPickle.loads(data[0])
-
-        #TODO: use different encoding scheme for different extension
-        #extension = filename.split(".")[-1].lower()
-
-        return
+            content = data[0]
+        return content
 
 
     def saveCouch(self, couchUrl, couchDBName, metadata={}):
@@ -17,6 +17,7 @@ import WMCore.WMSpec.Steps.StepFactory as StepFactory
 from WMCore.Configuration import ConfigSection
 from WMCore.Lexicon import lfnBase
 from WMCore.WMSpec.ConfigSectionTree import ConfigSectionTree, TreeHelper
+from WMCore.WMSpec.ConfigSectionTree import treeCache, invalidateTreeCache
 from WMCore.WMSpec.WMStep import WMStep, WMStepHelper
 from WMCore.WMSpec.Steps.ExecuteMaster import ExecuteMaster
 from WMCore.WMSpec.Steps.BuildMaster import BuildMaster
@@ -126,6 +127,7 @@ class WMTaskHelper(TreeHelper):
 
         """
         self.data.pathName = pathName
+        invalidateTreeCache(self.data)
 
     def getPathName(self):
         """
@@ -145,6 +147,22 @@ class WMTaskHelper(TreeHelper):
         """
         return self.data._internal_name
 
+    def getTaskByPath(self, taskPath):
+        """
+        _getTaskByPath_
+
+        Get the task with the given path name from the tree of tasks starting
+        at this one, None if there is no such task.
+
+        """
+        cache = treeCache(self.data)
+        if "pathMap" not in cache:
+            cache["pathMap"] = dict((x.pathName, x) for x in self.nodeIterator())
+        task = cache["pathMap"].get(taskPath, None)
+        if task is None:
+            return None
+        return WMTaskHelper(task)
+
     def listPathNames(self):
         """
         _listPathNames
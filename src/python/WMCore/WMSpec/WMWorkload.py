@@ -285,11 +285,6 @@ class WMWorkloadHelper(PersistencyHelper):
         Get a task instance based on the path name
 
         """
-        mapping = {}
-        for t in self.taskIterator():
-            [mapping.__setitem__(x.getPathName, x.name())
-             for x in t.taskIterator()]
-
         taskList = parseTaskPath(taskPath)
 
         if taskList[0] != self.name():  # should always be workload name first
@@ -308,10 +303,7 @@ class WMWorkloadHelper(PersistencyHelper):
             msg = "Task /%s/%s Not Found in Workload" % (taskList[0],
                                                          taskList[1])
             raise RuntimeError(msg)
-        for x in topTask.taskIterator():
-            if x.getPathName() == taskPath:
-                return x
-        return None
+        return topTask.getTaskByPath(taskPath)
 
     def taskIterator(self):
         """
@@ -21,7 +21,10 @@ class ActiveRequestJobInfo(RESTEntity):
         return            
 
     
-    @restcall(formats = [('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())])
+    # the same reply for every caller until the next DataCache update,
+    # keep the formatted response rather than reformatting it per request
+    @restcall(formats = [('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())],
+              cache_ttl = 60)
     @tools.expires(secs=-1)
     def get(self):
         # This assumes DataCahe is periodically updated. 
@@ -30,6 +30,8 @@ class Block(StartPolicyInterface):
         self.blockBlackListModifier = []
 
         self.siteDB = SiteDB()
+        # PSNs already resolved for a set of PNNs
+        self.psnsByPNNs = {}
 
     def split(self):
         """Apply policy to spec"""
@@ -45,7 +47,7 @@ class Block(StartPolicyInterface):
                     if self.initialTask.getTrustSitelists().get('trustlists'):
                         parentList[dbsBlock["Name"]] = self.sites
                     else:
-                        parentList[dbsBlock["Name"]] = self.siteDB.PNNstoPSNs(dbsBlock['PhEDExNodeList'])
+                        parentList[dbsBlock["Name"]] = self.pnnsToPSNs(dbsBlock['PhEDExNodeList'])
 
             self.newQueueElement(Inputs={block['block']: self.data.get(block['block'], [])},
                                  ParentFlag=parentFlag,
@@ -84,6 +86,10 @@ class Block(StartPolicyInterface):
             self.sites = makeLocationsList(siteWhitelist, siteBlacklist)
 
         blocks = []
+        # blocks passing all the restrictions and, for those which need their
+        # lumi counts recalculated, the runs accepted from them
+        candidateBlocks = []
+        recalculateRuns = {}
         # Take data inputs or from spec
         if not self.data:
             if blockWhiteList:
@@ -101,6 +107,7 @@ class Block(StartPolicyInterface):
                 for block in dbs.listFileBlocks(data, onlyClosedBlocks=True):
                     blocks.append(str(block))
 
+        selectedBlocks = []
         for blockName in blocks:
             # check block restrictions
             if blockWhiteList and blockName not in blockWhiteList:
@@ -110,11 +117,24 @@ class Block(StartPolicyInterface):
             if blockName in self.blockBlackListModifier:
                 # Don't duplicate blocks rejected before or blocks that were included and therefore are now in the blacklist
                 continue
+            selectedBlocks.append(blockName)
+
+        # Look up the blocks not rejected by the lumi mask concurrently, the
+        # summaries first and then the runs of the blocks which have files
+        lookupBlocks = [x for x in selectedBlocks if not task.getLumiMask() or x in maskedBlocks]
+        summaries = dict(zip(lookupBlocks, dbs.getDBSSummaryInfoForBlocks(datasetPath, lookupBlocks)))
+        runLumisByBlock = {}
+        if not task.getLumiMask() and (runWhiteList or runBlackList):
+            runBlocks = [x for x in lookupBlocks if summaries[x]['NumberOfFiles'] and
+                         summaries[x]['NumberOfFiles'] != '0']
+            runLumisByBlock = dict(zip(runBlocks, dbs.listRunLumisForBlocks(runBlocks)))
+
+        for blockName in selectedBlocks:
             if task.getLumiMask() and blockName not in maskedBlocks:
                 self.rejectedWork.append(blockName)
                 continue
 
-            block = dbs.getDBSSummaryInfo(datasetPath, block=blockName)
+            block = summaries[blockName]
             # blocks with 0 valid files should be ignored
             # - ideally they would be deleted but dbs can't delete blocks
             if not block['NumberOfFiles'] or block['NumberOfFiles'] == '0':
@@ -133,7 +153,7 @@ class Block(StartPolicyInterface):
             # check run restrictions
             elif runWhiteList or runBlackList:
                 # listRunLumis returns a dictionary with the lumi sections per run
-                runLumis = dbs.listRunLumis(block=block['block'])
+                runLumis = runLumisByBlock[blockName]
                 runs = set(runLumis.keys())
                 recalculateLumiCounts = False
                 if len(runs) > 1:
@@ -157,36 +177,53 @@ class Block(StartPolicyInterface):
                     recalculateLumiCounts = False
 
                 if recalculateLumiCounts:
-                    # Recalculate effective size of block
-                    # We pull out file info, since we don't do this often
-                    acceptedLumiCount = 0
-                    acceptedEventCount = 0
-                    acceptedFileCount = 0
-                    fileInfo = dbs.listFilesInBlock(fileBlockName=block['block'])
-                    for fileEntry in fileInfo:
-                        acceptedFile = False
-                        acceptedFileLumiCount = 0
-                        for lumiInfo in fileEntry['LumiList']:
-                            runNumber = lumiInfo['RunNumber']
-                            if runNumber in runs:
-                                acceptedFile = True
-                                acceptedFileLumiCount += 1
-                                acceptedLumiCount += len(lumiInfo['LumiSectionNumber'])
-                        if acceptedFile:
-                            acceptedFileCount += 1
-                            if len(fileEntry['LumiList']) != acceptedFileLumiCount:
-                                acceptedEventCount += float(acceptedFileLumiCount) * fileEntry['NumberOfEvents'] \
-                                                      / len(fileEntry['LumiList'])
-                            else:
-                                acceptedEventCount += fileEntry['NumberOfEvents']
-                    block[self.lumiType] = acceptedLumiCount
-                    block['NumberOfFiles'] = acceptedFileCount
-                    block['NumberOfEvents'] = acceptedEventCount
+                    # Recalculate effective size of block later, fetching
+                    # the file info of all those blocks in one bulk call
+                    recalculateRuns[block['block']] = runs
+
+            candidateBlocks.append(block)
+
+        # We pull out file info, since we don't do this often
+        recalculateBlocks = [x['block'] for x in candidateBlocks if x['block'] in recalculateRuns]
+        filesByBlock = dict(zip(recalculateBlocks, dbs.getFilesForBlocks(recalculateBlocks)))
+
+        blockLocations = {}
+        if candidateBlocks and not task.getTrustSitelists().get('trustlists'):
+            blockLocations = dbs.listFileBlockLocation([x['block'] for x in candidateBlocks])
+
+        for block in candidateBlocks:
+            if block['block'] in filesByBlock:
+                runs = recalculateRuns[block['block']]
+                acceptedLumiCount = 0
+                acceptedEventCount = 0
+                acceptedFileCount = 0
+                for fileEntry in filesByBlock[block['block']]:
+                    acceptedFile = False
+                    acceptedFileLumiCount = 0
+                    for lumiInfo in fileEntry['LumiList']:
+                        runNumber = lumiInfo['RunNumber']
+                        if runNumber in runs:
+                            acceptedFile = True
+                            acceptedFileLumiCount += 1
+                            acceptedLumiCount += len(lumiInfo['LumiSectionNumber'])
+                    if acceptedFile:
+                        acceptedFileCount += 1
+                        if len(fileEntry['LumiList']) != acceptedFileLumiCount:
+                            acceptedEventCount += float(acceptedFileLumiCount) * fileEntry['NumberOfEvents'] \
+                                                  / len(fileEntry['LumiList'])
+                        else:
+                            acceptedEventCount += fileEntry['NumberOfEvents']
+                block[self.lumiType] = acceptedLumiCount
+                block['NumberOfFiles'] = acceptedFileCount
+                block['NumberOfEvents'] = acceptedEventCount
             # save locations
             if task.getTrustSitelists().get('trustlists'):
                 self.data[block['block']] = self.sites
             else:
-                self.data[block['block']] = self.siteDB.PNNstoPSNs(dbs.listFileBlockLocation(block['block']))
+                if block['block'] not in blockLocations:
+                    # not in the bulk result, let the single block lookup decide
+                    blockLocations[block['block']] = dbs.listFileBlockLocation(block['block'])
+                self.data[block['block']] = self.pnnsToPSNs(blockLocations[block['block']])
 
             # TODO: need to decide what to do when location is no find.
             # There could be case for network problem (no connection to dbs, phedex)
@@ -200,6 +237,16 @@ class Block(StartPolicyInterface):
             validBlocks.append(block)
         return validBlocks
 
+    def pnnsToPSNs(self, pnns):
+        """
+        Map a list of PNNs to PSNs, asking SiteDB only once for each set
+        of PNNs. Return a new list each time.
+        """
+        key = frozenset(pnns)
+        if key not in self.psnsByPNNs:
+            self.psnsByPNNs[key] = self.siteDB.PNNstoPSNs(pnns)
+        return list(self.psnsByPNNs[key])
+
     def getMaskedBlocks(self, task, dbs, datasetPath):
         """ Get the blocks which pass the lumi mask restrictions. For each block return the list of lumis
             which were ok (given the lumi mask). The data structure returned is the following:
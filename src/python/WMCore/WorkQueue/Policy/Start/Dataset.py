@@ -85,6 +85,8 @@ class Dataset(StartPolicyInterface):
         Lexicon.dataset(datasetPath)  # check dataset name
         validBlocks = []
         locations = None
+        # runs accepted from the blocks which need their lumi counts recalculated
+        recalculateRuns = {}
 
         blockWhiteList = task.inputBlockWhitelist()
         blockBlackList = task.inputBlockBlacklist()
@@ -96,19 +98,19 @@ class Dataset(StartPolicyInterface):
             siteBlacklist = task.siteBlacklist()
             self.sites = makeLocationsList(siteWhitelist, siteBlacklist)
 
-        for blockName in dbs.listFileBlocks(datasetPath):
-            block = dbs.getDBSSummaryInfo(datasetPath, block=blockName)
-
-            # check block restrictions
-            if blockWhiteList and block['block'] not in blockWhiteList:
-                continue
-            if block['block'] in blockBlackList:
-                continue
+        # check block restrictions, then look up the remaining blocks concurrently
+        blockNames = [x for x in dbs.listFileBlocks(datasetPath)
+                      if (not blockWhiteList or x in blockWhiteList) and x not in blockBlackList]
+        summaries = dbs.getDBSSummaryInfoForBlocks(datasetPath, blockNames)
+        runLumisByBlock = {}
+        if runWhiteList or runBlackList:
+            runLumisByBlock = dict(zip(blockNames, dbs.listRunLumisForBlocks(blockNames)))
 
+        for blockName, block in zip(blockNames, summaries):
             # check run restrictions
             if runWhiteList or runBlackList:
                 # listRunLumis returns a dictionary with the lumi sections per run
-                runLumis = dbs.listRunLumis(block=block['block'])
+                runLumis = runLumisByBlock[blockName]
                 runs = set(runLumis.keys())
                 recalculateLumiCounts = False
                 if len(runs) > 1:
@@ -127,47 +129,55 @@ class Dataset(StartPolicyInterface):
                     continue
 
                 if recalculateLumiCounts:
-                    # get correct lumi count
-                    # Recalculate effective size of block
-                    # We pull out file info, since we don't do this often
-                    acceptedLumiCount = 0
-                    acceptedEventCount = 0
-                    acceptedFileCount = 0
-                    fileInfo = dbs.listFilesInBlock(fileBlockName=block['block'])
-                    for fileEntry in fileInfo:
-                        acceptedFile = False
-                        acceptedFileLumiCount = 0
-                        for lumiInfo in fileEntry['LumiList']:
-                            runNumber = lumiInfo['RunNumber']
-                            if runNumber in runs:
-                                acceptedFile = True
-                                acceptedFileLumiCount += 1
-                        if acceptedFile:
-                            acceptedFileCount += 1
-                            acceptedLumiCount += acceptedFileLumiCount
-                            if len(fileEntry['LumiList']) != acceptedFileLumiCount:
-                                acceptedEventCount += float(acceptedFileLumiCount) * fileEntry['NumberOfEvents'] / len(
-                                    fileEntry['LumiList'])
-                            else:
-                                acceptedEventCount += fileEntry['NumberOfEvents']
-                else:
-                    acceptedLumiCount = block["NumberOfLumis"]
-                    acceptedFileCount = block['NumberOfFiles']
-                    acceptedEventCount = block['NumberOfEvents']
-
-                # recalculate effective size of block
-                # make a guess for new event/file numbers from ratio
-                # of accepted lumi sections (otherwise have to pull file info)
+                    # get correct lumi count later, fetching the file
+                    # info of all those blocks in one bulk call
+                    recalculateRuns[block['block']] = runs
+
+            validBlocks.append(block)
+
+        # We pull out file info, since we don't do this often
+        recalculateBlocks = [x['block'] for x in validBlocks if x['block'] in recalculateRuns]
+        filesByBlock = dict(zip(recalculateBlocks, dbs.getFilesForBlocks(recalculateBlocks)))
+
+        blockLocations = {}
+        if validBlocks:
+            blockLocations = dbs.listFileBlockLocation([x['block'] for x in validBlocks])
+
+        for block in validBlocks:
+            if block['block'] in filesByBlock:
+                # Recalculate effective size of block
+                runs = recalculateRuns[block['block']]
+                acceptedLumiCount = 0
+                acceptedEventCount = 0
+                acceptedFileCount = 0
+                for fileEntry in filesByBlock[block['block']]:
+                    acceptedFile = False
+                    acceptedFileLumiCount = 0
+                    for lumiInfo in fileEntry['LumiList']:
+                        runNumber = lumiInfo['RunNumber']
+                        if runNumber in runs:
+                            acceptedFile = True
+                            acceptedFileLumiCount += 1
+                    if acceptedFile:
+                        acceptedFileCount += 1
+                        acceptedLumiCount += acceptedFileLumiCount
+                        if len(fileEntry['LumiList']) != acceptedFileLumiCount:
+                            acceptedEventCount += float(acceptedFileLumiCount) * fileEntry['NumberOfEvents'] / len(
+                                fileEntry['LumiList'])
+                        else:
+                            acceptedEventCount += fileEntry['NumberOfEvents']
 
                 block[self.lumiType] = acceptedLumiCount
                 block['NumberOfFiles'] = acceptedFileCount
                 block['NumberOfEvents'] = acceptedEventCount
 
-            validBlocks.append(block)
+            if block['block'] not in blockLocations:
+                # not in the bulk result, let the single block lookup decide
+                blockLocations[block['block']] = dbs.listFileBlockLocation(block['block'])
             if locations is None:
-                locations = set(dbs.listFileBlockLocation(block['block']))
+                locations = set(blockLocations[block['block']])
             else:
-                locations = locations.intersection(dbs.listFileBlockLocation(block['block']))
+                locations = locations.intersection(blockLocations[block['block']])
 
         # all needed blocks present at these sites
         if self.wmspec.getTrustLocationFlag().get('trustlists'):
@@ -26,6 +26,7 @@ from WMCore.JobStateMachine.ChangeState import ChangeState
 from WMCore.BossAir.BossAirAPI import (BossAirAPI, BossAirException)
 from WMCore.ResourceControl.ResourceControl import ResourceControl
 from WMComponent.DBS3Buffer.DBSBufferFile import DBSBufferFile
+from WMComponent.DBS3Buffer.DBSBufferFileStager import DBSBufferFileStager
 from WMComponent.DBS3Buffer.DBSBufferDataset import DBSBufferDataset
 
 def wmbsSubscriptionStatus(logger, dbi, conn, transaction):
@@ -192,15 +193,11 @@ class WMBSHelper(WMConnectionBase):
         self.getLocationInfo = self.daofactory(classname="Locations.GetSiteInfo")
 
         # DAOs from DBSBuffer
-        self.dbsCreateFiles = self.dbsDaoFactory(classname="DBSBufferFiles.Add")
-        self.dbsSetLocation = self.dbsDaoFactory(classname="DBSBufferFiles.SetLocationByLFN")
-        self.dbsInsertLocation = self.dbsDaoFactory(classname="DBSBufferFiles.AddLocation")
-        self.dbsSetChecksum = self.dbsDaoFactory(classname="DBSBufferFiles.AddChecksumByLFN")
         self.dbsInsertWorkflow = self.dbsDaoFactory(classname="InsertWorkflow")
+        self.dbsStager = DBSBufferFileStager()
 
         # Added for file creation bookkeeping
         self.dbsFilesToCreate = []
-        self.addedLocations = []
         self.wmbsFilesToCreate = []
         self.insertedBogusDataset = -1
 
@@ -512,73 +509,40 @@ class WMBSHelper(WMConnectionBase):
             # Whoops, nothing to do!
             return
 
-        dbsFileTuples = []
-        dbsFileLoc = []
-        dbsCksumBinds = []
-        locationsToAdd = []
-        selfChecksums = None
-
-        # The first thing we need to do is add the datasetAlgo
-        # Assume all files in a pass come from one datasetAlgo?
-        if self.insertedBogusDataset == -1:
-            self.insertedBogusDataset = self.dbsFilesToCreate[0].insertDatasetAlgo()
-
         for dbsFile in self.dbsFilesToCreate:
-            # Append a tuple in the format specified by DBSBufferFiles.Add
-            # Also run insertDatasetAlgo
-
-            lfn = dbsFile['lfn']
-            selfChecksums = dbsFile['checksums']
-
-            newTuple = (lfn, dbsFile['size'],
-                        dbsFile['events'], self.insertedBogusDataset,
-                        dbsFile['status'], self.topLevelTaskDBSBufferId)
+            self.dbsStager.stageFile(dbsFile['lfn'], dbsFile['size'], dbsFile['events'],
+                                     None, self.topLevelTaskDBSBufferId,
+                                     dbsFile['locations'], checksums=dbsFile['checksums'],
+                                     status="GLOBAL")
+        self.dbsFilesToCreate = []
 
-            if newTuple not in dbsFileTuples:
-                dbsFileTuples.append(newTuple)
+        # Files already in DBSBuffer are left alone
+        self.dbsStager.dropExisting()
+        if len(self.dbsStager) == 0:
+            return
 
-            if len(dbsFile['newlocations']) < 1:
+        # The first thing we need to do is add the datasetAlgo
+        # All files in a pass come from the same bogus datasetAlgo
+        if self.insertedBogusDataset == -1:
+            dbsBuffer = DBSBufferFile(lfn=self.dbsStager.stagedFiles()[0]['lfn'])
+            dbsBuffer.setDatasetPath('bogus')
+            dbsBuffer.setAlgorithm(appName="cmsRun", appVer="Unknown",
+                                   appFam="Unknown", psetHash="Unknown",
+                                   configContent="Unknown")
+            self.insertedBogusDataset = dbsBuffer.insertDatasetAlgo()
+
+        for dbsFile in self.dbsStager.stagedFiles():
+            if len(dbsFile['locations']) < 1:
                 msg = ''
                 msg += "File created without any locations!\n"
-                msg += "File lfn: %s\n" % (lfn)
+                msg += "File lfn: %s\n" % (dbsFile['lfn'])
                 msg += "Rejecting this group of files in DBS!\n"
                 logging.error(msg)
+                self.dbsStager.reset()
                 raise WorkQueueWMBSException(msg)
+            dbsFile['datasetAlgo'] = self.insertedBogusDataset
 
-            for jobLocation in dbsFile['newlocations']:
-                if jobLocation not in self.addedLocations:
-                    # If we don't have it, try and add it
-                    locationsToAdd.append(jobLocation)
-                    self.addedLocations.append(jobLocation)
-                dbsFileLoc.append({'lfn': lfn, 'sename': jobLocation})
-
-            if selfChecksums:
-                # If we have checksums we have to create a bind
-                # For each different checksum
-                for entry in selfChecksums.keys():
-                    dbsCksumBinds.append({'lfn': lfn, 'cksum': selfChecksums[entry],
-                                          'cktype': entry})
-
-        for jobLocation in locationsToAdd:
-            self.dbsInsertLocation.execute(siteName=jobLocation,
-                                           conn=self.getDBConn(),
-                                           transaction=self.existingTransaction())
-
-        self.dbsCreateFiles.execute(files=dbsFileTuples,
-                                    conn=self.getDBConn(),
-                                    transaction=self.existingTransaction())
-
-        self.dbsSetLocation.execute(binds=dbsFileLoc,
-                                    conn=self.getDBConn(),
-                                    transaction=self.existingTransaction())
-
-        if len(dbsCksumBinds) > 0:
-            self.dbsSetChecksum.execute(bulkList=dbsCksumBinds,
-                                        conn=self.getDBConn(),
-                                        transaction=self.existingTransaction())
-
-        # Now that we've created those files, clear the list
-        self.dbsFilesToCreate = []
+        self.dbsStager.commit()
         return
 
     def _addToDBSBuffer(self, dbsFile, checksums, locations):
@@ -586,20 +550,11 @@ class WMBSHelper(WMConnectionBase):
         This step is just for increase the performance for
         Accountant doesn't neccessary to check the parentage
         """
-        dbsBuffer = DBSBufferFile(lfn=dbsFile["LogicalFileName"],
-                                  size=dbsFile["FileSize"],
-                                  events=dbsFile["NumberOfEvents"],
-                                  checksums=checksums,
-                                  locations=locations,
-                                  status="GLOBAL")
-        dbsBuffer.setDatasetPath('bogus')
-        dbsBuffer.setAlgorithm(appName="cmsRun", appVer="Unknown",
-                               appFam="Unknown", psetHash="Unknown",
-                               configContent="Unknown")
-
-        if not dbsBuffer.exists():
-            self.dbsFilesToCreate.append(dbsBuffer)
-        # dbsBuffer.create()
+        self.dbsFilesToCreate.append({'lfn': dbsFile["LogicalFileName"],
+                                      'size': dbsFile["FileSize"],
+                                      'events': dbsFile["NumberOfEvents"],
+                                      'checksums': checksums,
+                                      'locations': set(locations)})
         return
 
     def _addDBSFileToWMBSFile(self, dbsFile, storageElements, inFileset=True):
@@ -18,6 +18,7 @@ import traceback
 
 from WMCore.Alerts import API as alertAPI
 
+from WMCore.Services.DBS.DBSBlockCache import DBSBlockCache, setDefaultBlockCache
 from WMCore.Services.PhEDEx.PhEDEx import PhEDEx
 from WMCore.Services.SiteDB.SiteDB import SiteDBJSON as SiteDB
 
@@ -151,6 +152,15 @@ class WorkQueue(WorkQueueBase):
         elif self.params.get('PopulateFilesets'):
             raise RuntimeError('CacheDir mandatory for local queue')
 
+        # persistent cache of closed block metadata shared by the start
+        # policies and the WMBS injection, disabled unless a dir is given
+        self.params.setdefault('DBSBlockCacheDir', None)
+        self.params.setdefault('DBSBlockCacheSize', 1024 ** 3)
+        if self.params['DBSBlockCacheDir']:
+            setDefaultBlockCache(DBSBlockCache(self.params['DBSBlockCacheDir'],
+                                               maxSize=self.params['DBSBlockCacheSize'],
+                                               logger=self.logger))
+
         self.params.setdefault('SplittingMapping', {})
         self.params['SplittingMapping'].setdefault('DatasetBlock',
                                                    {'name': 'Block',
@@ -20,6 +20,8 @@ from WMCore.Database.Transaction import Transaction
 from WMCore.Database.CMSCouch import CouchError
 from WMCore.Database.CouchUtils import CouchConnectionError
 from WMCore.WMFactory import WMFactory
+from WMCore.WorkerThreads.Instrumentation import Instrumentation
+from WMCore.WorkerThreads.WakeupChannel import sendWakeup, wakeupPath
 
 from WMCore.Alerts import API as alertAPI
 
@@ -29,6 +31,15 @@ class BaseWorkerThread:
     regular intervals. Framework (through WorkerThreadManager) ensures that
     a default transaction, trigger and message service are available as in
     event handler threads.
+
+    If the agent uses the wakeup channel the worker sleeps until its idle
+    time is over or another component wakes it up. The heartbeat is
+    written at most every heartbeatInterval seconds, and the time spent
+    working and sleeping is kept in loopStats.
+
+    Each call of algorithm is a cycle measured by the instrumentation of
+    the worker, see WMCore.WorkerThreads.Instrumentation, whose summary
+    is logged and can be written in the heartbeat.
     """
     def __init__(self):
         """
@@ -44,6 +55,20 @@ class BaseWorkerThread:
         self.component = None
         self.args = {}
         self.heartbeatAPI = None
+        self.heartbeatInterval = 0
+        self.heartbeatSummary = False
+        self.lastHeartbeat = None
+
+        # Timers, counters and queries of the poll cycles
+        self.instrumentation = Instrumentation(self.__class__.__name__)
+
+        # Set by WorkerThreadManager if the component listens for wakeups
+        self.wakeupEvent = None
+
+        # Work and sleep time of the poll loop
+        self.loopStats = {'loops': 0, 'workTime': 0.0, 'sleepTime': 0.0,
+                          'lastWorkTime': 0.0, 'lastSleepTime': 0.0,
+                          'wakeups': 0, 'heartbeats': 0, 'heartbeatsSkipped': 0}
 
         # Termination callback function
         self.terminateCallback = None
@@ -155,21 +180,33 @@ class BaseWorkerThread:
                     #  - threads should not run in this case!
                     if not self.notifyTerminate.isSet():
                         # Do some work!
+                        self.loopStats['lastWorkTime'] = 0.0
                         try:
                             try:
                                 # heartbeat needed to be called after self.initInThread
                                 # to get the right name
                                 if hasattr(self.component.config, "Agent"):
                                     if getattr(self.component.config.Agent, "useHeartbeat", True):
-                                        self.heartbeatAPI.updateWorkerHeartbeat(
-                                            myThread.getName(), "Running")
+                                        self.updateHeartbeat(myThread.getName())
                             except (CouchError, CouchConnectionError) as ex:
                                 msg  = " Failed to update heartbeat for worker %s" % str(self)
                                 msg += ":\n %s" % str(ex)
                                 msg += "\n Skipping worker algorithm!"
                                 logging.error(msg)
                             else:
-                                self.algorithm(parameters)
+                                if self.wakeupEvent is not None:
+                                    # wakeups sent from now on are for the
+                                    # work done after this cycle
+                                    self.wakeupEvent.clear()
+                                workStart = time.time()
+                                myThread.instrumentation = self.instrumentation
+                                self.instrumentation.startCycle()
+                                try:
+                                    self.algorithm(parameters)
+                                finally:
+                                    myThread.instrumentation = None
+                                self.instrumentation.endCycle()
+                                self.loopStats['lastWorkTime'] = time.time() - workStart
                                 # Catch if someone forgets to commit/rollback
                                 if myThread.transaction.transaction is not None:
                                     msg = """ Thread %s:  Transaction reached
@@ -197,7 +234,9 @@ class BaseWorkerThread:
                                         myThread.getName(), msg)
                             raise ex
                         # Put the thread to sleep
+                        sleepStart = time.time()
                         self.sleepThread()
+                        self.recordLoop(time.time() - sleepStart)
 
             # Call specific thread termination method
             self.terminate(parameters)
@@ -229,8 +268,70 @@ class BaseWorkerThread:
         returns control when it's time to wake back up
         doesn't return any values
         """
-        time.sleep( self.idleTime )
-        
+        if self.wakeupEvent is None:
+            time.sleep(self.idleTime)
+        else:
+            self.wakeupEvent.wait(self.idleTime)
+
+    def updateHeartbeat(self, workerName):
+        """
+        _updateHeartbeat_
+
+        Write the heartbeat of the worker, unless it was written less than
+        heartbeatInterval seconds ago. The state written includes the
+        summary of the last cycle if heartbeatSummary is set.
+
+        """
+        now = time.time()
+        if self.lastHeartbeat is not None and now - self.lastHeartbeat < self.heartbeatInterval:
+            self.loopStats['heartbeatsSkipped'] += 1
+            return
+        state = "Running"
+        if self.heartbeatSummary and self.instrumentation.lastSummary:
+            state = "Running (%s)" % self.instrumentation.shortSummary()
+        self.heartbeatAPI.updateWorkerHeartbeat(workerName, state)
+        self.lastHeartbeat = now
+        self.loopStats['heartbeats'] += 1
+
+    def recordLoop(self, sleepTime):
+        """
+        _recordLoop_
+
+        Account for a poll loop, the work time is the one of its last
+        algorithm call
+
+        """
+        stats = self.loopStats
+        wokenUp = self.wakeupEvent is not None and self.wakeupEvent.isSet()
+        stats['loops'] += 1
+        stats['workTime'] += stats['lastWorkTime']
+        stats['sleepTime'] += sleepTime
+        stats['lastSleepTime'] = sleepTime
+        if wokenUp:
+            stats['wakeups'] += 1
+        logging.debug("%s loop %d: worked %.3f secs, slept %.3f secs%s (total %.1f secs working, "
+                      "%.1f secs sleeping, %d wakeups)", self.__class__.__name__, stats['loops'],
+                      stats['lastWorkTime'], sleepTime, wokenUp and " until woken up" or "",
+                      stats['workTime'], stats['sleepTime'], stats['wakeups'])
+
+    def wakeupComponent(self, componentName):
+        """
+        _wakeupComponent_
+
+        Wake up the workers of another component of the agent, e.g. once
+        there is work for it, if the agent uses the wakeup channel.
+        Return whether the wakeup was sent.
+
+        """
+        if self.component is None or not hasattr(self.component.config, "Agent"):
+            return False
+        if not getattr(self.component.config.Agent, "useWakeupChannel", False):
+            return False
+        path = wakeupPath(self.component.config, componentName)
+        if path is None:
+            return False
+        return sendWakeup(path)
+
     def initAlerts(self, compName = None):
         """
         _initAlerts_
@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+"""
+_Instrumentation_
+
+Lightweight timing of the poll cycles of the worker threads.
+
+Each worker has an Instrumentation, which its poll loop makes the current
+one of the thread for the duration of a cycle. The code run in the cycle
+times its steps with nested timers and counts what it processed:
+
+    instrumentation = currentInstrumentation()
+    with instrumentation.timer("submit"):
+        with instrumentation.timer("build"):
+            ...
+        instrumentation.count("jobs", len(jobs))
+
+or times whole methods with the timed decorator,
+
+and DBInterface.processData accounts the time of the queries to the DAO
+running them. The summary of the cycle is logged at its end.
+
+Outside of a cycle currentInstrumentation returns an instance which does
+nothing, so instrumented code doesn't have to check for it.
+"""
+
+import functools
+import logging
+import threading
+import time
+
+
+# packages left out of the DAO names
+DAO_PACKAGES = set(['WMCore', 'WMComponent', 'Database', 'MySQL', 'Oracle', 'SQLite'])
+
+_daoNames = {}
+
+
+def daoName(dao):
+    """
+    _daoName_
+
+    Short name of the class of a DAO, e.g. WMBS.Jobs.GetState for
+    WMCore.WMBS.MySQL.Jobs.GetState
+
+    """
+    daoClass = dao.__class__
+    name = _daoNames.get(daoClass)
+    if name is None:
+        parts = [x for x in daoClass.__module__.split('.') if x not in DAO_PACKAGES]
+        if not parts or parts[-1] != daoClass.__name__:
+            parts.append(daoClass.__name__)
+        name = _daoNames[daoClass] = ".".join(parts)
+    return name
+
+
+class Timer(object):
+    """
+    _Timer_
+
+    Context manager timing a span of a cycle, nested in the spans entered
+    before it and not exited yet
+
+    """
+
+    __slots__ = ['instrumentation', 'name', 'startTime']
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.startTime = None
+
+    def __enter__(self):
+        stack = self.instrumentation.stack
+        if stack:
+            self.name = "%s/%s" % (stack[-1], self.name)
+        stack.append(self.name)
+        self.startTime = time.time()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.instrumentation.addTime(self.name, time.time() - self.startTime)
+        self.instrumentation.stack.pop()
+        return False
+
+
+class NoTimer(object):
+    """
+    _NoTimer_
+
+    Context manager doing nothing
+
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        return False
+
+
+NO_TIMER = NoTimer()
+
+
+class Instrumentation(object):
+    """
+    _Instrumentation_
+
+    Timers, counters and query times of the current cycle of a worker
+
+    """
+
+    def __init__(self, name, maxQueries = 10):
+        self.name = name
+        self.maxQueries = maxQueries
+        self.cycle = 0
+        self.cycleStart = None
+        self.lastSummary = None
+        self.reset()
+
+    def reset(self):
+        """
+        _reset_
+
+        Forget the measurements of the current cycle
+
+        """
+        self.timers = {}
+        self.counters = {}
+        self.queries = {}
+        self.stack = []
+        return
+
+    def timer(self, name):
+        """
+        _timer_
+
+        Context manager timing a (nested) span of the cycle
+
+        """
+        return Timer(self, name)
+
+    def addTime(self, name, elapsed):
+        """
+        _addTime_
+
+        Account time measured elsewhere to a timer
+
+        """
+        timer = self.timers.get(name)
+        if timer is None:
+            self.timers[name] = [1, elapsed]
+        else:
+            timer[0] += 1
+            timer[1] += elapsed
+        return
+
+    def count(self, name, value = 1):
+        """
+        _count_
+
+        Increment a counter
+
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+        return
+
+    def addQuery(self, dao, elapsed, nBinds = 1):
+        """
+        _addQuery_
+
+        Account a call to DBInterface.processData made by a DAO
+
+        """
+        query = self.queries.get(dao)
+        if query is None:
+            self.queries[dao] = [1, elapsed, nBinds]
+        else:
+            query[0] += 1
+            query[1] += elapsed
+            query[2] += nBinds
+        return
+
+    def startCycle(self):
+        """
+        _startCycle_
+
+        Start measuring a new cycle
+
+        """
+        self.reset()
+        self.cycle += 1
+        self.cycleStart = time.time()
+        return
+
+    def endCycle(self):
+        """
+        _endCycle_
+
+        Summarize the cycle, log the summary and return it
+
+        """
+        self.lastSummary = self.summary()
+        logging.info(self.formatSummary(self.lastSummary))
+        return self.lastSummary
+
+    def summary(self):
+        """
+        _summary_
+
+        Dictionary of the measurements of the current cycle
+
+        """
+        queryCount = sum([x[0] for x in self.queries.itervalues()])
+        queryTime = sum([x[1] for x in self.queries.itervalues()])
+        return {'name': self.name, 'cycle': self.cycle,
+                'duration': time.time() - (self.cycleStart or time.time()),
+                'timers': dict((name, {'count': x[0], 'time': x[1]}) for name, x in self.timers.iteritems()),
+                'counters': dict(self.counters),
+                'queryCount': queryCount, 'queryTime': queryTime,
+                'queries': dict((dao, {'count': x[0], 'time': x[1], 'binds': x[2]})
+                                for dao, x in self.queries.iteritems())}
+
+    def formatSummary(self, summary):
+        """
+        _formatSummary_
+
+        One line summary of a cycle, with the slowest DAOs only
+
+        """
+        msg = "%s cycle %d: %.3f secs" % (summary['name'], summary['cycle'], summary['duration'])
+        if summary['timers']:
+            msg += "; timers: %s" % ", ".join(["%s %.3f secs%s" % (name, x['time'], x['count'] > 1 and
+                                                                   " (%dx)" % x['count'] or "")
+                                               for name, x in sorted(summary['timers'].items())])
+        if summary['counters']:
+            msg += "; counters: %s" % ", ".join(["%s %s" % x for x in sorted(summary['counters'].items())])
+        if summary['queryCount']:
+            slowest = sorted(summary['queries'].items(), key = lambda x: x[1]['time'], reverse = True)
+            msg += "; %d queries in %.3f secs: %s" % (summary['queryCount'], summary['queryTime'],
+                                                       ", ".join(["%s %dx %.3f secs" % (dao, x['count'], x['time'])
+                                                                  for dao, x in slowest[:self.maxQueries]]))
+        return msg
+
+    def shortSummary(self):
+        """
+        _shortSummary_
+
+        Summary of the last cycle short enough for the state of the worker
+        in the heartbeat table
+
+        """
+        if self.lastSummary is None:
+            return None
+        return "cycle %.1f secs, %d queries in %.1f secs" % (self.lastSummary['duration'],
+                                                              self.lastSummary['queryCount'],
+                                                              self.lastSummary['queryTime'])
+
+
+class NoInstrumentation(Instrumentation):
+    """
+    _NoInstrumentation_
+
+    Used outside of the cycles, doesn't record anything
+
+    """
+
+    def __init__(self):
+        Instrumentation.__init__(self, None)
+
+    def timer(self, name):
+        return NO_TIMER
+
+    def addTime(self, name, elapsed):
+        return
+
+    def count(self, name, value = 1):
+        return
+
+    def addQuery(self, dao, elapsed, nBinds = 1):
+        return
+
+
+NO_INSTRUMENTATION = NoInstrumentation()
+
+
+def currentInstrumentation():
+    """
+    _currentInstrumentation_
+
+    Instrumentation of the cycle the current thread is running, if any
+
+    """
+    return getattr(threading.currentThread(), "instrumentation", None) or NO_INSTRUMENTATION
+
+
+def timed(name):
+    """
+    _timed_
+
+    Decorator timing each call of a method in the current cycle
+
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with currentInstrumentation().timer(name):
+                return method(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+"""
+_WakeupChannel_
+
+Lets a component wake up the worker threads of another component on the
+same agent before the end of their idle time, e.g. JobCreator waking up
+JobSubmitter once it created new jobs.
+
+Each component listens on a unix datagram socket in its componentDir, a
+wakeup is a datagram sent to it. Sending never blocks and a peer which
+is not running, or not listening, is silently ignored: the peer falls
+back to its regular polling.
+"""
+
+import errno
+import logging
+import os
+import socket
+import threading
+
+SOCKET_NAME = "wakeup.sock"
+
+
+def wakeupPath(config, componentName):
+    """
+    _wakeupPath_
+
+    Path of the wakeup socket of a component, None if the component isn't
+    configured
+
+    """
+    section = getattr(config, componentName, None)
+    componentDir = getattr(section, "componentDir", None)
+    if componentDir is None:
+        return None
+    return os.path.join(componentDir, SOCKET_NAME)
+
+
+def sendWakeup(path, message = "wakeup"):
+    """
+    _sendWakeup_
+
+    Send a wakeup to the channel listening at path, return whether it
+    was delivered
+
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        sock.setblocking(0)
+        sock.sendto(message, path)
+    except socket.error as ex:
+        # nobody listening, or the peer's queue is full and a wakeup is
+        # already pending anyway
+        if ex.errno not in (errno.ENOENT, errno.ECONNREFUSED, errno.EAGAIN):
+            logging.debug("Failed to send wakeup to %s: %s", path, str(ex))
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+class WakeupChannel(object):
+    """
+    _WakeupChannel_
+
+    Socket a component listens on for wakeups. The worker threads register
+    an event each, which is set whenever a wakeup is received, and wait on
+    it instead of sleeping.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.events = []
+        self.wakeups = 0
+        self.closed = False
+        self.lock = threading.Lock()
+
+        if os.path.exists(self.path):
+            # left over by a previous instance of the component
+            os.unlink(self.path)
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.socket.bind(self.path)
+
+        self.listener = threading.Thread(target = self.listen,
+                                         name = "WakeupChannel")
+        self.listener.daemon = True
+        self.listener.start()
+        logging.info("Listening for wakeups on %s", self.path)
+
+    def register(self):
+        """
+        _register_
+
+        Return a new event set on every wakeup
+
+        """
+        event = threading.Event()
+        with self.lock:
+            self.events.append(event)
+        return event
+
+    def wakeAll(self):
+        """
+        _wakeAll_
+
+        Set the events of all the registered workers
+
+        """
+        with self.lock:
+            for event in self.events:
+                event.set()
+        return
+
+    def listen(self):
+        """
+        _listen_
+
+        Receive the wakeups until the channel is closed
+
+        """
+        while not self.closed:
+            try:
+                self.socket.recv(1024)
+            except socket.error:
+                break
+            if self.closed:
+                break
+            self.wakeups += 1
+            self.wakeAll()
+        return
+
+    def close(self):
+        """
+        _close_
+
+        Stop listening, and wake up the workers so that they don't wait for
+        the end of their idle time to notice they have to terminate
+
+        """
+        if self.closed:
+            return
+        self.closed = True
+        # unblock the listener
+        sendWakeup(self.path, "close")
+        self.listener.join(5)
+        self.socket.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+        self.wakeAll()
+        return
@@ -11,6 +11,7 @@ import logging
 import time
 
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
+from WMCore.WorkerThreads.WakeupChannel import WakeupChannel, wakeupPath
 from WMCore.Agent.HeartbeatAPI import HeartbeatAPI
 
 # keep track of a unique WTM number
@@ -36,6 +37,7 @@ class WorkerThreadManager:
         wtmcount = wtmcount + 1
         self.slavecounter = 0
         self.slavelist = []
+        self.wakeupChannel = None
         self.lock.release()
         logging.info("Started")
         return
@@ -74,6 +76,35 @@ class WorkerThreadManager:
         if hasattr(self.component.config, "Agent"):
             if getattr(self.component.config.Agent, "useHeartbeat", True):
                 worker.heartbeatAPI = HeartbeatAPI(self.component.config.Agent.componentName)
+            worker.heartbeatInterval = getattr(self.component.config.Agent, "heartbeatInterval", 0)
+            worker.heartbeatSummary = getattr(self.component.config.Agent, "heartbeatCycleSummary", False)
+            if getattr(self.component.config.Agent, "useWakeupChannel", False):
+                channel = self.getWakeupChannel()
+                if channel is not None:
+                    worker.wakeupEvent = channel.register()
+
+    def getWakeupChannel(self):
+        """
+        _getWakeupChannel_
+
+        The channel the workers of the component listen on for wakeups,
+        created along with the first worker. None if it can't be created,
+        the workers then only wake up after their idle time.
+        """
+        self.lock.acquire()
+        try:
+            if self.wakeupChannel is None:
+                path = wakeupPath(self.component.config, self.component.config.Agent.componentName)
+                if path is None:
+                    return None
+                try:
+                    self.wakeupChannel = WakeupChannel(path)
+                except Exception as ex:
+                    logging.warning("Failed to listen for wakeups on %s: %s", path, str(ex))
+                    self.wakeupChannel = False
+            return self.wakeupChannel or None
+        finally:
+            self.lock.release()
 
 
     def addWorker(self, worker, idleTime = 60, parameters = None):
@@ -116,6 +147,9 @@ class WorkerThreadManager:
         self.terminateSlaves.set()
         self.pauseSlaves.clear()
         self.resumeSlaves.set()
+        if self.wakeupChannel:
+            # also wakes up the sleeping workers
+            self.wakeupChannel.close()
 
         # Wait for all threads to finished
         finished = False
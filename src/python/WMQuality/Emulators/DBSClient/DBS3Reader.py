@@ -153,8 +153,10 @@ class DBS3Reader:
                                                           locations = False) if str(x['OpenForWriting' ]) == '1']
 
     def listFileBlockLocation(self, block):
-        """Fake locations"""
-        return self.dataBlocks.getLocation(block)
+        """Fake locations, a dict by block if a list of blocks is given"""
+        if isinstance(block, basestring):
+            return self.dataBlocks.getLocation(block)
+        return dict((x, self.dataBlocks.getLocation(x)) for x in block)
 
     def listFilesInBlock(self, fileBlockName):
         """Fake files"""
@@ -163,6 +165,20 @@ class DBS3Reader:
     def listFilesInBlockWithParents(self, block):
         return self.dataBlocks.getFiles(block, True)
 
+    def getFilesForBlocks(self, blocks, lumis = True, validFileOnly = 1, parents = False, **kwargs):
+        """Fake files for several blocks, in the same order"""
+        if parents:
+            return [self.listFilesInBlockWithParents(x) for x in blocks]
+        return [self.listFilesInBlock(x) for x in blocks]
+
+    def getDBSSummaryInfoForBlocks(self, dataset, blocks, **kwargs):
+        """Fake summaries for several blocks, in the same order"""
+        return [self.getDBSSummaryInfo(dataset, block = x) for x in blocks]
+
+    def listRunLumisForBlocks(self, blocks, **kwargs):
+        """Fake runs for several blocks, in the same order"""
+        return [self.listRunLumis(block = x) for x in blocks]
+
     def getFileBlock(self, block):
         """Return block + locations"""
         result = { block : {
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+_DBSBufferFileStager_t_
+
+Unit tests for the DBSBufferFileStager, with DAOs recording the binds
+they are called with instead of a database.
+"""
+
+import unittest
+
+from WMCore.DataStructs.Run import Run
+from WMComponent.DBS3Buffer.DBSBufferFileStager import DBSBufferFileStager
+
+
+class RecordingDAO(object):
+    """
+    DAO keeping the arguments of every call
+    """
+
+    def __init__(self, result = None):
+        self.calls = []
+        self.result = result
+
+    def execute(self, **kwargs):
+        kwargs.pop('conn', None)
+        kwargs.pop('transaction', None)
+        self.calls.append(kwargs)
+        return self.result
+
+
+class TestStager(DBSBufferFileStager):
+    """
+    DBSBufferFileStager using recording DAOs
+    """
+
+    def __init__(self, existing = None):
+        self.existsAction = RecordingDAO(existing or set())
+        self.insertLocation = RecordingDAO()
+        self.createFiles = RecordingDAO()
+        self.setLocation = RecordingDAO()
+        self.setChecksum = RecordingDAO()
+        self.setRunLumi = RecordingDAO()
+        self.knownLocations = set()
+        self.reset()
+
+    def getDBConn(self):
+        return None
+
+    def existingTransaction(self):
+        return False
+
+    def queries(self):
+        return sum([len(dao.calls) for dao in [self.existsAction, self.insertLocation,
+                                                self.createFiles, self.setLocation,
+                                                self.setChecksum, self.setRunLumi]])
+
+
+class DBSBufferFileStagerTest(unittest.TestCase):
+
+    def stageBlock(self, stager, numFiles, locations):
+        for i in range(numFiles):
+            lfn = "/store/data/Run2012A/file%d.root" % i
+            stager.stageFile(lfn, 1024, 100, 1, 2, locations,
+                             checksums = {'adler32': 'abc%d' % i, 'cksum': str(i)},
+                             runs = set([Run(1, i)]))
+
+    def testBulkCommit(self):
+        """A 5k file block is committed with one query per table"""
+        stager = TestStager()
+        self.stageBlock(stager, 5000, ['T1_US_FNAL_Disk', 'T2_CH_CERN'])
+        # staging the block again does not add anything
+        self.stageBlock(stager, 5000, ['T1_US_FNAL_Disk'])
+        self.assertEqual(len(stager), 5000)
+
+        stager.commit()
+        self.assertEqual(stager.queries(), 5)
+        self.assertEqual(len(stager), 0)
+        self.assertEqual(stager.insertLocation.calls[0]['siteName'],
+                         set(['T1_US_FNAL_Disk', 'T2_CH_CERN']))
+        self.assertEqual(len(stager.createFiles.calls[0]['files']), 5000)
+        self.assertEqual(stager.createFiles.calls[0]['files'][0],
+                         ("/store/data/Run2012A/file0.root", 1024, 100, 1, "NOTUPLOADED", 2))
+        self.assertEqual(len(stager.setLocation.calls[0]['binds']), 10000)
+        self.assertEqual(len(stager.setChecksum.calls[0]['bulkList']), 10000)
+        self.assertEqual(len(stager.setRunLumi.calls[0]['file']), 5000)
+
+        # known locations are not inserted again
+        self.stageBlock(stager, 10, ['T2_CH_CERN'])
+        stager.commit()
+        self.assertEqual(len(stager.insertLocation.calls), 1)
+        self.assertEqual(len(stager.createFiles.calls), 2)
+
+    def testDropExisting(self):
+        """Files already in DBSBuffer are dropped with a single lookup"""
+        existing = set(["/store/data/Run2012A/file1.root", "/store/data/Run2012A/file3.root"])
+        stager = TestStager(existing)
+        self.stageBlock(stager, 5, ['T2_CH_CERN'])
+        self.assertEqual(stager.dropExisting(), existing)
+        self.assertEqual(len(stager.existsAction.calls), 1)
+        self.assertEqual([x['lfn'] for x in stager.stagedFiles()],
+                         ["/store/data/Run2012A/file0.root", "/store/data/Run2012A/file2.root",
+                          "/store/data/Run2012A/file4.root"])
+
+
+if __name__ == '__main__':
+    unittest.main()
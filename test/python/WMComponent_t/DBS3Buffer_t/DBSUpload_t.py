@@ -26,12 +26,41 @@ from WMComponent.DBS3Buffer.DBSBufferFile import DBSBufferFile
 from WMComponent.DBS3Buffer.DBSBufferUtil import DBSBufferUtil
 from WMComponent.DBS3Buffer.DBSBufferBlock import DBSBufferBlock
 
+from WMComponent.DBS3Buffer import DBSUploadPoller as DBSUploadPollerModule
 from WMComponent.DBS3Buffer.DBSUploadPoller import DBSUploadPoller
 
 from WMQuality.Emulators.DBSClient.DBS3API import DbsApi as MockDbsApi
 from WMQuality.TestInit     import TestInit
 from WMQuality.Emulators import EmulatorSetup
 
+class LatencyDbsApi(object):
+    """
+    _LatencyDbsApi_
+
+    Fake DBS accepting every block after a fixed latency, like a remote
+    DBS would, for the throughput benchmark
+    """
+    latency = 0.05
+
+    def __init__(self, url):
+        self.dbsPath = url
+
+    def insertBulkBlock(self, blockDump):
+        time.sleep(self.latency)
+        return
+
+    def listBlocks(self, block_name):
+        return []
+
+class FailingDbsApi(LatencyDbsApi):
+    """
+    _FailingDbsApi_
+
+    Fake DBS refusing every block
+    """
+    def insertBulkBlock(self, blockDump):
+        raise Exception("Service Unavailable")
+
 class DBSUploadTest(unittest.TestCase):
     """
     TestCase for DBSUpload module
@@ -64,6 +93,7 @@ class DBSUploadTest(unittest.TestCase):
         locationAction.execute(siteName = "malpaquet")
         self.dbsUrl = "https://localhost:1443/dbs/dev/global/DBSWriter"
         self.dbsApi = None
+        self.realDbsApi = DBSUploadPollerModule.DbsApi
         return
 
     def tearDown(self):
@@ -72,6 +102,7 @@ class DBSUploadTest(unittest.TestCase):
 
         tearDown function for unittest
         """
+        DBSUploadPollerModule.DbsApi = self.realDbsApi
         self.testInit.clearDatabase()
         self.testInit.delWorkDir()
         EmulatorSetup.deleteConfig(self.configFile)
@@ -323,6 +354,159 @@ class DBSUploadTest(unittest.TestCase):
                                                MaxEvents, MaxSize)
         return workflowID
 
+    def createUploader(self, dbsApi, **settings):
+        """
+        _createUploader_
+
+        Uploader whose upload processes talk to the fake DBS API provided
+        """
+        DBSUploadPollerModule.DbsApi = dbsApi
+        config = self.getConfig()
+        for key, value in settings.items():
+            setattr(config.DBS3Upload, key, value)
+        return DBSUploadPoller(config = config)
+
+    def countFiles(self, status):
+        """
+        _countFiles_
+
+        Number of files with the status provided in DBSBuffer
+        """
+        myThread = threading.currentThread()
+        sql = "SELECT COUNT(*) FROM dbsbuffer_file WHERE status = '%s'" % status
+        return myThread.dbi.processData(sql)[0].fetchall()[0][0]
+
+    def createBlockFiles(self, acqEra, nFiles):
+        """
+        _createBlockFiles_
+
+        Create the files of a workflow whose blocks are closed at 5 files
+        only, return the files
+        """
+        workflowName = 'TestWorkload%s' % acqEra
+        taskPath = '/%s/TestProcessing' % workflowName
+        self.injectWorkflow(workflowName, taskPath,
+                            MaxWaitTime = 100000, MaxFiles = 5,
+                            MaxEvents = 200000000)
+        return self.createParentFiles(acqEra, nFiles = nFiles,
+                                      workflowName = workflowName,
+                                      taskPath = taskPath)
+
+    def testUploadRetry(self):
+        """
+        _testUploadRetry_
+
+        A block whose upload failed is left alone until its retry time, the
+        delay doubling after each failure up to dbsMaxRetryDelay
+        """
+        dbsUploader = self.createUploader(FailingDbsApi, dbsRetryDelay = 100,
+                                          dbsMaxRetryDelay = 250)
+        self.createBlockFiles("Retry%s" % int(time.time()), 8)
+
+        startTime = time.time()
+        dbsUploader.algorithm()
+        self.assertEqual(len(dbsUploader.uploadState), 1)
+        blockName, state = dbsUploader.uploadState.items()[0]
+        self.assertEqual(state['attempts'], 1)
+        self.assertTrue(startTime + 100 <= state['retryTime'] <= time.time() + 100)
+        self.assertTrue("Service Unavailable" in state['error'])
+        self.assertEqual(dbsUploader.blockCache[blockName].status, 'Pending')
+
+        # not retried before its retry time
+        dbsUploader.algorithm()
+        self.assertEqual(state['attempts'], 1)
+        self.assertEqual(dbsUploader.queuedBlocks, set())
+
+        for attempts, delay in [(2, 200), (3, 250), (4, 250)]:
+            state['retryTime'] = 0
+            startTime = time.time()
+            dbsUploader.algorithm()
+            self.assertEqual(state['attempts'], attempts)
+            self.assertTrue(startTime + delay <= state['retryTime'] <= time.time() + delay)
+
+        # DBS is back, the block is uploaded on its next retry
+        dbsUploader.close()
+        DBSUploadPollerModule.DbsApi = LatencyDbsApi
+        state['retryTime'] = 0
+        dbsUploader.algorithm()
+        self.assertEqual(dbsUploader.uploadState, {})
+        self.assertFalse(blockName in dbsUploader.blockCache)
+        self.assertEqual(self.countFiles('InDBS'), 5)
+        dbsUploader.close()
+        return
+
+    def testIncrementalLoad(self):
+        """
+        _testIncrementalLoad_
+
+        The files already in an open block are not loaded again on the next
+        cycles, only the new ones
+        """
+        dbsUploader = self.createUploader(LatencyDbsApi)
+        dbsUtil = dbsUploader.dbsUtil
+        loadedFiles = []
+        findUploadableFilesByDAS = dbsUtil.findUploadableFilesByDAS
+        def recordLoad(datasetpath):
+            files = findUploadableFilesByDAS(datasetpath = datasetpath)
+            loadedFiles.append(len(files))
+            return files
+        dbsUtil.findUploadableFilesByDAS = recordLoad
+
+        acqEra = "Incremental%s" % int(time.time())
+        files = self.createBlockFiles(acqEra, 3)
+        dbsUploader.algorithm()
+        self.assertEqual(loadedFiles, [3])
+        openBlock = dbsUploader.openBlocks[(files[0]["datasetPath"], "malpaquet")]
+        self.assertEqual(openBlock.getNFiles(), 3)
+
+        dbsUploader.algorithm()
+        self.assertEqual(loadedFiles, [3])
+        self.assertEqual(openBlock.getNFiles(), 3)
+
+        # the open block is filled up and uploaded, the last files go into
+        # a new block
+        self.createBlockFiles(acqEra, 4)
+        dbsUploader.algorithm()
+        self.assertEqual(loadedFiles, [3, 4])
+        self.assertEqual(self.countFiles('InDBS'), 5)
+        openBlocks = [x['blockname'] for x in dbsUtil.findOpenBlocks()]
+        self.assertEqual(len(openBlocks), 1)
+        self.assertNotEqual(openBlocks[0], openBlock.getName())
+        self.assertEqual(dbsUploader.blockCache[openBlocks[0]].getNFiles(), 2)
+        dbsUploader.close()
+        return
+
+    def testRestartResume(self):
+        """
+        _testRestartResume_
+
+        After a restart the pending blocks are loaded from DBSBuffer and
+        uploaded, and the new files go into the open block loaded as well
+        """
+        dbsUploader = self.createUploader(FailingDbsApi)
+        acqEra = "Restart%s" % int(time.time())
+        files = self.createBlockFiles(acqEra, 8)
+        dbsUploader.algorithm()
+        self.assertEqual(len(dbsUploader.uploadState), 1)
+        pendingName = dbsUploader.uploadState.keys()[0]
+        blockKey = (files[0]["datasetPath"], "malpaquet")
+        openName = dbsUploader.openBlocks[blockKey].getName()
+        dbsUploader.close()
+        self.assertEqual(self.countFiles('InDBS'), 0)
+
+        dbsUploader = self.createUploader(LatencyDbsApi)
+        dbsUploader.algorithm()
+        self.assertFalse(pendingName in dbsUploader.blockCache)
+        self.assertEqual(self.countFiles('InDBS'), 5)
+        self.assertEqual(dbsUploader.openBlocks[blockKey].getName(), openName)
+
+        self.createBlockFiles(acqEra, 2)
+        dbsUploader.algorithm()
+        self.assertEqual([x['blockname'] for x in dbsUploader.dbsUtil.findOpenBlocks()], [openName])
+        self.assertEqual(dbsUploader.blockCache[openName].getNFiles(), 5)
+        dbsUploader.close()
+        return
+
     @attr("integration")
     def testBasicUpload(self):
         """
@@ -611,5 +795,54 @@ class DBSUploadTest(unittest.TestCase):
             del os.environ["DONT_TRAP_EXIT"]
         return
 
+    @attr('performance')
+    def testUploadThroughput(self):
+        """
+        _testUploadThroughput_
+
+        Time a cycle of the uploader over several datasets against a fake DBS
+        answering with a fixed latency, with a single upload process and
+        loading thread and then with several of them.
+        """
+        from WMComponent.DBS3Buffer import DBSUploadPoller as MockDBSUploadPoller
+        realDbsApi = MockDBSUploadPoller.DbsApi
+        MockDBSUploadPoller.DbsApi = LatencyDbsApi
+
+        myThread = threading.currentThread()
+        countSQL = "SELECT COUNT(*) FROM dbsbuffer_file WHERE status = 'InDBS'"
+        try:
+            for nWorkers in [1, 4]:
+                for i in range(5):
+                    acqEra = "Benchmark%s%d%d" % (int(time.time()), nWorkers, i)
+                    workflowName = 'TestWorkload%s' % acqEra
+                    taskPath = '/%s/TestProcessing' % workflowName
+                    self.injectWorkflow(workflowName, taskPath,
+                                        MaxWaitTime = 100000, MaxFiles = 10,
+                                        MaxEvents = 200000000)
+                    self.createParentFiles(acqEra, nFiles = 100,
+                                           workflowName = workflowName,
+                                           taskPath = taskPath)
+
+                config = self.getConfig()
+                config.DBS3Upload.nProcesses = nWorkers
+                config.DBS3Upload.loadWorkers = nWorkers
+                dbsUploader = MockDBSUploadPoller.DBSUploadPoller(config = config)
+
+                uploadedBefore = myThread.dbi.processData(countSQL)[0].fetchall()[0][0]
+                startTime = time.time()
+                dbsUploader.algorithm()
+                uploadTime = time.time() - startTime
+                dbsUploader.close()
+                uploaded = myThread.dbi.processData(countSQL)[0].fetchall()[0][0] - uploadedBefore
+
+                # the last block of each dataset stays open
+                self.assertEqual(uploaded, 450)
+                print("  Performance: %d upload processes and loading threads, %d files in %d blocks "
+                      "uploaded in %.2f secs, %.1f files/sec" % (nWorkers, uploaded, uploaded / 10,
+                                                                 uploadTime, uploaded / uploadTime))
+        finally:
+            MockDBSUploadPoller.DbsApi = realDbsApi
+        return
+
 if __name__ == '__main__':
     unittest.main()
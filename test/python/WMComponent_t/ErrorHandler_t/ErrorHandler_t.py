@@ -447,6 +447,7 @@ class ErrorHandlerTest(unittest.TestCase):
 
         config.ErrorHandler.failureExitCodes = []
         config.ErrorHandler.maxFailTime      = -10
+        config.ErrorHandler.triageProcesses  = 2
         testErrorHandler2 = ErrorHandlerPoller(config)
 
         changer.propagate(testJobGroup.jobs, 'created', 'new')
@@ -479,6 +480,10 @@ class ErrorHandlerTest(unittest.TestCase):
         idList = self.getJobs.execute(state = 'Created')
         self.assertEqual(len(idList), self.nJobs)
 
+        # All the jobs share the same FWJR, triaged once
+        self.assertEqual(testErrorHandler3.triageCache.keys(), [fwjrPath])
+        self.assertEqual(testErrorHandler3.triageReports([fwjrPath])[fwjrPath][2], [8020])
+
         return
 
 
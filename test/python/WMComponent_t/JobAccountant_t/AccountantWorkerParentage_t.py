@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+"""
+_AccountantWorkerParentage_t_
+
+Unit tests for the DBSBuffer parentage resolution of the AccountantWorker,
+run against an in memory lineage instead of the WMBS database.
+"""
+from __future__ import print_function
+
+import logging
+import sqlite3
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMComponent.JobAccountant.AccountantWorker import AccountantWorker
+from WMCore.Database.DBCore import DBInterface
+from WMCore.WMBS.MySQL.Files.GetParentInfo import GetParentInfo
+
+
+class SQLiteConnection(object):
+    """
+    Connection to an in memory SQLite database counting the statements run
+    """
+
+    def __init__(self):
+        self.db = sqlite3.connect(":memory:")
+        self.db.row_factory = sqlite3.Row
+        self.executions = 0
+
+    def execute(self, sql, binds = None):
+        self.executions += 1
+        return SQLiteResult(self.db.execute(sql, binds or {}))
+
+    def begin(self):
+        return self
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteResult(object):
+    """
+    The parts of a SQLAlchemy result proxy ResultSet uses
+    """
+    closed = False
+    returns_rows = True
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def close(self):
+        self.cursor.close()
+
+
+class SQLiteEngine(object):
+    """
+    Engine always handing out the same connection
+    """
+    dialect = None
+
+    def __init__(self):
+        self.conn = SQLiteConnection()
+
+    def connect(self):
+        return self.conn
+
+
+class ParentageWorker(AccountantWorker):
+    """
+    AccountantWorker with only what parentage resolution needs, using the
+    Files.GetParentInfo DAO on an in memory copy of the lineage
+    """
+
+    def __init__(self, parents, merged):
+        self.engine = SQLiteEngine()
+        db = self.engine.conn.db
+        db.execute("CREATE TABLE wmbs_file_details (id INTEGER PRIMARY KEY, lfn TEXT UNIQUE, merged INTEGER)")
+        db.execute("CREATE TABLE wmbs_file_parent (child INTEGER, parent INTEGER)")
+        db.execute("CREATE INDEX wmbs_file_parent_child ON wmbs_file_parent (child)")
+        fileIDs = {}
+        for lfn in merged:
+            fileIDs[lfn] = len(fileIDs) + 1
+        db.executemany("INSERT INTO wmbs_file_details (id, lfn, merged) VALUES (?, ?, ?)",
+                       [(fileIDs[lfn], lfn, merged[lfn]) for lfn in merged])
+        db.executemany("INSERT INTO wmbs_file_parent (child, parent) VALUES (?, ?)",
+                       [(fileIDs[child], fileIDs[parent]) for child in parents for parent in parents[child]])
+        dbi = DBInterface(logging.getLogger(), self.engine)
+        self.getParentInfoAction = GetParentInfo(logging.getLogger(), dbi)
+        self.dbsParentsMemo = {}
+
+    def executions(self):
+        """
+        Number of SQL statements run so far, setup excluded
+        """
+        return self.engine.conn.executions
+
+    def getDBConn(self):
+        return None
+
+    def existingTransaction(self):
+        return False
+
+
+def makeStepChainLineage(nJobs, nOutputs):
+    """
+    Lineage of nJobs three step jobs, each one reading a merged file and
+    writing nOutputs unmerged files in its last step which are then merged.
+    Returns the parents and merged maps and the merged output files.
+    """
+    parents = {}
+    merged = {}
+    outputs = []
+    for job in xrange(nJobs):
+        inputLFN = "/store/data/input/%i.root" % job
+        step1LFN = "/store/unmerged/step1/%i.root" % job
+        step2LFN = "/store/unmerged/step2/%i.root" % job
+        merged[inputLFN] = 1
+        merged[step1LFN] = 0
+        merged[step2LFN] = 0
+        parents[step1LFN] = [inputLFN]
+        parents[step2LFN] = [step1LFN]
+        for output in xrange(nOutputs):
+            step3LFN = "/store/unmerged/step3/%i/%i.root" % (job, output)
+            mergedLFN = "/store/mc/step3/%i/%i.root" % (job, output)
+            merged[step3LFN] = 0
+            merged[mergedLFN] = 1
+            parents[step3LFN] = [step2LFN]
+            parents[mergedLFN] = [step3LFN]
+            outputs.append(mergedLFN)
+    return parents, merged, outputs
+
+
+class AccountantWorkerParentageTest(unittest.TestCase):
+    """
+    _AccountantWorkerParentageTest_
+
+    """
+
+    def testFindDBSParents(self):
+        """
+        _testFindDBSParents_
+
+        Verify merged parents are found for direct, grand parent and
+        deeper lineage, and that shared parents are only looked up once.
+        """
+        parents, merged, outputs = makeStepChainLineage(2, 3)
+        parents["/store/mc/direct.root"] = ["/store/data/input/0.root"]
+        merged["/store/mc/direct.root"] = 1
+        parents["/store/unmerged/orphan.root"] = []
+        merged["/store/unmerged/orphan.root"] = 0
+        parents["/store/mc/orphan.root"] = ["/store/unmerged/orphan.root"]
+        merged["/store/mc/orphan.root"] = 1
+
+        worker = ParentageWorker(parents, merged)
+        lfns = outputs + ["/store/mc/direct.root", "/store/mc/orphan.root"]
+        result = worker.findDBSParentsBulk(lfns)
+
+        # one query per level of the lineage
+        self.assertEqual(worker.executions(), 2)
+        self.assertEqual(result["/store/mc/step3/0/2.root"], set(["/store/data/input/0.root"]))
+        self.assertEqual(result["/store/mc/step3/1/0.root"], set(["/store/data/input/1.root"]))
+        self.assertEqual(result["/store/mc/direct.root"], set(["/store/data/input/0.root"]))
+        self.assertEqual(result["/store/mc/orphan.root"], set())
+
+        self.assertEqual(worker.findDBSParents("/store/mc/step3/1/1.root"),
+                         set(["/store/data/input/1.root"]))
+        self.assertEqual(worker.executions(), 2)
+
+        worker.dbsParentsMemo = {}
+        self.assertEqual(worker.findDBSParents("/store/unmerged/step2/1.root"),
+                         set(["/store/data/input/1.root"]))
+        self.assertEqual(worker.executions(), 3)
+
+        # big levels are split in several queries
+        worker.dbsParentsMemo = {}
+        worker.getParentInfoAction.chunkSize = 4
+        self.assertEqual(worker.findDBSParentsBulk(lfns), result)
+        self.assertEqual(worker.executions(), 3 + 2 + 1)
+        return
+
+    @attr('performance')
+    def testFindDBSParentsPerformance(self):
+        """
+        _testFindDBSParentsPerformance_
+
+        Resolve the parents of 10k StepChain outputs one by one without memo
+        and then in bulk, counting the SQL statements actually run.
+        """
+        parents, merged, outputs = makeStepChainLineage(2000, 5)
+
+        worker = ParentageWorker(parents, merged)
+        startTime = time.time()
+        oneByOne = {}
+        for lfn in outputs:
+            worker.dbsParentsMemo = {}
+            oneByOne[lfn] = worker.findDBSParents(lfn)
+        oneByOneTime = time.time() - startTime
+        oneByOneCalls = worker.executions()
+
+        worker = ParentageWorker(parents, merged)
+        startTime = time.time()
+        bulk = worker.findDBSParentsBulk(outputs)
+        bulkTime = time.time() - startTime
+
+        self.assertEqual(bulk, oneByOne)
+        print("  Performance: %i outputs, one by one %i queries in %.2f secs, bulk %i queries in %.2f secs" %
+              (len(outputs), oneByOneCalls, oneByOneTime, worker.executions(), bulkTime))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+_JobAccountantPipeline_t_
+
+Unit tests for the pipelined mode of the JobAccountantPoller, using a
+fake accountant worker instead of the database.
+"""
+
+import time
+import threading
+import unittest
+from multiprocessing.pool import ThreadPool
+
+from WMComponent.JobAccountant.JobAccountantPoller import JobAccountantPoller
+
+
+class FakeAccountantWorker(object):
+    """
+    Accountant worker recording what it is asked to do
+    """
+
+    def __init__(self, commitTime = 0.0):
+        self.commitTime = commitTime
+        self.loaded = []
+        self.handled = []
+        self.committed = []
+        self.current = None
+        self.lock = threading.Lock()
+
+    def loadJobReport(self, job):
+        with self.lock:
+            self.loaded.append(job['id'])
+        return "report%i" % job['id']
+
+    def handleJobs(self, parameters, jobReports):
+        assert jobReports == ["report%i" % job['id'] for job in parameters]
+        self.current = [job['id'] for job in parameters]
+        self.handled.append(self.current)
+
+    def commitJobs(self):
+        time.sleep(self.commitTime)
+        self.committed.append(self.current)
+
+
+class PipelinePoller(JobAccountantPoller):
+    """
+    JobAccountantPoller without configuration and database
+    """
+
+    def __init__(self, worker, workSize, targetCommitTime):
+        self.accountantWorker = worker
+        self.accountantWorkSize = workSize
+        self.minWorkSize = 2
+        self.maxWorkSize = 40
+        self.targetCommitTime = targetCommitTime
+        self.loadPool = ThreadPool(2)
+
+
+class JobAccountantPipelineTest(unittest.TestCase):
+    """
+    _JobAccountantPipelineTest_
+
+    """
+
+    def testPipelinedAccounting(self):
+        """
+        _testPipelinedAccounting_
+
+        Every job is loaded, handled and committed once and in order, with
+        the slices growing while commits are fast.
+        """
+        worker = FakeAccountantWorker()
+        poller = PipelinePoller(worker, 5, 10)
+        jobs = [{'id': i, 'fwjr_path': '/tmp/%i.pkl' % i} for i in range(100)]
+        poller.pipelinedAccounting(jobs)
+        poller.terminate(None)
+
+        self.assertEqual(sorted(worker.loaded), range(100))
+        self.assertEqual(worker.committed, worker.handled)
+        self.assertEqual(sum(worker.committed, []), range(100))
+        self.assertEqual([len(x) for x in worker.handled], [5, 5, 10, 20, 40, 20])
+        self.assertEqual(poller.accountantWorkSize, 40)
+        return
+
+    def testAdaptWorkSize(self):
+        """
+        _testAdaptWorkSize_
+
+        Slow commits shrink the slices down to the minimum size.
+        """
+        worker = FakeAccountantWorker(commitTime = 0.02)
+        poller = PipelinePoller(worker, 16, 0.01)
+        jobs = [{'id': i, 'fwjr_path': '/tmp/%i.pkl' % i} for i in range(40)]
+        poller.pipelinedAccounting(jobs)
+        poller.terminate(None)
+
+        self.assertEqual(sum(worker.committed, []), range(40))
+        self.assertEqual([len(x) for x in worker.handled], [16, 16, 8])
+        self.assertEqual(poller.accountantWorkSize, 2)
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -30,7 +30,9 @@ from WMCore.WMBS.Job          import Job
 
 from WMCore.DataStructs.Run   import Run
 
-from WMComponent.JobArchiver.JobArchiverPoller import JobArchiverPoller
+import WMComponent.JobArchiver.JobArchiverPoller as JobArchiverPollerModule
+from WMComponent.JobArchiver.JobArchiverPoller import JobArchiverPoller, JobArchiverPollerException
+from WMComponent.JobArchiver.JobArchiverPoller import loadClusterIndex, openArchivedJob, tarJobCache
 
 from WMCore.JobStateMachine.ChangeState import ChangeState
 
@@ -257,6 +259,123 @@ class JobArchiverTest(unittest.TestCase):
 
         return
 
+    def testC_ClusterArchiveTest(self):
+        """
+        _ClusterArchiveTest_
+
+        Archive the jobs in a single gzipped archive per job cluster,
+        with several workers
+        """
+        myThread = threading.currentThread()
+
+        config = self.getConfig()
+        config.JobArchiver.archiveMode = "cluster"
+        config.JobArchiver.compression = "gz"
+        config.JobArchiver.compressLevel = 1
+        config.JobArchiver.archiveWorkers = 4
+
+        testJobGroup = self.createTestJobGroup()
+
+        changer = ChangeState(config)
+
+        cacheDir = os.path.join(self.testDir, 'test')
+
+        if not os.path.isdir(cacheDir):
+            os.mkdir(cacheDir)
+
+        for job in testJobGroup.jobs:
+            myThread.transaction.begin()
+            job["outcome"] = "success"
+            job.save()
+            myThread.transaction.commit()
+            path = os.path.join(cacheDir, job['name'])
+            os.makedirs(path)
+            f = open('%s/%s.out' %(path, job['name']),'w')
+            f.write(job['name'])
+            f.close()
+            job.setCache(path)
+
+        changer.propagate(testJobGroup.jobs, 'created', 'new')
+        changer.propagate(testJobGroup.jobs, 'executing', 'created')
+        changer.propagate(testJobGroup.jobs, 'complete', 'executing')
+        changer.propagate(testJobGroup.jobs, 'success', 'complete')
+
+        testJobArchiver = JobArchiverPoller(config = config)
+        testJobArchiver.algorithm()
+
+        dirList = os.listdir(cacheDir)
+        for job in testJobGroup.jobs:
+            self.assertEqual(job["name"] in dirList, False)
+
+        logPath = os.path.join(config.JobArchiver.componentDir, 'logDir', 'w', 'wf001')
+        self.assertEqual(sorted(os.listdir(logPath)),
+                         ['JobCluster_0.index', 'JobCluster_0.tar.gz'])
+        archivePath = os.path.join(logPath, 'JobCluster_0.tar.gz')
+        for job in testJobGroup.jobs:
+            tarball = openArchivedJob(archivePath, job['id'])
+            self.assertEqual(tarball.getnames(), ['Job_%i/%s.out' % (job['id'], job['name'])])
+            content = tarball.extractfile('Job_%i/%s.out' % (job['id'], job['name'])).read()
+            self.assertEqual(content, job['name'])
+
+        # the whole archive is readable as well
+        pipe = Popen(['tar', '-tzif', archivePath], stdout = PIPE, stderr = PIPE, shell = False)
+        stdout = pipe.communicate()[0]
+        self.assertEqual(len(stdout.splitlines()), self.nJobs)
+        return
+
+    def testD_ClusterArchiveFailure(self):
+        """
+        _ClusterArchiveFailure_
+
+        The jobs of a cluster archived before a failure stay indexed and
+        their caches are removed, the next run archives the others
+        """
+        config = self.getConfig()
+        config.JobArchiver.archiveMode = "cluster"
+        config.JobArchiver.compression = "gz"
+        config.JobArchiver.compressLevel = 1
+
+        jobs = []
+        for jobID in range(1, 6):
+            path = os.path.join(self.testDir, 'test', 'Job%i' % jobID)
+            os.makedirs(path)
+            f = open('%s/Job%i.out' % (path, jobID), 'w')
+            f.write('Job%i' % jobID)
+            f.close()
+            jobs.append({'id': jobID, 'cache_dir': path})
+        logDir = os.path.join(self.testDir, 'JobCluster_0')
+        archivePath = logDir + '.tar.gz'
+
+        def failingTarJobCache(jobID, cacheDir, cacheDirList, fileobj, *args):
+            if jobID == 3:
+                fileobj.write('partial tarball')
+                raise IOError('No space left on device')
+            return tarJobCache(jobID, cacheDir, cacheDirList, fileobj, *args)
+
+        testJobArchiver = JobArchiverPoller(config = config)
+        JobArchiverPollerModule.tarJobCache = failingTarJobCache
+        try:
+            self.assertRaises(JobArchiverPollerException,
+                              testJobArchiver.archiveJobCluster, (logDir, jobs))
+        finally:
+            JobArchiverPollerModule.tarJobCache = tarJobCache
+
+        index = loadClusterIndex(logDir + '.index')
+        self.assertEqual(sorted(index.keys()), [1, 2])
+        self.assertEqual(os.path.getsize(archivePath), index[2][0] + index[2][1])
+        self.assertEqual([os.path.isdir(job['cache_dir']) for job in jobs],
+                         [False, False, True, True, True])
+
+        # what was written of a job when the component was stopped is dropped
+        f = open(archivePath, 'ab')
+        f.write('interrupted tarball')
+        f.close()
+        self.assertEqual(testJobArchiver.archiveJobCluster((logDir, jobs))[0], 3)
+        for job in jobs:
+            tarball = openArchivedJob(archivePath, job['id'])
+            self.assertEqual(tarball.getnames(), ['Job_%i/Job%i.out' % (job['id'], job['id'])])
+        return
+
     @attr('integration')
     def testB_SpeedTest(self):
         """
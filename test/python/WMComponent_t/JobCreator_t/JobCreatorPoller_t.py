@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+_JobCreatorPoller_t_
+
+Unittest for the helper functions of the JobCreatorPoller, they do not
+need a database.
+"""
+
+import unittest
+
+from WMCore.DataStructs.Job import Job
+from WMCore.DataStructs.JobGroup import JobGroup
+from WMComponent.JobCreator.JobCreatorPoller import capResourceEstimates
+
+
+class JobCreatorPollerTest(unittest.TestCase):
+    """
+    _JobCreatorPollerTest_
+
+    """
+
+    constraints = {'MinWallTimeSecs': 3600, 'MaxWallTimeSecs': 36000,
+                   'MinRequestDiskKB': 1000000, 'MaxRequestDiskKB': 20000000}
+
+    def makeJobGroups(self, estimates):
+        """
+        _makeJobGroups_
+
+        Build two job groups out of a list of (time, disk, memory) estimates.
+        """
+        jobGroups = [JobGroup(), JobGroup()]
+        for i, (jobTime, disk, memory) in enumerate(estimates):
+            job = Job(name = "job%d" % i)
+            job["estimatedJobTime"] = jobTime
+            job["estimatedDiskUsage"] = disk
+            job["estimatedMemoryUsage"] = memory
+            jobGroups[i % 2].add(job)
+        for jobGroup in jobGroups:
+            jobGroup.commit()
+        return jobGroups
+
+    def getEstimates(self, jobGroups):
+        """
+        _getEstimates_
+
+        Return the (time, disk, memory) estimates of the jobs in the same
+        order they were given to makeJobGroups.
+        """
+        jobs = sorted([job for jobGroup in jobGroups for job in jobGroup.jobs],
+                      key = lambda job: int(job["name"][3:]))
+        return [(job["estimatedJobTime"], job["estimatedDiskUsage"],
+                 job["estimatedMemoryUsage"]) for job in jobs]
+
+    def testCapSingleCore(self):
+        """
+        _testCapSingleCore_
+
+        Estimates below the minimum or missing are raised to it, estimates
+        above the maximum are lowered to it and the others are kept.
+        """
+        estimates = [(None, None, 2000),
+                     (0, 0, 2000),
+                     (100, 500000, 1000),
+                     (7200, 5000000, 2500),
+                     (100000, 50000000, 4000),
+                     (36000, 20000000, 8000)]
+        jobGroups = self.makeJobGroups(estimates)
+        capResourceEstimates(jobGroups, 1, self.constraints)
+        self.assertEqual(self.getEstimates(jobGroups),
+                         [(3600, 1000000, 2000),
+                          (3600, 1000000, 2000),
+                          (3600, 1000000, 1000),
+                          (7200, 5000000, 2500),
+                          (36000, 20000000, 4000),
+                          (36000, 20000000, 8000)])
+        return
+
+    def testCapMultiCore(self):
+        """
+        _testCapMultiCore_
+
+        With several cores the time is divided by the expected efficiency
+        after the minimum is applied and the maximum disk scales with the
+        number of cores.
+        """
+        estimates = [(None, None, 2000),
+                     (100, 500000, 1000),
+                     (64000, 50000000, 2500),
+                     (640000, 100000000, 16000)]
+        jobGroups = self.makeJobGroups(estimates)
+        capResourceEstimates(jobGroups, 4, self.constraints)
+        self.assertEqual(self.getEstimates(jobGroups),
+                         [(3600 / 3.2, 1000000, 2000),
+                          (3600 / 3.2, 1000000, 1000),
+                          (20000, 50000000, 2500),
+                          (36000, 80000000, 16000)])
+        return
+
+    def testCapEmpty(self):
+        """
+        _testCapEmpty_
+
+        Nothing to do for empty job groups.
+        """
+        jobGroups = self.makeJobGroups([])
+        capResourceEstimates(jobGroups, 8, self.constraints)
+        self.assertEqual(self.getEstimates(jobGroups), [])
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,6 +25,44 @@ from WMQuality.TestInit import TestInit
 
 from nose.plugins.attrib import attr
 
+class PhEDExStandIn(object):
+    """
+    _PhEDExStandIn_
+
+    Local PhEDEx accepting every injection after a fixed latency, like the
+    remote data service would, for the injection benchmark
+    """
+    latency = 0.5
+    lock = threading.Lock()
+    injections = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def getNodeMap(self):
+        return {"phedex": {"node": [{"kind": "MSS", "se": "srm-cms.cern.ch", "name": "T1_CH_CERN_MSS"},
+                                    {"kind": "Disk", "se": "se.fnal.gov", "name": "T1_US_FNAL_Disk"}]}}
+
+    def injectBlocks(self, node, xmlData, strict = 1):
+        time.sleep(self.latency)
+        with self.lock:
+            self.injections.append((node, xmlData.count("<file ")))
+        return {"phedex": {"injected": {"stats": {}}}}
+
+class StaticDAO(object):
+    """
+    _StaticDAO_
+
+    DAO returning the same data every time, and recording the calls made
+    """
+    def __init__(self, result = None):
+        self.result = result
+        self.calls = []
+
+    def execute(self, *args, **kwargs):
+        self.calls.append(args)
+        return self.result
+
 class PhEDExInjectorPollerTest(unittest.TestCase):
     """
     _PhEDExInjectorPollerTest_
@@ -332,5 +370,57 @@ class PhEDExInjectorPollerTest(unittest.TestCase):
 
         return
 
+    @attr('performance')
+    def testInjectionPerformance(self):
+        """
+        _testInjectionPerformance_
+
+        Time the injection of 100k pending files, spread over two locations,
+        into a PhEDEx stand-in answering with a fixed latency, with a single
+        injection thread and then with several of them.
+        """
+        from WMComponent.PhEDExInjector import PhEDExInjectorPoller as PollerModule
+        realPhEDEx = PollerModule.PhEDEx
+        PollerModule.PhEDEx = PhEDExStandIn
+
+        uninjectedFiles = {}
+        for location in ["srm-cms.cern.ch", "se.fnal.gov"]:
+            uninjectedFiles[location] = {}
+            for i in range(20):
+                dataset = "/Benchmark%d/%s-v1/RECO" % (i, location)
+                uninjectedFiles[location][dataset] = {}
+                for j in range(25):
+                    files = []
+                    for k in range(100):
+                        files.append({"lfn": "%s/%d/%d.root" % (dataset, j, k), "size": 1024,
+                                      "checksum": {"adler32": "1234", "cksum": "5678"}})
+                    uninjectedFiles[location][dataset]["%s#%d" % (dataset, j)] = {"is-open": "y",
+                                                                                "files": files}
+
+        try:
+            for nWorkers in [1, 4]:
+                config = self.createConfig()
+                config.PhEDExInjector.injectionWorkers = nWorkers
+                poller = PollerModule.PhEDExInjectorPoller(config)
+                poller.setup(parameters = None)
+                poller.getUninjected = StaticDAO(uninjectedFiles)
+                poller.setStatus = StaticDAO()
+                del PhEDExStandIn.injections[:]
+
+                startTime = time.time()
+                poller.injectFiles()
+                injectionTime = time.time() - startTime
+
+                nFiles = sum([len(x[0]) for x in poller.setStatus.calls])
+                self.assertEqual(nFiles, 100000)
+                self.assertEqual(sum([x[1] for x in PhEDExStandIn.injections]), 100000)
+                self.assertTrue(max([x[1] for x in PhEDExStandIn.injections]) <= 5000)
+                print("  Performance: %d injection threads, %d files injected in %d payloads "
+                      "in %.2f secs, %.0f files/sec" % (nWorkers, nFiles, len(PhEDExStandIn.injections),
+                                                         injectionTime, nFiles / injectionTime))
+        finally:
+            PollerModule.PhEDEx = realPhEDEx
+        return
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+_Processor_t_
+
+Unittest for the WMCore.Alerts.ZMQ.Processor sinks fed from a worker
+thread.
+
+"""
+
+import threading
+import unittest
+
+from WMCore.Alerts.Alert import Alert
+from WMCore.Alerts.ZMQ.Processor import AsyncSink
+
+
+class SlowSink(object):
+    """
+    _SlowSink_
+
+    Keep the lists of alerts sent, the first call waits to be released
+    """
+
+    def __init__(self, fail = False):
+        self.received = []
+        self.fail = fail
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def send(self, alerts):
+        self.started.set()
+        self.release.wait(10)
+        self.received.append(alerts)
+        if self.fail:
+            raise RuntimeError("sink failure")
+
+
+class ProcessorTest(unittest.TestCase):
+    """
+    _ProcessorTest_
+
+    """
+
+    def makeAlerts(self, first, last):
+        return [Alert(Source = "Source%s" % i, Level = 5) for i in range(first, last)]
+
+    def testAsyncSink(self):
+        """
+        The alerts queued while the sink is busy are sent together, the
+        ones over the size of the queue are dropped
+        """
+        sink = SlowSink()
+        asyncSink = AsyncSink("slow", sink, queueSize = 3)
+        asyncSink.send(self.makeAlerts(0, 2))
+        self.assertTrue(sink.started.wait(10))
+
+        # the sink is busy, the producer isn't blocked
+        for i in range(2, 5):
+            asyncSink.send(self.makeAlerts(i, i + 1))
+        asyncSink.send(self.makeAlerts(5, 8))
+        self.assertEqual(asyncSink.dropped, 3)
+
+        sink.release.set()
+        asyncSink.close()
+        self.assertFalse(asyncSink.worker.isAlive())
+        self.assertEqual(sink.received, [self.makeAlerts(0, 2), self.makeAlerts(2, 5)])
+        self.assertEqual(asyncSink.sent, 5)
+        return
+
+    def testAsyncSinkFailure(self):
+        """
+        A failing sink doesn't stop its worker
+        """
+        sink = SlowSink(fail = True)
+        sink.release.set()
+        asyncSink = AsyncSink("failing", sink)
+        asyncSink.send(self.makeAlerts(0, 1))
+        asyncSink.send(self.makeAlerts(1, 2))
+        asyncSink.close()
+        self.assertFalse(asyncSink.worker.isAlive())
+        self.assertEqual(sum([len(x) for x in sink.received]), 2)
+        self.assertEqual(asyncSink.sent, 0)
+        self.assertEqual(asyncSink.dropped, 0)
+        return
+
+    def testClose(self):
+        """
+        The alerts still queued are sent on close
+        """
+        sink = SlowSink()
+        asyncSink = AsyncSink("closing", sink)
+        asyncSink.send(self.makeAlerts(0, 1))
+        self.assertTrue(sink.started.wait(10))
+        asyncSink.send(self.makeAlerts(1, 3))
+        closer = threading.Thread(target = asyncSink.close)
+        closer.start()
+        sink.release.set()
+        closer.join(10)
+        self.assertFalse(asyncSink.worker.isAlive())
+        self.assertEqual(sink.received, [self.makeAlerts(0, 1), self.makeAlerts(1, 3)])
+        self.assertEqual(asyncSink.sent, 3)
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+"""
+_Sender_t_
+
+Unittest for the WMCore.Alerts.ZMQ.Sender class, the alerts are sent
+to a fake work channel.
+
+"""
+
+import json
+import time
+import unittest
+
+import zmq
+
+from WMCore.Alerts.Alert import Alert
+from WMCore.Alerts.ZMQ.Sender import Sender
+
+
+class FakeSocket(object):
+    """
+    _FakeSocket_
+
+    Keep the messages sent, or refuse them as a full channel does
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.full = False
+
+    def send_multipart(self, frames, flags = 0):
+        if self.full:
+            raise zmq.Again()
+        self.messages.append([json.loads(x) for x in frames])
+
+
+class SenderTest(unittest.TestCase):
+    """
+    _SenderTest_
+
+    """
+
+    def makeSender(self, **args):
+        """
+        _makeSender_
+
+        Sender sending to a fake work channel
+        """
+        sender = Sender("tcp://127.0.0.1:15557", "tcp://127.0.0.1:15559",
+                        label = "SenderTest", **args)
+        sender._workChannel = FakeSocket()
+        return sender
+
+    def makeAlert(self, i = 0, **args):
+        return Alert(Component = "SenderTest", Source = "Source%s" % i, Type = "Type",
+                     Level = 5, Details = {"count": i}, **args)
+
+    def testIsDuplicate(self):
+        """
+        Identical alerts are suppressed within the window, the next one
+        sent after it carries the number suppressed
+        """
+        sender = self.makeSender(dedupWindow = 0.2)
+        self.assertFalse(sender._isDuplicate(self.makeAlert()))
+        self.assertTrue(sender._isDuplicate(self.makeAlert()))
+        self.assertTrue(sender._isDuplicate(self.makeAlert(HostName = "other")))
+        self.assertEqual(sender.suppressed, 2)
+
+        # the details, level, workload... are part of the key
+        self.assertFalse(sender._isDuplicate(self.makeAlert(1)))
+        alert = self.makeAlert()
+        alert["Details"] = {"count": 0, "more": 1}
+        self.assertFalse(sender._isDuplicate(alert))
+        alert = self.makeAlert()
+        alert["Level"] = 10
+        self.assertFalse(sender._isDuplicate(alert))
+        self.assertFalse(sender._isDuplicate(self.makeAlert(Workload = "Workload")))
+
+        time.sleep(0.25)
+        alert = self.makeAlert()
+        self.assertFalse(sender._isDuplicate(alert))
+        self.assertEqual(alert["Suppressed"], 2)
+        alert = self.makeAlert(1)
+        self.assertFalse(sender._isDuplicate(alert))
+        self.assertFalse("Suppressed" in alert)
+
+        # the table only keeps the recent alerts when it grows too much
+        sender.MAX_DEDUP_KEYS = 5
+        for i in range(10):
+            sender._isDuplicate(self.makeAlert(100 + i))
+        time.sleep(0.25)
+        sender._isDuplicate(self.makeAlert(200))
+        self.assertEqual(len(sender._recent), 1)
+
+        # duplicates are not sent
+        sender(self.makeAlert(300))
+        sender(self.makeAlert(300))
+        self.assertEqual(len(sender._workChannel.messages), 1)
+        return
+
+    def testSend(self):
+        """
+        Without batching each alert is sent on its own, alerts are dropped
+        rather than blocking when the channel is full
+        """
+        sender = self.makeSender()
+        for i in range(3):
+            sender(self.makeAlert(i))
+        self.assertEqual(sender._workChannel.messages,
+                         [[self.makeAlert(i)] for i in range(3)])
+        self.assertEqual(sender.sent, 3)
+
+        sender._workChannel.full = True
+        sender(self.makeAlert(3))
+        self.assertEqual(sender.sent, 3)
+        self.assertEqual(sender.dropped, 1)
+        self.assertEqual(len(sender._workChannel.messages), 3)
+        return
+
+    def testFlushOnSize(self):
+        """
+        Full batches are sent at once, the rest on flush
+        """
+        sender = self.makeSender(batchSize = 10, flushInterval = 60)
+        for i in range(25):
+            sender(self.makeAlert(i))
+        messages = sender._workChannel.messages
+        self.assertEqual([len(x) for x in messages], [10, 10])
+        self.assertEqual(messages[1][0], self.makeAlert(10))
+        self.assertEqual(len(sender._batch), 5)
+
+        sender.flush()
+        self.assertEqual([len(x) for x in messages], [10, 10, 5])
+        self.assertEqual(messages[2][-1], self.makeAlert(24))
+        self.assertEqual(sender.sent, 25)
+        sender.flush()
+        self.assertEqual(len(messages), 3)
+        return
+
+    def testFlushOnTimer(self):
+        """
+        Batches which don't fill up are sent after the flush interval
+        """
+        sender = self.makeSender(batchSize = 10, flushInterval = 0.1)
+        for i in range(3):
+            sender(self.makeAlert(i))
+        messages = sender._workChannel.messages
+        self.assertEqual(messages, [])
+
+        time.sleep(0.5)
+        self.assertEqual(messages, [[self.makeAlert(i) for i in range(3)]])
+        self.assertEqual(sender._batch, [])
+
+        # the batch started more than the interval ago is sent with the
+        # next alert
+        with sender._lock:
+            sender(self.makeAlert(3))
+            sender._batchStart -= 1
+            sender(self.makeAlert(4))
+        self.assertEqual(messages[-1], [self.makeAlert(3), self.makeAlert(4)])
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
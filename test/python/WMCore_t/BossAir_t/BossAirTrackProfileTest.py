@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+_BossAirTrackProfileTest_
+
+Time one BossAirAPI.track() cycle on a large number of running jobs,
+using a stub plugin and without any database.
+"""
+
+from __future__ import print_function, division
+
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.BossAir.BossAirAPI import BossAirAPI
+from WMCore.BossAir.RunJob import RunJob
+
+
+class StubTrackPlugin(object):
+    """
+    Plugin reporting a small fraction of the jobs as changed or complete
+    """
+    states = ['Idle', 'Running']
+
+    def __init__(self, changeEvery=100, completeEvery=100):
+        self.changeEvery = changeEvery
+        self.completeEvery = completeEvery
+
+    def track(self, jobs, info=None):
+        running, changes, completes = [], [], []
+        for job in jobs:
+            job['globalState'] = 'Running'
+            if job['id'] % self.completeEvery == 0:
+                completes.append(job)
+                continue
+            if job['id'] % self.changeEvery == 1:
+                job['status'] = 'Running'
+                changes.append(job)
+            running.append(job)
+        return running, changes, completes
+
+
+class StubBossAirAPI(BossAirAPI):
+    """
+    BossAirAPI whose database calls are replaced by in memory stubs
+    """
+
+    def __init__(self, nJobs):
+        self.nJobs = nJobs
+        self.plugins = {'StubTrackPlugin': StubTrackPlugin()}
+        self.states = StubTrackPlugin.states
+        self.updated = []
+        self.completed = []
+
+    def _listRunJobs(self, active=True):
+        runJobs = []
+        for i in xrange(self.nJobs):
+            rj = RunJob(jobid=i + 1)
+            rj.update({'id': i + 1, 'status': 'Idle', 'plugin': 'StubTrackPlugin',
+                       'status_time': 1000, 'gridid': 'grid.%i' % i})
+            runJobs.append(rj)
+        return runJobs
+
+    def _loadByID(self, jobs):
+        return [{'id': job['id'], 'cache_dir': '/tmp/job_%i' % job['id'], 'userdn': 'someone'}
+                for job in jobs]
+
+    def _updateJobs(self, jobs):
+        self.updated.extend(jobs)
+
+    def _complete(self, jobs):
+        self.completed.extend(jobs)
+
+
+class BossAirTrackProfileTest(unittest.TestCase):
+    """
+    _BossAirTrackProfileTest_
+
+    """
+
+    def testTrackSubset(self):
+        """
+        _testTrackSubset_
+
+        Filtering by running job and WMBS IDs keeps every requested job
+        """
+        baAPI = StubBossAirAPI(1000)
+        jobs = baAPI.track(runJobIDs=range(1, 21), buildWMBSJobs=False)
+        self.assertEqual(len(jobs) + len(baAPI.completed), 20)
+        jobs = baAPI.track(wmbsIDs=range(1, 1001), buildWMBSJobs=False)
+        self.assertEqual(len(jobs), 990)
+        jobs = baAPI.track(runJobIDs=[2, 3, 4], wmbsIDs=[3, 4, 5], buildWMBSJobs=False)
+        self.assertEqual(sorted(x['jobid'] for x in jobs), [3, 4])
+        self.assertEqual(jobs[0]['globalState'], 'Running')
+        self.assertEqual(jobs[0]['cache_dir'], '/tmp/job_3')
+        return
+
+    @attr('performance')
+    def testTrackCycle(self):
+        """
+        _testTrackCycle_
+
+        Time a tracking cycle over 200k running jobs
+        """
+        nJobs = 200000
+        baAPI = StubBossAirAPI(nJobs)
+
+        startTime = time.time()
+        jobs = baAPI.track(buildWMBSJobs=False)
+        endTime = time.time()
+
+        self.assertEqual(len(jobs), nJobs - nJobs // 100)
+        self.assertEqual(len(baAPI.updated), nJobs // 100)
+        self.assertEqual(len(baAPI.completed), nJobs // 100)
+        print("  Performance: one tracking cycle of %i jobs in %.2f secs" % (nJobs, endTime - startTime))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,16 +1,24 @@
 #!/usr/bin/env python
 #pylint: disable=E1101,C0103,R0902
 
+from __future__ import print_function
 
+import os
+import time
 import unittest
 
+from nose.plugins.attrib import attr
+
 from WMCore.Configuration import ConfigSection
 from WMCore.Configuration import Configuration
 from WMCore.Configuration import ConfigurationEx
 from WMCore.Configuration import loadConfigurationFile
 from WMCore.Configuration import saveConfigurationFile
 
+from WMCore.FwkJobReport.Report import Report
+from WMCore.WMBase import getTestBase
 from WMQuality.TestInit import TestInit
+import WMCore_t.WMSpec_t.WMWorkload_t as WMWorkload_t
 
 
 class ConfigurationExTest(unittest.TestCase):
@@ -324,5 +332,74 @@ class ConfigurationTest(unittest.TestCase):
         self.assertEqual(d["Task1"]["subSection"]["value3"], "MyValue3")
 
 
+    def testI_UpdateFromDict(self):
+        """
+        Settings updated from a dictionary are the same as the ones set
+        one by one, and nothing is set if a value is not supported.
+
+        """
+        values = {"string": "value", "unicode": u"value", "int": 1,
+                  "list": [1, ["2", 3.0]], "dict": {"a": [None, True]},
+                  "section": ConfigSection("section")}
+        config = ConfigSection("config")
+        config.update_from_dict_(values)
+        self.assertEqual(config._internal_children, set(["section"]))
+        self.assertTrue(config.section._internal_parent_ref is config)
+        expected = ConfigSection("config")
+        for key, value in values.iteritems():
+            setattr(expected, key, value)
+        self.assertEqual(config.pythonise_(), expected.pythonise_())
+        self.assertEqual(config.dictionary_(), expected.dictionary_())
+        self.assertTrue(isinstance(config.unicode, str))
+
+        config = ConfigSection("config")
+        self.assertRaises(RuntimeError, config.update_from_dict_,
+                          {"good": 1, "bad": [1, {"bad": object()}]})
+        self.assertEqual(config.listSections_(), [])
+        self.assertRaises(RuntimeError, setattr, config, "bad", (1, [object()]))
+
+        config._internal_skipChecks = True
+        config.update_from_dict_({"callable": len})
+        self.assertEqual(config.callable, len)
+
+
+    @attr('performance')
+    def testJ_Performance(self):
+        """
+        Time building ConfigSections, parsing a FWJR and building a spec
+
+        """
+        values = {"string": "value", "int": 1, "float": 1.0, "none": None,
+                  "list": ["a", "b", "c"], "dict": {"a": [1, 2], "b": "c"}}
+        startTime = time.time()
+        for i in range(10000):
+            section = ConfigSection("file%d" % i)
+            for key, value in values.iteritems():
+                setattr(section, key, value)
+            section.section_("runs")
+        setTime = time.time() - startTime
+
+        startTime = time.time()
+        for i in range(10000):
+            section = ConfigSection("file%d" % i)
+            section.update_from_dict_(values)
+            section.section_("runs")
+        updateTime = time.time() - startTime
+
+        xmlPath = os.path.join(getTestBase(), "WMCore_t/FwkJobReport_t/CMSSWProcessingReport.xml")
+        startTime = time.time()
+        for _ in range(20):
+            Report("cmsRun1").parse(xmlPath)
+        parseTime = (time.time() - startTime) / 20
+
+        startTime = time.time()
+        WMWorkload_t.WMWorkloadTest("testTreeIndexInvalidation").makeTaskChainWorkload(20)
+        buildTime = time.time() - startTime
+
+        print("  Performance: 10000 sections set in %.3f secs, updated in %.3f secs, "
+              "FWJR parsed in %.4f secs, 20 task spec built in %.3f secs" %
+              (setTime, updateTime, parseTime, buildTime))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -5,12 +5,13 @@ _JobPackage_
 Unittests for JobPackage persistency mechanism
 """
 
+import cPickle
 import os
 import unittest
 
 from WMQuality.TestInit import TestInit
 
-from WMCore.DataStructs.JobPackage import JobPackage
+from WMCore.DataStructs.JobPackage import JobPackage, readPackageIndex
 from WMCore.DataStructs.Job import Job
 
 class JobPackageTest(unittest.TestCase):
@@ -144,5 +145,41 @@ class JobPackageTest(unittest.TestCase):
 
         return
 
+    def testIndexedPackage(self):
+        """
+        _testIndexedPackage_
+
+        Verify that single jobs can be loaded from the indexed package and
+        that packages pickled as a whole still load.
+        """
+        package = JobPackage(directory = "/some/dir")
+
+        for i in range(100):
+            newJob = Job("Job%s" % i)
+            newJob["id"] = i
+            newJob["task"] = "/SomeWorkflow/Task%d" % (i % 2)
+            package[i] = newJob
+
+        package.save(self.persistFile)
+
+        with open(self.persistFile, "rb") as handle:
+            index = readPackageIndex(handle)
+        self.assertEqual(index["directory"], "/some/dir")
+        self.assertEqual(sorted(index["jobs"].keys()), range(100))
+        self.assertEqual(index["jobs"][7][2], "/SomeWorkflow/Task1")
+
+        newPackage = JobPackage()
+        newPackage.load(self.persistFile, jobID = 7)
+        self.assertEqual(sorted(newPackage.keys()), [7, "directory"])
+        self.assertEqual(newPackage[7]["name"], "Job7")
+        self.assertEqual(newPackage["directory"], "/some/dir")
+
+        with open(self.persistFile, "wb") as handle:
+            cPickle.dump(package, handle, -1)
+        newPackage.load(self.persistFile, jobID = 7)
+        self.assertEqual(len(newPackage.keys()), 101)
+        self.assertEqual(newPackage[99]["name"], "Job99")
+        return
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,21 @@
 #! /usr/bin/env python
 
+from __future__ import print_function
+
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
 import unittest
+from StringIO import StringIO
+
+from nose.plugins.attrib import attr
 
 #import FWCore.ParameterSet.Config as cms
-from WMCore.DataStructs.LumiList import LumiList
+from WMCore.DataStructs.LumiList import LumiList, _iterJSONObject
 
 class LumiListTest(unittest.TestCase):
     """
@@ -336,6 +348,97 @@ class LumiListTest(unittest.TestCase):
         with self.assertRaises(RuntimeError):
             w = LumiList(wmagentFormat=([1], ['1,2,3']))  # Need twice as many lumis as runs
 
+    def testRangeAlgebra(self):
+        """
+        Set operations on ranges match the ones on expanded lumis
+        """
+        random.seed(1)
+        for _ in range(200):
+            lumis = []
+            for _ in range(2):
+                lumis.append(dict((str(run), random.sample(range(1, 60), random.randint(1, 40)))
+                                  for run in random.sample(range(1, 5), random.randint(1, 3))))
+            a = LumiList(runsAndLumis = lumis[0])
+            b = LumiList(runsAndLumis = lumis[1])
+            aSet = set(a.getLumis())
+            bSet = set(b.getLumis())
+            self.assertEqual(len(aSet), sum([len(set(x)) for x in lumis[0].values()]))
+            self.assertEqual((a - b).getLumis(), sorted(aSet - bSet))
+            self.assertEqual((a & b).getLumis(), sorted(aSet & bSet))
+            self.assertEqual((a | b).getLumis(), sorted(aSet | bSet))
+            self.assertEqual(a.filterLumis(sorted(bSet)), sorted(aSet & bSet))
+
+    def testStreamingRead(self):
+        """
+        JSON files are read a run at a time, whatever the layout
+        """
+        compactList = {'1': [[1, 33], [35, 35], [37, 47]], '2': [[49, 75], [77, 130], [133, 136]]}
+        for indent in [None, 4]:
+            with open('lumiTest.json', 'w') as jsonFile:
+                json.dump(compactList, jsonFile, indent = indent)
+            self.assertEqual(LumiList(filename = 'lumiTest.json').getCompactList(), compactList)
+        with open('lumiTest.json', 'w') as jsonFile:
+            jsonFile.write('{"1": [[1, 2]], "2": [[3, ')
+        self.assertRaises(ValueError, LumiList, filename = 'lumiTest.json')
+
+    def testMalformedJSON(self):
+        """
+        Separators are checked as strictly as json.load does
+        """
+        for document in ['{"1": [[1, 2]] "2": [[3, 4]]}', '{"1": [[1, 2]],, "2": [[3, 4]]}',
+                         '{"1" [[1, 2]]}', '{"1":: [[1, 2]]}', '{"1": [[1, 2]],}', '{, "1": [[1, 2]]}',
+                         '{"1": [[1, 2]]:}', '{1: [[1, 2]]}', '{"1": [[1, 2]]', '{"1": [[1, 2]]} {}', '']:
+            self.assertRaises(ValueError, json.loads, document)
+            with open('lumiTest.json', 'w') as jsonFile:
+                jsonFile.write(document)
+            self.assertRaises(ValueError, LumiList, filename = 'lumiTest.json')
+        self.assertRaises(ValueError, dict, _iterJSONObject(StringIO('[[1, 2]]')))
+
+        # valid documents are still read whatever the chunks they are read by
+        for document in ['{}', ' { } \n', '{"1": [[1, 2]],\n "2" : [[3, 4]] }']:
+            for chunkSize in [1, 3, 1024]:
+                self.assertEqual(dict(_iterJSONObject(StringIO(document), chunkSize)), json.loads(document))
+        return
+
+    @attr('performance')
+    def testPerformance(self):
+        """
+        Time reading a certification JSON and combining it with another
+        """
+        random.seed(1)
+        golden = {}
+        for run in range(190000, 192000):
+            ranges = []
+            lumi = 1
+            for _ in range(random.randint(1, 200)):
+                first = lumi + random.randint(0, 20)
+                lumi = first + random.randint(0, 200)
+                ranges.append([first, lumi])
+                lumi += 2
+            golden[str(run)] = ranges
+        testDir = tempfile.mkdtemp()
+        goldenFile = os.path.join(testDir, 'golden.json')
+        with open(goldenFile, 'w') as jsonFile:
+            json.dump(golden, jsonFile)
+
+        startTime = time.time()
+        a = LumiList(filename = goldenFile)
+        readTime = time.time() - startTime
+        b = LumiList(compactList = dict((run, [[x[0] + 10, x[1] + 50] for x in ranges[::2]])
+                                        for run, ranges in golden.items()))
+        startTime = time.time()
+        [a - b, a & b, a | b]
+        setTime = time.time() - startTime
+        pairs = list(itertools.islice(b.iterLumis(), 1000000))
+        startTime = time.time()
+        a.filterLumis(pairs)
+        filterTime = time.time() - startTime
+        shutil.rmtree(testDir)
+
+        print("  Performance: %d runs read in %.3f secs, combined in %.3f secs, "
+              "%d lumis filtered in %.3f secs" %
+              (len(a), readTime, setTime, len(pairs), filterTime))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+"""
+_RunLumis_t_
+
+Unittest for the WMCore.DataStructs.RunLumis class
+
+"""
+from __future__ import print_function
+
+import json
+import random
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.DataStructs.File import File
+from WMCore.DataStructs.Fileset import Fileset
+from WMCore.DataStructs.Mask import Mask
+from WMCore.DataStructs.Run import Run
+from WMCore.DataStructs.RunLumis import RunLumis
+from WMCore.DataStructs.Subscription import Subscription
+from WMCore.DataStructs.Workflow import Workflow
+from WMCore.FwkJobReport.Report import Report
+from WMCore.JobSplitting.SplitterFactory import SplitterFactory
+from WMCore.Wrappers.JsonWrapper.JSONThunker import JSONThunker
+
+
+class RunLumisTest(unittest.TestCase):
+    """
+    _RunLumisTest_
+
+    """
+
+    def testSetOperations(self):
+        """
+        Build, combine and look up runs and lumis
+        """
+        runLumis = RunLumis([Run(1, 5, 3, 4, 3), Run(2, 10), Run(1, 1, 2)])
+        self.assertEqual(runLumis.runs(), [1, 2])
+        self.assertEqual(runLumis.lumis(1), [1, 2, 3, 4, 5])
+        self.assertEqual(len(runLumis), 6)
+        self.assertTrue((1, 4) in runLumis)
+        self.assertFalse((1, 6) in runLumis)
+        self.assertFalse((3, 1) in runLumis)
+        self.assertEqual(list(runLumis)[:2], [(1, 1), (1, 2)])
+        self.assertEqual(runLumis.getRuns(), [Run(1, 1, 2, 3, 4, 5), Run(2, 10)])
+
+        other = RunLumis({1: [4, 5, 6], 3: [1]})
+        self.assertEqual((runLumis | other).lumis(1), [1, 2, 3, 4, 5, 6])
+        self.assertEqual((runLumis | other).runs(), [1, 2, 3])
+        self.assertEqual(runLumis & other, RunLumis({1: [4, 5]}))
+        self.assertEqual(runLumis - other, RunLumis({1: [1, 2, 3], 2: [10]}))
+        self.assertEqual(runLumis.intersectionWithRanges({1: [[2, 3], [5, 100]], 3: [[1, 1]]}),
+                         RunLumis({1: [2, 3, 5]}))
+
+        # equal containers have the same hash, which follows updates
+        copy = RunLumis(runLumis)
+        self.assertEqual(hash(copy), hash(runLumis))
+        self.assertEqual(len(set([copy, runLumis])), 1)
+        copy.addLumis(2, [11])
+        self.assertNotEqual(copy, runLumis)
+        self.assertNotEqual(hash(copy), hash(runLumis))
+        return
+
+    def testIncrementalAdds(self):
+        """
+        Lumis added one by one, in small and in big batches, in any order
+        """
+        runLumis = RunLumis()
+        runLumis.addLumis(1, [7, 3])
+        runLumis.addLumis(1, [5, 3, 9])
+        runLumis.addLumis(1, range(20, 0, -2))
+        runLumis.addLumis(1, range(100, 120))
+        runLumis.addLumis(1, [0])
+        self.assertEqual(runLumis.lumis(1), [0] + sorted(set([3, 5, 7, 9] + range(2, 21, 2))) + range(100, 120))
+        self.assertEqual(len(runLumis), 1 + 14 + 20)
+
+        # arrays of other containers are merged without being sorted again
+        runLumis.update(RunLumis({1: range(15, 25), 2: [1]}))
+        self.assertEqual(runLumis, RunLumis({1: [0, 3, 5, 7, 9] + range(2, 21, 2) + range(15, 25) + range(100, 120),
+                                             2: [1]}))
+
+        # overlapping and unsorted mask ranges select each lumi once
+        self.assertEqual(runLumis.intersectionWithRanges({1: [[100, 105], [0, 4], [2, 3], [103, 110]]}).lumis(1),
+                         [0, 2, 3, 4] + range(100, 111))
+        return
+
+    def testJSON(self):
+        """
+        RunLumis round trip through json and the thunker
+        """
+        runLumis = RunLumis({1: range(1, 1000, 3), 2: [4294967295], 3: []})
+        jsonData = json.loads(json.dumps(runLumis.json()))
+        self.assertEqual(jsonData["Runs"][0], {"Run": 1, "Lumis": range(1, 1000, 3)})
+
+        thunker = JSONThunker()
+        unthunked = thunker.unthunk(json.loads(json.dumps(thunker.thunk({"runs": runLumis}))))
+        self.assertTrue(isinstance(unthunked["runs"], RunLumis))
+        self.assertEqual(unthunked["runs"], runLumis)
+        self.assertEqual(unthunked["runs"].lumis(2), [4294967295])
+        return
+
+    @attr('performance')
+    def testPerformance(self):
+        """
+        Time merging lumis into a file as the splitting algorithms do,
+        masking them and keeping them for accounting
+        """
+        numLumis = 20000
+
+        startTime = time.time()
+        mergedFile = File(lfn = "/store/merged/file.root")
+        for firstLumi in range(0, numLumis, 100):
+            mergedFile.addRun(Run(1, *range(firstLumi, firstLumi + 100)))
+        addTime = time.time() - startTime
+
+        mask = Mask()
+        for first in range(0, numLumis, 100):
+            mask.addRunAndLumis(1, lumis = [first, first + 49])
+        startTime = time.time()
+        maskedRuns = mask.filterRunLumisByMask(mergedFile["runs"])
+        maskTime = time.time() - startTime
+        self.assertEqual(len(list(maskedRuns)[0]), numLumis / 2)
+
+        runs = [Run(run, *range(numLumis)) for run in range(50)]
+        startTime = time.time()
+        runLumis = RunLumis(runs)
+        union = runLumis | RunLumis({0: range(numLumis, 2 * numLumis)})
+        intersection = union & runLumis
+        restored = RunLumis().__from_json__(json.loads(json.dumps(intersection.json())), None)
+        setTime = time.time() - startTime
+        self.assertEqual(restored, runLumis)
+
+        listBytes = sum([len(run.lumis) * (8 + 24) for run in runs])
+        arrayBytes = sum([lumis.itemsize * len(lumis) for lumis in runLumis.runLumis.values()])
+        print("  Performance: %d lumis merged into a file in %.3f secs, masked in %.3f secs, "
+              "%d lumis combined and round tripped in %.3f secs, %d bytes instead of %d" %
+              (numLumis, addTime, maskTime, len(runLumis), setTime, arrayBytes, listBytes))
+        return
+
+    @attr('performance')
+    def testBatchAddPerformance(self):
+        """
+        Time adding lumis in small batches, in order and shuffled
+        """
+        numLumis = 200000
+        for batchSize in [1, 10, 1000]:
+            batches = [range(first, min(first + batchSize, numLumis)) for first in range(0, numLumis, batchSize)]
+            startTime = time.time()
+            runLumis = RunLumis()
+            for batch in batches:
+                runLumis.addLumis(1, batch)
+            orderedTime = time.time() - startTime
+
+            random.shuffle(batches)
+            startTime = time.time()
+            shuffled = RunLumis()
+            for batch in batches:
+                shuffled.addLumis(1, batch)
+            shuffledTime = time.time() - startTime
+            self.assertEqual(shuffled, runLumis)
+            self.assertEqual(len(runLumis), numLumis)
+            print("  Performance: %d lumis added %d at a time in %.3f secs, shuffled in %.3f secs" %
+                  (numLumis, batchSize, orderedTime, shuffledTime))
+        return
+
+    @attr('performance')
+    def testSplittingPerformance(self):
+        """
+        Time the splitting path: files built from per lumi rows, split by
+        lumi, the job masks applied to their files as ACDC does and the
+        jobs accounted against the input to check no lumi is lost
+        """
+        nFiles = 100
+        lumisPerFile = 1000
+
+        startTime = time.time()
+        fileset = Fileset(name = "SplittingPerformance")
+        inputLumis = RunLumis()
+        for i in range(nFiles):
+            newFile = File(lfn = "/store/data/file%d.root" % i, size = 1000, events = 100 * lumisPerFile)
+            firstLumi = i * lumisPerFile
+            # the WMBS merge splitters add one run per file, run and lumi row
+            for lumi in range(firstLumi, firstLumi + lumisPerFile, 10):
+                newFile.addRun(Run(i % 5, *range(lumi, lumi + 10)))
+            newFile.setLocation("T1_US_FNAL_Disk")
+            fileset.addFile(newFile)
+            inputLumis.addLumis(i % 5, range(firstLumi, firstLumi + lumisPerFile))
+        buildTime = time.time() - startTime
+
+        subscription = Subscription(fileset = fileset, workflow = Workflow(), split_algo = "LumiBased",
+                                    type = "Processing")
+        jobFactory = SplitterFactory()(package = "WMCore.DataStructs", subscription = subscription)
+        startTime = time.time()
+        jobGroups = jobFactory(lumis_per_job = 50, halt_job_on_file_boundaries = True,
+                               performance = {'timePerEvent': 12, 'memoryRequirement': 2300,
+                                              'sizePerEvent': 400})
+        splitTime = time.time() - startTime
+        jobs = jobGroups[0].jobs
+        self.assertEqual(len(jobs), nFiles * lumisPerFile / 50)
+
+        startTime = time.time()
+        jobLumis = RunLumis()
+        for job in jobs:
+            for inputFile in job['input_files']:
+                jobLumis.update(job['mask'].filterRunLumisByMask(inputFile['runs']))
+        maskTime = time.time() - startTime
+        startTime = time.time()
+        self.assertEqual(len(inputLumis - jobLumis), 0)
+        self.assertEqual(len(jobLumis), nFiles * lumisPerFile)
+        accountTime = time.time() - startTime
+
+        print("  Performance: %d files of %d lumis built in %.3f secs, split in %d jobs in %.3f secs, "
+              "masked in %.3f secs, accounted in %.3f secs" %
+              (nFiles, lumisPerFile, buildTime, len(jobs), splitTime, maskTime, accountTime))
+        return
+
+    @attr('performance')
+    def testAccountingPerformance(self):
+        """
+        Time the accounting path: the runs of a merged output file read
+        back from the job report, copied into the DBSBuffer file as the
+        AccountantWorker does and compared with the lumis of the inputs
+        """
+        nInputs = 500
+        lumisPerInput = 200
+
+        mergedFile = File(lfn = "/store/data/merged.root", size = 1000, events = 1000)
+        inputLumis = RunLumis()
+        startTime = time.time()
+        for i in range(nInputs):
+            lumis = range(i * lumisPerInput, (i + 1) * lumisPerInput)
+            mergedFile.addRun(Run(1 + i % 3, *lumis))
+            inputLumis.addLumis(1 + i % 3, lumis)
+        mergeTime = time.time() - startTime
+
+        report = Report("cmsRun1")
+        report.addOutputFile("Merged", file = mergedFile)
+        startTime = time.time()
+        outputFile = report.getAllFilesFromStep("cmsRun1")[0]
+        readTime = time.time() - startTime
+
+        startTime = time.time()
+        dbsFile = File(lfn = outputFile["lfn"])
+        for run in outputFile["runs"]:
+            newRun = Run(runNumber = run.run)
+            newRun.extend(run.lumis)
+            dbsFile.addRun(newRun)
+        copyTime = time.time() - startTime
+
+        startTime = time.time()
+        outputLumis = RunLumis(dbsFile["runs"])
+        self.assertEqual(outputLumis, inputLumis)
+        self.assertEqual(len(inputLumis - outputLumis), 0)
+        accountTime = time.time() - startTime
+
+        print("  Performance: %d lumis merged in %.3f secs, read back from the report in %.3f secs, "
+              "copied in %.3f secs, accounted in %.3f secs" %
+              (len(inputLumis), mergeTime, readTime, copyTime, accountTime))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,8 +7,13 @@ General test of Lexicon
 """
 
 import logging
+import re
+import time
 import unittest
 
+from nose.plugins.attrib import attr
+
+import WMCore.Lexicon
 from WMCore.Lexicon import *
 
 class LexiconTest(unittest.TestCase):
@@ -779,5 +784,52 @@ class LexiconTest(unittest.TestCase):
         self.assertTrue(primaryDatasetType("cosmic"), "data should be allowed")
         self.assertTrue(primaryDatasetType("test"), "test should be allowed")
 
+    def testCheckList(self):
+        """
+        checkList validates every candidate with the same regexp
+        """
+        self.assertTrue(checkList(r'^T[0-3]', ['T1_US_FNAL', 'T2_CH_CERN']))
+        self.assertTrue(checkList(r'^T[0-3]', []))
+        self.assertRaises(AssertionError, checkList, r'^T[0-3]', ['T1_US_FNAL', 'X2_CH_CERN'])
+        self.assertRaises(AssertionError, checkList, r'^T[0-3]', ['T1_US_FNAL'], 5)
+
+    @attr('performance')
+    def testRequestCreationValidation(self):
+        """
+        Time the Lexicon checks done on request creation, compiling the
+        regular expressions on every call (as with a flushed re cache)
+        and with the compiled expressions kept by Lexicon
+        """
+        arguments = [(procdataset, 'Run2012A-PromptReco-v1'), (procversion, '1'),
+                     (dataset, '/MinimumBias/Run2012A-PromptReco-v1/RECO'),
+                     (block, '/MinimumBias/Run2012A-PromptReco-v1/RECO#fabf118a-cbbf-11e0-80a9-003048caaace'),
+                     (cmsswversion, 'CMSSW_7_4_1'), (globalTag, 'GR_R_74_V8::All'),
+                     (identifier, 'some_request_name'), (cmsname, 'T1_US_FNAL'),
+                     (primdataset, 'MinimumBias'), (lfnBase, '/store/user/ewv/Higgs-123/PrivateSample/v1')]
+        nRequests = 5000
+
+        def compileAlways(regexp):
+            re.purge()
+            return re.compile(regexp)
+
+        cachedCompile = WMCore.Lexicon._compile
+        WMCore.Lexicon._compile = compileAlways
+        try:
+            startTime = time.time()
+            for _ in xrange(nRequests):
+                for checker, value in arguments:
+                    checker(value)
+            before = time.time() - startTime
+        finally:
+            WMCore.Lexicon._compile = cachedCompile
+
+        startTime = time.time()
+        for _ in xrange(nRequests):
+            for checker, value in arguments:
+                checker(value)
+        after = time.time() - startTime
+        print("  Performance: %i requests validated in %.2f secs recompiling, %.2f secs cached" %
+              (nRequests, before, after))
+
 if __name__ == "__main__":
     unittest.main()
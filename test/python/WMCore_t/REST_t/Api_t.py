@@ -65,12 +65,29 @@ class Image(RESTEntity):
     def get(self):
         return gif_bytes
 
+class Cached(RESTEntity):
+    calls = 0
+
+    def validate(self, apiobj, method, api, param, safe):
+        validate_str("x", param, safe, re.compile("^[a-z]*$"), optional=True)
+
+    @restcall(cache_ttl=300)
+    @tools.expires(secs=300)
+    def get(self, x):
+        Cached.calls += 1
+        return rows([Cached.calls])
+
+    @restcall
+    def put(self, x):
+        return rows(["ok"])
+
 class Root(RESTApi):
     def __init__(self, app, config, mount):
         RESTApi.__init__(self, app, config, mount)
         self._add({ "simple": Simple(app, self, config, mount),
                     "image":  Image(app, self, config, mount),
-                    "multi":  Multi(app, self, config, mount) })
+                    "multi":  Multi(app, self, config, mount),
+                    "cached": Cached(app, self, config, mount) })
 
 class Tester(webtest.WebCase):
 
@@ -244,6 +261,47 @@ class Tester(webtest.WebCase):
             assert b["result"][i][0] == "row"
             assert b["result"][i][1] == i
 
+    def _get_cached(self, page = "/test/cached", headers = None):
+        h = self.h + [("Accept", "application/json")] + (headers or [])
+        self.getPage(page, headers = h)
+        self.assertStatus("200 OK")
+        self.assertHeader("ETag")
+        return json.loads(self.body)["result"][0]
+
+    def test_cached_get(self):
+        calls = self._get_cached()
+        self.assertEqual(self._get_cached(), calls)
+        self.assertEqual(self._get_cached("/test/cached?x=a"), calls + 1)
+        self.assertEqual(self._get_cached("/test/cached?x=a"), calls + 1)
+        self.assertEqual(self._get_cached(), calls)
+
+    def test_cached_etag(self):
+        self._get_cached()
+        etag = self.assertHeader("ETag")
+        h = self.h + [("Accept", "application/json"), ("If-None-Match", etag)]
+        self.getPage("/test/cached", headers = h)
+        self.assertStatus(304)
+        self.assertBody("")
+
+    def test_cached_deflate(self):
+        h = self.h + [("Accept", "application/json"), ("Accept-Encoding", "deflate")]
+        self.getPage("/test/cached", headers = h)
+        self.assertStatus("200 OK")
+        self.assertHeader("Content-Encoding", "deflate")
+        body = self.body
+        self.getPage("/test/cached", headers = h)
+        self.assertHeader("Content-Encoding", "deflate")
+        self.assertBody(body)
+        b = json.loads(zlib.decompress(body, -zlib.MAX_WBITS))
+        self.assertEqual(len(b["result"]), 1)
+
+    def test_cached_invalidate(self):
+        calls = self._get_cached()
+        h = self.h + [("Accept", "application/json")]
+        self.getPage("/test/cached", headers = h, method = "PUT")
+        self.assertStatus("200 OK")
+        self.assertEqual(self._get_cached(), calls + 1)
+
 def setup_server():
     srcfile = __file__.split("/")[-1].split(".py")[0]
     setup_test_server(srcfile, "Root", authz_key_file=FAKE_FILE, port=PORT)
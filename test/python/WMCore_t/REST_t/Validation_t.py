@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+_Validation_t_
+
+Unit tests for the REST list argument validators.
+"""
+
+import re
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.REST.Error import InvalidParameter
+from WMCore.REST.Server import RESTArgs
+from WMCore.REST.Validation import validate_strlist, validate_ustrlist, _check_str
+
+RX_NAME = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+
+class ValidationTest(unittest.TestCase):
+
+    def _validate(self, validator, values):
+        param = RESTArgs([], {'name': values})
+        safe = RESTArgs([], {})
+        validator('name', param, safe, RX_NAME)
+        self.assertFalse('name' in param.kwargs)
+        return safe.kwargs['name']
+
+    def testStrList(self):
+        """Lists of str are accepted as is, unicode is converted"""
+        self.assertEqual(self._validate(validate_strlist, ['a', 'b_1']), ['a', 'b_1'])
+        self.assertEqual(self._validate(validate_strlist, 'a'), ['a'])
+        result = self._validate(validate_strlist, ['a', u'b'])
+        self.assertEqual(result, ['a', 'b'])
+        self.assertEqual([type(x) for x in result], [str, str])
+        self.assertRaises(InvalidParameter, self._validate, validate_strlist, ['a', 'b c'])
+        self.assertRaises(InvalidParameter, self._validate, validate_strlist, ['a', 1])
+
+    def testUStrList(self):
+        """Lists of unicode are accepted as is, str is converted"""
+        result = self._validate(validate_ustrlist, [u'a', 'b'])
+        self.assertEqual(result, [u'a', u'b'])
+        self.assertEqual([type(x) for x in result], [unicode, unicode])
+        self.assertRaises(InvalidParameter, self._validate, validate_ustrlist, [u'a', u'b/c'])
+
+    @attr('performance')
+    def testBulkGet(self):
+        """Time the validation of a bulk GET with 100k names"""
+        names = ['block_%i' % i for i in xrange(100000)]
+
+        startTime = time.time()
+        expected = [_check_str('name', v, RX_NAME) for v in names]
+        perItem = time.time() - startTime
+
+        startTime = time.time()
+        result = self._validate(validate_strlist, names)
+        bulk = time.time() - startTime
+
+        self.assertEqual(result, expected)
+        print("  Performance: 100k names validated in %.3f secs per item, %.3f secs in bulk" % (perItem, bulk))
+
+
+if __name__ == '__main__':
+    unittest.main()
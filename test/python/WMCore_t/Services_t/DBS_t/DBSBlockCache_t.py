@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+_DBSBlockCache_t_
+
+Unit test for the closed block metadata cache.
+"""
+
+import shutil
+import tempfile
+import unittest
+
+from WMCore.Services.DBS.DBSBlockCache import DBSBlockCache
+
+BLOCK = '/HighPileUp/Run2011A-v1/RAW#fabf118a-cbbf-11e0-80a9-003048caaace'
+BLOCK2 = '/HighPileUp/Run2011A-v1/RAW#6021175e-cbfb-11e0-80a9-003048caaace'
+
+
+class DBSBlockCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cacheDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cacheDir)
+
+    def makeFiles(self, block, numFiles):
+        """Fake DBS file records"""
+        return [{'LogicalFileName': '/store/data/%s/%d.root' % (block.split('#')[1], i),
+                 'NumberOfEvents': 100 + i,
+                 'LumiList': [{'RunNumber': 1, 'LumiSectionNumber': [i, i + 1]}]}
+                for i in range(numFiles)]
+
+    def testGetPut(self):
+        """Cached data can be read back, also by another cache object"""
+        cache = DBSBlockCache(self.cacheDir)
+        files = self.makeFiles(BLOCK, 10)
+        self.assertEqual(cache.get(BLOCK, 'files:1:1'), None)
+        cache.put(BLOCK, 'files:1:1', files)
+        self.assertEqual(cache.get(BLOCK, 'files:1:1'), files)
+        self.assertEqual(cache.get(BLOCK, 'files:0:1'), None)
+
+        self.assertEqual(DBSBlockCache(self.cacheDir).get(BLOCK, 'files:1:1'), files)
+
+        cache.clear()
+        self.assertEqual(cache.get(BLOCK, 'files:1:1'), None)
+        self.assertEqual(cache.size(), 0)
+
+    def testContentAddressed(self):
+        """Identical data is stored only once"""
+        cache = DBSBlockCache(self.cacheDir)
+        files = self.makeFiles(BLOCK, 10)
+        digest = cache.put(BLOCK, 'files:1:1', files)
+        size = cache.size()
+        self.assertEqual(cache.put(BLOCK, 'parents:1:1', files), digest)
+        self.assertEqual(cache.size(), size)
+
+    def testEviction(self):
+        """Least recently used entries are evicted first"""
+        cache = DBSBlockCache(self.cacheDir)
+        cache.put(BLOCK, 'files:1:1', self.makeFiles(BLOCK, 100))
+        cache.put(BLOCK2, 'files:1:1', self.makeFiles(BLOCK2, 100))
+        cache.get(BLOCK, 'files:1:1')
+
+        cache.evict(cache.size() - 1)
+        self.assertNotEqual(cache.get(BLOCK, 'files:1:1'), None)
+        self.assertEqual(cache.get(BLOCK2, 'files:1:1'), None)
+
+        cache.evict(0)
+        self.assertEqual(cache.get(BLOCK, 'files:1:1'), None)
+        self.assertEqual(cache.size(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,10 +5,14 @@ _DBSReader_t_
 Unit test for the DBS helper class.
 """
 
+import shutil
+import tempfile
 import unittest
 
+from WMCore.Services.DBS.DBSBlockCache import DBSBlockCache
 from WMCore.Services.DBS.DBSReader import DBSReader as DBSReader
 from WMCore.Services.DBS.DBSErrors import DBSReaderError
+from WMQuality.Emulators.DBSClient.MockDbsApi import MockDbsApi
 from WMQuality.Emulators.EmulatedUnitTestCase import EmulatedUnitTestCase
 
 # A small dataset that should always exist
@@ -233,6 +237,78 @@ class DBSReaderTest(EmulatedUnitTestCase):
 
         self.assertRaises(DBSReaderError, self.dbs.listFilesInBlockWithParents, BLOCK + 'asas')
 
+    def testGetFilesForBlocks(self):
+        """getFilesForBlocks returns the files of each block, in order"""
+        self.dbs = DBSReader(self.endpoint)
+        # the emulated calls for this block were recorded with its unicode name
+        blockWithParents = unicode(BLOCK_WITH_PARENTS)
+        blocks = [BLOCK, blockWithParents, BLOCK]
+        results = self.dbs.getFilesForBlocks(blocks, maxWorkers=2, maxPerHost=1)
+        self.assertEqual(len(results), 3)
+        for block, files in zip(blocks, results):
+            self.assertItemsEqual([x['LogicalFileName'] for x in files],
+                                  [x['LogicalFileName'] for x in self.dbs.listFilesInBlock(block)])
+        self.assertTrue(FILE in [x['LogicalFileName'] for x in results[0]])
+
+        results = self.dbs.getFilesForBlocks([blockWithParents], parents=True)
+        self.assertEqual(PARENT_FILE, results[0][0]['ParentList'][0]['LogicalFileName'])
+
+        self.assertEqual(self.dbs.getFilesForBlocks([]), [])
+        self.assertRaises(DBSReaderError, self.dbs.getFilesForBlocks, [BLOCK, DATASET + '#blah'])
+
+    def testGetDBSSummaryInfoForBlocks(self):
+        """getDBSSummaryInfoForBlocks returns the summary of each block, in order"""
+        self.dbs = DBSReader(self.endpoint)
+        blocks = self.dbs.listFileBlocks(DATASET)[:4]
+        results = self.dbs.getDBSSummaryInfoForBlocks(DATASET, blocks, maxWorkers=2, maxPerHost=1)
+        self.assertEqual(results, [self.dbs.getDBSSummaryInfo(DATASET, block=x) for x in blocks])
+        self.assertEqual(self.dbs.getDBSSummaryInfoForBlocks(DATASET, []), [])
+        self.assertRaises(DBSReaderError, self.dbs.getDBSSummaryInfoForBlocks, DATASET, [BLOCK, BLOCK + 'asas'])
+
+    def testListRunLumisForBlocks(self):
+        """listRunLumisForBlocks returns the runs of each block, in order"""
+        self.dbs = DBSReader(self.endpoint)
+        blocks = [BLOCK, BLOCK_WITH_PARENTS]
+        results = self.dbs.listRunLumisForBlocks(blocks, maxWorkers=2)
+        self.assertEqual(results, [self.dbs.listRunLumis(block=x) for x in blocks])
+        self.assertTrue(173657 in results[0])
+
+    def testListFilesInBlockCached(self):
+        """listFilesInBlock serves closed blocks from the block cache"""
+        from WMCore.Services.DBS.DBS3Reader import DBS3Reader
+        cacheDir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cacheDir)
+        self.dbs = DBS3Reader(self.endpoint, blockCache=DBSBlockCache(cacheDir))
+        calls = []
+        mockApi = MockDbsApi(self.endpoint)
+
+        class CountingApi(object):
+            """Records the DBS calls made"""
+            def __getattr__(self, name):
+                calls.append(name)
+                return getattr(mockApi, name)
+
+        self.dbs.dbs = CountingApi()
+        files = self.dbs.listFilesInBlock(BLOCK)
+        # the block details tell it is closed, no extra blockIsOpen call
+        self.assertEqual(calls.count('listBlocks'), 1)
+        self.assertTrue(FILE in [x['LogicalFileName'] for x in files])
+
+        del calls[:]
+        self.assertEqual(self.dbs.listFilesInBlock(BLOCK), files)
+        self.assertEqual(calls, [])
+
+    def testHostSemaphore(self):
+        """_hostSemaphore is shared per host and cap"""
+        from WMCore.Services.DBS.DBS3Reader import _hostSemaphore
+        semaphore = _hostSemaphore(self.endpoint, 4)
+        self.assertTrue(_hostSemaphore('https://cmsweb.cern.ch/dbs/prod/phys03/DBSReader', 4) is semaphore)
+        other = _hostSemaphore(self.endpoint, 1)
+        self.assertFalse(other is semaphore)
+        self.assertTrue(other.acquire(False))
+        self.assertFalse(other.acquire(False))
+        other.release()
+
     def testLfnsInBlock(self):
         """lfnsInBlock returns lfns in block"""
         self.dbs = DBSReader(self.endpoint)
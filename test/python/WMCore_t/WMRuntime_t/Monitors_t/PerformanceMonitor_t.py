@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+_PerformanceMonitor_t_
+
+Unittest for the WMCore.WMRuntime.Monitors.PerformanceMonitor class and
+its sampling by the Watchdog thread
+
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from WMCore.FwkJobReport.Report import Report
+from WMCore.WMRuntime.Monitors.PerformanceMonitor import PerformanceMonitor
+from WMCore.WMRuntime.Monitors.ProcessTreeSampler import procfsAvailable
+from WMCore.WMRuntime.Watchdog import Watchdog
+from WMCore.WMSpec.WMStep import makeWMStep
+
+
+class PerformanceMonitorTest(unittest.TestCase):
+    """
+    _PerformanceMonitorTest_
+
+    """
+
+    def setUp(self):
+        if not procfsAvailable():
+            raise unittest.SkipTest("No /proc on this system")
+        self.logDir = tempfile.mkdtemp()
+        self.step = makeWMStep("cmsRun1")
+        self.step.setStepType("CMSSW")
+
+        self.monitor = PerformanceMonitor()
+        self.monitor.initMonitor(task = None, job = None, logPath = os.path.join(self.logDir, "Report.pkl"),
+                                 args = {'sampleInterval': 0.0001})
+        # sample this process rather than looking for the step PID file
+        self.monitor.getStepPID = os.getpid
+
+        # the Watchdog aborts the job when a monitor fails
+        self.aborts = []
+        self.osAbort = os.abort
+        os.abort = lambda: self.aborts.append(True)
+        return
+
+    def tearDown(self):
+        os.abort = self.osAbort
+        os.rmdir(self.logDir)
+        return
+
+    def testReportPerformance(self):
+        """
+        The summary of the samples is written in the step report at step end
+        """
+        self.monitor.stepStart(self.step.data)
+        for _ in range(3):
+            self.monitor.periodicSample()
+        self.assertEqual(len(self.monitor.sampler.samples), 3)
+        summary = self.monitor.sampler.summary()
+
+        report = Report("cmsRun1")
+        self.monitor.stepEnd(self.step.data, report)
+        self.assertEqual(self.monitor.sampler, None)
+        self.assertEqual(self.monitor.currentStepName, None)
+        performance = report.retrieveStep("cmsRun1").performance
+        self.assertEqual(performance.RSSMemory.max, summary['rss']['max'])
+        self.assertEqual(performance.RSSMemory.min, summary['rss']['min'])
+        self.assertEqual(performance.VSizeMemory.average, summary['vsize']['average'])
+        self.assertEqual(performance.PercentCPU.max, summary['pcpu']['max'])
+        if 'pss' in summary:
+            self.assertEqual(performance.PSSMemory.max, summary['pss']['max'])
+
+        # nothing is sampled or reported between steps
+        self.monitor.periodicSample()
+        self.monitor.periodicUpdate()
+        self.assertEqual(self.monitor.sampler, None)
+        report = Report("cmsRun1")
+        self.monitor.stepEnd(self.step.data, report)
+        self.assertFalse(hasattr(report.retrieveStep("cmsRun1").performance, "RSSMemory"))
+        return
+
+    def testWatchdogSampling(self):
+        """
+        The Watchdog thread samples between the updates while the steps
+        start and end
+        """
+        watchdog = Watchdog(logPath = self.logDir)
+        watchdog._Monitors.append(self.monitor)
+        watchdog.setInterval(0.05)
+        self.assertEqual(watchdog.getSampleInterval(), 0.0001)
+
+        self.monitor.stepStart(self.step.data)
+        watchdog.runMonitors("periodicSample")
+        self.assertEqual(len(self.monitor.sampler.samples), 1)
+        self.monitor.stepEnd(self.step.data, None)
+
+        watchdog.setDaemon(1)
+        watchdog.start()
+        try:
+            # end the steps while the thread is sampling them
+            for i in range(2000):
+                watchdog.notifyStepStart(self.step.data)
+                time.sleep(0.0005 * (i % 3))
+                report = Report("cmsRun1")
+                watchdog.notifyStepEnd(self.step.data, stepReport = report)
+            watchdog.notifyStepStart(self.step.data)
+            time.sleep(0.1)
+            self.assertTrue(len(self.monitor.sampler.samples) > 10)
+            report = Report("cmsRun1")
+            watchdog.notifyStepEnd(self.step.data, stepReport = report)
+            self.assertTrue(report.retrieveStep("cmsRun1").performance.RSSMemory.max > 0)
+        finally:
+            watchdog.shutdown()
+            watchdog.join()
+        self.assertEqual(self.aborts, [])
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
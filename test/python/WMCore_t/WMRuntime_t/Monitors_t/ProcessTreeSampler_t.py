@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+_ProcessTreeSampler_t_
+
+Unittest for the WMCore.WMRuntime.Monitors.ProcessTreeSampler class
+
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+import WMCore.Algorithms.SubprocessAlgos as subprocessAlgos
+from WMCore.FwkJobReport.Report import Report
+from WMCore.WMRuntime.Monitors.ProcessTreeSampler import ProcessTreeSampler, procfsAvailable
+
+# a child allocating 100MB and spinning, under a shell
+CHILD = "import time; x = 'x' * (100 * 1024 * 1024); t = time.time()\nwhile time.time() - t < 30: pass"
+
+
+class ProcessTreeSamplerTest(unittest.TestCase):
+    """
+    _ProcessTreeSamplerTest_
+
+    """
+
+    def setUp(self):
+        if not procfsAvailable():
+            raise unittest.SkipTest("No /proc on this system")
+        self.process = subprocess.Popen(["/bin/sh", "-c", "%s -c \"%s\"; sleep 30" % (sys.executable, CHILD)])
+        # wait for the child to allocate its memory
+        time.sleep(1)
+
+    def tearDown(self):
+        sampler = ProcessTreeSampler(self.process.pid)
+        for pid in reversed(sampler.processTree()):
+            try:
+                os.kill(pid, 9)
+            except OSError:
+                pass
+        self.process.wait()
+
+    def testSample(self):
+        """
+        Sample a shell and the python process it runs
+        """
+        sampler = ProcessTreeSampler(self.process.pid, maxSamples = 3)
+        self.assertEqual(len(sampler.processTree()), 2)
+
+        first = sampler.sample()
+        self.assertEqual(first['nProcesses'], 2)
+        self.assertTrue(first['rss'] > 100 * 1024)
+        self.assertTrue(first['vsize'] >= first['rss'])
+        if first['pss'] is not None:
+            self.assertTrue(first['pss'] > 100 * 1024)
+
+        # the child is spinning, using a whole core
+        time.sleep(0.5)
+        second = sampler.sample()
+        self.assertTrue(second['pcpu'] > 50)
+
+        for _ in range(3):
+            sampler.sample()
+        self.assertEqual(len(sampler.samples), 3)
+        summary = sampler.summary()
+        self.assertEqual(sorted(summary.keys()), sorted(['rss', 'vsize', 'pcpu'] + (first['pss'] and ['pss'] or [])))
+        self.assertEqual(summary['rss']['max'], max([x['rss'] for x in [first, second] + list(sampler.samples)]))
+        self.assertTrue(summary['rss']['min'] <= summary['rss']['average'] <= summary['rss']['max'])
+
+        # the sampler writes into the step performance section
+        report = Report("cmsRun1")
+        report.setStepRSS("cmsRun1", **summary['rss'])
+        self.assertEqual(report.retrieveStep("cmsRun1").performance.RSSMemory.max, summary['rss']['max'])
+
+        self.assertEqual(ProcessTreeSampler(2 ** 22 + 1).sample(), None)
+        return
+
+    def testNoChildrenFiles(self):
+        """
+        Find the children by scanning /proc
+        """
+        sampler = ProcessTreeSampler(self.process.pid)
+        tree = sampler.processTree()
+        sampler.childrenFiles = False
+        self.assertEqual(sampler.processTree(), tree)
+        return
+
+    @attr('performance')
+    def testPerformance(self):
+        """
+        Time sampling the process tree from /proc and with ps
+        """
+        sampler = ProcessTreeSampler(self.process.pid)
+        startTime = time.time()
+        for _ in range(100):
+            sampler.sample()
+        procTime = (time.time() - startTime) / 100
+
+        command = "ps -p %i -o pid,ppid,rss,vsize,pcpu,pmem,cmd -ww | grep %i" % (self.process.pid, self.process.pid)
+        startTime = time.time()
+        for _ in range(20):
+            subprocessAlgos.runCommand(command)
+        psTime = (time.time() - startTime) / 20
+
+        print("  Performance: process tree sampled from /proc in %.5f secs, top process with ps in %.5f secs" %
+              (procTime, psTime))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,7 +15,9 @@ import shutil
 import sys
 import copy
 import os
+import time
 
+from nose.plugins.attrib import attr
 
 import WMCore_t.WMSpec_t.TestWorkloads as TestWorkloads
 import WMCore.WMRuntime.SandboxCreator as SandboxCreator
@@ -87,6 +89,86 @@ class SandboxCreator_t(unittest.TestCase):
         shutil.rmtree( extractDir )
         shutil.rmtree( tempdir )
 
+    def testMakeSandboxFromStore(self):
+        tempdir  = tempfile.mkdtemp()
+        storeDir = os.path.join(tempdir, 'store')
+        creator  = SandboxCreator.SandboxCreator(storeDir = storeDir)
+        workload = TestWorkloads.twoTaskTree()
+        boxpath  = creator.makeSandbox(os.path.join(tempdir, 'first'), workload)
+        self.assertTrue(boxpath.endswith('-Sandbox.tar.gz'))
+
+        # the sandbox is a regular tarball
+        extractDir = tempfile.mkdtemp()
+        tarHandle  = tarfile.open(boxpath, 'r')
+        tarHandle.extractall( extractDir )
+        tarHandle.close()
+        self.fileExistsTest( extractDir + "/WMSandbox/WMWorkload.pkl")
+        self.fileExistsTest( extractDir + "/WMSandbox/__init__.py")
+        self.fileExistsTest( extractDir + "/WMSandbox/FirstTask/cmsRun1/__init__.py")
+        self.fileExistsTest( extractDir + "/WMSandbox/SecondTask/stageOut2/__init__.py")
+        self.fileExistsTest( extractDir + "/WMCore.zip")
+        self.fileExistsTest( extractDir + "/PSetTweaks/__init__.py")
+        self.fileExistsTest( extractDir + "/Utils/__init__.py")
+        pickleHandle = open( extractDir + "/WMSandbox/WMWorkload.pkl")
+        self.assertEqual( pickle.load( pickleHandle ).sandbox, boxpath )
+        pickleHandle.close()
+        layers = os.listdir(os.path.join(storeDir, 'layers'))
+
+        # another workflow only adds its own spec layer
+        otherWorkload = TestWorkloads.twoTaskTree()
+        otherWorkload.setName("OtherWorkload")
+        creator.makeSandbox(os.path.join(tempdir, 'second'), otherWorkload)
+        self.assertEqual(len(os.listdir(os.path.join(storeDir, 'layers'))), len(layers) + 1)
+
+        # an identical sandbox is hard linked
+        os.unlink(boxpath)
+        self.assertEqual(creator.makeSandbox(os.path.join(tempdir, 'first'), workload), boxpath)
+        self.assertEqual(len([x for x in os.listdir(os.path.join(storeDir, 'sandboxes'))
+                              if x.endswith('.tar.gz')]), 2)
+        self.assertEqual(os.stat(boxpath).st_nlink, 2)
+
+        shutil.rmtree( extractDir )
+        shutil.rmtree( tempdir )
+
+    def testWMCoreLayerPruned(self):
+        tempdir  = tempfile.mkdtemp()
+        storeDir = os.path.join(tempdir, 'store')
+        creator  = SandboxCreator.SandboxCreator(storeDir = storeDir)
+        creator.makeSandbox(os.path.join(tempdir, 'first'), TestWorkloads.twoTaskTree())
+
+        # another build prunes the layers, the WMCore zipball is made again
+        for layer in os.listdir(os.path.join(storeDir, 'layers')):
+            os.unlink(os.path.join(storeDir, 'layers', layer))
+        otherWorkload = TestWorkloads.twoTaskTree()
+        otherWorkload.setName("OtherWorkload")
+        boxpath = creator.makeSandbox(os.path.join(tempdir, 'second'), otherWorkload)
+        tarHandle = tarfile.open(boxpath, 'r')
+        self.assertTrue('WMCore.zip' in tarHandle.getnames())
+        self.assertTrue(tarHandle.getmember('WMCore.zip').size > 0)
+        tarHandle.close()
+
+        shutil.rmtree( tempdir )
+
+    @attr('performance')
+    def testPerformance(self):
+        tempdir  = tempfile.mkdtemp()
+        workload = TestWorkloads.twoTaskTree()
+        startTime = time.time()
+        SandboxCreator.SandboxCreator().makeSandbox(os.path.join(tempdir, 'bz2'), workload)
+        bz2Time = time.time() - startTime
+
+        creator  = SandboxCreator.SandboxCreator(storeDir = os.path.join(tempdir, 'store'))
+        startTime = time.time()
+        creator.makeSandbox(os.path.join(tempdir, 'first'), workload)
+        firstTime = time.time() - startTime
+        startTime = time.time()
+        creator.makeSandbox(os.path.join(tempdir, 'second'), workload)
+        secondTime = time.time() - startTime
+
+        print("  Performance: sandbox built in %.2f secs, from an empty store in %.2f secs, "
+              "from the store in %.2f secs" % (bz2Time, firstTime, secondTime))
+        shutil.rmtree( tempdir )
+
     def fileExistsTest(self,file,msg = None):
         if (msg == None):
             msg = "Failed file existence test for (%s)" % file
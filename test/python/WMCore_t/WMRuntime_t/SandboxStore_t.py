@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""
+_SandboxStore_t_
+
+Unittest for the WMCore.WMRuntime.SandboxStore class
+
+"""
+
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from WMCore.WMRuntime.SandboxStore import SandboxStore, SandboxStoreException
+
+
+class SandboxStoreTest(unittest.TestCase):
+    """
+    _SandboxStoreTest_
+
+    """
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.layers = {}
+        for name in ["common", "first", "second"]:
+            path = os.path.join(self.tempDir, "%s.txt" % name)
+            with open(path, 'w') as handle:
+                handle.write(os.urandom(10000).encode('hex'))
+            self.layers[name] = [("%s.txt" % name, path)]
+        return
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+        return
+
+    def listStore(self, store, directory):
+        """
+        _listStore_
+
+        Keys of the layers or of the sandboxes in the store
+        """
+        return sorted([x[:-len(".tar.gz")] for x in os.listdir(directory) if x.endswith(".tar.gz")])
+
+    def build(self, store, names, targetName):
+        """
+        _build_
+
+        Build the sandbox made of the named layers, return its path
+        """
+        targetPath = os.path.join(self.tempDir, targetName)
+        store.build([self.layers[x] for x in names], targetPath)
+        return targetPath
+
+    def testPrune(self):
+        """
+        Sandboxes no longer linked are removed, then the unused layers
+        when the store is too big
+        """
+        store = SandboxStore(os.path.join(self.tempDir, "store"), minAge = 0)
+        firstPath = self.build(store, ["common", "first"], "first.tar.gz")
+        secondPath = self.build(store, ["common", "second"], "second.tar.gz")
+        layerKeys = self.listStore(store, store.layerDir)
+        self.assertEqual(len(layerKeys), 4)
+        self.assertEqual(len(self.listStore(store, store.sandboxDir)), 2)
+
+        # both sandboxes are still used
+        self.assertEqual(store.prune(maxSize = 0), 0)
+
+        # the first workflow is cleaned up, its sandbox goes and its
+        # layers are kept as long as the store is small enough
+        os.unlink(firstPath)
+        self.assertEqual(store.prune(), 1)
+        self.assertEqual(len(self.listStore(store, store.sandboxDir)), 1)
+        self.assertEqual(len([x for x in os.listdir(store.sandboxDir) if x.endswith(".layers")]), 1)
+        self.assertEqual(self.listStore(store, store.layerDir), layerKeys)
+
+        # over the limit, only the layer the second sandbox isn't made of goes
+        self.assertEqual(store.prune(maxSize = 0), 1)
+        self.assertEqual(len(self.listStore(store, store.layerDir)), 3)
+        tarball = tarfile.open(secondPath, 'r')
+        self.assertEqual(sorted(tarball.getnames()), ["common.txt", "second.txt"])
+        tarball.close()
+
+        # the first sandbox can be built again
+        firstPath = self.build(store, ["common", "first"], "first.tar.gz")
+        self.assertEqual(self.listStore(store, store.layerDir), layerKeys)
+        tarball = tarfile.open(firstPath, 'r')
+        self.assertEqual(sorted(tarball.getnames()), ["common.txt", "first.txt"])
+        tarball.close()
+        return
+
+    def testPruneOnBuild(self):
+        """
+        Building a sandbox keeps the store under its limit, leaving alone
+        what was recently used
+        """
+        storeDir = os.path.join(self.tempDir, "store")
+        store = SandboxStore(storeDir, maxSize = 0, minAge = 0)
+        firstPath = self.build(store, ["first"], "first.tar.gz")
+        os.unlink(firstPath)
+        self.build(store, ["second"], "second.tar.gz")
+        self.assertEqual(len(self.listStore(store, store.sandboxDir)), 1)
+        self.assertEqual(len(self.listStore(store, store.layerDir)), 2)
+
+        # nothing is removed before minAge, another process may be using it
+        recentStore = SandboxStore(storeDir, maxSize = 0)
+        os.unlink(os.path.join(self.tempDir, "second.tar.gz"))
+        self.build(recentStore, ["common"], "common.tar.gz")
+        self.assertEqual(len(self.listStore(store, store.sandboxDir)), 2)
+        self.assertEqual(recentStore.prune(), 0)
+        self.assertEqual(store.prune(), 2)
+        self.assertEqual(len(self.listStore(store, store.sandboxDir)), 1)
+        self.assertEqual(len(self.listStore(store, store.layerDir)), 2)
+        return
+
+    def testLayersOnDemand(self):
+        """
+        A layer given as a function is only built when it is missing, and
+        an empty layer is never stored under the key provided
+        """
+        store = SandboxStore(os.path.join(self.tempDir, "store"), minAge = 0)
+        calls = []
+        def firstLayer():
+            calls.append(True)
+            return self.layers["first"]
+
+        self.assertEqual(store.addLayers([firstLayer], ["firstKey"]), ["firstKey"])
+        self.assertEqual(store.addLayers([firstLayer], ["firstKey"]), ["firstKey"])
+        self.assertEqual(len(calls), 1)
+
+        # e.g. pruned by another build
+        os.unlink(store.layerPath("firstKey"))
+        store.addLayers([firstLayer], ["firstKey"])
+        self.assertEqual(len(calls), 2)
+
+        self.assertRaises(SandboxStoreException, store.addLayers, [firstLayer])
+        self.assertRaises(SandboxStoreException, store.addLayers, [lambda: []], ["emptyKey"])
+        self.assertRaises(SandboxStoreException, store.addLayers, [[]], ["emptyKey"])
+        self.assertFalse(store.hasLayer("emptyKey"))
+        return
+
+    def testLayerPrunedBeforeAssembly(self):
+        """
+        A layer removed by another build before the sandbox is assembled
+        is stored again
+        """
+        store = SandboxStore(os.path.join(self.tempDir, "store"), minAge = 0)
+        addLayers = store.addLayers
+        def addAndPrune(layers, keys = None):
+            layerKeys = addLayers(layers, keys)
+            if len(store.addedKeys) == 0:
+                os.unlink(store.layerPath(layerKeys[0]))
+            store.addedKeys.append(layerKeys)
+            return layerKeys
+        store.addedKeys = []
+        store.addLayers = addAndPrune
+
+        targetPath = self.build(store, ["common", "first"], "first.tar.gz")
+        self.assertEqual(len(store.addedKeys), 2)
+        tarball = tarfile.open(targetPath, 'r')
+        self.assertEqual(sorted(tarball.getnames()), ["common.txt", "first.txt"])
+        tarball.close()
+        self.assertEqual([x for x in os.listdir(store.sandboxDir) if not x.endswith((".tar.gz", ".layers"))], [])
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+_Unpacker_t_
+
+Unittest for the WMCore.WMRuntime.Unpacker worker node script
+
+"""
+
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+import WMCore_t.WMSpec_t.TestWorkloads as TestWorkloads
+import WMCore.WMRuntime.Unpacker as Unpacker
+from WMCore.DataStructs.Job import Job
+from WMCore.DataStructs.JobPackage import JobPackage
+from WMCore.WMRuntime.SandboxCreator import SandboxCreator
+
+
+class UnpackerTest(unittest.TestCase):
+    """
+    _UnpackerTest_
+
+    """
+
+    def setUp(self):
+        """
+        _setUp_
+
+        Build a sandbox from a store of layers and an indexed job package
+        with jobs of both tasks of the workload.
+        """
+        self.tempDir = tempfile.mkdtemp()
+        self.currentDir = os.getcwd()
+
+        workload = TestWorkloads.twoTaskTree()
+        creator = SandboxCreator(storeDir = os.path.join(self.tempDir, "store"))
+        self.sandbox = creator.makeSandbox(os.path.join(self.tempDir, "sandbox"), workload)
+
+        package = JobPackage(directory = "/some/dir")
+        for i, taskName in enumerate(["FirstTask", "SecondTask"]):
+            newJob = Job("Job%s" % i)
+            newJob["id"] = i
+            newJob["task"] = "/%s/%s" % (workload.name(), taskName)
+            package[i] = newJob
+        self.package = os.path.join(self.tempDir, "JobPackage.pkl")
+        package.save(self.package)
+
+        self.workDir = os.path.join(self.tempDir, "work")
+        os.makedirs(self.workDir)
+        os.chdir(self.workDir)
+        return
+
+    def tearDown(self):
+        os.chdir(self.currentDir)
+        shutil.rmtree(self.tempDir)
+        return
+
+    def testTaskMode(self):
+        """
+        _testTaskMode_
+
+        Only the directory of the task of the job is extracted from the
+        layers of the sandbox and only the job is installed, reading the
+        sandbox once
+        """
+        # count the gzip rewinds, which decompress the sandbox again
+        rewinds = []
+        gzipRewind = gzip.GzipFile.rewind
+        def rewind(gzipFile):
+            rewinds.append(True)
+            return gzipRewind(gzipFile)
+        gzip.GzipFile.rewind = rewind
+        try:
+            Unpacker.runUnpacker(self.sandbox, self.package, "1", "Job1", mode = "task")
+        finally:
+            gzip.GzipFile.rewind = gzipRewind
+        self.assertEqual(rewinds, [])
+
+        jobDir = os.path.join(self.workDir, "job")
+        for path in ["WMCore.zip", "Startup.py", "PSetTweaks/__init__.py", "Utils/__init__.py",
+                     "WMSandbox/WMWorkload.pkl", "WMSandbox/__init__.py",
+                     "WMSandbox/SecondTask/stageOut2/__init__.py", "WMSandbox/JobIndex.py"]:
+            self.assertTrue(os.path.exists(os.path.join(jobDir, path)), "%s not extracted" % path)
+        self.assertFalse(os.path.exists(os.path.join(jobDir, "WMSandbox/FirstTask")))
+
+        package = JobPackage()
+        package.load(os.path.join(jobDir, "WMSandbox/JobPackage.pcl"))
+        self.assertEqual(sorted(package.keys()), [1, "directory"])
+        self.assertEqual(package[1]["name"], "Job1")
+        return
+
+    def testFullMode(self):
+        """
+        _testFullMode_
+
+        The whole sandbox and job package are installed
+        """
+        Unpacker.runUnpacker(self.sandbox, self.package, "0", "Job0")
+
+        jobDir = os.path.join(self.workDir, "job")
+        for path in ["WMCore.zip", "Startup.py", "WMSandbox/FirstTask/cmsRun1/__init__.py",
+                     "WMSandbox/SecondTask/stageOut2/__init__.py"]:
+            self.assertTrue(os.path.exists(os.path.join(jobDir, path)), "%s not extracted" % path)
+
+        package = JobPackage()
+        package.load(os.path.join(jobDir, "WMSandbox/JobPackage.pcl"))
+        self.assertEqual(len(package.keys()), 3)
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
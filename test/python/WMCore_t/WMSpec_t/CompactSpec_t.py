@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+"""
+_CompactSpec_t_
+
+Unit tests for the compact spec format and the spec cache.
+"""
+from __future__ import print_function
+
+import cPickle
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.WMSpec.CompactSpec import SpecCache, encodeSpec, decodeSpec, isCompactSpec
+from WMCore.WMSpec.WMWorkload import WMWorkloadHelper
+from WMCore.WMSpec.WMTask import WMTaskHelper
+import WMCore_t.WMSpec_t.WMWorkload_t as WMWorkload_t
+
+
+def makeTaskChainWorkload(numTasks):
+    """
+    _makeTaskChainWorkload_
+
+    TaskChain shaped workload from the WMWorkload unit tests
+    """
+    return WMWorkload_t.WMWorkloadTest("testTreeIndexInvalidation").makeTaskChainWorkload(numTasks)
+
+
+class CompactSpecTest(unittest.TestCase):
+    """
+    _CompactSpecTest_
+
+    """
+
+    def setUp(self):
+        self.workload = makeTaskChainWorkload(3)
+        self.cacheDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cacheDir)
+
+    def testRoundTrip(self):
+        """
+        _testRoundTrip_
+
+        A decoded spec is identical to the original one.
+        """
+        compact = encodeSpec(self.workload.data)
+        self.assertTrue(isCompactSpec(compact))
+        self.assertFalse(isCompactSpec(cPickle.dumps(self.workload.data)))
+        self.assertTrue(len(compact) < len(cPickle.dumps(self.workload.data)) / 4)
+
+        # like unpickling, the rebuilt sets may iterate in a different order
+        data = decodeSpec(compact)
+        self.assertEqual(sorted(data.pythonise_()), sorted(self.workload.data.pythonise_()))
+        self.assertEqual(data.dictionary_(), self.workload.data.dictionary_())
+
+        workload = WMWorkloadHelper(data)
+        self.assertEqual(workload.listAllTaskPathNames(), self.workload.listAllTaskPathNames())
+        taskPath = "/TaskChainWorkload/Task1/Task1MergeRAWSIMoutput/Task2"
+        task = workload.getTaskByPath(taskPath)
+        self.assertEqual(task.getPathName(), taskPath)
+        self.assertEqual(task.listAllStepNames(), ["cmsRun1", "stageOut1", "logArch1"])
+        self.assertEqual(sorted(task.getStep("cmsRun1").data.output.modules.listSections_()),
+                         ["DQMoutput", "RAWSIMoutput"])
+        self.assertTrue(task.data._internal_parent_ref._internal_parent_ref._internal_parent_ref is
+                        workload.getTaskByPath("/TaskChainWorkload/Task1/Task1MergeRAWSIMoutput").data)
+
+        # the decoded spec is fully usable
+        workload.getTask("Task1").addTask("NewTask")
+        self.assertTrue("NewTask" in workload.listAllTaskNames())
+        self.assertEqual(sorted(decodeSpec(encodeSpec(data)).pythonise_()), sorted(data.pythonise_()))
+        return
+
+    def testDecodeTask(self):
+        """
+        _testDecodeTask_
+
+        A single task and its subtasks can be decoded.
+        """
+        compact = encodeSpec(self.workload.data)
+        taskPath = "/TaskChainWorkload/Task1/Task1MergeRAWSIMoutput/Task2"
+        task = WMTaskHelper(decodeSpec(compact, taskPath))
+        self.assertEqual(task.getPathName(), taskPath)
+        self.assertEqual(task.data._internal_parent_ref, None)
+        self.assertEqual(sorted(task.data.pythonise_()),
+                         sorted(self.workload.getTaskByPath(taskPath).data.pythonise_()))
+        self.assertEqual([x.name() for x in task.childTaskIterator()],
+                         ["Task2MergeRAWSIMoutput", "Task2CleanupUnmergedRAWSIMoutput",
+                          "Task2MergeDQMoutput", "Task2CleanupUnmergedDQMoutput"])
+        self.assertEqual(decodeSpec(compact, "/TaskChainWorkload/Task4"), None)
+        return
+
+    def testUncompactable(self):
+        """
+        _testUncompactable_
+
+        Specs with values which can't be marshalled or with a section
+        referenced twice are still encoded.
+        """
+        task = self.workload.getTask("Task1")
+        task.data.parameters._internal_skipChecks = True
+        task.data.parameters.unmarshallable = RuntimeError("unmarshallable")
+        data = decodeSpec(encodeSpec(self.workload.data))
+        self.assertEqual(str(data.tasks.Task1.parameters.unmarshallable), "unmarshallable")
+
+        self.workload.data.section_("shared")
+        self.workload.data.shared.value = 1
+        self.workload.data.tasks.Task1.parameters.shared = self.workload.data.shared
+        compact = encodeSpec(self.workload.data)
+        data = decodeSpec(compact)
+        self.assertTrue(data.shared is data.tasks.Task1.parameters.shared)
+
+        # a single task is still found in the spec pickled as a whole
+        taskPath = "/TaskChainWorkload/Task1/Task1MergeRAWSIMoutput/Task2"
+        task = WMTaskHelper(decodeSpec(compact, taskPath))
+        self.assertEqual(task.getPathName(), taskPath)
+        self.assertEqual(task.data._internal_parent_ref, None)
+        self.assertEqual(sorted(task.data.pythonise_()),
+                         sorted(self.workload.getTaskByPath(taskPath).data.pythonise_()))
+        self.assertEqual(decodeSpec(compact, "/TaskChainWorkload/Task4"), None)
+
+        cache = SpecCache()
+        task = cache.decode(cPickle.dumps(self.workload.data), taskPath)
+        self.assertEqual(task.pathName, taskPath)
+        return
+
+    def testSpecCache(self):
+        """
+        _testSpecCache_
+
+        Pickled specs are decoded once, then from their compact form,
+        also by other caches sharing the same directory.
+        """
+        pickled = cPickle.dumps(self.workload.data)
+        cache = SpecCache(cacheDir=self.cacheDir)
+        first = cache.decode(pickled)
+        second = cache.decode(pickled)
+        self.assertEqual((cache.misses, cache.hits), (1, 1))
+        self.assertFalse(first is second)
+        self.assertEqual(sorted(first.pythonise_()), sorted(second.pythonise_()))
+        self.assertEqual(len(os.listdir(self.cacheDir)), 1)
+
+        otherCache = SpecCache(cacheDir=self.cacheDir)
+        taskPath = "/TaskChainWorkload/Task1"
+        task = otherCache.decode(pickled, taskPath)
+        self.assertEqual((otherCache.misses, otherCache.hits), (0, 1))
+        self.assertEqual(task.pathName, taskPath)
+
+        # a different spec is a different entry
+        self.workload.getTask("Task1").setTaskType("Skim")
+        changed = cache.decode(cPickle.dumps(self.workload.data))
+        self.assertEqual(changed.tasks.Task1.taskType, "Skim")
+        self.assertEqual(cache.misses, 2)
+
+        # the least recently used specs are evicted
+        cache = SpecCache(maxSize=1)
+        cache.decode(pickled)
+        cache.decode(cPickle.dumps(self.workload.data))
+        self.assertEqual(len(cache.entries), 1)
+        cache.decode(pickled)
+        self.assertEqual(cache.misses, 3)
+        return
+
+    @attr('performance')
+    def testLoadPerformance(self):
+        """
+        _testLoadPerformance_
+
+        Time the loading of a 20 task TaskChain pickled and compact.
+        """
+        workload = makeTaskChainWorkload(20)
+        pickled = cPickle.dumps(workload.data)
+        compact = encodeSpec(workload.data)
+
+        startTime = time.time()
+        for _ in range(10):
+            cPickle.loads(pickled)
+        pickleTime = (time.time() - startTime) / 10
+
+        startTime = time.time()
+        for _ in range(10):
+            decodeSpec(compact)
+        compactTime = (time.time() - startTime) / 10
+
+        cache = SpecCache()
+        cache.decode(pickled)
+        startTime = time.time()
+        for _ in range(10):
+            cache.decode(pickled)
+        cachedTime = (time.time() - startTime) / 10
+
+        taskPath = "/TaskChainWorkload/Task1/Task1MergeRAWSIMoutput/Task2"
+        startTime = time.time()
+        for _ in range(10):
+            decodeSpec(compact, taskPath)
+        taskTime = (time.time() - startTime) / 10
+
+        print("  Performance: pickle %d bytes loaded in %.3f secs, compact %d bytes in %.3f secs, "
+              "cached pickle in %.3f secs, single task in %.3f secs" %
+              (len(pickled), pickleTime, len(compact), compactTime, cachedTime, taskTime))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
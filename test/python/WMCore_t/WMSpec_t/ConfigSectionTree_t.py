@@ -3,11 +3,12 @@
 Tests for ConfigSectionTree
 """
 
+import cPickle
 import unittest
 
 from WMCore.WMSpec.ConfigSectionTree import ConfigSectionTree
 from WMCore.WMSpec.ConfigSectionTree import TreeHelper
-from WMCore.WMSpec.ConfigSectionTree import findTopNode, addNode
+from WMCore.WMSpec.ConfigSectionTree import findTopNode, addNode, getNode, deleteNode
 
 
 class ConfigSectionTreeTest(unittest.TestCase):
@@ -135,6 +136,36 @@ class ConfigSectionTreeTest(unittest.TestCase):
         topNode = TreeHelper(findTopNode(node3))
         self.assertEqual(topNode.name(), "node2")
 
+    def testD(self):
+        """memoized lookups follow tree changes"""
+        node1 = ConfigSectionTree("node1")
+        node2 = ConfigSectionTree("node2")
+        node3 = ConfigSectionTree("node3")
+        addNode(node1, node2)
+
+        helper = TreeHelper(node1)
+        self.assertEqual(helper.allNodeNames(), ["node1", "node2"])
+        self.assertTrue(getNode(node2, "node2") is node2)
+        self.assertEqual(getNode(node1, "node3"), None)
+
+        addNode(node2, node3)
+        self.assertEqual(helper.allNodeNames(), ["node1", "node2", "node3"])
+        self.assertTrue(getNode(node1, "node3") is node3)
+        self.assertEqual([x._internal_name for x in helper.nodeIterator()],
+                         ["node1", "node2", "node3"])
+        self.assertEqual([x._internal_name for x in helper.nodeChildIterator()],
+                         ["node2", "node3"])
+
+        # the memoized lookups are not persisted
+        pickled = cPickle.loads(cPickle.dumps(node1))
+        self.assertFalse(hasattr(pickled, "_internal_treeCache"))
+        self.assertEqual(TreeHelper(pickled).allNodeNames(), ["node1", "node2", "node3"])
+
+        deleteNode(node2, "node3")
+        self.assertEqual(getNode(node1, "node3"), None)
+        self.assertEqual(helper.listNodes(), ["node1", "node2"])
+        self.assertEqual(helper.allNodeNames(), ["node1", "node2"])
+
 
 
 
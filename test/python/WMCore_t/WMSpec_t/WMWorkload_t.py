@@ -5,9 +5,15 @@ _WMWorkload_t_
 Unittest for WMWorkload class
 """
 
+from __future__ import print_function
+
 import os
+import time
 import unittest
 
+from nose.plugins.attrib import attr
+
+from WMCore.WMSpec.ConfigSectionTree import invalidateTreeCache
 from WMCore.WMSpec.WMWorkload import WMWorkload, WMWorkloadHelper, WMWorkloadException
 from WMCore.WMSpec.WMTask import WMTask, WMTaskHelper
 from WMCore.WMSpec.WMSpecErrors import WMSpecFactoryException
@@ -1860,6 +1866,134 @@ class WMWorkloadTest(unittest.TestCase):
         self.assertFalse(testWorkload.getTrustLocationFlag().get('trustPUlists'), "Bad job!! You should be False again")
         return
 
+    def makeTaskChainWorkload(self, numTasks):
+        """
+        _makeTaskChainWorkload_
+
+        Make a workload shaped like a TaskChain: each processing task has
+        two output modules with a merge and a cleanup task each, and the
+        next processing task reads the output of the first merge task.
+        """
+        testWorkload = WMWorkloadHelper(WMWorkload("TaskChainWorkload"))
+
+        parentTask = None
+        for i in range(1, numTasks + 1):
+            taskName = "Task%d" % i
+            if parentTask is None:
+                procTask = testWorkload.newTask(taskName)
+            else:
+                procTask = parentTask.addTask(taskName)
+            procTask.setTaskType("Processing")
+            procTaskCMSSW = procTask.makeStep("cmsRun1")
+            procTaskCMSSW.setStepType("CMSSW")
+            procTaskStageOut = procTaskCMSSW.addStep("stageOut1")
+            procTaskStageOut.setStepType("StageOut")
+            procTaskLogArch = procTaskStageOut.addStep("logArch1")
+            procTaskLogArch.setStepType("LogArchive")
+            procTask.applyTemplates()
+
+            mergeTasks = []
+            for outputModule in ["RAWSIMoutput", "DQMoutput"]:
+                procTaskCMSSW.getTypeHelper().addOutputModule(outputModule,
+                                                              primaryDataset="bogusPrimary",
+                                                              processedDataset="bogusProcessed-v%d" % i,
+                                                              dataTier="GEN-SIM",
+                                                              lfnBase="bogusUnmerged",
+                                                              mergedLFNBase="bogusMerged",
+                                                              filterName=None)
+
+                mergeTask = procTask.addTask("%sMerge%s" % (taskName, outputModule))
+                mergeTask.setTaskType("Merge")
+                mergeTaskCMSSW = mergeTask.makeStep("cmsRun1")
+                mergeTaskCMSSW.setStepType("CMSSW")
+                mergeTask.applyTemplates()
+                mergeTasks.append(mergeTask)
+
+                cleanupTask = procTask.addTask("%sCleanupUnmerged%s" % (taskName, outputModule))
+                cleanupTask.setTaskType("Cleanup")
+                cleanupTaskStep = cleanupTask.makeStep("cleanupUnmerged%s" % outputModule)
+                cleanupTaskStep.setStepType("DeleteFiles")
+                cleanupTask.applyTemplates()
+
+            parentTask = mergeTasks[0]
+
+        return testWorkload
+
+    @attr('performance')
+    def testTaskChainLookupPerformance(self):
+        """
+        _testTaskChainLookupPerformance_
+
+        Time the task and step lookups done for every task of a 20 task
+        TaskChain, with the tree indexes dropped before each task and
+        memoized.
+        """
+        testWorkload = self.makeTaskChainWorkload(20)
+        taskPaths = testWorkload.listAllTaskPathNames()
+        self.assertEqual(len(taskPaths), 100)
+        self.assertEqual(len(testWorkload.listAllTaskNames()), 100)
+        self.assertEqual(len(testWorkload.listAllTaskNodes()), 100)
+
+        def lookups(memoized):
+            result = []
+            for taskPath in taskPaths:
+                if not memoized:
+                    topTask = testWorkload.getTask("Task1")
+                    for task in topTask.taskIterator():
+                        invalidateTreeCache(task.steps().data)
+                task = testWorkload.getTaskByPath(taskPath)
+                stepNames = task.listAllStepNames()
+                for stepName in stepNames:
+                    task.getStep(stepName)
+                outputModules = [x.listSections_() for x in task.getOutputModulesForTask()]
+                result.append((task.getPathName(), stepNames, outputModules,
+                               list(task.listNames())))
+            return result
+
+        startTime = time.time()
+        coldResult = lookups(False)
+        coldTime = time.time() - startTime
+
+        lookups(True)
+        startTime = time.time()
+        warmResult = lookups(True)
+        warmTime = time.time() - startTime
+
+        self.assertEqual(coldResult, warmResult)
+        self.assertEqual([x[0] for x in warmResult], taskPaths)
+        self.assertEqual(warmResult[0][1], ["cmsRun1", "stageOut1", "logArch1"])
+        self.assertEqual(sorted(warmResult[0][2][0]), ["DQMoutput", "RAWSIMoutput"])
+        print("  Performance: %d task lookups, %.3f secs rebuilding the indexes, %.3f secs memoized" %
+              (len(taskPaths), coldTime, warmTime))
+        return
+
+    def testTreeIndexInvalidation(self):
+        """
+        _testTreeIndexInvalidation_
+
+        Verify the memoized task and step lookups follow the changes made
+        to the workload.
+        """
+        testWorkload = self.makeTaskChainWorkload(2)
+        task2Path = "/TaskChainWorkload/Task1/Task1MergeRAWSIMoutput/Task2"
+        task2 = testWorkload.getTaskByPath(task2Path)
+        self.assertEqual(task2.name(), "Task2")
+        self.assertEqual(task2.listAllStepNames(), ["cmsRun1", "stageOut1", "logArch1"])
+
+        task2.steps().addStep("logArch2")
+        self.assertEqual(task2.listAllStepNames(), ["cmsRun1", "stageOut1", "logArch1", "logArch2"])
+        self.assertEqual(task2.getStep("logArch2").name(), "logArch2")
+
+        task2.setPathName("/TaskChainWorkload/Task1/Task2")
+        self.assertEqual(testWorkload.getTaskByPath(task2Path), None)
+        self.assertEqual(testWorkload.getTaskByPath("/TaskChainWorkload/Task1/Task2").name(), "Task2")
+
+        mergeTask = testWorkload.getTaskByPath("/TaskChainWorkload/Task1/Task1MergeRAWSIMoutput")
+        mergeTask.deleteChild("Task2")
+        self.assertEqual(testWorkload.getTaskByPath("/TaskChainWorkload/Task1/Task2"), None)
+        self.assertFalse("Task2" in testWorkload.listAllTaskNames())
+        return
+
 
 if __name__ == '__main__':
     unittest.main()
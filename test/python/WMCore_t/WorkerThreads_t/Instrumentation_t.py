@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+"""
+_Instrumentation_t_
+
+Unit tests for the instrumentation of the worker threads.
+
+"""
+from __future__ import print_function
+
+import logging
+import threading
+import time
+import unittest
+
+from nose.plugins.attrib import attr
+
+from WMCore.Database.DBCore import DBInterface
+from WMCore.WorkerThreads.Instrumentation import Instrumentation, currentInstrumentation, daoName, timed
+
+
+class DummyConnection(object):
+    """
+    Connection and transaction doing nothing
+    """
+    def begin(self):
+        return self
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class DummyEngine(object):
+    """
+    Engine handing out dummy connections
+    """
+    dialect = None
+
+    def connect(self):
+        return DummyConnection()
+
+
+class DummyDBInterface(DBInterface):
+    """
+    DBInterface not running anything
+    """
+    def executebinds(self, s = None, b = None, connection = None, returnCursor = False):
+        return []
+
+    def executemanybinds(self, s = None, b = None, connection = None, returnCursor = False):
+        return []
+
+
+class GetJobs(object):
+    """
+    A DAO
+    """
+    def __init__(self, dbi):
+        self.dbi = dbi
+
+    def execute(self, binds):
+        return self.dbi.processData("SELECT id FROM wmbs_job WHERE id = :id", binds)
+
+
+class DummyPoller(object):
+    """
+    Poller with timed methods
+    """
+    @timed("submit")
+    def submit(self, nJobs):
+        currentInstrumentation().count("jobs", nJobs)
+        self.build()
+
+    @timed("build")
+    def build(self):
+        time.sleep(0.01)
+
+
+class InstrumentationTest(unittest.TestCase):
+    """
+    Unit tests for Instrumentation
+    """
+
+    def setUp(self):
+        self.dbi = DummyDBInterface(logging.getLogger(), DummyEngine())
+
+    def tearDown(self):
+        threading.currentThread().instrumentation = None
+
+    def testCycle(self):
+        """
+        Nested timers, counters and queries of a cycle
+        """
+        instrumentation = Instrumentation("DummyPoller")
+        threading.currentThread().instrumentation = instrumentation
+        instrumentation.startCycle()
+
+        poller = DummyPoller()
+        poller.submit(10)
+        poller.submit(5)
+        dao = GetJobs(self.dbi)
+        dao.execute({"id": 1})
+        # split by processData, but accounted once
+        dao.execute([{"id": x} for x in range(1200)])
+
+        summary = instrumentation.endCycle()
+        self.assertEqual(summary['cycle'], 1)
+        self.assertEqual(sorted(summary['timers'].keys()), ["submit", "submit/build"])
+        self.assertEqual(summary['timers']["submit/build"]['count'], 2)
+        self.assertTrue(summary['timers']["submit"]['time'] >= summary['timers']["submit/build"]['time'] >= 0.02)
+        self.assertEqual(summary['counters'], {"jobs": 15})
+        self.assertEqual(summary['queryCount'], 2)
+        self.assertEqual(summary['queries'][daoName(dao)]['binds'], 1201)
+        self.assertTrue("2 queries in" in instrumentation.formatSummary(summary))
+        self.assertTrue(instrumentation.shortSummary().startswith("cycle "))
+
+        instrumentation.startCycle()
+        self.assertEqual(instrumentation.summary()['timers'], {})
+        return
+
+    def testNoCycle(self):
+        """
+        Nothing is recorded outside of a cycle
+        """
+        threading.currentThread().instrumentation = None
+        DummyPoller().submit(10)
+        GetJobs(self.dbi).execute({"id": 1})
+        self.assertEqual(currentInstrumentation().summary()['timers'], {})
+        self.assertEqual(currentInstrumentation().summary()['counters'], {})
+        return
+
+    def testDAOName(self):
+        """
+        DAO names leave out the generic packages
+        """
+        self.assertEqual(daoName(GetJobs(self.dbi)), "WMCore_t.WorkerThreads_t.Instrumentation_t.GetJobs")
+        from WMCore.Agent.Database.MySQL.InsertComponent import InsertComponent
+        self.assertEqual(daoName(InsertComponent.__new__(InsertComponent)), "Agent.InsertComponent")
+        return
+
+    @attr('performance')
+    def testPerformance(self):
+        """
+        Time the instrumentation of the queries and timers
+        """
+        dao = GetJobs(self.dbi)
+        poller = DummyPoller()
+        poller.build = lambda: None
+        count = 20000
+
+        startTime = time.time()
+        for _ in range(count):
+            dao.execute({"id": 1})
+        bareTime = time.time() - startTime
+
+        instrumentation = Instrumentation("DummyPoller")
+        threading.currentThread().instrumentation = instrumentation
+        instrumentation.startCycle()
+        startTime = time.time()
+        for _ in range(count):
+            dao.execute({"id": 1})
+        queryTime = time.time() - startTime
+
+        startTime = time.time()
+        for _ in range(count):
+            poller.submit(1)
+        timerTime = time.time() - startTime
+
+        print("  Performance: %.2f usecs per query instrumented (%.2f usecs for the dummy query), "
+              "%.2f usecs per timed call" % ((queryTime - bareTime) / count * 1e6, bareTime / count * 1e6,
+                                             timerTime / count * 1e6))
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
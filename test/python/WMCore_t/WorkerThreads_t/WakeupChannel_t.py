@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+_WakeupChannel_t_
+
+Unit tests for the wakeups of the worker threads.
+
+"""
+
+import os
+import threading
+import time
+import unittest
+
+from WMCore.Configuration import Configuration
+from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
+from WMCore.WorkerThreads.WakeupChannel import WakeupChannel, sendWakeup, wakeupPath
+
+from WMQuality.TestInit import TestInit
+
+
+class DummyComponent(object):
+    """
+    Just holds the configuration
+    """
+    def __init__(self, config):
+        self.config = config
+
+
+class DummyHeartbeatAPI(object):
+    """
+    Counts the heartbeats written
+    """
+    def __init__(self):
+        self.updates = []
+
+    def updateWorkerHeartbeat(self, workerName, state = "Start", pid = None):
+        self.updates.append((workerName, state))
+
+
+class WakeupChannelTest(unittest.TestCase):
+    """
+    Unit tests for WakeupChannel
+    """
+
+    def setUp(self):
+        self.testInit = TestInit(__file__)
+        self.testDir = self.testInit.generateWorkDir()
+
+        myThread = threading.currentThread()
+        self.dbFactory = getattr(myThread, "dbFactory", None)
+        self.logger = getattr(myThread, "logger", None)
+        myThread.dbFactory = None
+        myThread.logger = None
+
+        self.config = Configuration()
+        self.config.section_("Agent")
+        self.config.Agent.componentName = "JobCreator"
+        self.config.Agent.useWakeupChannel = True
+        for componentName in ["JobCreator", "JobSubmitter"]:
+            self.config.component_(componentName)
+            componentDir = os.path.join(self.testDir, componentName)
+            os.mkdir(componentDir)
+            getattr(self.config, componentName).componentDir = componentDir
+        return
+
+    def tearDown(self):
+        myThread = threading.currentThread()
+        myThread.dbFactory = self.dbFactory
+        myThread.logger = self.logger
+        self.testInit.delWorkDir()
+        return
+
+    def testChannel(self):
+        """
+        Wake up the workers registered to a channel
+        """
+        path = wakeupPath(self.config, "JobSubmitter")
+        self.assertEqual(path, os.path.join(self.testDir, "JobSubmitter", "wakeup.sock"))
+        self.assertEqual(wakeupPath(self.config, "JobAccountant"), None)
+        self.assertFalse(sendWakeup(path))
+
+        channel = WakeupChannel(path)
+        events = [channel.register(), channel.register()]
+        self.assertTrue(sendWakeup(path))
+        for event in events:
+            event.wait(5)
+            self.assertTrue(event.isSet())
+            event.clear()
+        self.assertEqual(channel.wakeups, 1)
+
+        # closing wakes the workers up so that they can terminate
+        channel.close()
+        self.assertTrue(events[0].isSet())
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(sendWakeup(path))
+        return
+
+    def testWorkerWakeup(self):
+        """
+        A sleeping worker is woken up by another component
+        """
+        channel = WakeupChannel(wakeupPath(self.config, "JobSubmitter"))
+
+        sleeper = BaseWorkerThread()
+        sleeper.idleTime = 60
+        sleeper.wakeupEvent = channel.register()
+
+        waker = BaseWorkerThread()
+        waker.component = DummyComponent(self.config)
+        self.assertFalse(waker.wakeupComponent("JobAccountant"))
+
+        threading.Timer(0.5, waker.wakeupComponent, ["JobSubmitter"]).start()
+        startTime = time.time()
+        sleeper.sleepThread()
+        sleeper.recordLoop(time.time() - startTime)
+        self.assertTrue(time.time() - startTime < 30)
+        self.assertEqual(sleeper.loopStats['loops'], 1)
+        self.assertEqual(sleeper.loopStats['wakeups'], 1)
+
+        self.config.Agent.useWakeupChannel = False
+        self.assertFalse(waker.wakeupComponent("JobSubmitter"))
+        channel.close()
+        return
+
+    def testHeartbeatInterval(self):
+        """
+        The heartbeat isn't written more often than its interval
+        """
+        worker = BaseWorkerThread()
+        worker.heartbeatAPI = DummyHeartbeatAPI()
+        worker.heartbeatInterval = 60
+        for _ in range(10):
+            worker.updateHeartbeat("Worker")
+        self.assertEqual(worker.heartbeatAPI.updates, [("Worker", "Running")])
+        self.assertEqual(worker.loopStats['heartbeatsSkipped'], 9)
+
+        worker.lastHeartbeat -= 60
+        worker.updateHeartbeat("Worker")
+        self.assertEqual(worker.loopStats['heartbeats'], 2)
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()